@@ -91,6 +91,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Failed to initialize AI pipeline components: {e}")
 
+    # Start periodic shelf-life sweep for stored lots
+    try:
+        import asyncio
+        from app.services.shelf_life_service import run_shelf_life_sweep_loop
+        app.state.shelf_life_task = asyncio.create_task(run_shelf_life_sweep_loop())
+        logger.info("✅ Shelf-life sweep scheduled")
+    except Exception as e:
+        logger.error(f"❌ Failed to schedule shelf-life sweep: {e}")
+
     # Initialize Storage Guard Agent
     try:
         from app.agents.storage_guard import StorageGuardAgent
@@ -134,6 +143,17 @@ async def lifespan(app: FastAPI):
             logger.warning("⚠️ MongoDB connection test failed; check credentials/host")
     except Exception as e:
         logger.error(f"❌ MongoDB init failed: {e}")
+
+    # Rebuild the vendor_locations geo index in the background
+    try:
+        import asyncio
+        from app.services.vendor_geo_service import get_vendor_geo_service
+        app.state.vendor_geo_sync_task = asyncio.create_task(asyncio.to_thread(get_vendor_geo_service().sync_all))
+        logger.info("✅ Vendor location geo sync scheduled")
+    except Exception as e:
+        logger.error(f"❌ Failed to schedule vendor location geo sync: {e}")
+    
+    yield
     
     # Shutdown
     logger.info("🛑 Shutting down Enhanced Pest & Disease Monitoring AI Agent")
@@ -147,6 +167,32 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"❌ LLM service cleanup failed: {e}")
     
+    # Stop shelf-life sweep
+    shelf_life_task = getattr(app.state, "shelf_life_task", None)
+    if shelf_life_task is not None:
+        shelf_life_task.cancel()
+
+    # Stop upload variant worker
+    try:
+        from app.services.upload_service import get_upload_service
+        get_upload_service().shutdown()
+    except Exception as e:
+        logger.error(f"❌ Upload variant worker shutdown failed: {e}")
+
+    # Stop demand forecast training worker
+    try:
+        from app.services.demand_forecast_service import shutdown_training_worker
+        shutdown_training_worker()
+    except Exception as e:
+        logger.error(f"❌ Demand forecast worker shutdown failed: {e}")
+
+    # Stop vendor location sync worker
+    try:
+        from app.services.vendor_geo_service import get_vendor_geo_service
+        get_vendor_geo_service().shutdown()
+    except Exception as e:
+        logger.error(f"❌ Vendor location sync shutdown failed: {e}")
+
     # Cleanup workflow resources
     try:
         from app.graph.graph import cleanup_workflow
@@ -179,8 +225,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ AI pipeline components cleanup failed: {e}")
 
+    # Close pooled outbound HTTP clients
+    try:
+        from app.connections.http_connection import close_http_pool
+        await close_http_pool()
+    except Exception as e:
+        logger.error(f"❌ HTTP client pool shutdown failed: {e}")
+
+    # Close shared cache disk tier
+    try:
+        from app.core.cache import get_cache_manager
+        get_cache_manager().close()
+    except Exception as e:
+        logger.error(f"❌ Cache manager shutdown failed: {e}")
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files for serving uploaded images
 uploads_dir = os.path.join(os.getcwd(), "uploads")
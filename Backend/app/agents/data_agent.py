@@ -1,9 +1,9 @@
 from typing import Dict, Any, Optional, List, Tuple  # ← FIXED: Added Tuple
-import httpx
 import pandas as pd
 import numpy as np
 from app.agents.base_agent import BaseAgent, AgentResponse
 from app.core.config import settings
+from app.connections.http_connection import get_http_pool
 from app.ml.data_loader import CropRecommendationSystem
 
 class DynamicDataAgent(BaseAgent):
@@ -166,26 +166,26 @@ class DynamicDataAgent(BaseAgent):
         
         # Use real weather API
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    "http://api.openweathermap.org/data/2.5/weather",
-                    params={
-                        "lat": lat,
-                        "lon": lon,
-                        "appid": settings.weather_api_key,
-                        "units": "metric"
-                    }
-                )
-                
-                if response.status_code == 200:
-                    weather = response.json()
-                    return {
-                        "temperature": weather["main"]["temp"],
-                        "humidity": weather["main"]["humidity"],
-                        "pressure": weather["main"]["pressure"],
-                        "wind_speed": weather.get("wind", {}).get("speed", 0),
-                        "weather_description": weather["weather"][0]["description"]
-                    }
+            client = get_http_pool().httpx_client("openweathermap", timeout=10.0)
+            response = await client.get(
+                "http://api.openweathermap.org/data/2.5/weather",
+                params={
+                    "lat": lat,
+                    "lon": lon,
+                    "appid": settings.weather_api_key,
+                    "units": "metric"
+                }
+            )
+            
+            if response.status_code == 200:
+                weather = response.json()
+                return {
+                    "temperature": weather["main"]["temp"],
+                    "humidity": weather["main"]["humidity"],
+                    "pressure": weather["main"]["pressure"],
+                    "wind_speed": weather.get("wind", {}).get("speed", 0),
+                    "weather_description": weather["weather"][0]["description"]
+                }
         except Exception as e:
             self.logger.error(f"Weather API error: {e}")
         
@@ -114,7 +114,8 @@ class PestDetectionAgent:
         location: Optional[Location] = None,
         field_notes: Optional[str] = None,
         previous_treatments: Optional[List[Dict]] = None,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        budget_seconds: Optional[float] = None
     ) -> AnalysisResponse:
         """
         Perform comprehensive pest and disease analysis
@@ -127,6 +128,8 @@ class PestDetectionAgent:
             field_notes: Additional field observations
             previous_treatments: History of applied treatments
             user_id: User identifier for personalization
+            budget_seconds: Request time budget covering the whole analysis (None uses
+                WORKFLOW_DEFAULT_BUDGET_SECONDS for the workflow)
             
         Returns:
             Comprehensive analysis response with recommendations
@@ -166,8 +169,11 @@ class PestDetectionAgent:
             )
             
             # Execute main analysis workflow
+            # Validation and context building already spent part of the budget
+            if budget_seconds is not None:
+                budget_seconds -= (datetime.utcnow() - start_time).total_seconds()
             analysis_result = await self._execute_analysis_workflow(
-                validated_payload, context, trace_id
+                validated_payload, context, trace_id, budget_seconds
             )
             
             # Post-process and enhance results
@@ -280,7 +286,7 @@ class PestDetectionAgent:
             
             cached_data = await self.cache_manager.get(
                 cache_key, 
-                cache_type="analysis_results"
+                namespace="analysis_results"
             )
             
             if cached_data:
@@ -376,9 +382,10 @@ class PestDetectionAgent:
         self,
         payload: AnalysisPayload,
         context: DetectionContext,
-        trace_id: str
+        trace_id: str,
+        budget_seconds: Optional[float] = None
     ) -> AnalysisResponse:
-        """Execute the main LangGraph analysis workflow"""
+        """Execute the main LangGraph analysis workflow within the remaining time budget"""
         
         logger.info(
             "🔄 Executing analysis workflow",
@@ -387,7 +394,7 @@ class PestDetectionAgent:
         
         try:
             # Use the existing LangGraph workflow
-            result = await self.workflow.analyze_images(payload)
+            result = await self.workflow.analyze_images(payload, budget_seconds=budget_seconds)
             
             # Add context information to the result
             if hasattr(result, 'metadata') and result.metadata:
@@ -695,7 +702,7 @@ class PestDetectionAgent:
                 cache_key,
                 result.dict(),
                 ttl=self.config.cache_ttl,
-                cache_type="analysis_results"
+                namespace="analysis_results"
             )
             
             logger.debug(
@@ -4,6 +4,10 @@ import requests
 from pathlib import Path
 from ultralytics import YOLO
 from app.schemas.postgres_base_models import QualityReport, Defect
+from app.models.model_variants import resolve_model_variant
+
+# Image downloads reuse keep-alive connections across calls
+_image_session = requests.Session()
 
 class StorageGuardAgent:
     """
@@ -19,11 +23,14 @@ class StorageGuardAgent:
             model_path = str(custom_model_path)
             print(f"🌾 Using custom crop detection model: {model_path}")
         
+        # INT8 ONNX export of the same weights when configured (scripts/quantize.py)
+        model_path, self.variant = resolve_model_variant("storage_guard", model_path)
+        
         try:
-            self.model = YOLO(model_path)
+            self.model = YOLO(model_path, task="detect")
             self.is_mock = False
             self.model_path = model_path
-            print(f"✅ Successfully loaded YOLOv8 model: {model_path}")
+            print(f"✅ Successfully loaded YOLOv8 model: {model_path} ({self.variant})")
         except Exception as e:
             print(f"⚠️ Warning: Could not load YOLOv8 model from '{model_path}'. Using a mock model. Error: {e}")
             self._create_mock_model()
@@ -127,7 +134,7 @@ class StorageGuardAgent:
         reports = []
         for url in image_urls:
             try:
-                resp = requests.get(url, timeout=5)
+                resp = _image_session.get(url, timeout=5)
                 if resp.status_code != 200:
                     continue
                 report = self.analyze_image(resp.content)
@@ -167,6 +174,7 @@ class StorageGuardAgent:
         return {
             "model_type": "YOLOv8",
             "model_path": self.model_path,
+            "variant": self.variant,
             "is_mock": self.is_mock,
             "status": "loaded" if self.model else "not loaded",
             "num_classes": len(crop_classes),
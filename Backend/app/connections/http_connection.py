@@ -0,0 +1,249 @@
+"""
+Shared outbound HTTP clients
+
+One long-lived client per upstream (LLM providers, weather, mandi, ...) so
+requests reuse keep-alive connections instead of repeating TCP/TLS setup.
+Clients are created lazily on the running event loop and closed from the
+application lifespan. Per-upstream counters show how often connections are
+reused.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import aiohttp
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events that mean a request failed before a response arrived
+_HTTPX_FAILURE_EVENTS = frozenset({
+    "connection.connect_tcp.failed",
+    "http11.receive_response_headers.failed",
+    "http2.receive_response_headers.failed",
+})
+
+
+@dataclass
+class UpstreamStats:
+    """Connection usage for one upstream client"""
+    requests: int = 0
+    new_connections: int = 0
+    errors: int = 0
+
+    @property
+    def reused_connections(self) -> int:
+        return max(0, self.requests - self.new_connections - self.errors)
+
+
+class HTTPClientPool:
+    """
+    Registry of pooled httpx and aiohttp clients keyed by upstream name
+
+    Clients are bound to the event loop that created them; a caller on a
+    different loop (scripts, tests using asyncio.run) gets a fresh client and
+    the stale one is closed.
+    """
+
+    def __init__(self):
+        self._httpx: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._aiohttp: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._stats: Dict[str, UpstreamStats] = {}
+        # Close tasks for stale clients, kept referenced until they finish
+        self._closing: Set[asyncio.Future] = set()
+
+    def _close_stale(self, owner: asyncio.AbstractEventLoop, close: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Close a client that belongs to another event loop
+
+        On its own loop when that loop still runs (another thread), else on the
+        current loop as a best effort for a loop that has already finished.
+        """
+        if owner.is_running() and not owner.is_closed():
+            asyncio.run_coroutine_threadsafe(close(), owner).add_done_callback(self._log_close_failure)
+            return
+        task = asyncio.get_running_loop().create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+        task.add_done_callback(self._log_close_failure)
+
+    @staticmethod
+    def _log_close_failure(future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.debug(f"Stale HTTP client did not close cleanly: {error}")
+
+    def _stats_for(self, name: str) -> UpstreamStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = UpstreamStats()
+        return stats
+
+    def httpx_client(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        verify: bool = True,
+        follow_redirects: bool = False,
+    ) -> httpx.AsyncClient:
+        """
+        Get the pooled httpx client for an upstream
+
+        Options only apply when the client is first created; every caller for a
+        name should pass the same ones.
+
+        Args:
+            name: Upstream name (e.g. "accuweather")
+            timeout: Default total timeout in seconds (HTTP_DEFAULT_TIMEOUT_SECONDS)
+            headers: Default headers
+            verify: Verify TLS certificates
+            follow_redirects: Follow redirects by default
+
+        Returns:
+            httpx.AsyncClient: Shared client; do not close it or use it in `async with`
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._httpx.get(name)
+        if entry and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        if entry and not entry[1].is_closed:
+            self._close_stale(entry[0], entry[1].aclose)
+
+        stats = self._stats_for(name)
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                stats.new_connections += 1
+            elif event_name in _HTTPX_FAILURE_EVENTS:
+                stats.errors += 1
+
+        async def on_request(request: httpx.Request) -> None:
+            stats.requests += 1
+            request.extensions["trace"] = trace
+
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                timeout or settings.HTTP_DEFAULT_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_SECONDS,
+            ),
+            headers=headers,
+            verify=verify,
+            follow_redirects=follow_redirects,
+            event_hooks={"request": [on_request]},
+        )
+        self._httpx[name] = (loop, client)
+        return client
+
+    def aiohttp_session(self, name: str, timeout: Optional[float] = None) -> aiohttp.ClientSession:
+        """
+        Get the pooled aiohttp session for an upstream
+
+        Args:
+            name: Upstream name (e.g. "llm:openai")
+            timeout: Default total timeout in seconds (HTTP_DEFAULT_TIMEOUT_SECONDS)
+
+        Returns:
+            aiohttp.ClientSession: Shared session; do not close it
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._aiohttp.get(name)
+        if entry and entry[0] is loop and not entry[1].closed:
+            return entry[1]
+        if entry and not entry[1].closed:
+            self._close_stale(entry[0], entry[1].close)
+
+        stats = self._stats_for(name)
+
+        async def on_request_start(session, ctx, params) -> None:
+            stats.requests += 1
+
+        async def on_connection_create_end(session, ctx, params) -> None:
+            stats.new_connections += 1
+
+        async def on_request_exception(session, ctx, params) -> None:
+            stats.errors += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_request_exception.append(on_request_exception)
+
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.HTTP_MAX_CONNECTIONS,
+                limit_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=timeout or settings.HTTP_DEFAULT_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+            trace_configs=[trace_config],
+        )
+        self._aiohttp[name] = (loop, session)
+        return session
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-upstream request and connection reuse counters"""
+        result = {}
+        for name, stats in self._stats.items():
+            data = asdict(stats)
+            data["reused_connections"] = stats.reused_connections
+            result[name] = data
+        return result
+
+    async def close(self) -> None:
+        """Close every pooled client (application shutdown)"""
+        clients = list(self._httpx.values())
+        sessions = list(self._aiohttp.values())
+        self._httpx.clear()
+        self._aiohttp.clear()
+
+        for _, client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client: {e}")
+        for _, session in sessions:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP session: {e}")
+
+        logger.info(f"🔌 Closed {len(clients) + len(sessions)} pooled HTTP client(s)")
+
+
+# Singleton instance
+_http_pool_instance: Optional[HTTPClientPool] = None
+
+
+def get_http_pool() -> HTTPClientPool:
+    """Get singleton HTTPClientPool instance"""
+    global _http_pool_instance
+
+    if _http_pool_instance is None:
+        _http_pool_instance = HTTPClientPool()
+
+    return _http_pool_instance
+
+
+async def close_http_pool() -> None:
+    """Close pooled HTTP clients at application shutdown"""
+    global _http_pool_instance
+
+    if _http_pool_instance is not None:
+        await _http_pool_instance.close()
+        _http_pool_instance = None
@@ -0,0 +1,536 @@
+"""
+Cache Manager - Namespaced, tiered caching shared across services
+
+Each namespace has a bounded in-process LRU with per-entry TTL. Namespaces can
+opt into a local SQLite tier so uvicorn workers on the same host share entries
+(and survive restarts). Loads are single-flight per key, and hit/miss/eviction
+counters are kept per namespace. No external services are required.
+"""
+
+import asyncio
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+_DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at);
+CREATE TABLE IF NOT EXISTS cache_leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+@dataclass
+class CacheStats:
+    """Counters for one namespace"""
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    loads: int = 0
+    coalesced: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class DiskCache:
+    """
+    SQLite file shared by every worker process on the host
+
+    Values are pickled; only this application writes the file.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes_since_trim = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=5.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_DISK_SCHEMA)
+
+    def get(self, namespace: str, key: str) -> Tuple[Any, float]:
+        """Return (value, expires_at) or (_MISSING, 0) when absent or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return _MISSING, 0.0
+            if row[1] <= now:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+                return _MISSING, 0.0
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: float) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, size_bytes, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, len(blob), expires_at, time.time()),
+            )
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= 100:
+                self._trim()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def claim(self, namespace: str, key: str, lease_seconds: float) -> bool:
+        """Take the host-wide lease for loading a key; False if another worker holds it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE expires_at <= ?", (now,))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cache_leases (namespace, key, expires_at) VALUES (?, ?, ?)",
+                (namespace, key, now + lease_seconds),
+            )
+            return cursor.rowcount == 1
+
+    def is_claimed(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM cache_leases WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def release(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_leases WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def _trim(self) -> None:
+        """Drop expired rows, then least recently used rows above max_bytes"""
+        self._writes_since_trim = 0
+        self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        rows = self._conn.execute(
+            "SELECT namespace, key, size_bytes FROM cache_entries ORDER BY accessed_at"
+        ).fetchall()
+        victims = []
+        for namespace, key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((namespace, key))
+            excess -= size
+        self._conn.executemany(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims
+        )
+
+    def ping(self) -> None:
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CacheNamespace:
+    """
+    One named cache: bounded LRU in memory, optionally backed by the disk tier
+
+    Args:
+        name: Namespace name (also the disk-tier partition)
+        max_entries: Entries kept in memory before the least recently used is evicted
+        ttl_seconds: Default time-to-live for entries
+        disk: Shared disk tier, or None for memory only
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, disk: Optional[DiskCache] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk = disk
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Single-flight: key -> in-progress load (asyncio.Future or threading.Event)
+        self._async_loads: Dict[str, asyncio.Future] = {}
+        self._sync_loads: Dict[str, threading.Event] = {}
+
+    def _store_local(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _lookup(self, key: str) -> Any:
+        value = self._lookup_memory(key)
+        if value is not _MISSING:
+            return value
+        return self._lookup_disk(key)
+
+    async def _lookup_async(self, key: str) -> Any:
+        """_lookup with the disk read (SQLite) off the event loop"""
+        value = self._lookup_memory(key)
+        if value is not _MISSING:
+            return value
+        if self.disk is None:
+            return self._lookup_disk(key)
+        return await asyncio.to_thread(self._lookup_disk, key)
+
+    def _lookup_memory(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.stats.expirations += 1
+        return _MISSING
+
+    def _lookup_disk(self, key: str) -> Any:
+        """Disk-tier read after a memory miss (counts the miss when absent)"""
+        if self.disk is not None:
+            try:
+                value, expires_at = self.disk.get(self.name, key)
+            except Exception as e:
+                logger.warning(f"Disk cache read failed for {self.name}: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                self._store_local(key, value, expires_at)
+                with self._lock:
+                    self.stats.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.stats.misses += 1
+        return _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or default when absent or expired"""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (namespace default when omitted)"""
+        expires_at = time.time() + (self.ttl_seconds if ttl is None else ttl)
+        self._store_local(key, value, expires_at)
+        with self._lock:
+            self.stats.sets += 1
+        if self.disk is not None:
+            try:
+                self.disk.set(self.name, key, value, expires_at)
+            except Exception as e:
+                logger.warning(f"Disk cache write failed for {self.name}: {e}")
+
+    def delete(self, key: str) -> None:
+        """
+        Drop a key from this process and the disk tier
+
+        Other workers keep their in-memory copy until it expires.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(self.name, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear(self.name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached value or await loader() once for all concurrent callers
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value on a miss
+            ttl: Time-to-live override in seconds
+            lease_seconds: With the disk tier, also coalesce across workers: one worker
+                claims the key for at most this long and the others wait for its result
+
+        Returns:
+            Any: Cached or freshly loaded value (loader exceptions propagate to every waiter)
+        """
+        while True:
+            value = await self._lookup_async(key)
+            if value is not _MISSING:
+                return value
+
+            pending = self._async_loads.get(key)
+            if pending is None:
+                break
+            with self._lock:
+                self.stats.coalesced += 1
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                return pending.result()
+            # The loading caller was cancelled; retry (possibly as the new loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_loads[key] = future
+        try:
+            if lease_seconds and self.disk is not None:
+                value = await self._load_shared(key, loader, ttl, lease_seconds)
+            else:
+                with self._lock:
+                    self.stats.loads += 1
+                value = await loader()
+                if self.disk is not None:
+                    await asyncio.to_thread(self.set, key, value, ttl)
+                else:
+                    self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark retrieved so an unobserved failure is not logged
+            future.exception()
+            raise
+        finally:
+            self._async_loads.pop(key, None)
+
+    async def _load_shared(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+        lease_seconds: float,
+    ) -> Any:
+        """Load under the disk-tier lease, or wait for the worker holding it"""
+        while True:
+            if await asyncio.to_thread(self.disk.claim, self.name, key, lease_seconds):
+                try:
+                    with self._lock:
+                        self.stats.loads += 1
+                    value = await loader()
+                    await asyncio.to_thread(self.set, key, value, ttl)
+                    return value
+                finally:
+                    await asyncio.to_thread(self.disk.release, self.name, key)
+
+            with self._lock:
+                self.stats.coalesced += 1
+            while await asyncio.to_thread(self.disk.is_claimed, self.name, key):
+                await asyncio.sleep(settings.CACHE_LEASE_POLL_SECONDS)
+            value = await asyncio.to_thread(self._lookup, key)
+            if value is not _MISSING:
+                return value
+            # The other worker failed or its result already expired; try to load it here
+
+    def get_or_load_sync(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Thread-safe variant of get_or_load for synchronous callers
+
+        Concurrent callers wait for the first loader; if it fails, they retry.
+        """
+        while True:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+
+            with self._lock:
+                event = self._sync_loads.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._sync_loads[key] = event
+                    owner = True
+                    self.stats.loads += 1
+                else:
+                    owner = False
+                    self.stats.coalesced += 1
+
+            if not owner:
+                event.wait()
+                continue
+
+            try:
+                value = loader()
+                self.set(key, value, ttl)
+                return value
+            finally:
+                with self._lock:
+                    self._sync_loads.pop(key, None)
+                event.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Statistics for monitoring endpoints"""
+        with self._lock:
+            data = asdict(self.stats)
+            data["hit_rate"] = round(self.stats.hit_rate, 4)
+            data["entries"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        data["ttl_seconds"] = self.ttl_seconds
+        data["disk_tier"] = self.disk is not None
+        return data
+
+
+class CacheManager:
+    """Registry of cache namespaces sharing one optional disk tier"""
+
+    def __init__(self):
+        self.default_max_entries = settings.CACHE_MAX_ENTRIES
+        self.default_ttl_seconds = settings.CACHE_DEFAULT_TTL_SECONDS
+        self._namespaces: Dict[str, CacheNamespace] = {}
+        self._lock = threading.Lock()
+        self.disk: Optional[DiskCache] = None
+
+        if settings.CACHE_DISK_ENABLED:
+            try:
+                self.disk = DiskCache(settings.CACHE_DISK_PATH, settings.CACHE_DISK_MAX_BYTES)
+                logger.info(f"💾 Shared disk cache at {settings.CACHE_DISK_PATH}")
+            except Exception as e:
+                logger.warning(f"Disk cache unavailable, using memory only: {e}")
+
+    def namespace(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        disk: bool = False,
+    ) -> CacheNamespace:
+        """
+        Get or create a namespace
+
+        Args:
+            name: Namespace name
+            max_entries: In-memory entry cap (CACHE_MAX_ENTRIES by default)
+            ttl_seconds: Default TTL (CACHE_DEFAULT_TTL_SECONDS by default)
+            disk: Also store entries in the shared disk tier (values must be picklable)
+
+        Returns:
+            CacheNamespace: Settings are fixed by the first call for a name
+        """
+        with self._lock:
+            ns = self._namespaces.get(name)
+            if ns is None:
+                ns = CacheNamespace(
+                    name,
+                    max_entries=max_entries or self.default_max_entries,
+                    ttl_seconds=self.default_ttl_seconds if ttl_seconds is None else ttl_seconds,
+                    disk=self.disk if disk else None,
+                )
+                self._namespaces[name] = ns
+            return ns
+
+    async def get(self, key: str, namespace: str = "default") -> Any:
+        ns = self.namespace(namespace)
+        if ns.disk is None:
+            return ns.get(key)
+        return await asyncio.to_thread(ns.get, key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, namespace: str = "default") -> None:
+        ns = self.namespace(namespace)
+        if ns.disk is None:
+            ns.set(key, value, ttl)
+        else:
+            await asyncio.to_thread(ns.set, key, value, ttl)
+
+    async def delete(self, key: str, namespace: str = "default") -> None:
+        ns = self.namespace(namespace)
+        if ns.disk is None:
+            ns.delete(key)
+        else:
+            await asyncio.to_thread(ns.delete, key)
+
+    async def ping(self) -> bool:
+        """Raise if the disk tier is configured but unusable"""
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.ping)
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-namespace statistics"""
+        with self._lock:
+            namespaces = list(self._namespaces.values())
+        return {ns.name: ns.snapshot() for ns in namespaces}
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+# Singleton instance
+_cache_manager_instance: Optional[CacheManager] = None
+_cache_manager_lock = threading.Lock()
+
+
+def get_cache_manager() -> CacheManager:
+    """Get singleton CacheManager instance"""
+    global _cache_manager_instance
+
+    if _cache_manager_instance is None:
+        with _cache_manager_lock:
+            if _cache_manager_instance is None:
+                _cache_manager_instance = CacheManager()
+
+    return _cache_manager_instance
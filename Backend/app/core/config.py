@@ -76,6 +76,10 @@ class Settings(BaseSettings):
     # API Cache settings
     api_cache_duration: int = 3600
 
+    # Farmer dashboard view cache (invalidated on booking/transport/certificate writes)
+    FARMER_DASHBOARD_CACHE_TTL_SECONDS: int = 300
+    FARMER_DASHBOARD_CACHE_MAX_ENTRIES: int = 10000
+
     # LLM Configuration
     PRIMARY_LLM_PROVIDER: str = "openai"  # openai, anthropic, google, azure
     FALLBACK_LLM_PROVIDER: str = "anthropic"
@@ -102,7 +106,56 @@ class Settings(BaseSettings):
     # LLM Parallel Processing Settings
     LLM_PARALLEL_PROVIDERS: int = 2  # Number of LLM providers to use in parallel
     LLM_CONSENSUS_THRESHOLD: float = 0.7  # Minimum consensus threshold for decisions
-    
+    VISION_MAX_CONCURRENCY: int = 4  # Images analyzed at once per workflow run
+    VISION_IMAGE_TIMEOUT_SECONDS: float = 45.0  # Per-image budget including provider retries
+
+    # Local-first vision cascade (app/models/vision_cascade.py)
+    VISION_CASCADE_ENABLED: bool = True  # Try the on-box classifier before the vision LLM
+    VISION_CASCADE_DEFAULT_THRESHOLD: float = 0.85  # Calibrated confidence needed to accept a local answer
+    VISION_CASCADE_TARGET_AGREEMENT: float = 0.95  # Per-class local/LLM agreement thresholds are tuned to
+    VISION_CASCADE_AUDIT_RATE: float = 0.05  # Share of accepted local answers also checked by the LLM
+    VISION_CASCADE_MIN_SAMPLES: int = 30  # Comparisons per class before its threshold is tuned
+    VISION_CASCADE_MAX_SAMPLES_PER_CLASS: int = 1000  # Most recent comparisons kept per class
+    VISION_CASCADE_TUNE_EVERY: int = 50  # Re-tune after this many new comparisons
+    VISION_CASCADE_THRESHOLDS_PATH: Path = BASE_DIR / "data" / "models" / "cascade_thresholds.json"
+    RESPONSE_AGENT_EARLY_EXIT: bool = True  # Select as provider answers arrive instead of waiting for all
+    RESPONSE_AGENT_QUALITY_BAR: float = 0.75  # Score that ends selection immediately
+    RESPONSE_AGENT_SCORE_WINDOW: int = 200  # Recent scores kept per provider to bound what it can reach
+    RESPONSE_AGENT_MIN_SCORE_SAMPLES: int = 20  # Successful scores needed before a provider's history replaces the formula maximum
+    RESPONSE_AGENT_BOUND_QUANTILE: float = 0.95  # Quantile of a provider's successful scores used as its ceiling
+    RESPONSE_AGENT_BOUND_FLOOR: float = 0.5  # History never lowers a provider's ceiling below this
+    RESPONSE_AGENT_EXPLORE_RATE: float = 0.1  # Share of selections that let every provider finish (refreshes history)
+    RESPONSE_AGENT_SKIP_LOG_PATH: Path = BASE_DIR / "data" / "response_agent" / "skipped_providers.jsonl"
+    LLM_HEDGE_ENABLED: bool = True  # Re-send slow vision calls to the next provider
+    LLM_HEDGE_PERCENTILE: float = 0.9  # Hedge once the primary exceeds this latency quantile
+    LLM_HEDGE_MAX_RATE: float = 0.1  # Fraction of recent requests allowed to fire a hedge
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 8.0  # Used until a provider has LLM_HEDGE_MIN_SAMPLES
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_LATENCY_WINDOW: int = 200  # Recent calls kept per provider latency histogram
+    LLM_ROUTER_EWMA_ALPHA: float = 0.2  # Weight of the newest call in latency/error/cost estimates
+    LLM_ROUTER_EXPLORE_RATE: float = 0.05  # Share of decisions routed to a non-best provider
+    LLM_ROUTER_PRIOR_LATENCY_SECONDS: float = 5.0  # Assumed latency for providers without samples
+    LLM_ROUTER_REFERENCE_COST_USD: float = 0.01  # Per-request cost scored as 1.0 (latency uses the prior)
+    LLM_ROUTER_UNHEALTHY_ERROR_RATE: float = 0.5
+    LLM_ROUTER_RETRY_UNHEALTHY_SECONDS: float = 30.0  # Unhealthy providers are retried after this
+    LLM_ROUTER_DECISION_LOG_SIZE: int = 200
+    LLM_COST_PER_1K_TOKENS: Dict[str, float] = {  # Rough blended USD prices for routing
+        "openai": 0.005,
+        "anthropic": 0.006,
+        "google": 0.0005,
+    }
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open a provider's circuit
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0  # Open circuits let a probe through after this
+    LLM_CIRCUIT_HALF_OPEN_PROBES: int = 1  # Concurrent probe requests while half-open
+    LLM_RATE_LIMITS: Dict[str, int] = {  # Requests per minute per provider account (0 = unlimited)
+        "openai": 500,
+        "anthropic": 50,
+        "google": 60,
+    }
+    LLM_RATE_LIMIT_BURST_SECONDS: float = 10.0  # Bucket capacity in seconds of quota
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS: float = 2.0  # Queue this long for quota, then reroute
+
     # LLM Analysis Enable/Disable Flags
     ENABLE_LLM_ANALYSIS: bool = True  # Enable/disable LLM analysis in workflow
     ENABLE_SLM_ANALYSIS: bool = True  # Enable/disable SLM analysis in workflow
@@ -122,6 +175,35 @@ class Settings(BaseSettings):
     
     # Model Loading Control
     ENABLE_MODEL_LOADING: bool = True  # Enable/disable ML model loading on startup
+
+    # ONNX Runtime sessions (app/models/infer.py)
+    ONNX_INTRA_OP_THREADS: int = 0  # Threads inside one operator (0 = one per physical core)
+    ONNX_INTER_OP_THREADS: int = 0  # Threads across independent operators (parallel execution mode only)
+    ONNX_GRAPH_OPTIMIZATION: str = "all"  # disable | basic | extended | all
+    ONNX_EXECUTION_MODE: str = "sequential"  # sequential | parallel
+    ONNX_ENABLE_MEM_ARENA: bool = True  # Reuse CPU buffers between runs (faster, holds peak memory)
+    ONNX_MAX_BATCH_SIZE: int = 16  # Images per session.run when the batch dimension is dynamic
+    ONNX_PREPROCESS_WORKERS: int = 4  # Threads decoding/resizing images for a batch
+    INFERENCE_STATS_SAMPLE_SIZE: int = 1024  # Latency reservoir size per model (constant memory)
+    # Served artifact per vision model: fp32 | int8_dynamic | int8_static (scripts/quantize.py builds INT8)
+    VISION_MODEL_VARIANTS: Dict[str, str] = {
+        "pest_classifier": "fp32",
+        "disease_detector": "fp32",
+        "plant_classifier": "fp32",  # PyTorch classifier: any int8 variant uses dynamic quantization
+        "storage_guard": "fp32",
+    }
+
+    # Tiled inference for large drone/field images (app/models/tiled_inference.py)
+    TILED_INFERENCE_ENABLED: bool = True
+    TILED_INFERENCE_MIN_SIDE: int = 4096  # Images with a longer side than this are analyzed tile by tile
+    TILED_INFERENCE_TILE_SIZE: int = 1024  # Square tile edge in source pixels
+    TILED_INFERENCE_OVERLAP: int = 128  # So lesions on tile borders appear whole in some tile
+    TILED_INFERENCE_BATCH_SIZE: int = 8  # Tiles per model run
+    TILED_INFERENCE_WORKERS: int = 2  # Batches in flight at once (bounds memory)
+    TILED_INFERENCE_NMS_IOU: float = 0.45  # Overlap at which detections from neighbouring tiles merge
+    TILED_INFERENCE_AFFECTED_SEVERITY: float = 0.5  # Tile severity counted as affected area
+    METRICS_ENABLED: bool = True  # Per-node / per-provider latency, token and cost metrics (GET /metrics)
+    METRICS_TRACE_HISTORY: int = 500  # Recent per-trace timing breakdowns kept in memory
     # Strict mode: when True, disallow any mock/placeholder/fallback data generation across services
     STRICT_NO_FALLBACKS: bool = False
     
@@ -132,9 +214,34 @@ class Settings(BaseSettings):
     # Cross-validation settings
     ENABLE_CROSS_VALIDATION: bool = True
     CROSS_VALIDATION_THRESHOLD: float = 0.7  # Use cross-validation if confidence < threshold
+    CROSS_VALIDATION_QUORUM: int = 2  # Agreeing validator votes needed to decide early
+    CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS: float = 40.0  # Per-validator deadline
     CONSENSUS_WEIGHT_SLM: float = 0.3
     CONSENSUS_WEIGHT_LLM: float = 0.7
 
+    # Workflow checkpoints (LangGraph state per analysis run)
+    WORKFLOW_CHECKPOINT_BACKEND: str = "sqlite"  # sqlite, memory
+    WORKFLOW_CHECKPOINT_PATH: Path = BASE_DIR / "data" / "checkpoints" / "workflow.sqlite3"
+    WORKFLOW_CHECKPOINT_TTL_SECONDS: int = 24 * 3600  # Runs untouched for longer are deleted
+    WORKFLOW_CHECKPOINT_MAX_BYTES: int = 512 * 1024 * 1024  # Oldest runs are deleted above this
+    WORKFLOW_CHECKPOINT_STRIP_PAYLOADS: bool = True  # Drop base64 image data URLs from stored state
+    WORKFLOW_CHECKPOINT_PRUNE_INTERVAL_SECONDS: int = 300
+
+    # Request-level execution budget (deadline) for the pest workflow
+    WORKFLOW_DEFAULT_BUDGET_SECONDS: float = 60.0  # Used when the caller sends no budget (0 = no deadline)
+    WORKFLOW_MAX_BUDGET_SECONDS: float = 300.0  # Caller budgets are clamped to this
+    WORKFLOW_BUDGET_QUANTILE: float = 0.95  # Observed node latency quantile used as a stage's expected cost
+    WORKFLOW_BUDGET_MIN_SAMPLES: int = 20  # Runs of a node before observed latency replaces the estimate below
+    WORKFLOW_STAGE_ESTIMATES_SECONDS: Dict[str, float] = {  # Expected cost of optional/degradable stages
+        "llm_vision_predict": 12.0,
+        "slm_analysis": 10.0,
+        "llm_analysis": 15.0,
+        "cross_validation": 15.0,
+        "vision_escalation": 8.0,  # LLM second opinion for an uncertain local prediction
+        "tiled_inference": 4.0,  # Tiled local pass over one very large image
+        "weather_lookup": 3.0,  # Remote weather fetch for the field location
+    }
+
     # Analysis Constants
     PERCENTAGE_TOLERANCE: float = 1.0
     MAX_RATING: float = 10.0
@@ -142,6 +249,57 @@ class Settings(BaseSettings):
     MAX_IMAGE_SIZE: int = 1024
     SUPPORTED_FORMATS: list = ["jpg", "jpeg", "png", "webp"]
     REMOVE_EXIF: bool = True  # Remove EXIF data from uploaded images for privacy
+    PREPROCESS_WORKERS: int = 4  # Threads for decode/resize/encode (OpenCV releases the GIL)
+    PREPROCESS_JPEG_QUALITY: int = 90  # Quality of the payload shared with vision providers
+
+    # Upload storage (proof-of-delivery and inspection images)
+    UPLOAD_MAX_BYTES: int = 15 * 1024 * 1024  # Reject uploads larger than this
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes read per chunk while streaming to disk
+    UPLOAD_THUMBNAIL_SIZE: int = 256  # Longest side of the thumbnail variant (px)
+    UPLOAD_WEB_SIZE: int = 1280  # Longest side of the web variant (px)
+
+    # Shelf-life sweep for stored lots (Q10 kinetics over sensor history)
+    SHELF_LIFE_SWEEP_INTERVAL_SECONDS: int = 900
+    SHELF_LIFE_MAX_HISTORY_DAYS: int = 120  # Older storage time is assumed to be at reference conditions
+    SHELF_LIFE_SELL_FIRST_DAYS: float = 3.0  # Flag lots with less remaining life than this
+    SHELF_LIFE_SELL_FIRST_FRACTION: float = 0.25  # ...or below this fraction of their intake shelf life
+
+    # Shared cache manager (app/core/cache.py)
+    CACHE_MAX_ENTRIES: int = 2048  # Default in-memory entries per namespace (LRU beyond this)
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_DISK_ENABLED: bool = True  # SQLite tier shared by workers on this host
+    CACHE_DISK_PATH: Path = BASE_DIR / "data" / "cache" / "shared_cache.sqlite3"
+    CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024  # Least recently used entries are dropped above this
+    CACHE_LEASE_POLL_SECONDS: float = 0.25  # How often workers check a load held by another worker
+
+    # /analyze-plant request coalescing (identical image + options)
+    AI_PIPELINE_DEDUP_TTL_SECONDS: float = 10.0  # Reuse a finished result for duplicates this long
+    AI_PIPELINE_DEDUP_MAX_ENTRIES: int = 256
+    AI_PIPELINE_DEDUP_LEASE_SECONDS: float = 120.0  # Cross-worker claim on an in-flight analysis
+    IMAGE_DEDUP_ENABLED: bool = True  # Reuse diagnoses for perceptually near-duplicate uploads
+    IMAGE_DEDUP_MAX_DISTANCE: int = 6  # dHash bits (of 64) that may differ for a near-duplicate
+    IMAGE_DEDUP_MAX_AGE_SECONDS: int = 7 * 24 * 3600  # Only reuse analyses this recent
+    IMAGE_DEDUP_MAX_ENTRIES_PER_SCOPE: int = 50000  # Hashes kept per farmer/plot (oldest replaced)
+
+    # Pooled outbound HTTP clients (app/connections/http_connection.py)
+    HTTP_MAX_CONNECTIONS: int = 100  # Per aiohttp session, across hosts
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_KEEPALIVE_SECONDS: float = 30.0  # Idle connections are closed after this
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_DEFAULT_TIMEOUT_SECONDS: float = 30.0
+
+    # Storage demand forecasting (per facility / region and crop)
+    DEMAND_FORECAST_MIN_HORIZON_WEEKS: int = 2
+    DEMAND_FORECAST_MAX_HORIZON_WEEKS: int = 8
+    DEMAND_FORECAST_HISTORY_WEEKS: int = 156  # Weekly history kept for training
+    DEMAND_FORECAST_MIN_TRAINING_ROWS: int = 200  # Below this a crop uses the seasonal baseline only, a region the pooled crop model
+
+    # Vendor proximity search (Mongo vendor_locations 2dsphere index)
+    VENDOR_GEO_DEFAULT_RADIUS_KM: float = 50.0
+    VENDOR_GEO_MAX_RADIUS_KM: float = 500.0
+    VENDOR_GEO_PAGE_SIZE: int = 20
+    VENDOR_GEO_MAX_PAGE_SIZE: int = 100
+    VENDOR_GEO_SYNC_BATCH_SIZE: int = 1000  # Locations upserted per bulk_write during a full resync
 
     # Weather thresholds
     HIGH_HUMIDITY_THRESHOLD: float = 85.0
@@ -252,6 +410,8 @@ LLM_SKIP_ON_HIGH_CONFIDENCE = settings.LLM_SKIP_ON_HIGH_CONFIDENCE
 LLM_CV_CONFIDENCE_THRESHOLD = settings.LLM_CV_CONFIDENCE_THRESHOLD
 ENABLE_CROSS_VALIDATION = settings.ENABLE_CROSS_VALIDATION
 CROSS_VALIDATION_THRESHOLD = settings.CROSS_VALIDATION_THRESHOLD
+CROSS_VALIDATION_QUORUM = settings.CROSS_VALIDATION_QUORUM
+CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS = settings.CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS
 CONSENSUS_WEIGHT_SLM = settings.CONSENSUS_WEIGHT_SLM
 CONSENSUS_WEIGHT_LLM = settings.CONSENSUS_WEIGHT_LLM
 STRICT_NO_FALLBACKS = settings.STRICT_NO_FALLBACKS
@@ -0,0 +1,329 @@
+"""
+Metrics - In-process latency, token, cost and error accounting
+
+Every LangGraph node and every LLM provider call reports here. Series are
+keyed by metric name plus labels (node, provider, model), histograms use fixed
+buckets so memory does not grow with traffic, and the registry renders either
+JSON or Prometheus text for GET /metrics. Provider calls are attributed to the
+node that made them through context variables, and each workflow run keeps a
+per-trace breakdown (node spans and LLM calls) for debug responses.
+"""
+
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Workflow trace and graph node the current task is running for
+_current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metrics_trace", default=None)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metrics_node", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with exact count/sum and estimated quantiles"""
+
+    # Upper bounds in seconds; covers sub-ms preprocessing up to slow LLM calls
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile q (0-1), interpolated inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        def _round(value: Optional[float]) -> Optional[float]:
+            return round(value, 4) if value is not None else None
+
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": _round(self.sum / self.count) if self.count else None,
+            "max": round(self.max, 4),
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            "buckets": {("+Inf" if b == float("inf") else f"{b:g}"): c for b, c in zip(self.BUCKETS, self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms keyed by name and labels, plus recent trace breakdowns
+
+    Args:
+        trace_history: Number of per-trace breakdowns kept (oldest dropped first)
+    """
+
+    def __init__(self, trace_history: Optional[int] = None):
+        self.trace_history = trace_history or settings.METRICS_TRACE_HISTORY
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def quantile(self, name: str, q: float, min_count: int = 1, **labels) -> Optional[float]:
+        """Estimated quantile of one histogram series, or None with fewer than min_count samples"""
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(key)
+            if histogram is None or histogram.count < min_count:
+                return None
+            return histogram.quantile(q)
+
+    # Per-trace breakdowns
+
+    def _trace(self, trace_id: str) -> Dict[str, Any]:
+        """Breakdown for a trace, created on first use (caller holds the lock)"""
+        trace = self._traces.get(trace_id)
+        if trace is None:
+            trace = self._traces[trace_id] = {"started_at": time.time(), "nodes": [], "llm_calls": []}
+            while len(self._traces) > self.trace_history:
+                self._traces.popitem(last=False)
+        return trace
+
+    def record_span(self, trace_id: Optional[str], kind: str, span: Dict[str, Any]) -> None:
+        if not trace_id:
+            return
+        with self._lock:
+            self._trace(trace_id)[kind].append(span)
+
+    def trace_breakdown(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Timing breakdown of one workflow run
+
+        Returns:
+            Node spans in completion order, LLM calls, and per-node / per-provider
+            totals, or None when the trace is unknown (or already evicted)
+        """
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return None
+            nodes = [dict(span) for span in trace["nodes"]]
+            calls = [dict(call) for call in trace["llm_calls"]]
+
+        by_node: Dict[str, float] = {}
+        for span in nodes:
+            by_node[span["node"]] = round(by_node.get(span["node"], 0.0) + span["seconds"], 4)
+        by_provider: Dict[str, Dict[str, Any]] = {}
+        for call in calls:
+            totals = by_provider.setdefault(call["provider"], {"calls": 0, "seconds": 0.0, "tokens": 0, "cost_usd": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] = round(totals["seconds"] + call["seconds"], 4)
+            totals["tokens"] += call.get("tokens") or 0
+            totals["cost_usd"] = round(totals["cost_usd"] + (call.get("cost_usd") or 0.0), 6)
+
+        return {
+            "trace_id": trace_id,
+            "nodes": nodes,
+            "llm_calls": calls,
+            "node_seconds": by_node,
+            "providers": by_provider,
+            "errors": sum(1 for span in nodes if span.get("error")) + sum(1 for call in calls if not call["success"]),
+        }
+
+    # Export
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All series as JSON-friendly dicts"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": round(value, 6)} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [{"labels": dict(key), **histogram.snapshot()} for key, histogram in series.items()]
+                for name, series in self._histograms.items()
+            }
+            traces = len(self._traces)
+        return {"counters": counters, "histograms": histograms, "traces_kept": traces}
+
+    def prometheus(self) -> str:
+        """All series in the Prometheus text exposition format"""
+        def _labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.BUCKETS, histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._traces.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _state_value(state: Any, name: str, default: Any = None) -> Any:
+    if isinstance(state, dict):
+        return state.get(name, default)
+    return getattr(state, name, default)
+
+
+@contextlib.contextmanager
+def trace_context(trace_id: Optional[str], node: Optional[str] = None) -> Iterator[None]:
+    """Attribute provider calls made inside the block to a trace (and optionally a node)"""
+    trace_token = _current_trace.set(trace_id)
+    node_token = _current_node.set(node)
+    try:
+        yield
+    finally:
+        _current_node.reset(node_token)
+        _current_trace.reset(trace_token)
+
+
+def instrument_node(name: str, node: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """
+    Wrap a LangGraph node with latency, error and trace accounting
+
+    The node name is set as the current node for the duration of the call so
+    provider calls made inside it are tagged with it. A node counts as failed
+    when it raises or when it appends to the state's errors list.
+    """
+    if not settings.METRICS_ENABLED:
+        return node
+
+    @functools.wraps(node)
+    async def wrapper(state):
+        registry = get_metrics_registry()
+        trace_id = _state_value(state, "trace_id")
+        errors_before = len(_state_value(state, "errors") or [])
+        started = time.monotonic()
+        failed = True
+        try:
+            with trace_context(trace_id, name):
+                result = await node(state)
+            errors_after = _state_value(result, "errors")
+            failed = errors_after is not None and len(errors_after) > errors_before
+            return result
+        finally:
+            elapsed = time.monotonic() - started
+            registry.observe("workflow_node_duration_seconds", elapsed, node=name)
+            registry.inc("workflow_node_runs_total", node=name)
+            if failed:
+                registry.inc("workflow_node_errors_total", node=name)
+            registry.record_span(trace_id, "nodes", {"node": name, "seconds": round(elapsed, 4), "error": failed})
+
+    return wrapper
+
+
+def record_llm_call(
+    provider: str,
+    model: Optional[str],
+    seconds: float,
+    success: bool,
+    tokens: Optional[int] = None,
+    cost_usd: Optional[float] = None,
+) -> None:
+    """Account one provider call, tagged with the graph node and trace it ran under"""
+    if not settings.METRICS_ENABLED:
+        return
+    registry = get_metrics_registry()
+    node = _current_node.get()
+    labels = {"provider": provider, "model": model, "node": node}
+    registry.observe("llm_call_duration_seconds", seconds, **labels)
+    registry.inc("llm_calls_total", **labels)
+    if not success:
+        registry.inc("llm_call_errors_total", **labels)
+    if tokens:
+        registry.inc("llm_tokens_total", tokens, **labels)
+    if cost_usd:
+        registry.inc("llm_cost_usd_total", cost_usd, **labels)
+    registry.record_span(_current_trace.get(), "llm_calls", {
+        "provider": provider,
+        "model": model,
+        "node": node,
+        "seconds": round(seconds, 4),
+        "success": success,
+        "tokens": tokens,
+        "cost_usd": round(cost_usd, 6) if cost_usd else None,
+    })
+
+
+# Singleton instance
+_metrics_registry_instance: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get singleton MetricsRegistry instance"""
+    global _metrics_registry_instance
+
+    if _metrics_registry_instance is None:
+        _metrics_registry_instance = MetricsRegistry()
+
+    return _metrics_registry_instance
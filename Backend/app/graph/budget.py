@@ -0,0 +1,107 @@
+"""
+Execution Budget - Request-level deadline for the pest workflow
+
+A run gets a time budget (caller-supplied or WORKFLOW_DEFAULT_BUDGET_SECONDS)
+that is stored in WorkflowState as a wall-clock deadline. Optional stages
+(the LLM nodes) are skipped when the remaining budget is below their expected
+cost, and cancelled if they are still running at the deadline. Required nodes
+always run but degrade their expensive sub-steps (remote weather lookup, LLM
+escalation of uncertain vision predictions) the same way. Expected cost is the
+observed latency quantile of the node once enough runs are recorded, else the
+configured estimate. Every skip is added to state.skipped_stages and reported
+in the response.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import get_metrics_registry
+from app.schemas.postgres_base_models import SkippedStage
+
+logger = logging.getLogger(__name__)
+
+# Nodes the response can be produced without
+OPTIONAL_STAGES = ("llm_vision_predict", "slm_analysis", "llm_analysis", "cross_validation")
+
+
+def deadline_for(budget_seconds: Optional[float]) -> Optional[float]:
+    """
+    Wall-clock deadline for a run starting now
+
+    Args:
+        budget_seconds: Caller budget; None uses WORKFLOW_DEFAULT_BUDGET_SECONDS
+
+    Returns:
+        Epoch seconds, or None when the run has no deadline
+    """
+    budget = settings.WORKFLOW_DEFAULT_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    if not budget or budget <= 0:
+        return None
+    return time.time() + min(float(budget), settings.WORKFLOW_MAX_BUDGET_SECONDS)
+
+
+def remaining_seconds(state: Any) -> Optional[float]:
+    """Budget left for a run (may be negative), or None without a deadline"""
+    deadline = state.get("deadline") if isinstance(state, dict) else getattr(state, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expected_seconds(stage: str) -> float:
+    """Expected cost of a stage: observed latency quantile, else the configured estimate"""
+    observed = get_metrics_registry().quantile(
+        "workflow_node_duration_seconds",
+        settings.WORKFLOW_BUDGET_QUANTILE,
+        min_count=settings.WORKFLOW_BUDGET_MIN_SAMPLES,
+        node=stage,
+    )
+    if observed is not None:
+        return observed
+    return settings.WORKFLOW_STAGE_ESTIMATES_SECONDS.get(stage, 0.0)
+
+
+def has_budget_for(state: Any, stage: str) -> bool:
+    """Whether the remaining budget covers the stage's expected cost (always True without a deadline)"""
+    remaining = remaining_seconds(state)
+    return remaining is None or remaining >= expected_seconds(stage)
+
+
+def skipped(stage: str, reason: str, remaining: Optional[float]) -> SkippedStage:
+    """Record a skipped/degraded stage (metrics + log) and return its state entry"""
+    remaining = max(0.0, remaining or 0.0)
+    get_metrics_registry().inc("workflow_stage_skipped_total", stage=stage, reason=reason)
+    logger.info(f"⏱️ Skipping {stage} ({reason}, {remaining:.2f}s left)")
+    return SkippedStage(stage=stage, reason=reason, remaining_seconds=round(remaining, 3))
+
+
+def within_budget(name: str, node: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """
+    Wrap a LangGraph node with the request deadline
+
+    Optional stages are skipped when the remaining budget is below their expected
+    cost and cancelled (with their in-flight provider calls) at the deadline.
+    Required nodes run unchanged and consult the budget themselves.
+    """
+    if name not in OPTIONAL_STAGES:
+        return node
+
+    @functools.wraps(node)
+    async def wrapper(state) -> Dict[str, Any]:
+        remaining = remaining_seconds(state)
+        if remaining is None:
+            return await node(state)
+        if remaining < expected_seconds(name):
+            return {"skipped_stages": [skipped(name, "insufficient_budget", remaining)]}
+        try:
+            return await asyncio.wait_for(node(state), timeout=remaining)
+        except asyncio.TimeoutError:
+            if remaining_seconds(state) > 0:
+                raise  # The node's own timeout, not the deadline
+            return {"skipped_stages": [skipped(name, "deadline_exceeded", 0.0)]}
+
+    return wrapper
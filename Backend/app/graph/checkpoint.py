@@ -0,0 +1,526 @@
+"""
+Workflow Checkpoint Store - Bounded, persistent LangGraph checkpointer
+Stores PestMonitoringWorkflow checkpoints in a local SQLite file instead of
+worker memory. Whole runs (threads) are pruned by age and by total size, and
+heavy payloads (base64 image data URLs) can be stripped before they are written.
+"""
+
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Strings longer than this that look like data URLs are dropped when stripping payloads
+STRIP_MIN_CHARS = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_threads_updated_at ON threads (updated_at);
+"""
+
+
+def strip_heavy_payloads(value: Any) -> Any:
+    """
+    Return value with inline base64 data URLs blanked out
+
+    Downstream nodes fall back to the preprocessed file on disk when a
+    PreparedImage has no data_url, so stripped checkpoints stay resumable.
+    """
+    if isinstance(value, str):
+        if len(value) >= STRIP_MIN_CHARS and value.startswith("data:"):
+            return ""
+        return value
+    if isinstance(value, BaseModel):
+        updates = {}
+        for name in type(value).model_fields:
+            current = getattr(value, name, None)
+            stripped = strip_heavy_payloads(current)
+            if stripped is not current:
+                updates[name] = stripped
+        return value.model_copy(update=updates) if updates else value
+    if isinstance(value, dict):
+        stripped = {k: strip_heavy_payloads(v) for k, v in value.items()}
+        return stripped if any(stripped[k] is not value[k] for k in value) else value
+    if isinstance(value, (list, tuple)):
+        stripped = [strip_heavy_payloads(v) for v in value]
+        if all(a is b for a, b in zip(stripped, value)):
+            return value
+        return type(value)(stripped) if isinstance(value, tuple) else stripped
+    return value
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer backed by a local SQLite file
+
+    Args:
+        path: SQLite database file
+        ttl_seconds: Runs not updated for this long are deleted
+        max_bytes: Oldest runs are deleted once stored payloads exceed this
+        strip_payloads: Blank out base64 data URLs before writing
+        prune_interval_seconds: Minimum time between automatic prunes
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: int,
+        max_bytes: int,
+        strip_payloads: bool = True,
+        prune_interval_seconds: int = 300,
+    ):
+        super().__init__()
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.strip_payloads = strip_payloads
+        self.prune_interval_seconds = prune_interval_seconds
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        # auto_vacuum only takes effect on a new database (before the first table)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.prune()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        if self.strip_payloads:
+            value = strip_heavy_payloads(value)
+        return self.serde.dumps_typed(value)
+
+    def _touch_thread(self, thread_id: str, size_bytes: int) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO threads (thread_id, updated_at, size_bytes) VALUES (?, ?, ?)
+            ON CONFLICT(thread_id) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                size_bytes = threads.size_bytes + excluded.size_bytes
+            """,
+            (thread_id, time.time(), size_bytes),
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        clauses = " OR ".join("(channel = ? AND version = ?)" for _ in versions)
+        params: List[Any] = [thread_id, checkpoint_ns]
+        for channel, version in versions.items():
+            params.extend((channel, str(version)))
+        rows = self._conn.execute(
+            f"SELECT channel, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND ({clauses})",
+            params,
+        ).fetchall()
+        return {
+            channel: self.serde.loads_typed((type_, blob))
+            for channel, type_, blob in rows
+            if type_ != "empty"
+        }
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = self._conn.execute(
+            """
+            SELECT task_id, channel, type, value FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_id, idx
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _row_to_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_b)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = (
+            "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata"
+        )
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"""
+                    SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    ORDER BY checkpoint_id DESC LIMIT 1
+                    """,
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._row_to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY thread_id, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        remaining = limit
+        for row in rows:
+            if remaining is not None and remaining <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            with self._lock:
+                item = self._row_to_tuple(row)
+            if remaining is not None:
+                remaining -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        blob_rows = []
+        for channel, version in new_versions.items():
+            type_, blob = self._dumps(values[channel]) if channel in values else ("empty", b"")
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+        type_, checkpoint_b = self.serde.dumps_typed(c)
+        metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        size = len(checkpoint_b) + len(metadata_b) + sum(len(r[5]) for r in blob_rows)
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id, checkpoint_ns, checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_, checkpoint_b, metadata_type, metadata_b,
+                    ),
+                )
+                self._touch_thread(thread_id, size)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._maybe_prune()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self._dumps(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path,
+            ))
+        # Regular writes are idempotent per (task, idx); special (negative idx) writes replace
+        special = [row for row in rows if row[4] < 0]
+        regular = [row for row in rows if row[4] >= 0]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", regular)
+                self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+                self._touch_thread(thread_id, sum(len(row[7]) for row in rows))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_threads([thread_id])
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ------------------------------------------------------------------
+    # Pruning
+    # ------------------------------------------------------------------
+
+    def _delete_threads(self, thread_ids: List[str]) -> None:
+        if not thread_ids:
+            return
+        marks = ",".join("?" for _ in thread_ids)
+        self._conn.execute("BEGIN")
+        try:
+            for table in ("writes", "blobs", "checkpoints", "threads"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id IN ({marks})", thread_ids)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _maybe_prune(self) -> None:
+        if time.time() - self._last_prune >= self.prune_interval_seconds:
+            self.prune()
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Delete runs older than the TTL, then the oldest runs until under the size cap
+
+        Returns:
+            Dict: Number of runs removed by age and by size
+        """
+        with self._lock:
+            self._last_prune = time.time()
+            cutoff = self._last_prune - self.ttl_seconds
+            expired = [r[0] for r in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE updated_at < ?", (cutoff,)
+            )]
+            self._delete_threads(expired)
+
+            evicted: List[str] = []
+            total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM threads").fetchone()[0]
+            if total > self.max_bytes:
+                for thread_id, size in self._conn.execute(
+                    "SELECT thread_id, size_bytes FROM threads ORDER BY updated_at"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append(thread_id)
+                    total -= size
+                self._delete_threads(evicted)
+
+            if expired or evicted:
+                self._conn.execute("PRAGMA incremental_vacuum")
+                logger.info(f"🧹 Pruned workflow checkpoints: {len(expired)} expired, {len(evicted)} over size cap")
+            return {"expired": len(expired), "evicted": len(evicted)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Singleton instance
+_checkpointer_instance: Optional[BaseCheckpointSaver] = None
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    Get the shared workflow checkpointer
+
+    WORKFLOW_CHECKPOINT_BACKEND="memory" keeps the previous in-process MemorySaver.
+    """
+    global _checkpointer_instance
+
+    if _checkpointer_instance is None:
+        if settings.WORKFLOW_CHECKPOINT_BACKEND == "memory":
+            _checkpointer_instance = MemorySaver()
+        else:
+            _checkpointer_instance = SQLiteCheckpointSaver(
+                path=settings.WORKFLOW_CHECKPOINT_PATH,
+                ttl_seconds=settings.WORKFLOW_CHECKPOINT_TTL_SECONDS,
+                max_bytes=settings.WORKFLOW_CHECKPOINT_MAX_BYTES,
+                strip_payloads=settings.WORKFLOW_CHECKPOINT_STRIP_PAYLOADS,
+                prune_interval_seconds=settings.WORKFLOW_CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+            )
+            logger.info(f"💾 Workflow checkpoints stored in {settings.WORKFLOW_CHECKPOINT_PATH}")
+
+    return _checkpointer_instance
+
+
+def close_checkpointer() -> None:
+    """Close the shared checkpointer (application shutdown)"""
+    global _checkpointer_instance
+
+    if isinstance(_checkpointer_instance, SQLiteCheckpointSaver):
+        _checkpointer_instance.close()
+    _checkpointer_instance = None
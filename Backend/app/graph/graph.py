@@ -3,15 +3,19 @@ Enhanced LangGraph Workflow for Pest & Disease Monitoring with Multi-LLM Analysi
 Production-ready workflow with cross-validation and consensus building
 """
 
+import asyncio
 import logging
+import time
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 from datetime import datetime
 
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from app.schemas.postgres_base_models import WorkflowState, AnalysisPayload, AnalysisResponse
+from app.graph.checkpoint import get_checkpointer, close_checkpointer
+from app.core.metrics import instrument_node, get_metrics_registry
+from app.graph.budget import deadline_for, within_budget
 from app.graph.nodes.validate_input import validate_input_node
 from app.graph.nodes.preprocess import preprocess_node
 from app.graph.nodes.vision_predict import vision_predict_node
@@ -35,6 +39,11 @@ from app.core.config import (
 logger = logging.getLogger(__name__)
 
 
+def _node(name: str, node):
+    """Graph node with the request deadline applied and latency/error metrics recorded"""
+    return within_budget(name, instrument_node(name, node))
+
+
 class PestMonitoringWorkflow:
     """
     Enhanced LangGraph workflow with multi-LLM analysis and cross-validation
@@ -47,7 +56,7 @@ class PestMonitoringWorkflow:
     
     def __init__(self):
         """Initialize the enhanced workflow graph"""
-        self.checkpointer = MemorySaver()
+        self.checkpointer = get_checkpointer()
         self.graph = self._build_graph()
         
     def _build_graph(self) -> StateGraph:
@@ -63,23 +72,23 @@ class PestMonitoringWorkflow:
         workflow = StateGraph(WorkflowState)
         
         # Add traditional CV pipeline nodes
-        workflow.add_node("validate_input", validate_input_node)
-        workflow.add_node("preprocess", preprocess_node)
-        workflow.add_node("vision_predict", vision_predict_node)
-        workflow.add_node("severity", severity_node)
-        workflow.add_node("weather_context", weather_context_node)
-        workflow.add_node("threshold_decision", threshold_decision_node)
-        workflow.add_node("recommend_ipm", recommend_ipm_node)
-        workflow.add_node("format_response", format_response_node)
+        workflow.add_node("validate_input", _node("validate_input", validate_input_node))
+        workflow.add_node("preprocess", _node("preprocess", preprocess_node))
+        workflow.add_node("vision_predict", _node("vision_predict", vision_predict_node))
+        workflow.add_node("severity", _node("severity", severity_node))
+        workflow.add_node("weather_context", _node("weather_context", weather_context_node))
+        workflow.add_node("threshold_decision", _node("threshold_decision", threshold_decision_node))
+        workflow.add_node("recommend_ipm", _node("recommend_ipm", recommend_ipm_node))
+        workflow.add_node("format_response", _node("format_response", format_response_node))
         
         # Add LLM analysis nodes (conditional)
         if ENABLE_LLM_ANALYSIS:
-            workflow.add_node("llm_vision_predict", llm_vision_predict_node)
-            workflow.add_node("slm_analysis", slm_analysis_node)
-            workflow.add_node("llm_analysis", llm_analysis_node)
+            workflow.add_node("llm_vision_predict", _node("llm_vision_predict", llm_vision_predict_node))
+            workflow.add_node("slm_analysis", _node("slm_analysis", slm_analysis_node))
+            workflow.add_node("llm_analysis", _node("llm_analysis", llm_analysis_node))
             
             if ENABLE_CROSS_VALIDATION:
-                workflow.add_node("cross_validation", cross_validation_node)
+                workflow.add_node("cross_validation", _node("cross_validation", cross_validation_node))
         
         # Define the workflow edges
         workflow.set_entry_point("validate_input")
@@ -184,12 +193,14 @@ class PestMonitoringWorkflow:
         else:
             return "full_multi_llm_cv"
     
-    async def analyze_images(self, payload: AnalysisPayload) -> AnalysisResponse:
+    async def analyze_images(self, payload: AnalysisPayload, budget_seconds: Optional[float] = None) -> AnalysisResponse:
         """
         Execute the complete analysis workflow
         
         Args:
             payload: Analysis request payload
+            budget_seconds: Request time budget; optional LLM stages are skipped or
+                cancelled to finish within it (None uses WORKFLOW_DEFAULT_BUDGET_SECONDS)
             
         Returns:
             Complete analysis response
@@ -214,7 +225,9 @@ class PestMonitoringWorkflow:
                 payload=payload,
                 start_time=start_time,
                 processing_times={},
-                errors=[]
+                errors=[],
+                budget_seconds=budget_seconds,
+                deadline=deadline_for(budget_seconds)
             )
             
             # Execute workflow
@@ -229,6 +242,7 @@ class PestMonitoringWorkflow:
             
             if response:
                 total_time = (datetime.utcnow() - start_time).total_seconds()
+                get_metrics_registry().observe("workflow_duration_seconds", total_time, mode=self._get_workflow_mode())
                 
                 # Safe logging using fields present in AnalysisResponse
                 try:
@@ -254,6 +268,7 @@ class PestMonitoringWorkflow:
                 
         except Exception as e:
             error_msg = f"Workflow execution failed: {str(e)}"
+            get_metrics_registry().inc("workflow_errors_total", mode=self._get_workflow_mode())
             logger.error(
                 error_msg,
                 extra={"trace_id": trace_id},
@@ -283,6 +298,140 @@ class PestMonitoringWorkflow:
                 created_at=datetime.utcnow(),
             )
     
+    async def stream_analysis(
+        self,
+        payload: AnalysisPayload,
+        budget_seconds: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute the analysis workflow, yielding progress events as nodes finish
+        
+        Events (each a dict with "event" and "trace_id"):
+            started: workflow mode
+            node_completed: node name and seconds since start
+            diagnosis: first diagnosis (stage "vision"), then refinements
+                ("llm" per provider, "consensus") as they become available
+            severity: severity assessment as soon as it exists
+            stage_skipped: a stage skipped or cancelled to meet the time budget
+            result: the final AnalysisResponse (same as analyze_images) and the
+                per-node / per-provider timing breakdown of the run
+            error: workflow failure
+        
+        Closing the iterator (e.g. client disconnect) cancels the running nodes;
+        the run stays checkpointed and can be finished with resume_analysis().
+        
+        Args:
+            payload: Analysis request payload
+            budget_seconds: Request time budget (see analyze_images)
+        """
+        trace_id = str(uuid.uuid4())
+        started = time.monotonic()
+        emitted: Dict[str, Any] = {}
+        
+        logger.info(
+            f"📡 Starting streaming pest monitoring analysis",
+            extra={"trace_id": trace_id, "image_count": len(payload.images or [])}
+        )
+        yield {"event": "started", "trace_id": trace_id, "mode": self._get_workflow_mode()}
+        
+        initial_state = WorkflowState(
+            trace_id=trace_id,
+            payload=payload,
+            start_time=datetime.utcnow(),
+            processing_times={},
+            errors=[],
+            budget_seconds=budget_seconds,
+            deadline=deadline_for(budget_seconds)
+        )
+        config = {"configurable": {"thread_id": trace_id}}
+        final_response = None
+        stream = self.graph.astream(
+            initial_state.dict(),
+            config=config,
+            stream_mode=["updates", "values"]
+        )
+        
+        try:
+            async for mode, chunk in stream:
+                if mode == "updates":
+                    for node in chunk:
+                        yield {
+                            "event": "node_completed",
+                            "trace_id": trace_id,
+                            "node": node,
+                            "elapsed_seconds": round(time.monotonic() - started, 3)
+                        }
+                    continue
+                
+                # Full state after each step: surface partial results that changed
+                for key, event in _partial_results(chunk):
+                    if emitted.get(key) == event:
+                        continue
+                    emitted[key] = event
+                    yield {**event, "trace_id": trace_id}
+                final_response = chunk.get("final_response") or final_response
+            
+            if final_response is None:
+                raise ValueError("Workflow completed but no response generated")
+            get_metrics_registry().observe(
+                "workflow_duration_seconds", time.monotonic() - started, mode=self._get_workflow_mode()
+            )
+            logger.info(
+                f"✅ Streaming analysis completed",
+                extra={"trace_id": trace_id, "total_time": time.monotonic() - started}
+            )
+            yield {
+                "event": "result",
+                "trace_id": trace_id,
+                "response": _as_dict(final_response),
+                "timings": get_metrics_registry().trace_breakdown(trace_id)
+            }
+            
+        except (asyncio.CancelledError, GeneratorExit):
+            # The last completed step is checkpointed; resume_analysis(trace_id) finishes it
+            logger.info(
+                f"🛑 Streaming analysis cancelled by client",
+                extra={"trace_id": trace_id, "elapsed": time.monotonic() - started}
+            )
+            raise
+        except Exception as e:
+            logger.error(
+                f"Streaming workflow execution failed: {str(e)}",
+                extra={"trace_id": trace_id},
+                exc_info=True
+            )
+            get_metrics_registry().inc("workflow_errors_total", mode=self._get_workflow_mode())
+            yield {"event": "error", "trace_id": trace_id, "error": str(e)}
+        finally:
+            # Stops the graph run (and cancels in-flight nodes) if we exit early
+            await stream.aclose()
+    
+    async def resume_analysis(self, trace_id: str) -> Optional[AnalysisResponse]:
+        """
+        Resume an interrupted run from its last stored checkpoint
+        
+        Args:
+            trace_id: Workflow trace ID of the interrupted run
+            
+        Returns:
+            Analysis response, or None if no checkpoint exists for the trace
+        """
+        config = {"configurable": {"thread_id": trace_id}}
+        state = await self.graph.aget_state(config)
+        if not state or not state.values:
+            return None
+        
+        if not state.next:
+            # Already finished; return the stored result
+            return state.values.get("final_response")
+        
+        logger.info(
+            f"🔁 Resuming workflow from {state.next[0]}",
+            extra={"trace_id": trace_id}
+        )
+        final_state = await self.graph.ainvoke(None, config=config)
+        return final_state.get("final_response")
+    
     async def get_workflow_status(self, trace_id: str) -> Dict[str, Any]:
         """
         Get status of a running workflow
@@ -468,6 +617,59 @@ class PestMonitoringWorkflow:
         }
 
 
+def _as_dict(value: Any) -> Any:
+    """Pydantic models to plain dicts; anything else unchanged"""
+    if hasattr(value, "dict"):
+        return value.dict()
+    return value
+
+
+def _partial_results(values: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Partial results available in a workflow state snapshot
+    
+    Args:
+        values: Full workflow state emitted by the graph after a step
+        
+    Returns:
+        List of (key, event) pairs; the key identifies the result for de-duplication
+    """
+    results: List[Tuple[str, Dict[str, Any]]] = []
+    
+    vision = values.get("vision_results") or {}
+    aggregated = vision.get("aggregated_diagnosis") if isinstance(vision, dict) else None
+    if aggregated:
+        results.append(("diagnosis:vision", {
+            "event": "diagnosis", "stage": "vision", "diagnosis": _as_dict(aggregated)
+        }))
+    
+    llm_results = _as_dict(values.get("llm_results")) or {}
+    for provider, analysis in (llm_results.get("llm_analysis") or {}).items():
+        diagnosis = (analysis.get("parsed_data") or {}).get("diagnosis")
+        if analysis.get("success") and isinstance(diagnosis, dict):
+            results.append((f"diagnosis:llm:{provider}", {
+                "event": "diagnosis", "stage": "llm", "provider": provider,
+                "confidence": analysis.get("confidence"), "diagnosis": diagnosis
+            }))
+    
+    final_diagnosis = (llm_results.get("consensus_result") or {}).get("final_diagnosis")
+    if final_diagnosis:
+        results.append(("diagnosis:consensus", {
+            "event": "diagnosis", "stage": "consensus",
+            "agreement_score": llm_results.get("agreement_score"), "diagnosis": final_diagnosis
+        }))
+    
+    severity = values.get("severity_assessment")
+    if severity:
+        results.append(("severity", {"event": "severity", "severity": _as_dict(severity)}))
+    
+    for skipped in values.get("skipped_stages") or []:
+        skipped = _as_dict(skipped)
+        results.append((f"skipped:{skipped['stage']}", {"event": "stage_skipped", **skipped}))
+    
+    return results
+
+
 # Global workflow instance
 workflow_instance: Optional[PestMonitoringWorkflow] = None
 
@@ -526,9 +728,11 @@ async def cleanup_workflow():
     
     if workflow_instance:
         logger.info("🧹 Cleaning up workflow resources")
-        # Add any necessary cleanup logic here
         workflow_instance = None
-        logger.info("✅ Workflow cleanup completed")
+    
+    # Flush and close the checkpoint store
+    close_checkpointer()
+    logger.info("✅ Workflow cleanup completed")
 
 
 # Workflow utilities
@@ -3,15 +3,21 @@ Cross-Validation Analysis Node - Meta-analysis and consensus building
 Validates and synthesizes results from SLM, LLM, and CV analyses
 """
 
+import asyncio
 import json
 import logging
+import time
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from app.schemas.postgres_base_models import WorkflowState, LLMAnalysisResult
 from app.services.llm_service import get_llm_service, LLMProvider, LLMResponseType
+from app.graph.nodes.preprocess import get_image_payload
 from app.services.prompt_engineering import get_prompt_engine
-from app.core.config import LLM_CONSENSUS_THRESHOLD, CROSS_VALIDATION_LLM_PROVIDER
+from app.core.config import (
+    LLM_CONSENSUS_THRESHOLD, CROSS_VALIDATION_LLM_PROVIDER,
+    CROSS_VALIDATION_QUORUM, CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +33,9 @@ async def cross_validation_node(state: WorkflowState) -> WorkflowState:
     - Final recommendation generation
     
     Sequential Flow:
-    1. Response A (SLM) + Response B (LLM) → Multiple Validators
-    2. Validators compare responses and vote for best one
+    1. Response A (SLM) + Response B (LLM) → Multiple Validators (run concurrently)
+    2. Validators compare responses and vote for best one; once
+       CROSS_VALIDATION_QUORUM agree, outstanding validators are cancelled
     3. Synthesize final response based on validator consensus
     
     Args:
@@ -69,14 +76,14 @@ async def cross_validation_node(state: WorkflowState) -> WorkflowState:
         # Prepare validation data (Response A vs Response B)
         validation_context = _prepare_sequential_validation_context(state)
         
-        # Generate comparison prompts for each validator
-        validator_responses = {}
+        image_data = get_image_payload(state, 0) if state.processed_images else None
         
+        # Build every prompt before starting any call, so a prompt failure never
+        # leaves already-started validators running unsupervised
+        prompts: Dict[LLMProvider, str] = {}
         for validator_provider in validators:
-            logger.debug(f"🔍 Running validator: {validator_provider.value}")
-            
             # Generate validator-specific prompt for Response A vs Response B comparison
-            validator_prompt = prompt_engine.generate_cross_validation_prompt(
+            prompts[validator_provider] = prompt_engine.generate_cross_validation_prompt(
                 vision_results=state.vision_results,
                 severity_assessment=state.severity_assessment, 
                 weather_context=state.weather_context,
@@ -91,54 +98,87 @@ async def cross_validation_node(state: WorkflowState) -> WorkflowState:
                 context_data=validation_context,
                 provider_hint=validator_provider.value
             )
-            
-            # Execute validator analysis
-            if state.processed_images:
-                image_data = state.processed_images[0]
-                response = await llm_service.analyze_image_with_provider(
-                    provider=validator_provider,
-                    image_data=image_data,
-                    prompt=validator_prompt,
-                    response_type=LLMResponseType.CROSS_VALIDATION
-                )
-            else:
-                # Text-only validation if no images available
-                response = await llm_service.analyze_text_with_provider(
-                    provider=validator_provider,
-                    prompt=validator_prompt,
-                    response_type=LLMResponseType.CROSS_VALIDATION
-                )
-            
-            # Store validator response
-            validator_responses[validator_provider.value] = response
         
-        # Process validator responses and determine consensus
+        # Tally votes as validators finish; stop once a quorum agrees
+        quorum = max(1, min(CROSS_VALIDATION_QUORUM, len(validators)))
         validator_results = {}
         successful_validations = 0
+        timed_out_validators: List[str] = []
+        quorum_votes = {"response_a": 0, "response_b": 0}
+        quorum_reached = None
         
-        for provider_name, response in validator_responses.items():
-            validator_result = LLMAnalysisResult(
-                provider=provider_name,
-                model_name=response.metadata.get("model", "unknown"),
-                analysis_type="sequential_validator",
-                content=response.content,
-                parsed_data=response.parse_json_content(),
-                confidence=_extract_consensus_confidence(response.content),
-                token_usage=response.metadata.get("usage", {}),
-                processing_time=(datetime.utcnow() - start_time).total_seconds(),
-                success=response.success,
-                error_message=response.error,
-                metadata={
-                    "validation_role": "response_comparator",
-                    "comparison_mode": "A_vs_B_analysis",
-                    "finish_reason": response.metadata.get("finish_reason")
-                }
-            )
-            
-            validator_results[provider_name] = validator_result
+        # Fire all validators at once; each runs under its own deadline
+        tasks: Dict[asyncio.Task, LLMProvider] = {}
+        pending = set()
+        try:
+            for validator_provider, validator_prompt in prompts.items():
+                logger.debug(f"🔍 Running validator: {validator_provider.value}")
+                task = asyncio.create_task(
+                    _run_validator(llm_service, validator_provider, validator_prompt, image_data)
+                )
+                tasks[task] = validator_provider
+                pending.add(task)
             
-            if response.success:
-                successful_validations += 1
+            while pending and quorum_reached is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider_name = tasks[task].value
+                    try:
+                        response, elapsed = task.result()
+                    except asyncio.TimeoutError:
+                        logger.warning(
+                            f"⏱️ Validator {provider_name} exceeded "
+                            f"{CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS:g}s deadline"
+                        )
+                        timed_out_validators.append(provider_name)
+                        continue
+                    except Exception as e:
+                        logger.error(f"Validator {provider_name} failed: {e}")
+                        continue
+                    
+                    validator_result = LLMAnalysisResult(
+                        provider=provider_name,
+                        model_name=response.metadata.get("model", "unknown"),
+                        analysis_type="sequential_validator",
+                        content=response.content,
+                        parsed_data=response.parse_json_content(),
+                        confidence=_extract_consensus_confidence(response.content),
+                        token_usage=response.metadata.get("usage", {}),
+                        processing_time=elapsed,
+                        success=response.success,
+                        error_message=response.error,
+                        metadata={
+                            "validation_role": "response_comparator",
+                            "comparison_mode": "A_vs_B_analysis",
+                            "finish_reason": response.metadata.get("finish_reason")
+                        }
+                    )
+                    validator_results[provider_name] = validator_result
+                    
+                    if not response.success:
+                        continue
+                    successful_validations += 1
+                    
+                    selected = _extract_validator_decision(
+                        validator_result.content, validator_result.parsed_data
+                    )["selected_response"]
+                    if selected in quorum_votes:
+                        quorum_votes[selected] += 1
+                        if quorum_votes[selected] >= quorum:
+                            quorum_reached = selected
+        finally:
+            # Decision made (or node failing): outstanding validator calls are not needed
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        cancelled_validators = [tasks[task].value for task in pending]
+        if quorum_reached:
+            logger.info(
+                f"🗳️ Quorum of {quorum} reached for {quorum_reached}; "
+                f"cancelled {len(cancelled_validators)} outstanding validator(s)"
+            )
         
         # Determine consensus from validator votes
         consensus_decision = _determine_sequential_consensus(validator_results, state)
@@ -160,6 +200,10 @@ async def cross_validation_node(state: WorkflowState) -> WorkflowState:
                 "validators_used": list(validator_results.keys()),
                 "successful_validations": successful_validations,
                 "total_validators": len(validators),
+                "quorum": quorum,
+                "quorum_reached": quorum_reached is not None,
+                "cancelled_validators": cancelled_validators,
+                "timed_out_validators": timed_out_validators,
                 "winning_response": consensus_decision["selected_response"],
                 "decision_rationale": consensus_decision["rationale"]
             }
@@ -209,6 +253,37 @@ async def cross_validation_node(state: WorkflowState) -> WorkflowState:
         return state
 
 
+async def _run_validator(
+    llm_service,
+    provider: LLMProvider,
+    prompt: str,
+    image_data: Optional[str],
+) -> Tuple[Any, float]:
+    """
+    Run one validator comparison under CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS
+    
+    Returns:
+        Tuple of (LLMResponse, elapsed seconds)
+    """
+    started = time.monotonic()
+    if image_data:
+        call = llm_service.analyze_image_with_provider(
+            provider=provider,
+            image_data=image_data,
+            prompt=prompt,
+            response_type=LLMResponseType.CROSS_VALIDATION
+        )
+    else:
+        # Text-only validation if no images available
+        call = llm_service.analyze_text_with_provider(
+            provider=provider,
+            prompt=prompt,
+            response_type=LLMResponseType.CROSS_VALIDATION
+        )
+    response = await asyncio.wait_for(call, timeout=CROSS_VALIDATION_VALIDATOR_TIMEOUT_SECONDS)
+    return response, time.monotonic() - started
+
+
 def _validate_sequential_prerequisites(state: WorkflowState) -> bool:
     """Validate prerequisites for sequential validation (Response A vs Response B)"""
     # Need Response A (SLM analysis)
@@ -103,6 +103,7 @@ async def format_response_node(state: WorkflowState) -> Dict[str, Any]:
             trace_id=state.trace_id,
             confidence=float(overall_confidence),
             timings=None,
+            skipped_stages=state.skipped_stages,
             created_at=datetime.utcnow(),
         )
         
@@ -167,6 +168,7 @@ async def format_response_node(state: WorkflowState) -> Dict[str, Any]:
             trace_id=state.trace_id,
             confidence=0.0,
             timings=None,
+            skipped_stages=state.skipped_stages,
             created_at=datetime.utcnow(),
         )
         
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from app.schemas.postgres_base_models import WorkflowState, LLMAnalysisResult
 from app.services.llm_service import get_llm_service, LLMProvider, LLMResponseType
+from app.graph.nodes.preprocess import get_image_payload
 from app.services.prompt_engineering import get_prompt_engine
 from app.core.config import LLM_PARALLEL_PROVIDERS, LLM_CONSENSUS_THRESHOLD
 
@@ -91,7 +92,7 @@ async def llm_analysis_node(state: WorkflowState) -> WorkflowState:
         )
         
         # Execute single LLM analysis for Response B
-        image_data = state.processed_images[0]  # Use first processed image
+        image_data = get_image_payload(state, 0)  # Use first processed image
         
         response = await llm_service.analyze_image_with_provider(
             provider=target_provider,
@@ -4,13 +4,13 @@ LLM Vision Prediction Node - External LLM-based image analysis
 
 import logging
 import time
-import base64
 import json
 from typing import Dict, Any, List
 from pathlib import Path
 
 from app.schemas.postgres_base_models import WorkflowState
 from app.services.llm_service import get_llm_service, LLMProvider, LLMResponseType
+from app.graph.nodes.preprocess import get_image_payload
 from app.services.prompt_engineering import get_prompt_engine
 
 logger = logging.getLogger(__name__)
@@ -57,10 +57,9 @@ async def llm_vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
         
         # Encode images for LLM
         encoded_images = []
-        for image_path in state.processed_images[:3]:  # Limit to 3 images for cost
+        for i, image_path in enumerate(state.processed_images[:3]):  # Limit to 3 images for cost
             try:
-                encoded_image = _encode_image_for_llm(image_path)
-                encoded_images.append(encoded_image)
+                encoded_images.append(get_image_payload(state, i))
             except Exception as e:
                 logger.warning(f"Failed to encode image {image_path}: {e}")
         
@@ -85,7 +84,7 @@ async def llm_vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
         }
         
         # Get healthy providers for vision analysis
-        healthy_providers = llm_service.get_healthy_providers()
+        healthy_providers = llm_service.get_healthy_providers(vision=True)
         if not healthy_providers:
             error_msg = "No healthy LLM providers available for vision analysis"
             logger.error(error_msg, extra={"trace_id": state.trace_id})
@@ -244,20 +243,6 @@ def _prepare_analysis_context(state: WorkflowState) -> Dict[str, Any]:
     return context
 
 
-def _encode_image_for_llm(image_path: str) -> str:
-    """Encode image as base64 for LLM vision models"""
-    try:
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-            # Resize image if too large (implement as needed)
-            # For now, just encode
-            encoded = base64.b64encode(image_data).decode('utf-8')
-            return f"data:image/jpeg;base64,{encoded}"
-    except Exception as e:
-        logger.error(f"Failed to encode image {image_path}: {e}")
-        raise
-
-
 def _parse_llm_response(content: str, trace_id: str) -> Dict[str, Any]:
     """Parse LLM response content into structured format"""
     try:
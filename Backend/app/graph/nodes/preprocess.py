@@ -2,22 +2,50 @@
 Preprocessing Node - Image preprocessing, resizing, normalization, and tiling
 """
 
+import base64
 import logging
+import mimetypes
 import time
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import asyncio
-from app.schemas.postgres_base_models import WorkflowState, ImageSource
+from app.schemas.postgres_base_models import WorkflowState, ImageSource, PreparedImage
 from app.models.transforms import ImageTransforms
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Drone images above this size are tiled; the first tile is used for analysis
+DRONE_TILE_THRESHOLD = 4096
+DRONE_TILE_SIZE = (1024, 1024)
+DRONE_TILE_OVERLAP = 128
+
+# Images smaller than this are upscaled to SMALL_IMAGE_TARGET
+SMALL_IMAGE_MIN_SIDE = 224
+SMALL_IMAGE_TARGET = (512, 512)
+
+_preprocess_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_preprocess_executor() -> ThreadPoolExecutor:
+    global _preprocess_executor
+    if _preprocess_executor is None:
+        _preprocess_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.PREPROCESS_WORKERS),
+            thread_name_prefix="preprocess",
+        )
+    return _preprocess_executor
+
 
 async def preprocess_node(state: WorkflowState) -> Dict[str, Any]:
     """
     Preprocess images for model inference
     
+    Each image is decoded once in a worker thread, enhanced/resized in memory and
+    encoded once; the resulting payloads are carried in state.prepared_images so
+    downstream nodes never re-read or re-encode the files.
+    
     Args:
         state: Current workflow state
         
@@ -36,41 +64,33 @@ async def preprocess_node(state: WorkflowState) -> Dict[str, Any]:
     )
     
     try:
-        preprocessed_images = []
-        preprocessing_metadata = []
+        loop = asyncio.get_running_loop()
+        executor = _get_preprocess_executor()
         
+        jobs = []
         for i, image_path in enumerate(state.processed_images):
-            try:
-                image_meta = state.images[i] if i < len(state.images) else None
-                processed_path = await _preprocess_single_image(
-                    image_path=image_path,
-                    image_meta=image_meta,
-                    trace_id=state.trace_id,
-                    index=i
-                )
-                
-                if processed_path:
-                    preprocessed_images.append(processed_path)
-                    preprocessing_metadata.append({
-                        "original_path": image_path,
-                        "processed_path": processed_path,
-                        "index": i
-                    })
-                else:
-                    logger.warning(
-                        f"Failed to preprocess image {i+1}",
-                        extra={"trace_id": state.trace_id}
-                    )
-                    
-            except Exception as e:
-                error_msg = f"Image {i+1} preprocessing failed: {str(e)}"
+            image_meta = state.images[i] if i < len(state.images) else None
+            image_source = getattr(image_meta, 'source', ImageSource.phone) if image_meta else ImageSource.phone
+            jobs.append(loop.run_in_executor(
+                executor, _prepare_image, image_path, image_source, i, state.trace_id
+            ))
+        
+        # Results come back in input order; failures are returned as exceptions
+        outcomes = await asyncio.gather(*jobs, return_exceptions=True)
+        
+        prepared_images: List[PreparedImage] = []
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                error_msg = f"Image {i+1} preprocessing failed: {str(outcome)}"
                 logger.error(
                     error_msg,
                     extra={"trace_id": state.trace_id}
                 )
                 state.errors.append(error_msg)
+            else:
+                prepared_images.append(outcome)
         
-        if not preprocessed_images:
+        if not prepared_images:
             error_msg = "No images successfully preprocessed"
             logger.error(error_msg, extra={"trace_id": state.trace_id})
             return {
@@ -88,13 +108,14 @@ async def preprocess_node(state: WorkflowState) -> Dict[str, Any]:
             extra={
                 "trace_id": state.trace_id,
                 "original_count": len(state.processed_images),
-                "processed_count": len(preprocessed_images),
+                "processed_count": len(prepared_images),
                 "processing_time": processing_time
             }
         )
         
         return {
-            "processed_images": preprocessed_images,
+            "processed_images": [prepared.processed_path for prepared in prepared_images],
+            "prepared_images": prepared_images,
             "processing_times": {
                 **state.processing_times,
                 node_name: processing_time
@@ -118,179 +139,121 @@ async def preprocess_node(state: WorkflowState) -> Dict[str, Any]:
         }
 
 
-async def _preprocess_single_image(image_path: str, image_meta: Any, 
-                                 trace_id: str, index: int) -> str:
+def _prepare_image(image_path: str, image_source: ImageSource,
+                   index: int, trace_id: str) -> PreparedImage:
     """
-    Preprocess a single image
+    Decode, enhance, resize and encode a single image (runs in a worker thread)
+    
+    Re-encoding from the decoded pixels drops EXIF metadata, so no separate
+    privacy pass is needed.
     
     Args:
-        image_path: Path to input image
-        image_meta: Image metadata
-        trace_id: Workflow trace ID
+        image_path: Path to validated input image
+        image_source: Where the image came from (drone images may be tiled)
         index: Image index
+        trace_id: Workflow trace ID
         
     Returns:
-        Path to preprocessed image
+        PreparedImage with the processed file path and its encoded payload
     """
-    try:
-        path = Path(image_path)
-        output_dir = path.parent / "preprocessed"
-        output_dir.mkdir(exist_ok=True)
-        
-        # Determine preprocessing strategy based on image source
-        image_source = getattr(image_meta, 'source', ImageSource.phone) if image_meta else ImageSource.phone
-        
-        if image_source == ImageSource.drone:
-            # Handle large drone images - may need tiling
-            return await _preprocess_drone_image(image_path, output_dir, trace_id, index)
+    path = Path(image_path)
+    output_dir = path.parent / "preprocessed"
+    output_dir.mkdir(exist_ok=True)
+    
+    image = ImageTransforms.load_image(image_path)
+    height, width = image.shape[:2]
+    
+    tile_paths: List[str] = []
+    if image_source == ImageSource.drone and max(width, height) > DRONE_TILE_THRESHOLD:
+        logger.info(
+            f"🧩 Large drone image detected ({width}x{height}), tiling",
+            extra={"trace_id": trace_id}
+        )
+        tile_paths = ImageTransforms.tile_array(
+            image, DRONE_TILE_SIZE, DRONE_TILE_OVERLAP, output_dir / f"tiles_{index}"
+        )
+        if tile_paths:
+            # Analysis uses the first tile; the full tile set is kept for tile-level inference
+            tile_w, tile_h = DRONE_TILE_SIZE
+            image = image[:tile_h, :tile_w]
         else:
-            # Handle phone/camera images - standard preprocessing
-            return await _preprocess_standard_image(image_path, output_dir, trace_id, index)
-            
-    except Exception as e:
-        logger.error(f"Single image preprocessing failed: {e}")
-        return None
-
-
-async def _preprocess_drone_image(image_path: str, output_dir: Path, 
-                                trace_id: str, index: int) -> str:
-    """
-    Preprocess drone images (may include tiling for very large images)
+            image = _standard_preprocess(image, trace_id)
+    else:
+        image = _standard_preprocess(image, trace_id)
     
-    Args:
-        image_path: Input image path
-        output_dir: Output directory
-        trace_id: Workflow trace ID
-        index: Image index
-        
-    Returns:
-        Path to preprocessed image or primary tile
-    """
-    try:
-        # Check image dimensions
-        is_valid, _, metadata = ImageTransforms.validate_image(image_path)
-        if not is_valid or not metadata:
-            return None
-        
-        width, height = metadata["width"], metadata["height"]
-        max_dimension = max(width, height)
-        
-        # If image is very large (> 4K), consider tiling
-        if max_dimension > 4096:
-            logger.info(
-                f"🧩 Large drone image detected ({width}x{height}), considering tiling",
-                extra={"trace_id": trace_id}
-            )
-            
-            # Create tiles for processing
-            tile_dir = output_dir / f"tiles_{index}"
-            tile_paths = ImageTransforms.tile_large_image(
-                image_path=image_path,
-                tile_size=(1024, 1024),
-                overlap=128,
-                output_dir=str(tile_dir)
-            )
-            
-            if tile_paths:
-                # For now, return the first tile as primary
-                # In a full implementation, you'd process all tiles and merge results
-                logger.info(
-                    f"Created {len(tile_paths)} tiles, using first tile for analysis",
-                    extra={"trace_id": trace_id}
-                )
-                return tile_paths[0]
-        
-        # Standard processing for smaller drone images
-        return await _preprocess_standard_image(image_path, output_dir, trace_id, index)
-        
-    except Exception as e:
-        logger.error(f"Drone image preprocessing failed: {e}")
-        return None
+    encoded = ImageTransforms.encode_jpeg(image, settings.PREPROCESS_JPEG_QUALITY)
+    processed_path = output_dir / f"{path.stem}_prepared_{index}.jpg"
+    processed_path.write_bytes(encoded)
+    
+    out_height, out_width = image.shape[:2]
+    logger.debug(
+        f"📸 Preprocessed image {index+1}: {image_path} → {processed_path}",
+        extra={"trace_id": trace_id}
+    )
+    
+    return PreparedImage(
+        index=index,
+        source_path=image_path,
+        processed_path=str(processed_path),
+        width=out_width,
+        height=out_height,
+        mime_type="image/jpeg",
+        data_url=f"data:image/jpeg;base64,{base64.b64encode(encoded).decode('ascii')}",
+        tile_paths=tile_paths,
+    )
 
 
-async def _preprocess_standard_image(image_path: str, output_dir: Path, 
-                                   trace_id: str, index: int) -> str:
+def _standard_preprocess(image, trace_id: str):
     """
-    Standard image preprocessing (resize, enhance, normalize)
-    
-    Args:
-        image_path: Input image path
-        output_dir: Output directory
-        trace_id: Workflow trace ID
-        index: Image index
-        
-    Returns:
-        Path to preprocessed image
+    Enhance and resize a decoded image. Enhancement runs on the smaller of the
+    input/output sizes, so large photos are downscaled before the bilateral filter.
     """
-    try:
-        path = Path(image_path)
-        
-        # Step 1: Remove EXIF data for privacy
-        exif_cleaned_path = output_dir / f"{path.stem}_noexif_{index}{path.suffix}"
-        try:
-            cleaned_path = ImageTransforms.remove_exif(image_path, str(exif_cleaned_path))
-        except Exception as e:
-            logger.warning(f"EXIF removal failed, using original: {e}")
-            cleaned_path = image_path
-        
-        # Step 2: Apply quality enhancements
-        enhanced_path = output_dir / f"{path.stem}_enhanced_{index}{path.suffix}"
+    height, width = image.shape[:2]
+    max_side = settings.MAX_IMAGE_SIZE
+    
+    def enhance(img):
         try:
-            enhanced = ImageTransforms.apply_quality_enhancements(cleaned_path, str(enhanced_path))
+            return ImageTransforms.enhance_array(img)
         except Exception as e:
-            logger.warning(f"Quality enhancement failed, using cleaned image: {e}")
-            enhanced = cleaned_path
-        
-        # Step 3: Resize to model input size if needed
-        is_valid, _, metadata = ImageTransforms.validate_image(enhanced)
-        if is_valid and metadata:
-            width, height = metadata["width"], metadata["height"]
-            
-            # Resize if image is too large or too small for optimal processing
-            if max(width, height) > 1024 or min(width, height) < 224:
-                # For small images, upscale to at least 512x512
-                # For large images, downscale to 1024x1024
-                if min(width, height) < 224:
-                    target_size = (512, 512)
-                    logger.info(
-                        f"🔍 Upscaling small image from {width}x{height} to {target_size}",
-                        extra={"trace_id": trace_id}
-                    )
-                else:
-                    target_size = (1024, 1024)
-                
-                resized_path = output_dir / f"{path.stem}_resized_{index}{path.suffix}"
-                final_path = ImageTransforms.resize_image(
-                    enhanced, target_size, str(resized_path), maintain_aspect=True
-                )
-            else:
-                final_path = enhanced
-        else:
-            # If validation fails, still try to use the enhanced image
-            logger.warning(
-                f"⚠️ Image validation failed but continuing with enhanced image",
-                extra={"trace_id": trace_id}
-            )
-            final_path = enhanced
-        
-        # Step 4: Extract NDVI for vegetation analysis (optional)
-        ndvi_path = ImageTransforms.extract_ndvi(final_path)
-        if ndvi_path:
-            logger.debug(
-                f"🌱 NDVI extracted for analysis enhancement",
-                extra={"trace_id": trace_id}
-            )
-        
-        logger.debug(
-            f"📸 Preprocessed image {index+1}: {image_path} → {final_path}",
+            logger.warning(f"Quality enhancement failed, using unenhanced image: {e}")
+            return img
+    
+    if max(width, height) > max_side:
+        image = ImageTransforms.resize_array(image, (max_side, max_side), maintain_aspect=True)
+        return enhance(image)
+    
+    if min(width, height) < SMALL_IMAGE_MIN_SIDE:
+        logger.info(
+            f"🔍 Upscaling small image from {width}x{height} to {SMALL_IMAGE_TARGET}",
             extra={"trace_id": trace_id}
         )
-        
-        return final_path
-        
-    except Exception as e:
-        logger.error(f"Standard image preprocessing failed: {e}")
-        return None
+        return ImageTransforms.resize_array(enhance(image), SMALL_IMAGE_TARGET, maintain_aspect=True)
+    
+    return enhance(image)
+
+
+def encode_image_file(image_path: str) -> str:
+    """Read an image file and return it as a base64 data URL"""
+    mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+    with open(image_path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f"data:{mime_type};base64,{encoded}"
+
+
+def get_image_payload(state: WorkflowState, index: int = 0) -> Optional[str]:
+    """
+    Base64 data URL for the index-th processed image
+    
+    Uses the payload produced by preprocess_node; only falls back to reading the
+    file when the workflow skipped preprocessing or the payload was stripped from
+    a resumed checkpoint.
+    """
+    if index < len(state.prepared_images):
+        prepared = state.prepared_images[index]
+        return prepared.data_url or encode_image_file(prepared.processed_path)
+    if index < len(state.processed_images):
+        return encode_image_file(state.processed_images[index])
+    return None
 
 
 def should_continue_after_preprocessing(state: WorkflowState) -> bool:
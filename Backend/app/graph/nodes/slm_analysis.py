@@ -10,6 +10,7 @@ from datetime import datetime
 
 from app.schemas.postgres_base_models import WorkflowState, LLMAnalysisResult
 from app.services.llm_service import get_llm_service, LLMProvider, LLMResponseType
+from app.graph.nodes.preprocess import get_image_payload
 # from app.services.slm_service import get_slm_service  # Local SLM disabled
 from app.services.prompt_engineering import get_prompt_engine
 
@@ -55,7 +56,7 @@ async def slm_analysis_node(state: WorkflowState) -> WorkflowState:
         prompt_engine = get_prompt_engine()
 
         # Check for healthy SLM-suitable providers (prioritize faster, cheaper models)
-        healthy_providers = llm_service.get_healthy_providers()
+        healthy_providers = llm_service.get_healthy_providers(vision=True)
         slm_providers = [
             LLMProvider.OPENAI,  # GPT-4o-mini for fast analysis
             LLMProvider.GOOGLE,  # Gemini Flash for quick responses
@@ -91,7 +92,7 @@ async def slm_analysis_node(state: WorkflowState) -> WorkflowState:
         )
 
         # Local SLM disabled; perform analysis with image via cloud provider
-        image_data = state.processed_images[0]
+        image_data = get_image_payload(state, 0)
         response = await llm_service.analyze_image_with_provider(
             provider=selected_provider,
             image_data=image_data,
@@ -113,10 +114,10 @@ async def slm_analysis_node(state: WorkflowState) -> WorkflowState:
             error_message=response.error,
             metadata={
                 "prompt_length": len(slm_prompt),
-                "image_size": len(state.processed_images[0]) if state.processed_images else 0,
+                "image_size": len(image_data) if image_data else 0,
                 "finish_reason": response.metadata.get("finish_reason"),
                 "analysis_focus": "computer_vision_interpretation",
-                "provider_health": llm_service.provider_health.get(selected_provider, False)
+                "provider_health": llm_service.is_provider_healthy(selected_provider, vision=True)
             }
         )
         
@@ -2,14 +2,20 @@
 Vision Prediction Node - Computer vision inference for pest and disease detection
 """
 
+import asyncio
 import logging
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 
-from app.schemas.postgres_base_models import WorkflowState, Diagnosis, Alternative
+from app.core.config import settings
+from app.schemas.postgres_base_models import WorkflowState, Diagnosis, Alternative, SkippedStage
 # from app.models.vision_classifier import get_classifier  # Vision classifier disabled
 from PIL import Image as _PILImage
 from app.services.llm_service import get_llm_service, LLMProvider, LLMResponseType
+from app.graph.nodes.preprocess import encode_image_file
+from app.models.vision_cascade import get_vision_cascade, predict_local
+from app.models.tiled_inference import analyze_large_image, needs_tiling
+from app.graph.budget import has_budget_for, remaining_seconds, skipped
 
 # Handle optional imports gracefully
 try:
@@ -43,58 +49,55 @@ async def vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
         }
     )
 
+    tiled_task: Optional[asyncio.Task] = None
     try:
         llm_service = get_llm_service()
 
-        predictions: List[Dict[str, Any]] = []
-        for i, image_path in enumerate(state.processed_images):
-            try:
-                with open(image_path, 'rb') as f:
-                    img_bytes = f.read()
-
-                # Prefer Google (Gemini) or OpenAI for vision
-                healthy = llm_service.get_healthy_providers() or []
-                provider = None
-                for p in (LLMProvider.GOOGLE, LLMProvider.OPENAI, LLMProvider.ANTHROPIC):
-                    if p in healthy:
-                        provider = p
-                        break
-                provider = provider or (healthy[0] if healthy else LLMProvider.GOOGLE)
-
-                resp = await llm_service.analyze_image_with_provider(
-                    provider=provider,
-                    image_data=img_bytes,
-                    prompt=("Analyze this leaf image for disease or pest condition."
-                            " Return JSON with fields: diagnosis, confidence, alternatives[] (label, confidence)."),
-                    response_type=LLMResponseType.LLM_VISION_ANALYSIS,
-                )
+        # Provider health does not change meaningfully within one request; pick once
+        providers = _vision_provider_order(llm_service)
+        semaphore = asyncio.Semaphore(max(1, settings.VISION_MAX_CONCURRENCY))
 
-                parsed = resp.parse_json_content() if hasattr(resp, 'parse_json_content') else None
-                label = str((parsed or {}).get("diagnosis") or (parsed or {}).get("label") or "unknown")
-                try:
-                    confidence = float((parsed or {}).get("confidence") or 0.0)
-                except Exception:
-                    confidence = 0.0
-                alt_list: List[Alternative] = []
-                for alt in (parsed or {}).get("alternatives", []) or []:
-                    try:
-                        alt_list.append(Alternative(label=str(alt.get("label") or alt.get("diagnosis") or "unknown"), confidence=float(alt.get("confidence") or 0.0)))
-                    except Exception:
-                        pass
-
-                predictions.append({
-                    "image_index": i,
-                    "image_path": image_path,
-                    "label": label,
-                    "confidence": confidence,
-                    "alternatives": alt_list,
-                })
-            except Exception as e:
-                msg = f"LLM vision failed for image {i+1}: {e}"
+        # Very large images also get a tiled local pass alongside the per-image predictions
+        # (budget-aware per image; cancelled below if the node fails or is cancelled first)
+        tiled_task = asyncio.create_task(_tiled_analyses(state))
+
+        # gather() keeps results in input order; failures come back as exceptions
+        outcomes = await asyncio.gather(
+            *(
+                _predict_image(llm_service, providers, semaphore, state, i, image_path)
+                for i, image_path in enumerate(state.processed_images)
+            ),
+            return_exceptions=True,
+        )
+
+        predictions: List[Dict[str, Any]] = []
+        skipped_stages: List[SkippedStage] = []
+        unanswered = 0
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    reason = f"timed out after {settings.VISION_IMAGE_TIMEOUT_SECONDS:g}s"
+                else:
+                    reason = str(outcome)
+                msg = f"LLM vision failed for image {i+1}: {reason}"
                 logger.error(msg, extra={"trace_id": state.trace_id})
                 state.errors.append(msg)
+                continue
 
-        if not predictions:
+            # Images the budget could not cover: answered locally, or not at all
+            budget_reason = _BUDGET_DECISIONS.get((outcome.get("cascade") or {}).get("decision"))
+            if budget_reason:
+                stage = "vision_escalation" if outcome["source"] == "local" else "vision_prediction"
+                skipped_stages.append(skipped(f"{stage}:{i + 1}", budget_reason, remaining_seconds(state)))
+            if outcome["source"] == "none":
+                unanswered += 1
+            else:
+                predictions.append(outcome)
+
+        tiled_analysis, tiled_skipped = await tiled_task
+        skipped_stages.extend(tiled_skipped)
+
+        if not predictions and not unanswered:
             error_msg = "No successful predictions generated"
             logger.error(error_msg, extra={"trace_id": state.trace_id})
             return {
@@ -112,7 +115,18 @@ async def vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
             "individual_predictions": predictions,
             "aggregated_diagnosis": aggregated_diagnosis,
             "detection_results": detection_results,
-            "model_info": {"vision": "disabled", "mode": "llm_only"},
+            "tiled_analysis": tiled_analysis,
+            "model_info": {
+                "vision": "cascade" if settings.VISION_CASCADE_ENABLED else "disabled",
+                "mode": "local_first" if settings.VISION_CASCADE_ENABLED else "llm_only",
+                "sources": {
+                    **{
+                        source: sum(1 for p in predictions if p.get("source") == source)
+                        for source in ("local", "llm")
+                    },
+                    "none": unanswered,
+                },
+            },
         }
 
         processing_time = time.time() - start_time
@@ -129,6 +143,7 @@ async def vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
 
         return {
             "vision_results": vision_results,
+            "skipped_stages": skipped_stages,
             "processing_times": {**state.processing_times, node_name: processing_time},
         }
 
@@ -139,6 +154,264 @@ async def vision_predict_node(state: WorkflowState) -> Dict[str, Any]:
             "errors": state.errors + [error_msg],
             "processing_times": {**state.processing_times, node_name: time.time() - start_time},
         }
+    finally:
+        if tiled_task is not None and not tiled_task.done():
+            tiled_task.cancel()
+
+
+async def _tiled_analyses(state: WorkflowState) -> Tuple[List[Dict[str, Any]], List[SkippedStage]]:
+    """
+    Tiled local analysis (heatmap, merged detections) for images above TILED_INFERENCE_MIN_SIDE
+
+    Images are skipped once the remaining budget no longer covers a tiled pass, and a
+    pass still running at the deadline is abandoned.
+
+    Returns:
+        (analyses, skipped stage entries)
+    """
+    analyses: List[Dict[str, Any]] = []
+    skipped_stages: List[SkippedStage] = []
+    for prepared in state.prepared_images:
+        stage = f"tiled_inference:{prepared.index + 1}"
+        try:
+            # Reads only the header
+            with _PILImage.open(prepared.source_path) as img:
+                width, height = img.size
+            if not needs_tiling(width, height):
+                continue
+            if not has_budget_for(state, "tiled_inference"):
+                skipped_stages.append(skipped(stage, "insufficient_budget", remaining_seconds(state)))
+                continue
+            remaining = remaining_seconds(state)
+            analysis = await asyncio.wait_for(analyze_large_image(prepared.source_path), timeout=remaining)
+            if analysis is not None:
+                analyses.append({"image_index": prepared.index, **analysis})
+        except asyncio.TimeoutError as e:
+            remaining = remaining_seconds(state)
+            if remaining is None or remaining > 0:
+                logger.warning(
+                    f"Tiled inference timed out for image {prepared.index+1}: {e}",
+                    extra={"trace_id": state.trace_id},
+                )
+            else:
+                skipped_stages.append(skipped(stage, "deadline_exceeded", 0.0))
+        except Exception as e:
+            logger.warning(
+                f"Tiled inference failed for image {prepared.index+1}: {e}",
+                extra={"trace_id": state.trace_id},
+            )
+    return analyses, skipped_stages
+
+
+def _vision_provider_order(llm_service) -> List[LLMProvider]:
+    """
+    Healthy providers to try for vision, best first by observed latency, errors and
+    cost (ties prefer Google (Gemini), then OpenAI). Later entries are hedge/failover targets.
+    """
+    healthy = llm_service.get_healthy_providers(vision=True) or []
+    preferred = [p for p in (LLMProvider.GOOGLE, LLMProvider.OPENAI, LLMProvider.ANTHROPIC) if p in healthy]
+    order = llm_service.rank_providers(preferred + [p for p in healthy if p not in preferred], vision=True)
+    return order or [LLMProvider.GOOGLE]
+
+
+async def _predict_image(
+    llm_service,
+    providers: List[LLMProvider],
+    semaphore: asyncio.Semaphore,
+    state: WorkflowState,
+    index: int,
+    image_path: str,
+) -> Dict[str, Any]:
+    """
+    Analyze a single image, local classifier first
+
+    Confident local answers (per-class thresholds, see VisionCascade) are
+    returned without an LLM call; a small share of them is audited by the LLM
+    in the background. Uncertain images escalate to the vision LLM, and the
+    local/LLM agreement is recorded to tune the thresholds.
+
+    The LLM call is clamped to the remaining request budget. When the budget is
+    spent (or cannot cover an escalation) the image degrades to its local answer,
+    or to an unanswered placeholder with source "none".
+
+    Raises:
+        asyncio.TimeoutError: If the LLM exceeds VISION_IMAGE_TIMEOUT_SECONDS and no local answer exists
+    """
+    cascade = get_vision_cascade()
+    # Local inference shares the concurrency limit with the LLM step
+    async with semaphore:
+        local = await predict_local(image_path)
+    if local is not None:
+        local_label, local_confidence, local_alternatives = local
+        decision = cascade.decide(local_label, local_confidence)
+        if decision != "escalate":
+            if decision == "audit":
+                task = asyncio.create_task(
+                    _audit_local(llm_service, providers, state, index, image_path, local_label, local_confidence)
+                )
+                _AUDIT_TASKS.add(task)
+                task.add_done_callback(_AUDIT_TASKS.discard)
+            return {
+                "image_index": index,
+                "image_path": image_path,
+                "label": local_label,
+                "confidence": local_confidence,
+                "alternatives": local_alternatives,
+                "source": "local",
+                "cascade": {"decision": decision, "threshold": cascade.threshold_for(local_label)},
+            }
+
+    try:
+        async with semaphore:
+            # Checked after queueing for the semaphore; the LLM never runs past the deadline
+            timeout = settings.VISION_IMAGE_TIMEOUT_SECONDS
+            remaining = remaining_seconds(state)
+            if remaining is not None:
+                # With a local answer the LLM is only a second opinion: require its expected cost
+                if remaining <= 0 or (local is not None and not has_budget_for(state, "vision_escalation")):
+                    return _budget_fallback(index, image_path, local, cascade, "budget_exhausted")
+                timeout = min(timeout, remaining)
+            label, confidence, alt_list = await _llm_predict(llm_service, providers, state, index, image_path, timeout)
+    except Exception as e:
+        remaining = remaining_seconds(state)
+        if isinstance(e, asyncio.TimeoutError) and remaining is not None and remaining <= 0:
+            return _budget_fallback(index, image_path, local, cascade, "deadline_exceeded")
+        if local is None:
+            raise
+        # The LLM was only a second opinion; fall back to the uncertain local answer
+        logger.warning(
+            f"LLM escalation failed for image {index+1}, using local prediction: {e}",
+            extra={"trace_id": state.trace_id},
+        )
+        return {
+            "image_index": index,
+            "image_path": image_path,
+            "label": local_label,
+            "confidence": local_confidence,
+            "alternatives": local_alternatives,
+            "source": "local",
+            "cascade": {"decision": "escalation_failed", "threshold": cascade.threshold_for(local_label)},
+        }
+
+    prediction = {
+        "image_index": index,
+        "image_path": image_path,
+        "label": label,
+        "confidence": confidence,
+        "alternatives": alt_list,
+        "source": "llm",
+    }
+    if local is not None:
+        # An unparseable LLM answer says nothing about the local model's accuracy
+        agreed = cascade.record(local_label, local_confidence, label) if label != "unknown" else None
+        prediction["cascade"] = {
+            "decision": "escalate",
+            "threshold": cascade.threshold_for(local_label),
+            "local_label": local_label,
+            "local_confidence": local_confidence,
+            "agreed": agreed,
+        }
+    return prediction
+
+
+# Cascade decisions that mean the budget, not the model, decided the answer
+_BUDGET_DECISIONS = {"budget_exhausted": "insufficient_budget", "deadline_exceeded": "deadline_exceeded"}
+
+
+def _budget_fallback(
+    index: int,
+    image_path: str,
+    local: Optional[Tuple[str, float, List[Alternative]]],
+    cascade,
+    decision: str,
+) -> Dict[str, Any]:
+    """
+    Prediction for an image the budget could not cover with an LLM call: the
+    uncertain local answer when there is one, else an unanswered placeholder
+    (source "none") that is reported but left out of the aggregate
+    """
+    if local is None:
+        return {
+            "image_index": index,
+            "image_path": image_path,
+            "label": "unknown",
+            "confidence": 0.0,
+            "alternatives": [],
+            "source": "none",
+            "cascade": {"decision": decision},
+        }
+    local_label, local_confidence, local_alternatives = local
+    return {
+        "image_index": index,
+        "image_path": image_path,
+        "label": local_label,
+        "confidence": local_confidence,
+        "alternatives": local_alternatives,
+        "source": "local",
+        "cascade": {"decision": decision, "threshold": cascade.threshold_for(local_label)},
+    }
+
+
+async def _llm_predict(
+    llm_service,
+    providers: List[LLMProvider],
+    state: WorkflowState,
+    index: int,
+    image_path: str,
+    timeout: Optional[float] = None,
+) -> Tuple[str, float, List[Alternative]]:
+    """Analyze a single image with the vision LLM, hedging slow providers"""
+    if index < len(state.prepared_images) and state.prepared_images[index].data_url:
+        image_data = state.prepared_images[index].data_url
+    else:
+        image_data = await asyncio.to_thread(encode_image_file, image_path)
+    resp = await asyncio.wait_for(
+        llm_service.analyze_image_hedged(
+            providers=providers,
+            image_data=image_data,
+            prompt=("Analyze this leaf image for disease or pest condition."
+                    " Return JSON with fields: diagnosis, confidence, alternatives[] (label, confidence)."),
+            response_type=LLMResponseType.LLM_VISION_ANALYSIS,
+        ),
+        timeout=timeout or settings.VISION_IMAGE_TIMEOUT_SECONDS,
+    )
+
+    parsed = resp.parse_json_content() if hasattr(resp, 'parse_json_content') else None
+    label = str((parsed or {}).get("diagnosis") or (parsed or {}).get("label") or "unknown")
+    try:
+        confidence = float((parsed or {}).get("confidence") or 0.0)
+    except Exception:
+        confidence = 0.0
+    alt_list: List[Alternative] = []
+    for alt in (parsed or {}).get("alternatives", []) or []:
+        try:
+            alt_list.append(Alternative(label=str(alt.get("label") or alt.get("diagnosis") or "unknown"), confidence=float(alt.get("confidence") or 0.0)))
+        except Exception:
+            pass
+
+    return label, confidence, alt_list
+
+
+async def _audit_local(
+    llm_service,
+    providers: List[LLMProvider],
+    state: WorkflowState,
+    index: int,
+    image_path: str,
+    local_label: str,
+    local_confidence: float,
+) -> None:
+    """Check an accepted local answer against the LLM so tuning also sees confident cases"""
+    try:
+        label, _, _ = await _llm_predict(llm_service, providers, state, index, image_path)
+        if label != "unknown":
+            get_vision_cascade().record(local_label, local_confidence, label)
+    except Exception as e:
+        logger.debug(f"Cascade audit failed for image {index+1}: {e}", extra={"trace_id": state.trace_id})
+
+
+# Background audits are referenced here so they are not garbage collected mid-flight
+_AUDIT_TASKS: Set[asyncio.Task] = set()
 
 
 def _aggregate_predictions(predictions: List[Dict], trace_id: str) -> Diagnosis:
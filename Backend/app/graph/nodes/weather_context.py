@@ -2,12 +2,14 @@
 Weather Context Node - Fetch weather data and calculate risk indices
 """
 
+import asyncio
 import logging
 import time
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from app.schemas.postgres_base_models import WorkflowState, WeatherRisk, WeatherRiskIndices, WeatherRiskBand
 from app.services.weather_service import WeatherService
+from app.graph.budget import has_budget_for, remaining_seconds, skipped
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +32,7 @@ async def weather_context_node(state: WorkflowState) -> Dict[str, Any]:
         extra={"trace_id": state.trace_id}
     )
     
+    skipped_stages = []
     try:
         # Ensure aiohttp session is closed properly
         async with WeatherService() as weather_service:
@@ -43,11 +46,20 @@ async def weather_context_node(state: WorkflowState) -> Dict[str, Any]:
                     state.trace_id
                 )
             else:
-                # Otherwise, try location-based lookup
-                if location:
-                    weather_risk = await _get_weather_risk_with_location(
-                        weather_service, location, state.trace_id
-                    )
+                # Otherwise, try location-based lookup (within the request's time budget)
+                remaining = remaining_seconds(state)
+                if location and not has_budget_for(state, "weather_lookup"):
+                    skipped_stages.append(skipped("weather_lookup", "insufficient_budget", remaining))
+                    weather_risk = await _get_weather_risk_without_location(None, state.trace_id)
+                elif location:
+                    try:
+                        weather_risk = await asyncio.wait_for(
+                            _get_weather_risk_with_location(weather_service, location, state.trace_id),
+                            timeout=remaining
+                        )
+                    except asyncio.TimeoutError:
+                        skipped_stages.append(skipped("weather_lookup", "deadline_exceeded", 0.0))
+                        weather_risk = await _get_weather_risk_without_location(None, state.trace_id)
                 else:
                     # No weather and no location; use defaults
                     weather_risk = await _get_weather_risk_without_location(
@@ -69,6 +81,7 @@ async def weather_context_node(state: WorkflowState) -> Dict[str, Any]:
         
         return {
             "weather_context": weather_risk,
+            "skipped_stages": skipped_stages,
             "processing_times": {
                 **state.processing_times,
                 node_name: processing_time
@@ -15,6 +15,7 @@ from typing import Dict, Any, List, Optional, AsyncGenerator, Union
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from app.connections.http_connection import get_http_pool
 from app.schemas import (
     PromptRequest, LLMResponse, ModelInfo, TokenUsage, LLMError,
     ModelProvider, ModelType, Priority, AdapterConfig, HealthCheck,
@@ -53,7 +54,6 @@ class BaseModelAdapter(ABC):
         self.config = config
         self.provider = config.provider
         self.model_name = config.model_name
-        self._client: Optional[httpx.AsyncClient] = None
         self._rate_limiter = None
         self._metrics = {
             "requests": 0,
@@ -96,6 +96,12 @@ class BaseModelAdapter(ABC):
             "metrics": self._metrics.copy()
         }
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by every adapter for this provider"""
+        return get_http_pool().httpx_client(
+            f"llm_adapter:{self.provider.value}", timeout=self.config.timeout_seconds
+        )
+    
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count using simple heuristic"""
         # Rough estimation: ~4 characters per token
@@ -168,41 +174,41 @@ class OpenAIAdapter(BaseModelAdapter):
         }
         
         try:
-            async with httpx.AsyncClient(timeout=self.config.timeout_seconds) as client:
-                response = await client.post(
-                    f"{self._base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
-                usage = data.get("usage", {})
-                
-                # Calculate metrics
-                input_tokens = usage.get("prompt_tokens", self._estimate_tokens(prompt))
-                output_tokens = usage.get("completion_tokens", self._estimate_tokens(content))
-                total_tokens = input_tokens + output_tokens
-                cost = self._calculate_cost(input_tokens, output_tokens)
-                latency_ms = (time.time() - start_time) * 1000
-                
-                self._update_metrics(total_tokens, cost)
-                
-                return LLMResponse(
-                    content=content,
-                    model_info=self.model_info,
-                    token_usage=TokenUsage(
-                        prompt_tokens=input_tokens,
-                        completion_tokens=output_tokens,
-                        total_tokens=total_tokens,
-                        estimated_cost=cost
-                    ),
-                    request_id=kwargs.get("request_id"),
-                    latency_ms=latency_ms,
-                    finish_reason=data["choices"][0].get("finish_reason")
-                )
-                
+            client = self._get_client()
+            response = await client.post(
+                f"{self._base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            usage = data.get("usage", {})
+            
+            # Calculate metrics
+            input_tokens = usage.get("prompt_tokens", self._estimate_tokens(prompt))
+            output_tokens = usage.get("completion_tokens", self._estimate_tokens(content))
+            total_tokens = input_tokens + output_tokens
+            cost = self._calculate_cost(input_tokens, output_tokens)
+            latency_ms = (time.time() - start_time) * 1000
+            
+            self._update_metrics(total_tokens, cost)
+            
+            return LLMResponse(
+                content=content,
+                model_info=self.model_info,
+                token_usage=TokenUsage(
+                    prompt_tokens=input_tokens,
+                    completion_tokens=output_tokens,
+                    total_tokens=total_tokens,
+                    estimated_cost=cost
+                ),
+                request_id=kwargs.get("request_id"),
+                latency_ms=latency_ms,
+                finish_reason=data["choices"][0].get("finish_reason")
+            )
+            
         except httpx.HTTPStatusError as e:
             self._update_metrics(0, 0, error=True)
             if e.response.status_code == 429:
@@ -4,9 +4,12 @@ ONNX model loading, image preprocessing, inference, and confidence scoring
 """
 
 import logging
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Sequence, Union
 import json
 
 import numpy as np
@@ -26,11 +29,68 @@ except (ImportError, RuntimeError, AttributeError) as e:
     import logging
     logging.getLogger(__name__).warning(f"Inference dependencies not available: {e}")
 
+from app.core.config import settings
 from app.schemas.postgres_base_models import Alternative
 
 
 logger = logging.getLogger(__name__)
 
+# An image to classify: file path, RGB (or grayscale/RGBA) array, or PIL image
+ImageInput = Union[str, Path, np.ndarray, Image.Image]
+
+# ImageNet normalization, shaped to broadcast over HWC float images
+_IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# ONNX_GRAPH_OPTIMIZATION values -> onnxruntime.GraphOptimizationLevel members
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+class LatencyReservoir:
+    """
+    Constant-memory latency statistics
+
+    Count, total, min and max are exact; percentiles come from a uniform random
+    sample (reservoir sampling) of at most sample_size observations.
+    """
+
+    def __init__(self, sample_size: Optional[int] = None):
+        self.sample_size = max(1, sample_size or settings.INFERENCE_STATS_SAMPLE_SIZE)
+        self.samples = np.zeros(self.sample_size, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            if self.count < self.sample_size:
+                self.samples[self.count] = value
+            else:
+                slot = self._rng.randrange(self.count + 1)
+                if slot < self.sample_size:
+                    self.samples[slot] = value
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            n = min(self.count, self.sample_size)
+            if n == 0:
+                return 0.0
+            return float(np.percentile(self.samples[:n], q))
 
 
 class ModelInference:
@@ -38,7 +98,8 @@ class ModelInference:
     ONNX-based computer vision inference for pest and disease detection
     """
     
-    def __init__(self, model_path: str, label_map_path: str, calibration_path: Optional[str] = None):
+    def __init__(self, model_path: str, label_map_path: str, calibration_path: Optional[str] = None,
+                 session_options: Optional[Dict[str, Any]] = None, max_batch_size: Optional[int] = None):
         """
         Initialize inference pipeline
         
@@ -46,6 +107,9 @@ class ModelInference:
             model_path: Path to ONNX model file
             label_map_path: Path to label mapping JSON
             calibration_path: Optional path to calibration parameters
+            session_options: Overrides for intra_op_threads, inter_op_threads,
+                graph_optimization, execution_mode, enable_mem_arena (ONNX_* settings)
+            max_batch_size: Images per session run when the model's batch dimension is dynamic
         """
         if not INFERENCE_DEPENDENCIES_AVAILABLE:
             raise RuntimeError("Inference dependencies not available. Cannot initialize ModelInference.")
@@ -53,6 +117,14 @@ class ModelInference:
         self.model_path = Path(model_path)
         self.label_map_path = Path(label_map_path)
         self.calibration_path = Path(calibration_path) if calibration_path else None
+        self.session_config = {
+            "intra_op_threads": settings.ONNX_INTRA_OP_THREADS,
+            "inter_op_threads": settings.ONNX_INTER_OP_THREADS,
+            "graph_optimization": settings.ONNX_GRAPH_OPTIMIZATION,
+            "execution_mode": settings.ONNX_EXECUTION_MODE,
+            "enable_mem_arena": settings.ONNX_ENABLE_MEM_ARENA,
+            **(session_options or {}),
+        }
         
         # Model components
         self.session = None
@@ -61,13 +133,16 @@ class ModelInference:
         self.input_name = None
         self.output_names = []
         self.input_shape = None
+        self.max_batch_size = 1
         
-        # Performance tracking
-        self.inference_times = []
-        self.preprocessing_times = []
+        # Performance tracking (fixed-size, safe to call from worker threads)
+        self.inference_stats = LatencyReservoir()
+        self.preprocessing_stats = LatencyReservoir()
+        self.images_inferred = 0
+        self._preprocess_pool: Optional[ThreadPoolExecutor] = None
         
         # Load components
-        self._load_model()
+        self._load_model(max_batch_size)
         self._load_label_map()
         self._load_calibration()
         
@@ -76,12 +151,30 @@ class ModelInference:
             extra={
                 "model_path": str(self.model_path),
                 "input_shape": self.input_shape,
+                "max_batch_size": self.max_batch_size,
                 "num_classes": len(self.label_map),
                 "calibrated": self.calibration_path is not None
             }
         )
     
-    def _load_model(self):
+    def _session_options(self) -> "ort.SessionOptions":
+        """Build ONNX Runtime session options from session_config"""
+        config = self.session_config
+        options = ort.SessionOptions()
+        if int(config["intra_op_threads"]) > 0:
+            options.intra_op_num_threads = int(config["intra_op_threads"])
+        if int(config["inter_op_threads"]) > 0:
+            options.inter_op_num_threads = int(config["inter_op_threads"])
+        level = _GRAPH_OPTIMIZATION_LEVELS.get(str(config["graph_optimization"]).lower(), "ORT_ENABLE_ALL")
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level)
+        if str(config["execution_mode"]).lower() == "parallel":
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        else:
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.enable_cpu_mem_arena = bool(config["enable_mem_arena"])
+        return options
+    
+    def _load_model(self, max_batch_size: Optional[int] = None):
         """Load ONNX model and get input/output information"""
         try:
             # Configure ONNX Runtime for optimal performance
@@ -95,6 +188,7 @@ class ModelInference:
             # Create inference session
             self.session = ort.InferenceSession(
                 str(self.model_path),
+                sess_options=self._session_options(),
                 providers=providers
             )
             
@@ -103,13 +197,21 @@ class ModelInference:
             self.output_names = [output.name for output in self.session.get_outputs()]
             self.input_shape = self.session.get_inputs()[0].shape
             
+            # A fixed batch dimension (int) bounds the batch; symbolic/None means dynamic
+            batch_dim = self.input_shape[0] if self.input_shape else 1
+            if isinstance(batch_dim, int) and batch_dim > 0:
+                self.max_batch_size = batch_dim
+            else:
+                self.max_batch_size = max(1, max_batch_size or settings.ONNX_MAX_BATCH_SIZE)
+            
             logger.info(
                 f"📦 ONNX model loaded",
                 extra={
                     "providers": providers,
                     "input_name": self.input_name,
                     "output_names": self.output_names,
-                    "input_shape": self.input_shape
+                    "input_shape": self.input_shape,
+                    "session_config": self.session_config
                 }
             )
             
@@ -145,75 +247,122 @@ class ModelInference:
             logger.warning(f"Failed to load calibration: {e}")
             self.calibration_params = {}
     
-    def preprocess_image(self, image_path: str, target_size: Tuple[int, int] = None) -> np.ndarray:
+    def _target_size(self, target_size: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+        """(height, width) to resize to: explicit, model input size (NCHW), or 224x224"""
+        if target_size is not None:
+            return target_size
+        if self.input_shape and len(self.input_shape) == 4:
+            height, width = self.input_shape[2], self.input_shape[3]
+            if isinstance(height, int) and isinstance(width, int) and height > 0 and width > 0:
+                return (height, width)
+        return (224, 224)
+    
+    @staticmethod
+    def _load_rgb(image: ImageInput) -> np.ndarray:
+        """Decode an image input into an HWC uint8 RGB array"""
+        if isinstance(image, Image.Image):
+            return np.asarray(image.convert("RGB"))
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+            if image.shape[2] == 4:
+                return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+            return image
+        
+        # Load image, convert BGR to RGB
+        bgr = cv2.imread(str(image))
+        if bgr is None:
+            raise ValueError(f"Failed to load image: {image}")
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    
+    def _to_chw(self, image: ImageInput, target_size: Tuple[int, int]) -> np.ndarray:
+        """Load, resize and normalize one image into a CHW float32 array"""
+        start_time = time.time()
+        height, width = target_size
+        
+        # cv2 takes (width, height)
+        rgb = cv2.resize(self._load_rgb(image), (width, height), interpolation=cv2.INTER_LINEAR)
+        
+        # Normalize to [0, 1], then ImageNet mean/std; HWC -> CHW for ONNX
+        normalized = (rgb.astype(np.float32) * (1.0 / 255.0) - _IMAGENET_MEAN) / _IMAGENET_STD
+        chw = np.ascontiguousarray(normalized.transpose(2, 0, 1))
+        
+        self.preprocessing_stats.add(time.time() - start_time)
+        return chw
+    
+    def preprocess_image(self, image: ImageInput, target_size: Tuple[int, int] = None) -> np.ndarray:
         """
         Preprocess image for model inference
         
         Args:
-            image_path: Path to input image
+            image: Image path, RGB array or PIL image
             target_size: Target size (height, width), uses model input size if None
             
         Returns:
-            Preprocessed image array ready for inference
+            Preprocessed image array ready for inference (batch of one)
         """
-        start_time = time.time()
-        
         try:
-            # Determine target size
-            if target_size is None:
-                if len(self.input_shape) == 4:  # NCHW format
-                    target_size = (self.input_shape[2], self.input_shape[3])
-                else:
-                    target_size = (224, 224)  # Default
-            
-            # Load image
-            image = cv2.imread(str(image_path))
-            if image is None:
-                raise ValueError(f"Failed to load image: {image_path}")
-            
-            # Convert BGR to RGB
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Resize image
-            image = cv2.resize(image, target_size, interpolation=cv2.INTER_LINEAR)
-            
-            # Normalize to [0, 1]
-            image = image.astype(np.float32) / 255.0
-            
-            # Apply ImageNet normalization
-            mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-            std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-            image = (image - mean) / std
-            
-            # Convert to NCHW format for ONNX
-            image = np.transpose(image, (2, 0, 1))  # HWC -> CHW
-            image = np.expand_dims(image, axis=0)   # Add batch dimension
-            
-            preprocessing_time = time.time() - start_time
-            self.preprocessing_times.append(preprocessing_time)
+            target_size = self._target_size(target_size)
+            image_array = self._to_chw(image, target_size)[np.newaxis]
             
             logger.debug(
                 f"🖼️ Image preprocessed",
                 extra={
-                    "image_path": image_path,
+                    "image": str(image) if not isinstance(image, np.ndarray) else "array",
                     "target_size": target_size,
-                    "output_shape": image.shape,
-                    "preprocessing_time": preprocessing_time
+                    "output_shape": image_array.shape
                 }
             )
             
-            return image
+            return image_array
             
         except Exception as e:
             logger.error(f"Image preprocessing failed: {e}")
             raise RuntimeError(f"Preprocessing failed: {e}")
     
+    def preprocess_batch(self, images: Sequence[ImageInput], target_size: Tuple[int, int] = None) -> np.ndarray:
+        """
+        Preprocess several images in parallel into one NCHW batch
+        
+        Decoding and resizing run on a small thread pool (OpenCV releases the GIL).
+        
+        Args:
+            images: Image paths, RGB arrays or PIL images
+            target_size: Target size (height, width), uses model input size if None
+            
+        Returns:
+            Array of shape (len(images), 3, height, width)
+        """
+        target_size = self._target_size(target_size)
+        batch = np.empty((len(images), 3, *target_size), dtype=np.float32)
+        
+        def fill(index: int) -> None:
+            batch[index] = self._to_chw(images[index], target_size)
+        
+        try:
+            if len(images) <= 1 or settings.ONNX_PREPROCESS_WORKERS <= 1:
+                for i in range(len(images)):
+                    fill(i)
+            else:
+                if self._preprocess_pool is None:
+                    self._preprocess_pool = ThreadPoolExecutor(
+                        max_workers=settings.ONNX_PREPROCESS_WORKERS,
+                        thread_name_prefix="onnx-preprocess"
+                    )
+                # list() re-raises the first failure
+                list(self._preprocess_pool.map(fill, range(len(images))))
+        except Exception as e:
+            logger.error(f"Batch preprocessing failed: {e}")
+            raise RuntimeError(f"Preprocessing failed: {e}")
+        
+        return batch
+    
     def run_inference(self, image_array: np.ndarray) -> Dict[str, np.ndarray]:
         """
-        Run model inference on preprocessed image
+        Run model inference on a preprocessed image batch
         
         Args:
-            image_array: Preprocessed image array
+            image_array: Preprocessed image array (N, C, H, W)
             
         Returns:
             Dictionary of model outputs
@@ -233,12 +382,14 @@ class ModelInference:
             }
             
             inference_time = time.time() - start_time
-            self.inference_times.append(inference_time)
+            self.inference_stats.add(inference_time)
+            self.images_inferred += len(image_array)
             
             logger.debug(
                 f"🧠 Inference completed",
                 extra={
                     "inference_time": inference_time,
+                    "batch_size": len(image_array),
                     "output_shapes": {name: output.shape for name, output in output_dict.items()}
                 }
             )
@@ -249,6 +400,43 @@ class ModelInference:
             logger.error(f"Model inference failed: {e}")
             raise RuntimeError(f"Inference failed: {e}")
     
+    def _probabilities(self, outputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """Softmax (and calibration) over the classification logits, one row per image"""
+        # Adapt this based on your actual model output format
+        if 'logits' in outputs:
+            logits = outputs['logits']
+        elif 'output' in outputs:
+            logits = outputs['output']
+        else:
+            # Use first output if naming is unclear
+            logits = list(outputs.values())[0]
+        logits = np.asarray(logits, dtype=np.float32).reshape(len(logits), -1)
+        
+        # Apply softmax to get probabilities (row max subtracted for numerical stability)
+        exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+        
+        # Apply calibration if available
+        if self.calibration_params:
+            probabilities = np.stack([self._apply_calibration(row) for row in probabilities])
+        return probabilities
+    
+    def _top_k(self, probabilities: np.ndarray, top_k: int) -> Tuple[str, float, List[Alternative]]:
+        """Primary label, confidence and alternatives for one probability row"""
+        top_indices = np.argsort(probabilities)[-top_k:][::-1]
+        
+        primary_idx = top_indices[0]
+        primary_label = self.label_map.get(str(primary_idx), f"class_{primary_idx}")
+        primary_confidence = float(probabilities[primary_idx])
+        
+        alternatives = []
+        for idx in top_indices[1:]:
+            alternatives.append(Alternative(
+                label=self.label_map.get(str(idx), f"class_{idx}"),
+                confidence=float(probabilities[idx])
+            ))
+        return primary_label, primary_confidence, alternatives
+    
     def postprocess_outputs(self, outputs: Dict[str, np.ndarray], top_k: int = 5) -> Tuple[str, float, List[Alternative]]:
         """
         Post-process model outputs to get predictions
@@ -258,54 +446,33 @@ class ModelInference:
             top_k: Number of top predictions to return
             
         Returns:
-            Tuple of (primary_label, confidence, alternatives)
+            Tuple of (primary_label, confidence, alternatives) for the first image
+        """
+        return self.postprocess_batch(outputs, top_k)[0]
+    
+    def postprocess_batch(self, outputs: Dict[str, np.ndarray], top_k: int = 5) -> List[Tuple[str, float, List[Alternative]]]:
+        """
+        Post-process batched model outputs
+        
+        Args:
+            outputs: Raw model outputs with a leading batch dimension
+            top_k: Number of top predictions to return per image
+            
+        Returns:
+            One (primary_label, confidence, alternatives) per image
         """
         try:
-            # Get prediction probabilities (assuming classification model)
-            # Adapt this based on your actual model output format
-            if 'logits' in outputs:
-                logits = outputs['logits'][0]  # Remove batch dimension
-            elif 'output' in outputs:
-                logits = outputs['output'][0]
-            else:
-                # Use first output if naming is unclear
-                logits = list(outputs.values())[0][0]
-            
-            # Apply softmax to get probabilities
-            exp_logits = np.exp(logits - np.max(logits))  # Numerical stability
-            probabilities = exp_logits / np.sum(exp_logits)
-            
-            # Apply calibration if available
-            if self.calibration_params:
-                probabilities = self._apply_calibration(probabilities)
-            
-            # Get top-k predictions
-            top_indices = np.argsort(probabilities)[-top_k:][::-1]
-            
-            # Create result objects
-            primary_idx = top_indices[0]
-            primary_label = self.label_map.get(str(primary_idx), f"class_{primary_idx}")
-            primary_confidence = float(probabilities[primary_idx])
-            
-            alternatives = []
-            for idx in top_indices[1:]:
-                alt_label = self.label_map.get(str(idx), f"class_{idx}")
-                alt_confidence = float(probabilities[idx])
-                alternatives.append(Alternative(
-                    label=alt_label,
-                    confidence=alt_confidence
-                ))
+            results = [self._top_k(row, top_k) for row in self._probabilities(outputs)]
             
             logger.debug(
                 f"🎯 Predictions generated",
                 extra={
-                    "primary_label": primary_label,
-                    "primary_confidence": primary_confidence,
-                    "alternatives_count": len(alternatives)
+                    "batch_size": len(results),
+                    "primary_labels": [label for label, _, _ in results]
                 }
             )
             
-            return primary_label, primary_confidence, alternatives
+            return results
             
         except Exception as e:
             logger.error(f"Output postprocessing failed: {e}")
@@ -345,12 +512,12 @@ class ModelInference:
             logger.warning(f"Calibration failed, using raw probabilities: {e}")
             return probabilities
     
-    def predict(self, image_path: str, top_k: int = 5) -> Tuple[str, float, List[Alternative]]:
+    def predict(self, image: ImageInput, top_k: int = 5) -> Tuple[str, float, List[Alternative]]:
         """
         Complete inference pipeline: preprocess -> inference -> postprocess
         
         Args:
-            image_path: Path to input image
+            image: Image path, RGB array or PIL image
             top_k: Number of top predictions to return
             
         Returns:
@@ -358,7 +525,7 @@ class ModelInference:
         """
         try:
             # Preprocess image
-            image_array = self.preprocess_image(image_path)
+            image_array = self.preprocess_image(image)
             
             # Run inference
             outputs = self.run_inference(image_array)
@@ -367,26 +534,58 @@ class ModelInference:
             return self.postprocess_outputs(outputs, top_k)
             
         except Exception as e:
-            logger.error(f"Prediction failed for {image_path}: {e}")
+            logger.error(f"Prediction failed for {image if not isinstance(image, np.ndarray) else 'array'}: {e}")
             raise
     
+    def predict_batch(self, images: Sequence[ImageInput], top_k: int = 5) -> List[Tuple[str, float, List[Alternative]]]:
+        """
+        Classify several images with as few session runs as possible
+        
+        Images are preprocessed in parallel and sent in chunks of max_batch_size
+        (the model's fixed batch dimension, or ONNX_MAX_BATCH_SIZE when dynamic).
+        
+        Args:
+            images: Image paths, RGB arrays or PIL images
+            top_k: Number of top predictions to return per image
+            
+        Returns:
+            One (primary_label, confidence, alternatives) per image, in input order
+        """
+        results: List[Tuple[str, float, List[Alternative]]] = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            outputs = self.run_inference(self.preprocess_batch(chunk))
+            results.extend(self.postprocess_batch(outputs, top_k))
+        return results
+    
     def get_performance_stats(self) -> Dict[str, float]:
-        """Get performance statistics"""
+        """Get performance statistics (percentiles are estimated from a fixed-size sample)"""
+        inference = self.inference_stats
+        preprocessing = self.preprocessing_stats
         stats = {
-            "total_inferences": len(self.inference_times),
-            "avg_inference_time": np.mean(self.inference_times) if self.inference_times else 0,
-            "avg_preprocessing_time": np.mean(self.preprocessing_times) if self.preprocessing_times else 0,
-            "total_time": sum(self.inference_times) + sum(self.preprocessing_times)
+            "total_inferences": self.images_inferred,
+            "inference_runs": inference.count,
+            "avg_batch_size": self.images_inferred / inference.count if inference.count else 0,
+            "avg_inference_time": inference.mean(),
+            "avg_preprocessing_time": preprocessing.mean(),
+            "total_time": inference.total + preprocessing.total
         }
         
-        if self.inference_times:
+        if inference.count:
             stats.update({
-                "min_inference_time": np.min(self.inference_times),
-                "max_inference_time": np.max(self.inference_times),
-                "p95_inference_time": np.percentile(self.inference_times, 95)
+                "min_inference_time": inference.min,
+                "max_inference_time": inference.max,
+                "p50_inference_time": inference.percentile(50),
+                "p95_inference_time": inference.percentile(95)
             })
         
         return stats
+    
+    def close(self):
+        """Release the preprocessing thread pool"""
+        if self._preprocess_pool is not None:
+            self._preprocess_pool.shutdown(wait=False)
+            self._preprocess_pool = None
 
 
 class DetectionInference(ModelInference):
@@ -395,7 +594,7 @@ class DetectionInference(ModelInference):
     """
     
     def __init__(self, model_path: str, label_map_path: str, calibration_path: Optional[str] = None,
-                 confidence_threshold: float = 0.5, nms_threshold: float = 0.4):
+                 confidence_threshold: float = 0.5, nms_threshold: float = 0.4, **kwargs):
         """
         Initialize detection inference
         
@@ -405,8 +604,9 @@ class DetectionInference(ModelInference):
             calibration_path: Optional calibration parameters
             confidence_threshold: Minimum confidence for detections
             nms_threshold: NMS IoU threshold
+            **kwargs: session_options / max_batch_size (see ModelInference)
         """
-        super().__init__(model_path, label_map_path, calibration_path)
+        super().__init__(model_path, label_map_path, calibration_path, **kwargs)
         self.confidence_threshold = confidence_threshold
         self.nms_threshold = nms_threshold
     
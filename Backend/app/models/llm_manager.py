@@ -8,18 +8,23 @@ import asyncio
 import json
 import logging
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Union, Tuple
+from typing import Awaitable, Dict, Any, List, Optional, Union, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from app.services.prompt_engineering import AgriculturalPromptEngine
 import aiohttp
 
+from app.connections.http_connection import get_http_pool
+from app.services.provider_guard import get_provider_guard
+from app.core.metrics import record_llm_call
 from app.core.config import (
     OPENAI_API_KEY, ANTHROPIC_API_KEY, GEMINI_API_KEY,
     AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT,
-    LLM_MODELS, LLM_VISION_MODELS, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_TIMEOUT
+    LLM_MODELS, LLM_VISION_MODELS, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_TIMEOUT,
+    settings
 )
 import base64
 logger = logging.getLogger(__name__)
@@ -159,13 +164,12 @@ class LLMResponse:
         
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
+        self.session = get_http_pool().aiohttp_session("llm", timeout=LLM_TIMEOUT)
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        self.session = None
     
     def _setup_gemini(self):
         """Setup Gemini provider"""
@@ -524,10 +528,12 @@ class LLMResponse:
             
             response_time = (datetime.now() - start_time).total_seconds()
             response.response_time = response_time
+            record_llm_call(provider.value, response.model, response_time, response.success, response.tokens_used)
             
             return response
             
         except Exception as e:
+            record_llm_call(provider.value, None, (datetime.now() - start_time).total_seconds(), False)
             # Try fallback providers
             for fallback_provider in self.fallback_providers:
                 if fallback_provider != provider and fallback_provider in self.providers:
@@ -791,14 +797,12 @@ class BaseLLMClient(ABC):
         self.session: Optional[aiohttp.ClientSession] = None
     
     async def __aenter__(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
+        # Pooled per provider; concurrent callers share its keep-alive connections
+        self.session = get_http_pool().aiohttp_session(f"llm:{self.provider.value}", timeout=LLM_TIMEOUT)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-            self.session = None
+        pass
     
     @abstractmethod
     async def analyze_image(self, image_data: str, prompt: str, response_type: LLMResponseType) -> LLMResponse:
@@ -1134,14 +1138,8 @@ class GoogleClient(BaseLLMClient):
         url = f"{self.postgres_base_url}/models/{self.model}:generateContent?key={self.api_key}"
 
         # Ensure session exists (in case method is called without __aenter__ context)
-        created_session = False
         if self.session is None:
-            try:
-                self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
-                created_session = True
-            except Exception as e:
-                logger.error(f"Failed to create HTTP session for Google image analysis: {e}")
-                return self._create_error_response(response_type, str(e))
+            self.session = get_http_pool().aiohttp_session(f"llm:{self.provider.value}", timeout=LLM_TIMEOUT)
 
         # Retry on transient network/server issues
         retries = 2
@@ -1183,14 +1181,6 @@ class GoogleClient(BaseLLMClient):
             except Exception as e:
                 logger.error(f"Google image analysis failed: {e}")
                 return self._create_error_response(response_type, str(e))
-            finally:
-                # Close temp session if we created it here (outer context manager will handle otherwise)
-                if created_session and attempt == retries:
-                    try:
-                        await self.session.close()
-                    except Exception:
-                        pass
-                    self.session = None
     
     async def analyze_text(
         self,
@@ -1212,14 +1202,8 @@ class GoogleClient(BaseLLMClient):
         url = f"{self.postgres_base_url}/models/{model}:generateContent?key={self.api_key}"
 
         # Ensure session exists (in case method is called without __aenter__ context)
-        created_session = False
         if self.session is None:
-            try:
-                self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
-                created_session = True
-            except Exception as e:
-                logger.error(f"Failed to create HTTP session for Google text analysis: {e}")
-                return self._create_error_response(response_type, str(e))
+            self.session = get_http_pool().aiohttp_session(f"llm:{self.provider.value}", timeout=LLM_TIMEOUT)
 
         retries = 2
         backoff = 0.5
@@ -1258,13 +1242,6 @@ class GoogleClient(BaseLLMClient):
             except Exception as e:
                 logger.error(f"Google text analysis failed: {e}")
                 return self._create_error_response(response_type, str(e))
-            finally:
-                if created_session and attempt == retries:
-                    try:
-                        await self.session.close()
-                    except Exception:
-                        pass
-                    self.session = None
 
 
 class MultiLLMService:
@@ -1276,6 +1253,8 @@ class MultiLLMService:
         """Initialize multi-LLM service"""
         self.clients = self._initialize_clients()
         self.provider_health = {provider: True for provider in LLMProvider}
+        # Circuit breakers and quotas are shared with app.services.llm_service
+        self.guard = get_provider_guard()
         
     def _initialize_clients(self) -> Dict[LLMProvider, BaseLLMClient]:
         """Initialize all available LLM clients"""
@@ -1293,6 +1272,32 @@ class MultiLLMService:
         logger.info(f"Initialized LLM clients: {list(clients.keys())}")
         return clients
     
+    def _record_call(self, provider: LLMProvider, response: Optional[LLMResponse], elapsed: float) -> None:
+        """Account latency, tokens and cost of a provider call in the metrics registry"""
+        client = self.clients.get(provider)
+        success = bool(response and response.success)
+        tokens = None
+        if response is not None:
+            usage = response.metadata.get("usage") if isinstance(response.metadata, dict) else None
+            tokens = response.tokens_used or (usage.get("total_tokens") if isinstance(usage, dict) else None)
+        price = settings.LLM_COST_PER_1K_TOKENS.get(provider.value)
+        cost = tokens / 1000 * price if tokens and price is not None else None
+        record_llm_call(provider.value, client.model if client else None, elapsed, success, tokens, cost)
+    
+    async def _admit(self, provider: LLMProvider, response_type: LLMResponseType) -> Optional[LLMResponse]:
+        """Fast failure response when the provider's circuit is open or its quota is exhausted"""
+        rejection = await self.guard.acquire(provider.value)
+        if rejection is None:
+            return None
+        return LLMResponse(
+            provider=provider,
+            response_type=response_type,
+            content="",
+            metadata={"rejected": rejection},
+            success=False,
+            error=f"Provider {provider.value} {rejection}"
+        )
+    
     async def analyze_image_with_provider(
         self,
         provider: LLMProvider,
@@ -1312,17 +1317,29 @@ class MultiLLMService:
                 error=f"Provider {provider.value} not available"
             )
         
+        rejected = await self._admit(provider, response_type)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
         try:
             async with client:
                 response = await client.analyze_image(image_data, prompt, response_type)
                 
             # Update provider health
             self.provider_health[provider] = response.success
+            self.guard.record(provider.value, response.success, response.error)
+            self._record_call(provider, response, time.monotonic() - started)
             return response
             
+        except asyncio.CancelledError:
+            self.guard.release(provider.value)
+            raise
         except Exception as e:
             logger.error(f"Provider {provider.value} analysis failed: {e}")
             self.provider_health[provider] = False
+            self.guard.record(provider.value, False, str(e))
+            self._record_call(provider, None, time.monotonic() - started)
             return client._create_error_response(response_type, str(e))
     
     async def analyze_text_with_provider(
@@ -1343,17 +1360,29 @@ class MultiLLMService:
                 error=f"Provider {provider.value} not available"
             )
         
+        rejected = await self._admit(provider, response_type)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
         try:
             async with client:
                 response = await client.analyze_text(prompt, response_type)
                 
             # Update provider health
             self.provider_health[provider] = response.success
+            self.guard.record(provider.value, response.success, response.error)
+            self._record_call(provider, response, time.monotonic() - started)
             return response
             
+        except asyncio.CancelledError:
+            self.guard.release(provider.value)
+            raise
         except Exception as e:
             logger.error(f"Provider {provider.value} text analysis failed: {e}")
             self.provider_health[provider] = False
+            self.guard.record(provider.value, False, str(e))
+            self._record_call(provider, None, time.monotonic() - started)
             return client._create_error_response(response_type, str(e))
     
     async def parallel_image_analysis(
@@ -1404,7 +1433,7 @@ class MultiLLMService:
         """Get list of currently healthy providers"""
         return [
             provider for provider, healthy in self.provider_health.items()
-            if healthy and provider in self.clients
+            if healthy and provider in self.clients and self.guard.is_available(provider.value)
         ]
     
     def get_provider_status(self) -> Dict[str, Any]:
@@ -1416,7 +1445,8 @@ class MultiLLMService:
                 provider.value: status 
                 for provider, status in self.provider_health.items()
             },
-            "total_providers": len(self.clients)
+            "total_providers": len(self.clients),
+            "circuits": self.guard.snapshot()
         }
 
 
@@ -1576,11 +1606,17 @@ class LLMManager:
             providers.append(p.value)
         self.enabled_providers = providers
 
+    def response_calls(self, prompt: str, providers: Optional[List[str]] = None) -> Dict[str, Awaitable[LLMResponse]]:
+        """Un-awaited text calls per enabled provider (optionally limited to `providers`), for incremental selection"""
+        return {
+            p.value: self._service.analyze_text_with_provider(p, prompt, LLMResponseType.LLM_ANALYSIS)
+            for p in self._service.clients.keys()
+            if providers is None or p.value in providers
+        }
+
     async def get_all_responses(self, prompt: str) -> Dict[str, LLMResponse]:
-        tasks = []
         # External
-        for p in self._service.clients.keys():
-            tasks.append((p.value, self._service.analyze_text_with_provider(p, prompt, LLMResponseType.LLM_ANALYSIS)))
+        tasks = list(self.response_calls(prompt).items())
 
         results: Dict[str, LLMResponse] = {}
         if tasks:
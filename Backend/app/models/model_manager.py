@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional
 import json
 
 from app.core.config import settings, ENABLE_MODEL_LOADING
+from app.models.model_variants import resolve_model_variant
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,7 @@ class ModelManager:
         """Initialize model manager"""
         self.models: Dict[str, Any] = {}
         self.model_configs: Dict[str, Dict[str, Any]] = {}
+        self.model_variants: Dict[str, str] = {}
         self.is_loaded = False
         
         # Default model paths (can be overridden by config)
@@ -126,7 +128,8 @@ class ModelManager:
             logger.info(f"⏭️ Skipping disabled model: {model_name}")
             return
         
-        model_path = config["model_path"]
+        # Serve the configured FP32/INT8 artifact (falls back to FP32 when missing)
+        model_path, variant = resolve_model_variant(model_name, config["model_path"])
         if not Path(model_path).exists():
             logger.warning(f"❌ Model file not found: {model_path}")
             await self._create_placeholder_files(model_name, config)
@@ -135,11 +138,16 @@ class ModelManager:
         try:
             # Create inference engine
             inference_kwargs = {
-                "model_path": config["model_path"],
+                "model_path": model_path,
                 "label_map_path": config["label_map_path"],
                 "calibration_path": config.get("calibration_path")
             }
             
+            # Optional ONNX Runtime tuning per model (defaults come from ONNX_* settings)
+            for key in ("session_options", "max_batch_size"):
+                if config.get(key):
+                    inference_kwargs[key] = config[key]
+            
             # Add detection-specific parameters
             if config.get("model_type") == "detection":
                 inference_kwargs.update({
@@ -156,7 +164,8 @@ class ModelManager:
             # This will catch loading errors early
             
             self.models[model_name] = model
-            logger.info(f"✅ Loaded model: {model_name}")
+            self.model_variants[model_name] = variant
+            logger.info(f"✅ Loaded model: {model_name} ({variant})")
             
         except Exception as e:
             logger.error(f"Failed to load model {model_name}: {e}")
@@ -231,6 +240,7 @@ class ModelManager:
             model_status[name] = {
                 "config": config,
                 "loaded": name in self.models,
+                "variant": self.model_variants.get(name),
                 "model_file_exists": Path(config["model_path"]).exists(),
                 "label_file_exists": Path(config["label_map_path"]).exists()
             }
@@ -252,8 +262,9 @@ class ModelManager:
             raise ValueError(f"Unknown model: {model_name}")
         
         # Remove existing model
-        if model_name in self.models:
-            del self.models[model_name]
+        model = self.models.pop(model_name, None)
+        if model is not None:
+            model.close()
         
         # Reload
         await self._load_single_model(model_name, self.model_configs[model_name])
@@ -262,7 +273,9 @@ class ModelManager:
     async def unload_model(self, model_name: str):
         """Unload a specific model to free memory"""
         if model_name in self.models:
-            del self.models[model_name]
+            model = self.models.pop(model_name)
+            if model is not None:
+                model.close()
             logger.info(f"🗑️ Unloaded model: {model_name}")
     
     def is_ready(self) -> bool:
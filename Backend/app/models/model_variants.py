@@ -0,0 +1,49 @@
+"""
+Model Variants - Pick the FP32 or INT8 artifact to serve per model
+
+Quantized artifacts are produced offline by scripts/quantize.py next to the
+FP32 model: weights/pest_classifier.onnx -> weights/pest_classifier.int8_static.onnx.
+VISION_MODEL_VARIANTS selects the variant per model; a missing artifact falls
+back to FP32 so a config change can never take a model offline.
+"""
+
+import logging
+from pathlib import Path
+from typing import Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODEL_VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+
+
+def variant_path(model_path: Union[str, Path], variant: str) -> Path:
+    """Artifact path of a variant (quantized variants are always ONNX)"""
+    path = Path(model_path)
+    if not variant or variant == "fp32":
+        return path
+    return path.with_name(f"{path.stem}.{variant}.onnx")
+
+
+def configured_variant(model_name: str) -> str:
+    variant = settings.VISION_MODEL_VARIANTS.get(model_name, "fp32")
+    if variant not in MODEL_VARIANTS:
+        logger.warning(f"Unknown model variant '{variant}' for {model_name}; using fp32")
+        return "fp32"
+    return variant
+
+
+def resolve_model_variant(model_name: str, model_path: Union[str, Path]) -> Tuple[str, str]:
+    """
+    Path and variant to serve for a model
+
+    Returns:
+        (artifact path, variant name); FP32 when the configured artifact does not exist
+    """
+    variant = configured_variant(model_name)
+    candidate = variant_path(model_path, variant)
+    if variant != "fp32" and not candidate.exists():
+        logger.warning(f"⚠️ {variant} artifact for {model_name} not found ({candidate}); serving fp32")
+        return str(model_path), "fp32"
+    return str(candidate), variant
@@ -3,13 +3,19 @@ Intelligent Agent for Response Selection and Quality Assessment
 Compares LLM responses and selects the best one using multiple criteria
 """
 
+import asyncio
 import logging
+import random
 import re
-from typing import Dict, List, Any, Optional
+import time
+from collections import deque
+from typing import Awaitable, Deque, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import json
-from app.models.llm_manager import LLMResponse
+from app.core.config import settings
+from app.core.metrics import get_metrics_registry
+from app.models.llm_manager import LLMResponse, LLMResponseType
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +46,9 @@ class AgentDecision:
 class ResponseAgent:
     """Intelligent agent for selecting best LLM response"""
     
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        
         # Agricultural domain keywords
         self.domain_keywords = {
             'disease': ['disease', 'infection', 'pathogen', 'fungal', 'bacterial', 'viral', 'blight', 'rust', 'mildew'],
@@ -59,6 +67,9 @@ class ResponseAgent:
             'confidence': 0.10,  # Provider confidence
             'error_penalty': 0.05 # Error penalty
         }
+        
+        # Recent successful final scores per provider (bounds what a pending provider can still reach)
+        self._score_history: Dict[str, Deque[float]] = {}
     
     def analyze_response(self, response: LLMResponse, query_context: str) -> ResponseAnalysis:
         """Analyze a single LLM response"""
@@ -278,9 +289,155 @@ class ResponseAgent:
         
         return f"{provider.title()}: {', '.join(reasons)}"
     
+    def _remember_score(self, provider: str, analysis: ResponseAnalysis) -> None:
+        # Failures say nothing about how good an answer the provider gives
+        if analysis.error_penalty:
+            return
+        history = self._score_history.get(provider)
+        if history is None:
+            history = self._score_history[provider] = deque(maxlen=settings.RESPONSE_AGENT_SCORE_WINDOW)
+        history.append(analysis.final_score)
+    
+    def max_possible_score(self, provider: str, query_context: str = "") -> float:
+        """
+        Highest score a provider's pending response can plausibly reach
+        
+        The formula maximum (every component perfect, full confidence), tightened
+        to a high quantile of the provider's recent successful scores once it has
+        enough of them, but never below RESPONSE_AGENT_BOUND_FLOOR.
+        """
+        relevance_max = 1.0 if query_context else 0.5
+        bound = (
+            self.weights['length'] +
+            self.weights['keywords'] +
+            self.weights['clarity'] +
+            relevance_max * self.weights['relevance'] +
+            self.weights['confidence']
+        )
+        history = self._score_history.get(provider)
+        if history and len(history) >= settings.RESPONSE_AGENT_MIN_SCORE_SAMPLES:
+            ordered = sorted(history)
+            observed = ordered[min(len(ordered) - 1, int(settings.RESPONSE_AGENT_BOUND_QUANTILE * len(ordered)))]
+            bound = min(bound, max(observed, settings.RESPONSE_AGENT_BOUND_FLOOR))
+        return bound
+    
+    async def select_as_completed(
+        self,
+        calls: Dict[str, Awaitable[LLMResponse]],
+        query_context: str = "",
+        quality_bar: Optional[float] = None
+    ) -> Tuple[AgentDecision, Dict[str, LLMResponse]]:
+        """
+        Score provider responses as they arrive and stop once the choice is settled
+        
+        Selection ends early when the best response so far reaches the quality
+        bar, or when no pending provider can score higher than it (see
+        max_possible_score). Only a successful, non-zero best response ends
+        selection. Pending calls are then cancelled and recorded as skipped for
+        offline analysis. A share of selections (RESPONSE_AGENT_EXPLORE_RATE)
+        never uses the history bound, so providers it keeps skipping still get
+        fresh scores.
+        
+        Args:
+            calls: Un-awaited provider calls by provider name
+            query_context: Context used for relevance scoring
+            quality_bar: Score that ends selection (RESPONSE_AGENT_QUALITY_BAR by default)
+            
+        Returns:
+            (decision, completed responses by provider)
+        """
+        quality_bar = settings.RESPONSE_AGENT_QUALITY_BAR if quality_bar is None else quality_bar
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(call): provider for provider, call in calls.items()}
+        pending = set(tasks)
+        responses: Dict[str, LLMResponse] = {}
+        analyses: Dict[str, ResponseAnalysis] = {}
+        best: Optional[str] = None
+        reason: Optional[str] = None
+        explore = self.rng.random() < settings.RESPONSE_AGENT_EXPLORE_RATE
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        response = LLMResponse(provider=provider, response_type=LLMResponseType.LLM_ANALYSIS, content="", success=False, error=str(e))
+                    responses[provider] = response
+                    analyses[provider] = self.analyze_response(response, query_context)
+                    self._remember_score(provider, analyses[provider])
+                    if best is None or analyses[provider].final_score > analyses[best].final_score:
+                        best = provider
+                
+                if not pending:
+                    break
+                best_score = analyses[best].final_score
+                if analyses[best].error_penalty or best_score <= 0:
+                    continue
+                if best_score >= quality_bar:
+                    reason = "quality_bar_met"
+                elif not explore and all(self.max_possible_score(tasks[t], query_context) < best_score for t in pending):
+                    reason = "cannot_beat_best"
+                if reason:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        skipped = []
+        if pending:
+            # Let cancelled calls release their provider slots before returning
+            await asyncio.gather(*pending, return_exceptions=True)
+            elapsed = time.monotonic() - started
+            skipped = [
+                {
+                    "provider": tasks[task],
+                    "reason": reason,
+                    "best_provider": best,
+                    "best_score": round(analyses[best].final_score, 4),
+                    "max_possible_score": round(self.max_possible_score(tasks[task], query_context), 4),
+                    "elapsed_seconds": round(elapsed, 3),
+                }
+                for task in pending
+            ]
+            await self._record_skipped(skipped, query_context)
+            logger.info(f"⚡ Selected {best} after {elapsed:.2f}s ({reason}); skipped {[s['provider'] for s in skipped]}")
+        
+        decision = self.select_best_response(responses, query_context, analyses=analyses)
+        decision.metadata.update({
+            "early_exit": reason,
+            "explored": explore,
+            "completed_providers": list(responses),
+            "skipped_providers": skipped,
+            "selection_seconds": round(time.monotonic() - started, 3),
+        })
+        return decision, responses
+    
+    async def _record_skipped(self, skipped: List[Dict[str, Any]], query_context: str) -> None:
+        """Count skipped providers and append them to the offline analysis log"""
+        registry = get_metrics_registry()
+        for entry in skipped:
+            registry.inc("response_agent_skipped_total", provider=entry["provider"], reason=entry["reason"])
+        
+        def append() -> None:
+            path = settings.RESPONSE_AGENT_SKIP_LOG_PATH
+            path.parent.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().isoformat()
+            with open(path, "a", encoding="utf-8") as f:
+                for entry in skipped:
+                    f.write(json.dumps({"timestamp": timestamp, "query_context": query_context, **entry}) + "\n")
+        
+        try:
+            await asyncio.to_thread(append)
+        except Exception as e:
+            logger.warning(f"Failed to log skipped providers: {e}")
+    
     def select_best_response(self, responses: Dict[str, LLMResponse], 
-                           query_context: str = "") -> AgentDecision:
-        """Select the best response from multiple LLM providers"""
+                           query_context: str = "",
+                           analyses: Optional[Dict[str, ResponseAnalysis]] = None) -> AgentDecision:
+        """Select the best response from multiple LLM providers (reusing any precomputed analyses)"""
         try:
             if not responses:
                 return AgentDecision(
@@ -293,9 +450,11 @@ class ResponseAgent:
                 )
             
             # Analyze all responses
-            analyses = {}
+            analyses = dict(analyses or {})
             for provider, response in responses.items():
-                analyses[provider] = self.analyze_response(response, query_context)
+                if provider not in analyses:
+                    analyses[provider] = self.analyze_response(response, query_context)
+                    self._remember_score(provider, analyses[provider])
             
             # Find best response
             best_provider = max(analyses.keys(), key=lambda p: analyses[p].final_score)
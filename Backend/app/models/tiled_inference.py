@@ -0,0 +1,252 @@
+"""
+Tiled Inference - Classification and detection over very large images
+
+Drone orthophotos and high-resolution field photos are analyzed tile by tile
+instead of being downscaled until small lesions disappear. Tiles are views
+into the decoded image (nothing is copied or written to disk); they are
+resized to the model input in batches, and only TILED_INFERENCE_WORKERS
+batches are in flight at once, so memory stays roughly the decoded image plus
+a few model batches regardless of image size. Detections from overlapping
+tiles are merged with cross-tile NMS, and every tile gets a severity score for
+the heatmap.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.models.transforms import ImageTransforms
+
+logger = logging.getLogger(__name__)
+
+Window = Tuple[int, int, int, int]
+
+
+def _batches(items: List[Window], size: int) -> Iterator[List[Window]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _is_healthy(label: str) -> bool:
+    return "healthy" in str(label).lower()
+
+
+def merge_detections(detections: List[Dict[str, Any]], iou_threshold: float) -> List[Dict[str, Any]]:
+    """
+    Cross-tile non-maximum suppression, per class
+
+    Args:
+        detections: Boxes in image coordinates (x1, y1, x2, y2, confidence, class)
+        iou_threshold: IoU above which the weaker box is dropped
+
+    Returns:
+        Surviving detections, most confident first
+    """
+    by_class: Dict[str, List[Dict[str, Any]]] = {}
+    for det in detections:
+        by_class.setdefault(det["class"], []).append(det)
+
+    merged = []
+    for class_dets in by_class.values():
+        boxes = [[d["x1"], d["y1"], d["x2"] - d["x1"], d["y2"] - d["y1"]] for d in class_dets]
+        scores = [float(d["confidence"]) for d in class_dets]
+        keep = cv2.dnn.NMSBoxes(boxes, scores, 0.0, iou_threshold)
+        merged.extend(class_dets[int(i)] for i in np.array(keep).flatten())
+    return sorted(merged, key=lambda d: d["confidence"], reverse=True)
+
+
+class TiledInference:
+    """
+    Runs a classifier and/or detector (ModelInference / DetectionInference) over image tiles
+
+    Args:
+        classifier: Classification engine, or None
+        detector: Detection engine, or None
+        tile_size: Square tile edge in source pixels
+        overlap: Overlap between neighbouring tiles in pixels
+        batch_size: Tiles per model run
+        workers: Batches processed concurrently
+    """
+
+    def __init__(
+        self,
+        classifier=None,
+        detector=None,
+        tile_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None,
+    ):
+        if classifier is None and detector is None:
+            raise ValueError("TiledInference needs a classifier or a detector")
+        self.classifier = classifier
+        self.detector = detector
+        self.tile_size = tile_size or settings.TILED_INFERENCE_TILE_SIZE
+        self.overlap = settings.TILED_INFERENCE_OVERLAP if overlap is None else overlap
+        self.batch_size = batch_size or settings.TILED_INFERENCE_BATCH_SIZE
+        self.workers = max(1, workers or settings.TILED_INFERENCE_WORKERS)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tiled-inference")
+
+    def _run_batch(self, image: np.ndarray, windows: List[Window]) -> List[Dict[str, Any]]:
+        """Classify/detect one batch of tiles (runs in a worker thread)"""
+        tiles = [image[y:y + h, x:x + w] for x, y, w, h in windows]
+        results: List[Dict[str, Any]] = [{"window": window, "detections": []} for window in windows]
+
+        if self.classifier is not None:
+            for result, (label, confidence, _) in zip(results, self.classifier.predict_batch(tiles, top_k=2)):
+                result["label"] = label
+                result["confidence"] = confidence
+                result["severity"] = (1.0 - confidence) if _is_healthy(label) else confidence
+
+        if self.detector is not None:
+            input_h, input_w = self.detector._target_size()
+            outputs = self.detector.run_inference(self.detector.preprocess_batch(tiles))
+            for row, result in enumerate(results):
+                x, y, w, h = result["window"]
+                row_outputs = {name: output[row:row + 1] for name, output in outputs.items()}
+                _, _, _, boxes = self.detector.postprocess_detections(row_outputs, (input_h, input_w))
+                # Model-input coordinates -> tile -> whole image
+                sx, sy = w / input_w, h / input_h
+                covered = 0.0
+                for box in boxes:
+                    det = {
+                        "x1": x + int(box["x1"] * sx), "y1": y + int(box["y1"] * sy),
+                        "x2": x + int(box["x2"] * sx), "y2": y + int(box["y2"] * sy),
+                        "confidence": box["confidence"], "class": box["class"],
+                    }
+                    result["detections"].append(det)
+                    if not _is_healthy(det["class"]):
+                        covered += (det["x2"] - det["x1"]) * (det["y2"] - det["y1"]) * det["confidence"]
+                detection_severity = min(1.0, covered / float(w * h))
+                result["severity"] = max(result.get("severity", 0.0), detection_severity)
+
+        return results
+
+    def analyze_array(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Tile, infer and merge for a decoded RGB image
+
+        Returns:
+            Dict with merged detections, per-tile predictions, a severity heatmap
+            (rows x cols, tile grid order) and an overall label
+        """
+        start_time = time.time()
+        height, width = image.shape[:2]
+        windows = ImageTransforms.tile_grid(width, height, (self.tile_size, self.tile_size), self.overlap)
+        cols = len({x for x, _, _, _ in windows})
+        rows = len(windows) // cols
+
+        # Keep at most `workers` batches in flight so memory does not grow with the image
+        tiles: List[Dict[str, Any]] = []
+        pending: deque = deque()
+        for batch in _batches(windows, self.batch_size):
+            if len(pending) >= self.workers:
+                tiles.extend(pending.popleft().result())
+            pending.append(self._executor.submit(self._run_batch, image, batch))
+        while pending:
+            tiles.extend(pending.popleft().result())
+
+        heatmap = [[0.0] * cols for _ in range(rows)]
+        label_scores: Dict[str, float] = {}
+        for index, tile in enumerate(tiles):
+            row, col = divmod(index, cols)
+            heatmap[row][col] = round(float(tile.get("severity", 0.0)), 4)
+            if "label" in tile:
+                label_scores[tile["label"]] = label_scores.get(tile["label"], 0.0) + tile["confidence"]
+
+        detections = []
+        if self.detector is not None:
+            raw = [det for tile in tiles for det in tile["detections"]]
+            detections = merge_detections(raw, settings.TILED_INFERENCE_NMS_IOU)
+
+        # Overall label: most confident-weighted diseased label, else the top label
+        diseased = {label: score for label, score in label_scores.items() if not _is_healthy(label)}
+        candidates = diseased or label_scores
+        if not candidates and detections:
+            candidates = {detections[0]["class"]: detections[0]["confidence"]}
+        primary_label = max(candidates, key=candidates.get) if candidates else "unknown"
+
+        severities = [value for row in heatmap for value in row]
+        affected = sum(1 for value in severities if value >= settings.TILED_INFERENCE_AFFECTED_SEVERITY)
+        processing_time = time.time() - start_time
+
+        logger.info(
+            f"🧩 Tiled inference: {len(windows)} tiles ({rows}x{cols}) in {processing_time:.2f}s",
+            extra={"width": width, "height": height, "detections": len(detections)},
+        )
+
+        return {
+            "label": primary_label,
+            "image_size": {"width": width, "height": height},
+            "grid": {
+                "rows": rows,
+                "cols": cols,
+                "tile_size": self.tile_size,
+                "overlap": self.overlap,
+            },
+            "heatmap": heatmap,
+            "max_severity": max(severities) if severities else 0.0,
+            "affected_fraction": round(affected / len(severities), 4) if severities else 0.0,
+            "detections": detections,
+            "tiles": [
+                {
+                    "x": tile["window"][0],
+                    "y": tile["window"][1],
+                    "label": tile.get("label"),
+                    "confidence": tile.get("confidence"),
+                    "severity": round(float(tile.get("severity", 0.0)), 4),
+                    "detections": len(tile["detections"]),
+                }
+                for tile in tiles
+            ],
+            "processing_time": processing_time,
+        }
+
+    def analyze_path(self, image_path: str) -> Dict[str, Any]:
+        """Decode an image file (converted to RGB in place) and analyze it tile by tile"""
+        image = ImageTransforms.load_image(image_path)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        return self.analyze_array(image)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def needs_tiling(width: int, height: int) -> bool:
+    """Whether an image is large enough to be analyzed tile by tile"""
+    return settings.TILED_INFERENCE_ENABLED and max(width, height) > settings.TILED_INFERENCE_MIN_SIDE
+
+
+# Singleton instance
+_tiled_inference_instance: Optional[TiledInference] = None
+
+
+async def get_tiled_inference() -> Optional[TiledInference]:
+    """Get singleton TiledInference over the loaded local models, or None when none are loaded"""
+    global _tiled_inference_instance
+
+    if _tiled_inference_instance is None:
+        from app.models.model_manager import get_model_manager
+        manager = await get_model_manager()
+        classifier = manager.get_model("pest_classifier")
+        detector = manager.get_detection_model()
+        if classifier is None and detector is None:
+            return None
+        _tiled_inference_instance = TiledInference(classifier=classifier, detector=detector)
+
+    return _tiled_inference_instance
+
+
+async def analyze_large_image(image_path: str) -> Optional[Dict[str, Any]]:
+    """Tiled analysis of one image in a worker thread, or None when no local model is loaded"""
+    engine = await get_tiled_inference()
+    if engine is None:
+        return None
+    return await asyncio.to_thread(engine.analyze_path, image_path)
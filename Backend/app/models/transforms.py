@@ -111,6 +111,166 @@ class ImageTransforms:
         except Exception as e:
             return False, f"Invalid image file: {str(e)}", None
     
+    @staticmethod
+    def load_image(image_path: str) -> np.ndarray:
+        """
+        Decode an image file into a BGR array (EXIF orientation applied, metadata dropped)
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            Decoded BGR image
+        """
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Failed to load image: {image_path}")
+        return image
+    
+    @staticmethod
+    def resize_array(image: np.ndarray, target_size: Tuple[int, int],
+                     maintain_aspect: bool = True) -> np.ndarray:
+        """
+        Resize a decoded image to target size
+        
+        Args:
+            image: BGR image array
+            target_size: Target (width, height)
+            maintain_aspect: Whether to maintain aspect ratio (pads to target size)
+            
+        Returns:
+            Resized image array
+        """
+        if not maintain_aspect:
+            # Direct resize (may distort aspect ratio)
+            return cv2.resize(image, target_size, interpolation=cv2.INTER_LINEAR)
+        
+        # Calculate aspect-preserving size
+        h, w = image.shape[:2]
+        target_w, target_h = target_size
+        scale = min(target_w / w, target_h / h)
+        new_w = int(w * scale)
+        new_h = int(h * scale)
+        
+        # INTER_AREA avoids aliasing when shrinking large photos
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        resized = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+        
+        # Pad to target size if needed
+        if new_w != target_w or new_h != target_h:
+            # Create black background and center the resized image
+            padded = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+            y_offset = (target_h - new_h) // 2
+            x_offset = (target_w - new_w) // 2
+            padded[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
+            resized = padded
+        
+        return resized
+    
+    @staticmethod
+    def enhance_array(image: np.ndarray) -> np.ndarray:
+        """
+        Apply CLAHE contrast enhancement and slight denoising to a decoded image
+        
+        Args:
+            image: BGR image array
+            
+        Returns:
+            Enhanced image array
+        """
+        # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+        l, a, b = cv2.split(lab)
+        
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        l = clahe.apply(l)
+        
+        enhanced = cv2.merge([l, a, b])
+        enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
+        
+        # Apply slight denoising
+        return cv2.bilateralFilter(enhanced, 9, 75, 75)
+    
+    @staticmethod
+    def tile_grid(width: int, height: int, tile_size: Tuple[int, int] = (1024, 1024),
+                  overlap: int = 128) -> List[Tuple[int, int, int, int]]:
+        """
+        Overlapping tile windows covering the whole image
+        
+        Tiles are spread evenly so the first and last rows/columns touch the image
+        edges (borders are not dropped) and neighbours overlap by at least
+        `overlap`; images smaller than a tile yield a single window of the image size.
+        
+        Args:
+            width: Image width
+            height: Image height
+            tile_size: Size of each tile (width, height)
+            overlap: Overlap between tiles in pixels
+            
+        Returns:
+            List of (x, y, w, h) windows, row by row
+        """
+        tile_w, tile_h = min(tile_size[0], width), min(tile_size[1], height)
+        
+        def starts(length: int, tile: int) -> List[int]:
+            step = max(1, tile - overlap)
+            count = -(-(length - tile) // step) + 1  # ceil division
+            if count <= 1:
+                return [0]
+            return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+        
+        return [
+            (x, y, tile_w, tile_h)
+            for y in starts(height, tile_h)
+            for x in starts(width, tile_w)
+        ]
+    
+    @staticmethod
+    def tile_array(image: np.ndarray, tile_size: Tuple[int, int] = (1024, 1024),
+                   overlap: int = 128, output_dir: Path = None) -> List[str]:
+        """
+        Split a decoded image into overlapping tiles and write them to output_dir
+        
+        Args:
+            image: BGR image array
+            tile_size: Size of each tile (width, height)
+            overlap: Overlap between tiles in pixels
+            output_dir: Directory for tile outputs
+            
+        Returns:
+            List of tile file paths
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        h, w = image.shape[:2]
+        tile_paths = []
+        
+        for tile_idx, (x, y, tile_w, tile_h) in enumerate(ImageTransforms.tile_grid(w, h, tile_size, overlap)):
+            tile = image[y:y+tile_h, x:x+tile_w]
+            tile_path = output_dir / f"tile_{tile_idx:04d}_{x}_{y}.jpg"
+            cv2.imwrite(str(tile_path), tile)
+            tile_paths.append(str(tile_path))
+        
+        return tile_paths
+    
+    @staticmethod
+    def encode_jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+        """
+        Encode a decoded image as JPEG bytes (no EXIF is written)
+        
+        Args:
+            image: BGR image array
+            quality: JPEG quality (0-100)
+            
+        Returns:
+            JPEG bytes
+        """
+        ok, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+    
     @staticmethod
     def resize_image(image_path: str, target_size: Tuple[int, int], 
                     output_path: str = None, maintain_aspect: bool = True) -> str:
@@ -131,38 +291,8 @@ class ImageTransforms:
                 path = Path(image_path)
                 output_path = str(path.parent / f"{path.stem}_resized{path.suffix}")
             
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Failed to load image: {image_path}")
-            
-            if maintain_aspect:
-                # Calculate aspect-preserving size
-                h, w = image.shape[:2]
-                target_w, target_h = target_size
-                
-                # Calculate scaling factor
-                scale = min(target_w / w, target_h / h)
-                new_w = int(w * scale)
-                new_h = int(h * scale)
-                
-                # Resize
-                resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-                
-                # Pad to target size if needed
-                if new_w != target_w or new_h != target_h:
-                    # Create black background
-                    padded = np.zeros((target_h, target_w, 3), dtype=np.uint8)
-                    
-                    # Center the resized image
-                    y_offset = (target_h - new_h) // 2
-                    x_offset = (target_w - new_w) // 2
-                    padded[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
-                    
-                    resized = padded
-            else:
-                # Direct resize (may distort aspect ratio)
-                resized = cv2.resize(image, target_size, interpolation=cv2.INTER_LINEAR)
+            image = ImageTransforms.load_image(image_path)
+            resized = ImageTransforms.resize_array(image, target_size, maintain_aspect)
             
             # Save resized image
             cv2.imwrite(output_path, resized)
@@ -199,32 +329,8 @@ class ImageTransforms:
             
             output_dir.mkdir(exist_ok=True)
             
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Failed to load image: {image_path}")
-            
-            h, w = image.shape[:2]
-            tile_w, tile_h = tile_size
-            
-            # Calculate step size
-            step_x = tile_w - overlap
-            step_y = tile_h - overlap
-            
-            tile_paths = []
-            tile_idx = 0
-            
-            for y in range(0, h - tile_h + 1, step_y):
-                for x in range(0, w - tile_w + 1, step_x):
-                    # Extract tile
-                    tile = image[y:y+tile_h, x:x+tile_w]
-                    
-                    # Save tile
-                    tile_path = output_dir / f"tile_{tile_idx:04d}_{x}_{y}.jpg"
-                    cv2.imwrite(str(tile_path), tile)
-                    tile_paths.append(str(tile_path))
-                    
-                    tile_idx += 1
+            image = ImageTransforms.load_image(image_path)
+            tile_paths = ImageTransforms.tile_array(image, tile_size, overlap, output_dir)
             
             logger.info(f"🧩 Tiled image into {len(tile_paths)} tiles: {image_path}")
             return tile_paths
@@ -272,6 +378,40 @@ class ImageTransforms:
             logger.error(f"Image hashing failed: {e}")
             return ""
     
+    @staticmethod
+    def calculate_dhash(image_data: bytes, hash_size: int = 8) -> Optional[int]:
+        """
+        Calculate the difference hash (dHash) of encoded image bytes
+        
+        Compares neighbouring pixels of a downscaled grayscale image, so the hash
+        survives re-compression, resizing and small exposure changes (e.g. the same
+        photo re-shared through a messaging app).
+        
+        Args:
+            image_data: Encoded image bytes (JPEG, PNG, ...)
+            hash_size: Hash is hash_size * hash_size bits (8 -> 64-bit)
+            
+        Returns:
+            Hash as an integer, or None if the image cannot be decoded
+        """
+        try:
+            image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise ValueError("Failed to decode image")
+            
+            small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+            bits = (small[:, 1:] > small[:, :-1]).flatten()
+            return int.from_bytes(np.packbits(bits).tobytes(), "big")
+            
+        except Exception as e:
+            logger.error(f"Perceptual hashing failed: {e}")
+            return None
+    
+    @staticmethod
+    def hamming_distance(hash_a: int, hash_b: int) -> int:
+        """Number of differing bits between two perceptual hashes"""
+        return bin(hash_a ^ hash_b).count("1")
+    
     @staticmethod
     def apply_quality_enhancements(image_path: str, output_path: str = None) -> str:
         """
@@ -289,23 +429,8 @@ class ImageTransforms:
                 path = Path(image_path)
                 output_path = str(path.parent / f"{path.stem}_enhanced{path.suffix}")
             
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Failed to load image: {image_path}")
-            
-            # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            l = clahe.apply(l)
-            
-            enhanced = cv2.merge([l, a, b])
-            enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
-            
-            # Apply slight denoising
-            enhanced = cv2.bilateralFilter(enhanced, 9, 75, 75)
+            image = ImageTransforms.load_image(image_path)
+            enhanced = ImageTransforms.enhance_array(image)
             
             # Save enhanced image
             cv2.imwrite(output_path, enhanced)
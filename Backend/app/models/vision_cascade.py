@@ -0,0 +1,236 @@
+"""
+Vision Cascade - Local classifier first, LLM escalation only when uncertain
+
+The on-box ONNX classifier (ModelInference via ModelManager) answers first.
+Its calibrated confidence is compared with a per-class threshold; confident
+answers are accepted locally and only uncertain images are sent to the vision
+LLM providers. Every escalation (plus a small audit sample of accepted images)
+logs whether the local and LLM answers agree, and thresholds are re-tuned from
+that log so each class keeps the target agreement rate.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.postgres_base_models import Alternative
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_label(label: Optional[str]) -> str:
+    """Comparable form of a diagnosis label ("Bacterial Blight" -> "bacterial_blight")"""
+    return re.sub(r"[^a-z0-9]+", "_", str(label or "").lower()).strip("_")
+
+
+def condition_tokens(label: Optional[str]) -> frozenset:
+    """
+    Words naming the condition in a label, without a "Crop___" class prefix
+    ("Tomato___Late_blight" -> {"late", "blight"})
+    """
+    condition = str(label or "").rsplit("___", 1)[-1]
+    return frozenset(token for token in normalize_label(condition).split("_") if token)
+
+
+def labels_agree(local_label: str, llm_label: str) -> bool:
+    """
+    Local and LLM labels name the same condition (same words, in any order)
+
+    Containment is deliberately not agreement: "healthy" vs "unhealthy" or
+    "not healthy", and a crop name vs a disease of that crop, are different
+    answers, and counting them as agreement would lower the tuned thresholds.
+    """
+    a, b = condition_tokens(local_label), condition_tokens(llm_label)
+    return bool(a) and a == b
+
+
+class VisionCascade:
+    """
+    Per-class confidence thresholds for accepting local predictions
+
+    Args:
+        thresholds_path: JSON file the tuned thresholds are persisted to
+        rng: Random source for audit sampling (inject a seeded one in tests)
+    """
+
+    def __init__(self, thresholds_path: Optional[Path] = None, rng: Optional[random.Random] = None):
+        self.thresholds_path = Path(thresholds_path or settings.VISION_CASCADE_THRESHOLDS_PATH)
+        self.rng = rng or random.Random()
+        self.thresholds: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._records_since_tune = 0
+        self._lock = threading.Lock()
+        self.stats = {"local": 0, "escalated": 0, "audited": 0, "compared": 0, "agreed": 0}
+        # record() is called from the event loop; re-tuning and the JSON write run here
+        self._tune_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cascade-tune")
+        self._load_thresholds()
+
+    def _load_thresholds(self) -> None:
+        if not self.thresholds_path.exists():
+            return
+        try:
+            with open(self.thresholds_path, "r", encoding="utf-8") as f:
+                self.thresholds = {k: float(v) for k, v in json.load(f).items()}
+            logger.info(f"🎯 Loaded cascade thresholds for {len(self.thresholds)} classes")
+        except Exception as e:
+            logger.warning(f"Failed to load cascade thresholds: {e}")
+
+    def _save_thresholds(self) -> None:
+        with self._lock:
+            thresholds = dict(self.thresholds)
+        try:
+            self.thresholds_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.thresholds_path, "w", encoding="utf-8") as f:
+                json.dump(thresholds, f, indent=2, sort_keys=True)
+        except Exception as e:
+            logger.warning(f"Failed to save cascade thresholds: {e}")
+
+    def threshold_for(self, label: str) -> float:
+        return self.thresholds.get(normalize_label(label), settings.VISION_CASCADE_DEFAULT_THRESHOLD)
+
+    def decide(self, label: str, confidence: float) -> str:
+        """
+        Route one local prediction
+
+        Returns:
+            "local" to accept it, "audit" to accept-but-verify with the LLM,
+            or "escalate" when the local model is not confident enough
+        """
+        with self._lock:
+            if confidence >= self.threshold_for(label):
+                if self.rng.random() < settings.VISION_CASCADE_AUDIT_RATE:
+                    self.stats["audited"] += 1
+                    return "audit"
+                self.stats["local"] += 1
+                return "local"
+            self.stats["escalated"] += 1
+            return "escalate"
+
+    def record(self, local_label: str, local_confidence: float, llm_label: str) -> bool:
+        """
+        Log whether the local answer matched the LLM answer for the same image.
+        Every VISION_CASCADE_TUNE_EVERY records the thresholds are re-tuned on a
+        background thread.
+
+        Returns:
+            bool: Whether the labels agreed
+        """
+        agreed = labels_agree(local_label, llm_label)
+        key = normalize_label(local_label)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=settings.VISION_CASCADE_MAX_SAMPLES_PER_CLASS)
+            samples.append((float(local_confidence), agreed))
+            self.stats["compared"] += 1
+            self.stats["agreed"] += int(agreed)
+            self._records_since_tune += 1
+            due = self._records_since_tune >= settings.VISION_CASCADE_TUNE_EVERY
+        if due:
+            self._tune_executor.submit(self.tune)
+        return agreed
+
+    def tune(self) -> Dict[str, float]:
+        """
+        Re-tune per-class thresholds from the agreement log
+
+        For each class with enough samples, the threshold becomes the lowest
+        confidence at which local answers at or above it agree with the LLM at
+        least VISION_CASCADE_TARGET_AGREEMENT of the time. Classes that never
+        reach the target always escalate.
+        """
+        target = settings.VISION_CASCADE_TARGET_AGREEMENT
+        with self._lock:
+            self._records_since_tune = 0
+            snapshot = {label: list(samples) for label, samples in self._samples.items()}
+
+        tuned: Dict[str, float] = {}
+        for label, samples in snapshot.items():
+            if len(samples) < settings.VISION_CASCADE_MIN_SAMPLES:
+                continue
+            # Walk from the most confident sample down, tracking agreement of the tail
+            samples.sort(key=lambda s: s[0], reverse=True)
+            agreed = 0
+            threshold = None
+            for count, (confidence, ok) in enumerate(samples, start=1):
+                agreed += int(ok)
+                if count >= settings.VISION_CASCADE_MIN_SAMPLES // 2 and agreed / count >= target:
+                    threshold = confidence
+            tuned[label] = round(threshold, 4) if threshold is not None else 1.01
+
+        if tuned:
+            with self._lock:
+                self.thresholds.update(tuned)
+            self._save_thresholds()
+            logger.info(f"🎯 Cascade thresholds tuned for {len(tuned)} classes")
+        return tuned
+
+    def report(self) -> Dict[str, Any]:
+        """Local-vs-escalated split, agreement (accuracy proxy) and thresholds"""
+        with self._lock:
+            stats = dict(self.stats)
+            per_class = {
+                label: {
+                    "samples": len(samples),
+                    "agreement": round(sum(ok for _, ok in samples) / len(samples), 4) if samples else None,
+                    "threshold": self.thresholds.get(label, settings.VISION_CASCADE_DEFAULT_THRESHOLD),
+                }
+                for label, samples in self._samples.items()
+            }
+            thresholds = dict(self.thresholds)
+        decided = stats["local"] + stats["audited"] + stats["escalated"]
+        return {
+            **stats,
+            "local_rate": round((stats["local"] + stats["audited"]) / decided, 4) if decided else None,
+            "escalation_rate": round(stats["escalated"] / decided, 4) if decided else None,
+            "agreement_rate": round(stats["agreed"] / stats["compared"], 4) if stats["compared"] else None,
+            "classes": per_class,
+            "thresholds": thresholds,
+            "default_threshold": settings.VISION_CASCADE_DEFAULT_THRESHOLD,
+        }
+
+
+async def predict_local(image_path: str) -> Optional[Tuple[str, float, List[Alternative]]]:
+    """
+    Run the on-box classifier on one image
+
+    Returns:
+        (label, calibrated confidence, alternatives), or None when no local model is loaded
+    """
+    if not settings.VISION_CASCADE_ENABLED:
+        return None
+    try:
+        from app.models.model_manager import get_model_manager
+        model = (await get_model_manager()).get_primary_model()
+    except Exception as e:
+        logger.debug(f"Local classifier unavailable: {e}")
+        return None
+    if model is None:
+        return None
+    try:
+        return await asyncio.to_thread(model.predict, image_path, 5)
+    except Exception as e:
+        logger.warning(f"Local classifier failed for {image_path}: {e}")
+        return None
+
+
+# Singleton instance
+_vision_cascade_instance: Optional[VisionCascade] = None
+
+
+def get_vision_cascade() -> VisionCascade:
+    """Get singleton VisionCascade instance"""
+    global _vision_cascade_instance
+
+    if _vision_cascade_instance is None:
+        _vision_cascade_instance = VisionCascade()
+
+    return _vision_cascade_instance
@@ -16,9 +16,12 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor
+import copy
 import hashlib
 import os
 
+from app.models.model_variants import configured_variant
+
 logger = logging.getLogger(__name__)
 
 class PlantClassifier:
@@ -36,6 +39,13 @@ class PlantClassifier:
         self.detection_backbone = os.getenv("DETECTION_BACKBONE", "fasterrcnn_resnet50_fpn")
         self.classification_backbone = os.getenv("CLASSIFICATION_BACKBONE", "efficientnet_b4")
         self.detector = None
+        # Served precision; INT8 runs a dynamically quantized copy (training keeps FP32)
+        self.variant = configured_variant("plant_classifier")
+        self._quantized_model = None
+        self._quantized_source = None
+        # Detected crops are classified together; tiny boxes are not worth a forward pass
+        self.crop_batch_size = int(os.getenv("CROP_BATCH_SIZE", "16"))
+        self.min_crop_area = int(os.getenv("MIN_CROP_AREA", "1024"))  # pixels (e.g. 32x32)
         # ---- Training hyperparameters (configurable) ----
         self.min_samples_per_class = 2         # classes below this not weighted (weight=0)
         self.learning_rate = 7e-4              # base LR
@@ -368,7 +378,7 @@ class PlantClassifier:
                 raise RuntimeError("No model loaded")
             image_tensor = self.transform(image).unsqueeze(0).to(self.device)
             with torch.no_grad():
-                outputs = self.model(image_tensor)
+                outputs = self._serving_model()(image_tensor)
                 probabilities = torch.softmax(outputs, dim=1)
                 confidence, predicted = torch.max(probabilities, 1)
                 predicted_class_idx = predicted.item()
@@ -443,7 +453,10 @@ class PlantClassifier:
                 labels_list = labels_val.detach().cpu().numpy()
             else:
                 labels_list = labels_val
-            predictions = []
+            # Collect crops above the score and area thresholds, then classify them together
+            crops = []
+            kept = []
+            skipped_small = 0
             for i, box in enumerate(boxes_list):
                 score = float(scores_list[i]) if i < len(scores_list) else 0.0
                 if score < score_threshold:
@@ -454,21 +467,23 @@ class PlantClassifier:
                 else:
                     # box may already be a list/np array
                     x1, y1, x2, y2 = [int(float(v)) for v in list(box)]
-                # Crop PIL image
-                crop = image.crop((x1, y1, x2, y2))
-                # Classify crop
-                crop_result = await self._classify_whole_image(crop)
-                pred = crop_result.get('predictions', [{}])[0]
-                pred_entry = {
-                    "label": pred.get('label', 'unknown'),
-                    "leaf": pred.get('leaf', 'unknown'),
-                    "condition": pred.get('condition', 'unknown'),
-                    "confidence": pred.get('confidence', 0.0),
-                    "bbox": [x1, y1, x2, y2],
+                if max(0, x2 - x1) * max(0, y2 - y1) < self.min_crop_area:
+                    skipped_small += 1
+                    continue
+                crops.append(image.crop((x1, y1, x2, y2)))
+                kept.append(([x1, y1, x2, y2], score))
+
+            predictions = []
+            for (bbox, score), (label, confidence) in zip(kept, self._classify_crops(crops)):
+                predictions.append({
+                    "label": label,
+                    "leaf": label.split('_')[0] if '_' in label else label,
+                    "condition": label.replace('_', ' '),
+                    "confidence": confidence,
+                    "bbox": bbox,
                     "score": score,
                     "source": "detector+classifier"
-                }
-                predictions.append(pred_entry)
+                })
             # If no predictions passed threshold, fallback to whole-image
             if not predictions:
                 return await self._classify_whole_image(image)
@@ -479,13 +494,48 @@ class PlantClassifier:
                     "device": str(self.device),
                     "detector": self.detection_backbone,
                     "classification_backbone": self.classification_backbone,
-                    "model_path": str(self.get_latest_model_path())
+                    "model_path": str(self.get_latest_model_path()),
+                    "skipped_small_boxes": skipped_small
                 }
             }
         except Exception as e:
             logger.error(f"Detect+Classify error: {e}")
             return await self._classify_whole_image(image)
     
+    def _serving_model(self) -> nn.Module:
+        """Model used for inference: FP32, or an INT8 copy with dynamically quantized Linear layers on CPU"""
+        if self.variant == "fp32" or self.device.type != "cpu":
+            return self.model
+        if self._quantized_model is None or self._quantized_source is not self.model:
+            quantized = torch.ao.quantization.quantize_dynamic(
+                copy.deepcopy(self.model).eval(), {nn.Linear}, dtype=torch.qint8
+            )
+            self._quantized_model, self._quantized_source = quantized, self.model
+            logger.info(f"Serving INT8 ({self.variant}) copy of the plant classifier")
+        return self._quantized_model
+
+    def _class_name(self, idx: int) -> str:
+        if idx >= len(self.class_names):
+            self._load_class_names()
+        return self.class_names[idx] if idx < len(self.class_names) else f"class_{idx}"
+
+    def _classify_crops(self, crops: List[Image.Image]) -> List[Tuple[str, float]]:
+        """Classify crops in batches of crop_batch_size; returns (label, confidence) per crop."""
+        if not crops:
+            return []
+        if self.model is None:
+            raise RuntimeError("No model loaded")
+        results = []
+        with torch.inference_mode():
+            for start in range(0, len(crops), self.crop_batch_size):
+                chunk = crops[start:start + self.crop_batch_size]
+                batch = torch.stack([self.transform(crop.convert("RGB")) for crop in chunk]).to(self.device)
+                probabilities = torch.softmax(self._serving_model()(batch), dim=1)
+                confidence, predicted = torch.max(probabilities, 1)
+                for idx, conf in zip(predicted.tolist(), confidence.tolist()):
+                    results.append((self._class_name(idx), float(conf)))
+        return results
+
     def get_model_info(self) -> Dict[str, any]:
         """Get current model information"""
         return {
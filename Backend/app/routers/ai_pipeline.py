@@ -6,11 +6,11 @@ Handles image upload, classification, LLM integration, and response selection
 import asyncio
 import os
 import hashlib
-import time
 import uuid
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks, Request
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from PIL import Image
 import io
 import json
@@ -23,23 +23,26 @@ from app.models.llm_manager import get_llm_manager, LLMResponse, LLMResponseType
 from app.models.response_agent import get_response_agent
 from app.services.llm_service import get_llm_service, LLMProvider, analyze_leaf_image_llm
 from app.core.config import settings
+from app.core.cache import get_cache_manager
+from app.connections.http_connection import get_http_pool
+from app.models.transforms import ImageTransforms
+from app.services.image_dedup_service import get_image_dedup_service
+from app.services.upload_service import get_upload_service
+from app.models.vision_cascade import get_vision_cascade
+from app.core.metrics import get_metrics_registry, trace_context
 
 logger = logging.getLogger(__name__)
 
 from fastapi import APIRouter
 router = APIRouter()
 
-# In-memory de-duplication for analyze-plant requests (per image digest)
-# Prevents repeated rapid hits from re-calling external providers.
-REQUEST_LOCKS: dict[str, asyncio.Lock] = {}
-RECENT_RESULTS: dict[str, tuple[float, dict]] = {}
-DEDUP_TTL_SECONDS: float = 10.0
-
 class AskRequest(BaseModel):
     prompt: str
     # Local SLM disabled: default to external providers
     providers: str | None = "external"
     max_tokens: int | None = 400
+    # Wait for every provider instead of selecting as answers arrive
+    wait_for_all: bool = False
 
 class AskResponse(BaseModel):
     llm_responses: dict
@@ -76,7 +79,7 @@ async def analyze_image_llm(
         if debug:
             # expose provider health snapshot
             service = get_llm_service()
-            result["debug"] = {"available": [p.value for p in (service.get_healthy_providers() or list(service.clients.keys()))]}
+            result["debug"] = {"available": [p.value for p in (service.get_healthy_providers(vision=True) or list(service.clients.keys()))]}
         result["timestamp"] = datetime.utcnow().isoformat()
         return JSONResponse(content=result)
     except HTTPException:
@@ -111,7 +114,7 @@ async def analyze_simple(file: UploadFile = File(...)):
 
         # Analyze with Multi-LLM (auto-select provider, default prompt similar to sample)
         prompt = "Analyze this leaf image for disease condition."
-        llm_result = await analyze_leaf_image_llm(data, providers="auto", prompt=prompt)
+        llm_result = await analyze_leaf_image_llm(data, providers="auto", prompt=prompt, hedge=True)
         if llm_result.get("status") != "success":
             return JSONResponse(content={"error": llm_result.get("error", "LLM analysis unavailable")}, status_code=503)
 
@@ -135,6 +138,77 @@ async def analyze_simple(file: UploadFile = File(...)):
         logger.exception("/analyze compatibility endpoint failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+def _request_budget(request: Request, budget_seconds: Optional[float]) -> Optional[float]:
+    """Time budget from the query parameter, else the X-Request-Budget header (seconds)"""
+    if budget_seconds is not None or not request.headers.get("X-Request-Budget"):
+        return budget_seconds
+    try:
+        return float(request.headers["X-Request-Budget"])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Budget must be a number of seconds")
+
+
+@router.post("/analyze-pest-stream")
+async def analyze_pest_stream(
+    request: Request,
+    images: List[UploadFile] = File(...),
+    crop: str = Form(...),
+    stage: str = Form(...),
+    notes: Optional[str] = Form(None),
+    budget_seconds: Optional[float] = None
+):
+    """Run the pest monitoring workflow and stream progress as Server-Sent Events.
+
+    - Emits `started`, one `node_completed` per workflow node, `diagnosis` as soon as the
+      vision result exists (then refinements from LLM analysis and consensus), `severity`,
+      and finally `result` with the full AnalysisResponse (or `error`).
+    - Time budget: `?budget_seconds=` or the `X-Request-Budget` header (seconds). Optional
+      LLM stages that do not fit are skipped (`stage_skipped` events, `skipped_stages` in
+      the result); without either, WORKFLOW_DEFAULT_BUDGET_SECONDS applies.
+    - Stops the workflow when the client disconnects; the run stays checkpointed.
+    - Images are size-capped and type-checked like other uploads, kept in temporary
+      files for the duration of the run and deleted afterwards.
+    """
+    from app.graph.graph import get_workflow
+    from app.schemas.postgres_base_models import AnalysisPayload
+
+    budget_seconds = _request_budget(request, budget_seconds)
+
+    upload_service = get_upload_service()
+    paths: List[Path] = []
+    try:
+        for upload in images:
+            paths.append(await upload_service.save_temporary(upload))
+        try:
+            payload = AnalysisPayload(crop=crop, stage=stage, notes=notes, images=[str(p) for p in paths])
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        upload_service.discard(paths)
+        raise
+
+    async def event_stream():
+        events = get_workflow().stream_analysis(payload, budget_seconds=budget_seconds)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                data = json.dumps(jsonable_encoder(event))
+                yield f"event: {event['event']}\ndata: {data}\n\n"
+        finally:
+            # Closing the generator stops the workflow run
+            try:
+                await events.aclose()
+            finally:
+                await asyncio.to_thread(upload_service.discard, paths)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/analyze-plant")
 async def analyze_plant_image(
     background_tasks: BackgroundTasks,
@@ -148,7 +222,9 @@ async def analyze_plant_image(
     run_parallel_tests: Optional[bool] = Form(False),  # tests disabled
     save_on_metrics: Optional[bool] = Form(False),     # saving disabled
     min_confidence_for_save: Optional[float] = Form(0.80),
-    nutrient_activation: Optional[bool] = Form(True)
+    nutrient_activation: Optional[bool] = Form(True),
+    farmer_id: Optional[str] = Form(None),
+    plot_id: Optional[str] = Form(None)
 ):
     try:
         start_time = datetime.now()
@@ -156,279 +232,328 @@ async def analyze_plant_image(
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         image_data = await image.read()
-        # Compute request digest for de-dup
+        # Identical uploads with identical options share one analysis (across workers when
+        # the disk cache tier is enabled) and reuse its result for a short TTL
         digest = hashlib.sha256(image_data).hexdigest()
-        lock = REQUEST_LOCKS.setdefault(digest, asyncio.Lock())
-        if lock.locked():
-            logger.info(f"analyze-plant duplicate detected request_id={request_id} digest={digest[:8]} waiting for in-flight")
-        async with lock:
-            # Serve cached result if available and fresh
-            now_ts = time.time()
-            cached = RECENT_RESULTS.get(digest)
-            if cached and (now_ts - cached[0] < DEDUP_TTL_SECONDS):
-                logger.info(f"analyze-plant cache-hit request_id={request_id} digest={digest[:8]}")
-                return JSONResponse(content=cached[1])
-
-            logger.info(f"analyze-plant start request_id={request_id} llm_providers={llm_providers} debug={debug} chain_mode={chain_mode} nutrient_activation={nutrient_activation}")
-            logger.info(f"analyze-plant request_id={request_id} image_size_bytes={len(image_data)} content_type={image.content_type}")
-            pil_image = Image.open(io.BytesIO(image_data)).convert('RGB')
-            # Prepare optimized JPEG bytes to reduce provider timeouts
-            try:
-                max_side = 1280
-                w, h = pil_image.size
-                if max(w, h) > max_side:
-                    pil_image.thumbnail((max_side, max_side))
-                buf = io.BytesIO()
-                pil_image.save(buf, format='JPEG', quality=85, optimize=True)
-                llm_image_data = buf.getvalue()
-            except Exception:
-                llm_image_data = image_data
-        # LLM-only vision analysis
-        try:
-            # Normalize provider spec (respect incoming form value)
-            norm_providers = llm_providers or "auto"
-            if norm_providers not in ("auto", "all"):
-                mapping = {
-                    "gemini": "google", "gemini-2.5-flash": "google", "gemini-1.5": "google",
-                    "google": "google",
-                    "openai": "openai", "gpt-4o": "openai", "gpt-4": "openai",
-                    "anthropic": "anthropic", "claude": "anthropic"
-                }
-                req = [p.strip().lower() for p in norm_providers.split(',') if p.strip()]
-                req = [mapping.get(p, p) for p in req]
-                # de-duplicate
-                seen = set()
-                req_norm = []
-                for p in req:
-                    if p and p not in seen:
-                        seen.add(p)
-                        req_norm.append(p)
-                norm_providers = ",".join(req_norm) if req_norm else "auto"
-
-            vision_prompt = (
-                "Analyze this plant leaf image and return STRICT JSON only with keys: "
-                "diagnosis (string), confidence (0-1), severity (0-100), category (string), "
-                "alternatives (array of {label, confidence})."
-            )
-            llm_vision = await analyze_leaf_image_llm(llm_image_data, providers=norm_providers, prompt=vision_prompt)
-            logger.info(f"analyze-plant request_id={request_id} llm_vision_status={llm_vision.get('status')} providers={llm_vision.get('providers')} requested={norm_providers}")
-            if debug:
-                # Log truncated responses for diagnostics
-                resp_keys = list((llm_vision.get('responses') or {}).keys())
-                logger.debug(f"analyze-plant request_id={request_id} response_keys={resp_keys}")
-        except Exception as e:
-            logger.exception(f"analyze-plant LLM vision exception request_id={request_id}")
-            raise
-        if llm_vision.get("status") != "success":
-            raise HTTPException(status_code=503, detail=llm_vision.get("error", "LLM vision unavailable"))
-
-        # Pick first provider response with content
-        resp = None
-        for _prov, r in llm_vision.get("responses", {}).items():
-            if r and r.get("content"):
-                resp = r
-                break
-        parsed = None
-        if resp and resp.get("content"):
-            content = resp.get("content")
-            # Try to extract JSON if fenced
-            try:
-                text = content.strip()
-                if "```json" in text:
-                    s = text.find("```json") + 7
-                    e = text.find("```", s)
-                    if e != -1:
-                        text = text[s:e].strip()
-                elif "```" in text:
-                    s = text.find("```") + 3
-                    e = text.find("```", s)
-                    if e != -1:
-                        text = text[s:e].strip()
-                parsed = json.loads(text)
-            except Exception:
-                parsed = None
-
-        # Determine mandatory classification fields without injecting defaults when strict mode is enabled
-        if parsed is None or (not parsed.get("diagnosis") and not parsed.get("label")):
-            if settings.STRICT_NO_FALLBACKS:
-                raise HTTPException(status_code=502, detail="LLM vision returned invalid or unstructured output (missing diagnosis)")
-        predicted_class = str((parsed or {}).get("diagnosis") or (parsed or {}).get("label") or "unknown")
-        try:
-            confidence = float((parsed or {}).get("confidence")) if (parsed or {}).get("confidence") is not None else None
-        except Exception:
-            confidence = None
-        # Optional fields from LLM JSON
-        category = (parsed or {}).get("category")
-        # normalize severity: prefer integer 0-100
-        raw_sev = (parsed or {}).get("severity") or (parsed or {}).get("severity_score")
-        try:
-            severity = int(round(float(raw_sev))) if raw_sev is not None else None
-        except Exception:
-            severity = None
-        reasoning = (parsed or {}).get("reasoning") or (parsed or {}).get("analysis")
-        top_preds = []
-        if isinstance((parsed or {}).get("alternatives"), list):
-            for alt in (parsed or {}).get("alternatives"):
-                try:
-                    top_preds.append({"class": alt.get("label") or alt.get("diagnosis"), "confidence": float(alt.get("confidence") or 0)})
-                except Exception:
-                    pass
-        classification_result = {
-            "predicted_class": predicted_class,
-            "confidence": confidence,
-            "top3_predictions": top_preds[:3],
-            "model_info": {"vision": "disabled", "mode": "llm_only"}
-        }
+        options = f"{llm_providers}|{chain_mode}|{nutrient_activation}|{debug}|{label}|{user_provided_label}|{enable_training}"
+        options_digest = hashlib.sha256(options.encode()).hexdigest()[:16]
+        key = f"{digest}:{options_digest}"
+
+        # Re-photographed or re-compressed images from the same farmer/plot, analyzed with
+        # the same options, reuse the prior diagnosis
+        dedup = get_image_dedup_service()
+        scope = dedup.scope_for(farmer_id, plot_id, options_digest) if settings.IMAGE_DEDUP_ENABLED else None
+        phash = ImageTransforms.calculate_dhash(image_data) if scope else None
+        if phash is not None:
+            reused = await dedup.find_diagnosis(scope, phash)
+            if reused:
+                logger.info(f"analyze-plant near-duplicate request_id={request_id} scope={scope} distance={reused['near_duplicate']['distance']}")
+                return JSONResponse(content=reused)
+
+        loaded = False
+
+        async def load() -> Dict[str, Any]:
+            nonlocal loaded
+            loaded = True
+            # Provider calls made while analyzing are accounted under this request's trace
+            with trace_context(request_id, "analyze_plant"):
+                return await _analyze_plant(
+                    image_data, image.content_type, request_id, start_time,
+                    label, user_provided_label, enable_training,
+                    llm_providers, chain_mode, debug, nutrient_activation
+                )
 
-        detection = {
-            "diagnosis": predicted_class,
-            "category": category,
-            "confidence": confidence,
-            "severity": severity,
-            "alternatives": top_preds[:3],
-            "reasoning": reasoning,
-        }
+        response = await _plant_results().get_or_load(
+            key, load, lease_seconds=settings.AI_PIPELINE_DEDUP_LEASE_SECONDS
+        )
+        if not loaded:
+            logger.info(f"analyze-plant deduplicated request_id={request_id} digest={digest[:8]}")
+        elif phash is not None and response.get("status") == "success":
+            await dedup.remember(scope, phash, f"{scope}:{key}", response)
+        return JSONResponse(content=response)
+    except Exception as e:
+        logger.exception("analyze-plant fatal error")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-        prompt = build_plant_analysis_prompt(predicted_class, confidence, classification_result.get("top3_predictions", []))
 
-        trace: Dict[str, Any] = {}
+def _plant_results():
+    """Coalescing cache for /analyze-plant results, keyed by image digest and options"""
+    return get_cache_manager().namespace(
+        "analyze_plant",
+        max_entries=settings.AI_PIPELINE_DEDUP_MAX_ENTRIES,
+        ttl_seconds=settings.AI_PIPELINE_DEDUP_TTL_SECONDS,
+        disk=True,
+    )
+
+
+async def _analyze_plant(
+    image_data: bytes,
+    content_type: str,
+    request_id: str,
+    start_time: datetime,
+    label: Optional[str],
+    user_provided_label: bool,
+    enable_training: bool,
+    llm_providers: Optional[str],
+    chain_mode: Optional[bool],
+    debug: Optional[bool],
+    nutrient_activation: Optional[bool]
+) -> Dict[str, Any]:
+    """Run the /analyze-plant pipeline once and return the response payload"""
+    logger.info(f"analyze-plant start request_id={request_id} llm_providers={llm_providers} debug={debug} chain_mode={chain_mode} nutrient_activation={nutrient_activation}")
+    logger.info(f"analyze-plant request_id={request_id} image_size_bytes={len(image_data)} content_type={content_type}")
+    pil_image = Image.open(io.BytesIO(image_data)).convert('RGB')
+    # Prepare optimized JPEG bytes to reduce provider timeouts
+    try:
+        max_side = 1280
+        w, h = pil_image.size
+        if max(w, h) > max_side:
+            pil_image.thumbnail((max_side, max_side))
+        buf = io.BytesIO()
+        pil_image.save(buf, format='JPEG', quality=85, optimize=True)
+        llm_image_data = buf.getvalue()
+    except Exception:
+        llm_image_data = image_data
+    # LLM-only vision analysis
+    try:
+        # Normalize provider spec (respect incoming form value)
+        norm_providers = llm_providers or "auto"
+        if norm_providers not in ("auto", "all"):
+            mapping = {
+                "gemini": "google", "gemini-2.5-flash": "google", "gemini-1.5": "google",
+                "google": "google",
+                "openai": "openai", "gpt-4o": "openai", "gpt-4": "openai",
+                "anthropic": "anthropic", "claude": "anthropic"
+            }
+            req = [p.strip().lower() for p in norm_providers.split(',') if p.strip()]
+            req = [mapping.get(p, p) for p in req]
+            # de-duplicate
+            seen = set()
+            req_norm = []
+            for p in req:
+                if p and p not in seen:
+                    seen.add(p)
+                    req_norm.append(p)
+            norm_providers = ",".join(req_norm) if req_norm else "auto"
+
+        vision_prompt = (
+            "Analyze this plant leaf image and return STRICT JSON only with keys: "
+            "diagnosis (string), confidence (0-1), severity (0-100), category (string), "
+            "alternatives (array of {label, confidence})."
+        )
+        llm_vision = await analyze_leaf_image_llm(llm_image_data, providers=norm_providers, prompt=vision_prompt, hedge=True)
+        logger.info(f"analyze-plant request_id={request_id} llm_vision_status={llm_vision.get('status')} providers={llm_vision.get('providers')} requested={norm_providers}")
         if debug:
-            trace = {"request_id": request_id, "classification_result": classification_result, "base_prompt": prompt}
+            # Log truncated responses for diagnostics
+            resp_keys = list((llm_vision.get('responses') or {}).keys())
+            logger.debug(f"analyze-plant request_id={request_id} response_keys={resp_keys}")
+    except Exception as e:
+        logger.exception(f"analyze-plant LLM vision exception request_id={request_id}")
+        raise
+    if llm_vision.get("status") != "success":
+        raise HTTPException(status_code=503, detail=llm_vision.get("error", "LLM vision unavailable"))
+
+    # Pick first provider response with content
+    resp = None
+    for _prov, r in llm_vision.get("responses", {}).items():
+        if r and r.get("content"):
+            resp = r
+            break
+    parsed = None
+    if resp and resp.get("content"):
+        content = resp.get("content")
+        # Try to extract JSON if fenced
+        try:
+            text = content.strip()
+            if "```json" in text:
+                s = text.find("```json") + 7
+                e = text.find("```", s)
+                if e != -1:
+                    text = text[s:e].strip()
+            elif "```" in text:
+                s = text.find("```") + 3
+                e = text.find("```", s)
+                if e != -1:
+                    text = text[s:e].strip()
+            parsed = json.loads(text)
+        except Exception:
+            parsed = None
 
-        llm_manager = get_llm_manager()
-        chained_used = False
-        if chain_mode:
-            # Chain requested, but local SLM is disabled. Run external providers directly.
-            if llm_providers == "all":
-                llm_responses = await llm_manager.get_all_responses(prompt)
-            else:
-                llm_responses = await get_selective_llm_responses(
-                    llm_manager,
-                    prompt,
-                    "external" if llm_providers == "external" else (llm_providers or "external"),
-                )
-        elif llm_providers == "all":
+    # Determine mandatory classification fields without injecting defaults when strict mode is enabled
+    if parsed is None or (not parsed.get("diagnosis") and not parsed.get("label")):
+        if settings.STRICT_NO_FALLBACKS:
+            raise HTTPException(status_code=502, detail="LLM vision returned invalid or unstructured output (missing diagnosis)")
+    predicted_class = str((parsed or {}).get("diagnosis") or (parsed or {}).get("label") or "unknown")
+    try:
+        confidence = float((parsed or {}).get("confidence")) if (parsed or {}).get("confidence") is not None else None
+    except Exception:
+        confidence = None
+    # Optional fields from LLM JSON
+    category = (parsed or {}).get("category")
+    # normalize severity: prefer integer 0-100
+    raw_sev = (parsed or {}).get("severity") or (parsed or {}).get("severity_score")
+    try:
+        severity = int(round(float(raw_sev))) if raw_sev is not None else None
+    except Exception:
+        severity = None
+    reasoning = (parsed or {}).get("reasoning") or (parsed or {}).get("analysis")
+    top_preds = []
+    if isinstance((parsed or {}).get("alternatives"), list):
+        for alt in (parsed or {}).get("alternatives"):
+            try:
+                top_preds.append({"class": alt.get("label") or alt.get("diagnosis"), "confidence": float(alt.get("confidence") or 0)})
+            except Exception:
+                pass
+    classification_result = {
+        "predicted_class": predicted_class,
+        "confidence": confidence,
+        "top3_predictions": top_preds[:3],
+        "model_info": {"vision": "disabled", "mode": "llm_only"}
+    }
+
+    detection = {
+        "diagnosis": predicted_class,
+        "category": category,
+        "confidence": confidence,
+        "severity": severity,
+        "alternatives": top_preds[:3],
+        "reasoning": reasoning,
+    }
+
+    prompt = build_plant_analysis_prompt(predicted_class, confidence, classification_result.get("top3_predictions", []))
+
+    trace: Dict[str, Any] = {}
+    if debug:
+        trace = {"request_id": request_id, "classification_result": classification_result, "base_prompt": prompt}
+
+    llm_manager = get_llm_manager()
+    chained_used = False
+    if chain_mode:
+        # Chain requested, but local SLM is disabled. Run external providers directly.
+        if llm_providers == "all":
             llm_responses = await llm_manager.get_all_responses(prompt)
         else:
-            llm_responses = await get_selective_llm_responses(llm_manager, prompt, llm_providers)
-        agent = get_response_agent()
-        agent_decision = agent.select_best_response(llm_responses, f"Plant disease/pest: {predicted_class}")
-        if debug:
-            trace["raw_llm_responses"] = {k: {"response": v.response, "confidence": v.confidence, "error": v.error} for k, v in llm_responses.items()}
-            trace["agent_scores"] = {p: {"final_score": a.final_score} for p, a in agent_decision.all_analyses.items()}
-            trace["selected_provider"] = agent_decision.selected_provider
-
-        # Prepare parallel coroutines (nutrient analysis only when enabled)
-        parallel_tasks: List[asyncio.Task] = []
-
-        # 1. Nutrient analysis activation (strict LLM path) if enabled
-        #    Skip this auto-call when STRICT_NO_FALLBACKS to avoid placeholder/mock inputs
-        if nutrient_activation and not settings.STRICT_NO_FALLBACKS:
-            async def _nutrient_call():
-                try:
-                    # Minimal nutrient context derivation
-                    from app.services.gemini_service import gemini_service, NutrientAnalysisRequest
-                    if not gemini_service.is_available():
-                        return {"error": "nutrient_llm_unavailable"}
-                    # Use placeholder mandatory fields (strict upstream will reject insufficient real data)
-                    analysis_request = NutrientAnalysisRequest(
-                        soil_analysis={},
-                        crop_info={"species": "unknown", "current_stage": "unknown", "target_yield": 0},
-                        current_nutrients={},
-                        deficiencies=[],
-                        growth_stage="unknown",
-                        target_yield=0,
-                        farm_context={
-                            "diagnosed_issue": predicted_class,
-                            "diagnosed_category": category,
-                            "diagnosed_confidence": confidence,
-                            "diagnosed_severity": severity,
-                        },
-                        user_preferences={"treatment_focus": "pesticide_recommendations"},
-                        weather_forecast=[]
-                    )
-                    resp = await gemini_service.get_nutrient_recommendations_async(analysis_request)
-                    return {"success": getattr(resp, 'success', False), "confidence": getattr(resp, 'confidence', None)}
-                except Exception as e:
-                    return {"error": str(e)}
-            parallel_tasks.append(asyncio.create_task(_nutrient_call()))
-
-        # Await all parallel tasks
-        parallel_results = await asyncio.gather(*parallel_tasks, return_exceptions=True)
-        nutrient_meta = None
-        if nutrient_activation and parallel_results:
-            nutrient_meta = parallel_results[0]
-        total_time = (datetime.now() - start_time).total_seconds()
-        response = {
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "processing_time_seconds": total_time,
-            "detection": detection,
-            "classification": {
-                "predicted_class": predicted_class,
-                "confidence": confidence,
-                "top_predictions": classification_result.get("top3_predictions", []),
-                "model_info": classification_result.get("model_info", {})
-            },
-            "parallel": {
-                "nutrients": nutrient_meta
-            },
-            "llm_responses": {p: {"response": r.response, "provider": r.provider, "model_name": r.model_name, "confidence": r.confidence, "tokens_used": r.tokens_used, "response_time": r.response_time, "error": r.error, "metadata": r.metadata} for p, r in llm_responses.items()},
-            "agent_decision": {"selected_provider": agent_decision.selected_provider, "selected_response": agent_decision.selected_response, "confidence": agent_decision.confidence, "reasoning": agent_decision.reasoning, "metadata": agent_decision.metadata},
-            "response_analysis": {p: {"final_score": a.final_score} for p, a in agent_decision.all_analyses.items()},
-            "training": {"enabled": enable_training, "label_used": label if user_provided_label else predicted_class, "user_provided_label": user_provided_label, "queued_for_training": enable_training, "chaining_mode": chain_mode},
-            "flow_mode": "chained" if chained_used else "parallel"
-        }
-        # Generate IPM/pesticide treatment plan using detected diagnosis
-        try:
-            ipm_prompt = (
-                f"You are an IPM expert. Diagnosis: {predicted_class}. "
-                f"Category: {category or 'unknown'}. Severity: {severity if severity is not None else 'unknown'}. "
-                f"Confidence: {confidence:.2f}. Provide structured IPM with biological and chemical (if needed) options as JSON."
+            llm_responses = await get_selective_llm_responses(
+                llm_manager,
+                prompt,
+                "external" if llm_providers == "external" else (llm_providers or "external"),
             )
-            ipm_responses = await llm_manager.get_all_responses(ipm_prompt)
-            ipm_agent = get_response_agent()
-            ipm_choice = ipm_agent.select_best_response(ipm_responses, "ipm_treatment")
-            chosen = ipm_responses.get(ipm_choice.selected_provider)
-            ipm_json = None
-            if chosen and chosen.response:
-                try:
-                    content = chosen.response
-                    if "```json" in content:
-                        start = content.find("```json") + 7
-                        end = content.find("```", start)
+    elif llm_providers == "all":
+        llm_responses = await llm_manager.get_all_responses(prompt)
+    else:
+        llm_responses = await get_selective_llm_responses(llm_manager, prompt, llm_providers)
+    agent = get_response_agent()
+    agent_decision = agent.select_best_response(llm_responses, f"Plant disease/pest: {predicted_class}")
+    if debug:
+        trace["raw_llm_responses"] = {k: {"response": v.response, "confidence": v.confidence, "error": v.error} for k, v in llm_responses.items()}
+        trace["agent_scores"] = {p: {"final_score": a.final_score} for p, a in agent_decision.all_analyses.items()}
+        trace["selected_provider"] = agent_decision.selected_provider
+
+    # Prepare parallel coroutines (nutrient analysis only when enabled)
+    parallel_tasks: List[asyncio.Task] = []
+
+    # 1. Nutrient analysis activation (strict LLM path) if enabled
+    #    Skip this auto-call when STRICT_NO_FALLBACKS to avoid placeholder/mock inputs
+    if nutrient_activation and not settings.STRICT_NO_FALLBACKS:
+        async def _nutrient_call():
+            try:
+                # Minimal nutrient context derivation
+                from app.services.gemini_service import gemini_service, NutrientAnalysisRequest
+                if not gemini_service.is_available():
+                    return {"error": "nutrient_llm_unavailable"}
+                # Use placeholder mandatory fields (strict upstream will reject insufficient real data)
+                analysis_request = NutrientAnalysisRequest(
+                    soil_analysis={},
+                    crop_info={"species": "unknown", "current_stage": "unknown", "target_yield": 0},
+                    current_nutrients={},
+                    deficiencies=[],
+                    growth_stage="unknown",
+                    target_yield=0,
+                    farm_context={
+                        "diagnosed_issue": predicted_class,
+                        "diagnosed_category": category,
+                        "diagnosed_confidence": confidence,
+                        "diagnosed_severity": severity,
+                    },
+                    user_preferences={"treatment_focus": "pesticide_recommendations"},
+                    weather_forecast=[]
+                )
+                resp = await gemini_service.get_nutrient_recommendations_async(analysis_request)
+                return {"success": getattr(resp, 'success', False), "confidence": getattr(resp, 'confidence', None)}
+            except Exception as e:
+                return {"error": str(e)}
+        parallel_tasks.append(asyncio.create_task(_nutrient_call()))
+
+    # Await all parallel tasks
+    parallel_results = await asyncio.gather(*parallel_tasks, return_exceptions=True)
+    nutrient_meta = None
+    if nutrient_activation and parallel_results:
+        nutrient_meta = parallel_results[0]
+    total_time = (datetime.now() - start_time).total_seconds()
+    response = {
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "processing_time_seconds": total_time,
+        "detection": detection,
+        "classification": {
+            "predicted_class": predicted_class,
+            "confidence": confidence,
+            "top_predictions": classification_result.get("top3_predictions", []),
+            "model_info": classification_result.get("model_info", {})
+        },
+        "parallel": {
+            "nutrients": nutrient_meta
+        },
+        "llm_responses": {p: {"response": r.response, "provider": r.provider, "model_name": r.model_name, "confidence": r.confidence, "tokens_used": r.tokens_used, "response_time": r.response_time, "error": r.error, "metadata": r.metadata} for p, r in llm_responses.items()},
+        "agent_decision": {"selected_provider": agent_decision.selected_provider, "selected_response": agent_decision.selected_response, "confidence": agent_decision.confidence, "reasoning": agent_decision.reasoning, "metadata": agent_decision.metadata},
+        "response_analysis": {p: {"final_score": a.final_score} for p, a in agent_decision.all_analyses.items()},
+        "training": {"enabled": enable_training, "label_used": label if user_provided_label else predicted_class, "user_provided_label": user_provided_label, "queued_for_training": enable_training, "chaining_mode": chain_mode},
+        "flow_mode": "chained" if chained_used else "parallel"
+    }
+    # Generate IPM/pesticide treatment plan using detected diagnosis
+    try:
+        ipm_prompt = (
+            f"You are an IPM expert. Diagnosis: {predicted_class}. "
+            f"Category: {category or 'unknown'}. Severity: {severity if severity is not None else 'unknown'}. "
+            f"Confidence: {confidence:.2f}. Provide structured IPM with biological and chemical (if needed) options as JSON."
+        )
+        ipm_responses = await llm_manager.get_all_responses(ipm_prompt)
+        ipm_agent = get_response_agent()
+        ipm_choice = ipm_agent.select_best_response(ipm_responses, "ipm_treatment")
+        chosen = ipm_responses.get(ipm_choice.selected_provider)
+        ipm_json = None
+        if chosen and chosen.response:
+            try:
+                content = chosen.response
+                if "```json" in content:
+                    start = content.find("```json") + 7
+                    end = content.find("```", start)
+                    content = content[start:end].strip()
+                elif "```" in content:
+                    start = content.find("```") + 3
+                    end = content.find("```", start)
+                    if end != -1:
                         content = content[start:end].strip()
-                    elif "```" in content:
-                        start = content.find("```") + 3
-                        end = content.find("```", start)
-                        if end != -1:
-                            content = content[start:end].strip()
-                    ipm_json = json.loads(content)
-                except Exception:
-                    ipm_json = None
-            response["ipm"] = {
-                "selected_provider": ipm_choice.selected_provider,
-                "confidence": ipm_choice.confidence,
-                "raw": chosen.response if chosen else None,
-                "parsed": ipm_json,
-            }
-        except Exception:
-            # non-fatal
-            response["ipm"] = {"error": "ipm_generation_failed"}
-        if debug:
-            response["debug_trace"] = trace
+                ipm_json = json.loads(content)
+            except Exception:
+                ipm_json = None
+        response["ipm"] = {
+            "selected_provider": ipm_choice.selected_provider,
+            "confidence": ipm_choice.confidence,
+            "raw": chosen.response if chosen else None,
+            "parsed": ipm_json,
+        }
+    except Exception:
+        # non-fatal
+        response["ipm"] = {"error": "ipm_generation_failed"}
+    if debug:
+        trace["timings"] = get_metrics_registry().trace_breakdown(request_id)
+        response["debug_trace"] = trace
+
+    # Local SLM auto fine-tune accumulation disabled
+    logger.info(f"analyze-plant done request_id={request_id} total_time={total_time:.2f}s predicted_class={predicted_class} provider={agent_decision.selected_provider}")
+    return response
 
-        # Local SLM auto fine-tune accumulation disabled
-        logger.info(f"analyze-plant done request_id={request_id} total_time={total_time:.2f}s predicted_class={predicted_class} provider={agent_decision.selected_provider}")
-        # Cache successful response for short TTL to serve duplicates
-        try:
-            RECENT_RESULTS[digest] = (time.time(), response)
-        except Exception:
-            pass
-        return JSONResponse(content=response)
-    except Exception as e:
-        logger.exception("analyze-plant fatal error")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 # [Local SLM] Endpoints disabled
 # @router.post("/slm/save")
@@ -505,41 +630,23 @@ async def ask_ai(req: AskRequest):
         llm_manager = get_llm_manager()
         prompt = req.prompt
         
-        # Choose providers
-        if req.providers in (None, "all"):
-            llm_responses = await llm_manager.get_all_responses(prompt)
-        # Local SLM disabled; treat "local" as external-only
-        elif req.providers in ("local", "external"):
-            llm_responses = {}
-            if "openai" in llm_manager.enabled_providers:
-                try:
-                    llm_responses["openai"] = await llm_manager.external_llm.call_openai(prompt)
-                except Exception as e:
-                    llm_responses["openai"] = LLMResponse(provider="openai", response_type=LLMResponseType.LLM_ANALYSIS, content="", success=False, error=str(e))
-            if "anthropic" in llm_manager.enabled_providers:
-                try:
-                    llm_responses["anthropic"] = await llm_manager.external_llm.call_anthropic(prompt)
-                except Exception as e:
-                    llm_responses["anthropic"] = LLMResponse(provider="anthropic", response_type=LLMResponseType.LLM_ANALYSIS, content="", success=False, error=str(e))
-            if "grok" in llm_manager.enabled_providers:
-                try:
-                    llm_responses["grok"] = await llm_manager.external_llm.call_grok(prompt)
-                except Exception as e:
-                    llm_responses["grok"] = LLMResponse(provider="grok", response_type=LLMResponseType.LLM_ANALYSIS, content="", success=False, error=str(e))
-            if "google" in llm_manager.enabled_providers:
-                try:
-                    llm_responses["google"] = await llm_manager.external_llm.call_google(prompt)
-                except Exception as e:
-                    llm_responses["google"] = LLMResponse(provider="google", response_type=LLMResponseType.LLM_ANALYSIS, content="", success=False, error=str(e))
+        # Choose providers (local SLM disabled; "local" and "external" mean all enabled external providers)
+        if req.providers in (None, "all", "local", "external"):
+            selected = None
         else:
             # Comma-separated list
             selected = [p.strip() for p in (req.providers or "").split(",") if p.strip()]
-            all_responses = await llm_manager.get_all_responses(prompt)
-            llm_responses = {k: v for k, v in all_responses.items() if k in selected}
 
-        # Optional agent selection
         agent = get_response_agent()
-        decision = agent.select_best_response(llm_responses, query_context="direct_query")
+        if req.wait_for_all or not settings.RESPONSE_AGENT_EARLY_EXIT:
+            all_responses = await llm_manager.get_all_responses(prompt)
+            llm_responses = {k: v for k, v in all_responses.items() if selected is None or k in selected}
+            decision = agent.select_best_response(llm_responses, query_context="direct_query")
+        else:
+            # Score answers as they arrive; slower providers are cancelled once the choice is settled
+            decision, llm_responses = await agent.select_as_completed(
+                llm_manager.response_calls(prompt, selected), query_context="direct_query"
+            )
         
         return AskResponse(
             llm_responses={
@@ -660,11 +767,15 @@ async def add_training_sample(classifier, image: Image.Image, label: str, user_p
 
 @router.get("/model-info")
 async def get_model_info():
-    """Get information about loaded models (vision disabled, LLM-only)"""
+    """Get information about loaded models and the local-first vision cascade"""
     try:
         llm_manager = get_llm_manager()
         return {
-            "vision_model": {"enabled": False, "mode": "llm_only"},
+            "vision_model": {
+                "enabled": settings.VISION_CASCADE_ENABLED,
+                "mode": "local_first" if settings.VISION_CASCADE_ENABLED else "llm_only",
+                "cascade": get_vision_cascade().report(),
+            },
             "llm_providers": {
                 "enabled": llm_manager.enabled_providers,
                 "local_slm": {"enabled": False}
@@ -683,6 +794,26 @@ async def llm_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get LLM status: {e}")
 
+@router.get("/metrics")
+async def get_metrics(format: str = "json"):
+    """Per-node and per-provider latency histograms, token/cost counters and error counts.
+
+    - `format=json` (default): series with labels, counts and p50/p95/p99 estimates.
+    - `format=prometheus`: text exposition format for scraping.
+    """
+    registry = get_metrics_registry()
+    if format == "prometheus":
+        return PlainTextResponse(registry.prometheus(), media_type="text/plain; version=0.0.4")
+    return {**registry.snapshot(), "timestamp": datetime.now().isoformat()}
+
+@router.get("/metrics/traces/{trace_id}")
+async def get_trace_metrics(trace_id: str):
+    """Timing breakdown (node spans and LLM calls) of a recent workflow run or /analyze-plant request"""
+    breakdown = get_metrics_registry().trace_breakdown(trace_id)
+    if breakdown is None:
+        raise HTTPException(status_code=404, detail="Trace not found or no longer kept")
+    return breakdown
+
 @router.post("/llm/refresh")
 async def llm_refresh():
     """Refresh enabled provider list (re-check env vars)."""
@@ -814,7 +945,10 @@ async def health_check():
                 "llm_providers": {
                     "enabled_count": len(llm_manager.enabled_providers),
                     "providers": llm_manager.enabled_providers
-                }
+                },
+                "cache": get_cache_manager().stats(),
+                "http_clients": get_http_pool().stats(),
+                "image_dedup": get_image_dedup_service().snapshot()
             }
         }
         if len(llm_manager.enabled_providers) == 0:
@@ -868,7 +1002,7 @@ async def camera_analyze(
         img_bytes = jpeg_bytes.tobytes()
 
         # LLM-only vision analysis
-        llm_vision = await analyze_leaf_image_llm(img_bytes, providers="auto")
+        llm_vision = await analyze_leaf_image_llm(img_bytes, providers="auto", hedge=True)
         if llm_vision.get("status") != "success":
             raise HTTPException(status_code=503, detail=llm_vision.get("error", "LLM vision unavailable"))
 
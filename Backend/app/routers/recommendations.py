@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from sqlalchemy import select, desc, and_, or_, func
 from datetime import datetime, timezone, timedelta
+import asyncio
 import logging
 import json
 import traceback
@@ -26,6 +27,7 @@ from app.agents.agent_orchestrator import DynamicAgentOrchestrator
 
 # Market service imports
 from app.services.mandi_service import create_mandi_service
+from app.services.vendor_geo_service import get_vendor_geo_service
 
 logger = logging.getLogger(__name__)
 recommendation_router = APIRouter()
@@ -1368,23 +1370,63 @@ async def get_crop_planning_details(
 
 @recommendation_router.get("/vendors")
 async def get_vendors(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0),
+    service_type: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get list of vendors/suppliers with their details.
+    Get list of vendors/suppliers with their details (paginated).
+    With lat/lon, only vendors with a location within radius_km are returned,
+    nearest first, with the distance filled in. If the geo index is unavailable
+    (Mongo down or never synced) the listing falls back to rating order without distances.
     """
     try:
+        geo = get_vendor_geo_service()
+        page, page_size = geo.page_bounds(page, page_size)
+
+        # Nearest-location distance per vendor on this page, from the Mongo 2dsphere index
+        distances: Optional[Dict[str, float]] = None
+        if lat is not None and lon is not None:
+            try:
+                nearby = await asyncio.to_thread(
+                    geo.search_vendors, lat, lon, radius_km, service_type, page, page_size
+                )
+                distances = {v["id"]: v["distance_km"] for v in nearby["vendors"]}
+                total = nearby["total"]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                # Geo index unavailable: fall back to the unfiltered listing
+                logger.warning(f"Vendor geo search failed, listing without distances: {e}")
+            if distances == {}:
+                return {"status": "success", "count": 0, "total": total, "page": page, "page_size": page_size, "vendors": []}
+
         # Query vendors with user details
         stmt = (
             select(Vendor, User)
             .join(User, Vendor.user_id == User.id)
             # .where(Vendor.verified == True)  # Temporarily disabled to show all vendors
-            .order_by(desc(Vendor.rating_avg))
-            .limit(100)
         )
+        if distances:
+            # The geo index already paginated by distance
+            stmt = stmt.where(Vendor.id.in_([UUID(vendor_id) for vendor_id in distances]))
+        else:
+            total = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar_one()
+            stmt = (
+                stmt.order_by(desc(Vendor.rating_avg), Vendor.id)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+            )
+        distances = distances or {}
         
         result = await db.execute(stmt)
         vendors_data = result.all()
+        if distances:
+            vendors_data = sorted(vendors_data, key=lambda row: distances[str(row[0].id)])
         
         vendors_list = []
         for vendor, user in vendors_data:
@@ -1399,7 +1441,7 @@ async def get_vendors(
                 "type": vendor.business_type.value if vendor.business_type else "General",
                 "rating": float(vendor.rating_avg) if vendor.rating_avg else 0.0,
                 "rating_count": vendor.rating_count or 0,
-                "distance": "N/A",  # Would need geolocation calculation
+                "distance": f"{distances[str(vendor.id)]:.1f} km" if str(vendor.id) in distances else "N/A",
                 "location": f"{user.city}, {user.state}" if user.city and user.state else user.city or user.state or "Not specified",
                 "phone": user.phone or "N/A",
                 "email": user.email or "N/A",
@@ -1426,9 +1468,14 @@ async def get_vendors(
         return {
             "status": "success",
             "count": len(vendors_list),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
             "vendors": vendors_list
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching vendors: {e}")
         raise HTTPException(status_code=500, detail=str(e))
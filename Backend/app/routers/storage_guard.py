@@ -8,8 +8,6 @@ from typing import List, Optional
 import re
 from uuid import UUID
 from datetime import datetime, timezone, timedelta
-from pathlib import Path
-import shutil
 from fastapi import (
     APIRouter, File, UploadFile, HTTPException, Depends, Request, status, Form
 )
@@ -24,6 +22,11 @@ from app.models.llm_manager import LLMManager
 from app.connections.postgres_connection import get_db
 from app.services import storage_guard_service as service
 from app.services import booking_service
+from app.services.upload_service import get_upload_service, variant_url_for
+from app.services.vendor_geo_service import (
+    get_vendor_geo_service, group_by_vendor, location_document, location_payload,
+    normalize_service_type, vendor_payload
+)
 
 
 storage_guard_router = APIRouter()
@@ -146,7 +149,9 @@ async def analyze_image(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    image_data = await file.read()
+    upload_service = get_upload_service()
+    stored = await upload_service.save_upload(file, "inspection_images")
+    image_data = await upload_service.read_bytes(stored)
     quality_report = storage_guard.analyze_image(image_data)
     
     # Override AI detection with user input if provided
@@ -177,7 +182,7 @@ async def analyze_image(
             grade=getattr(quality_report, 'overall_quality', getattr(quality_report, 'grade', 'ungraded')),
             defects=defects_json,
             recommendation=getattr(quality_report, 'recommendation', 'No specific recommendations'),
-            image_urls=[file.filename],
+            image_urls=[stored.url],
             shelf_life_days=getattr(quality_report, 'shelf_life_days', None)
         )
         db.add(crop_inspection)
@@ -256,7 +261,9 @@ async def analyze_and_suggest_storage(
         raise HTTPException(status_code=400, detail="File must be an image")
     
     # AI Analysis
-    image_data = await file.read()
+    upload_service = get_upload_service()
+    stored = await upload_service.save_upload(file, "inspection_images")
+    image_data = await upload_service.read_bytes(stored)
     quality_report = storage_guard.analyze_image(image_data)
     
     # Override AI detection with user input if provided
@@ -289,7 +296,7 @@ async def analyze_and_suggest_storage(
             grade=getattr(quality_report, 'overall_quality', getattr(quality_report, 'grade', 'ungraded')),
             defects=defects_json,
             recommendation=getattr(quality_report, 'recommendation', 'No specific recommendations'),
-            image_urls=[file.filename],
+            image_urls=[stored.url],
             shelf_life_days=getattr(quality_report, 'shelf_life_days', None)
         )
         db.add(crop_inspection)
@@ -719,9 +726,21 @@ def get_farmer_dashboard(
 @storage_guard_router.get("/locations")
 def get_storage_locations(
     limit: int = 50,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    service_type: Optional[str] = None,
+    page: int = 1,
     db: Session = Depends(get_db)
 ):
-    """Get all available storage locations with vendor info"""
+    """
+    Get available storage locations with vendor info.
+    With lat/lon, returns locations within radius_km nearest first (paginated,
+    optionally filtered by service_type: cold_storage, dry_storage, transport, inputs, processing).
+    """
+    if lat is not None and lon is not None:
+        return _search_locations_near(db, lat, lon, radius_km, service_type, page, limit)
+
     try:
         locations = db.query(models.StorageLocation).limit(limit).all()
         
@@ -764,9 +783,120 @@ def get_storage_locations(
         return {"success": False, "locations": [], "error": str(e)}
 
 
+def _search_locations_near(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_km: Optional[float],
+    service_type: Optional[str],
+    page: int,
+    page_size: int
+):
+    """Proximity search on the vendor_locations 2dsphere index, Postgres if Mongo is unavailable"""
+    try:
+        normalize_service_type(service_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    geo = get_vendor_geo_service()
+    try:
+        result = geo.search_locations(lat, lon, radius_km, service_type, page, page_size)
+        return {"success": True, "source": "geo_index", **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Geo location search failed, falling back to Postgres: {e}")
+
+    page, page_size = geo.page_bounds(page, page_size)
+    nearby = _location_documents_near(db, lat, lon, radius_km, service_type)
+    window = nearby[(page - 1) * page_size: page * page_size]
+    return {
+        "success": True,
+        "source": "postgres",
+        "total": len(nearby),
+        "page": page,
+        "page_size": page_size,
+        "locations": [location_payload(doc) for doc in window]
+    }
+
+
+def _search_vendors_near(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_km: Optional[float],
+    service_type: Optional[str],
+    page: int,
+    page_size: Optional[int]
+):
+    """Vendors by distance to their nearest location from the geo index, Postgres if it is unavailable"""
+    try:
+        normalize_service_type(service_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    geo = get_vendor_geo_service()
+    try:
+        result = geo.search_vendors(lat, lon, radius_km, service_type, page, page_size)
+        return {"success": True, "source": "geo_index", **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Geo vendor search failed, falling back to Postgres: {e}")
+
+    page, page_size = geo.page_bounds(page, page_size)
+    groups = group_by_vendor(_location_documents_near(db, lat, lon, radius_km, service_type))
+    window = groups[(page - 1) * page_size: page * page_size]
+    return {
+        "success": True,
+        "source": "postgres",
+        "total": len(groups),
+        "page": page,
+        "page_size": page_size,
+        "vendors": [vendor_payload(group) for group in window]
+    }
+
+
+def _location_documents_near(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_km: Optional[float],
+    service_type: Optional[str]
+):
+    """Postgres locations within radius_km as vendor_locations documents with distance_m, nearest first"""
+    geo = get_vendor_geo_service()
+    radius_km = min(radius_km or geo.default_radius_km, geo.max_radius_km)
+    category = normalize_service_type(service_type)
+    synced_at = datetime.now(timezone.utc)
+    docs = []
+    for loc in service.get_locations_near(db, lat, lon, radius_km):
+        doc = location_document(loc, synced_at)
+        if category and category not in doc["service_types"]:
+            continue
+        doc["distance_m"] = loc.distance_km * 1000.0
+        docs.append(doc)
+    return docs
+
+
 @storage_guard_router.get("/vendors")
-def get_vendors(db: Session = Depends(get_db)):
-    """Get all registered vendors"""
+def get_vendors(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    service_type: Optional[str] = None,
+    page: int = 1,
+    page_size: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get registered vendors.
+    With lat/lon, returns vendors with a location within radius_km, ordered by
+    distance to their nearest location (paginated, optionally filtered by service_type).
+    """
+    if lat is not None and lon is not None:
+        return _search_vendors_near(db, lat, lon, radius_km, service_type, page, page_size)
+
     try:
         vendors = db.query(models.Vendor).limit(50).all()
         return {
@@ -779,6 +909,73 @@ def get_vendors(db: Session = Depends(get_db)):
         return {"success": False, "vendors": []}
 
 
+@storage_guard_router.post("/vendors/geo-sync")
+def sync_vendor_locations():
+    """Rebuild the Mongo vendor_locations index from Postgres locations and vendors"""
+    try:
+        summary = get_vendor_geo_service().sync_all()
+        return {"success": True, **summary}
+    except Exception as e:
+        print(f"Vendor location sync error: {e}")
+        raise HTTPException(status_code=500, detail=f"Vendor location sync failed: {str(e)}")
+
+
+@storage_guard_router.post("/demand-forecast/train", status_code=status.HTTP_202_ACCEPTED)
+def train_demand_forecast():
+    """
+    Queue a background run that folds new bookings/jobs/RFQs into demand history,
+    retrains and publishes forecasts (progress: GET /demand-forecast/train/status)
+    """
+    from app.services.demand_forecast_service import start_training, training_status
+
+    if not start_training():
+        raise HTTPException(status_code=409, detail="Demand forecast training is already running")
+    return {"success": True, **training_status()}
+
+
+@storage_guard_router.get("/demand-forecast/train/status")
+def get_demand_forecast_training_status():
+    """Latest background training run: running flag, timestamps, summary or error"""
+    from app.services.demand_forecast_service import training_status
+
+    return {"success": True, **training_status()}
+
+
+@storage_guard_router.get("/demand-forecast")
+def get_demand_forecast(
+    location_id: Optional[UUID] = None,
+    region: Optional[str] = None,
+    crop: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Published 2-8 week storage demand forecast for a facility or region"""
+    from app.services.demand_forecast_service import DemandForecastService
+
+    if not location_id and not region:
+        raise HTTPException(status_code=400, detail="location_id or region is required")
+
+    forecasts = DemandForecastService(db).get_forecasts(location_id=location_id, region=region, crop=crop)
+    return {
+        "success": True,
+        "total": len(forecasts),
+        "generated_at": forecasts[0].generated_at.isoformat() if forecasts else None,
+        "forecasts": [
+            {
+                "level": f.level,
+                "location_id": str(f.location_id) if f.location_id else None,
+                "region": f.region,
+                "crop": f.crop,
+                "week_start": f.week_start.isoformat(),
+                "horizon_weeks": f.horizon_weeks,
+                "forecast_kg": f.forecast_kg,
+                "lower_kg": f.lower_kg,
+                "upper_kg": f.upper_kg
+            }
+            for f in forecasts
+        ]
+    }
+
+
 # =============================================================================
 # SECTION 5: RFQ & BIDDING (EXISTING - COMPETITIVE QUOTES)
 # =============================================================================
@@ -932,7 +1129,8 @@ def get_quality_analysis_data(db: Session = Depends(get_db)):
                 "defects": inspection.defects if inspection.defects else "None",
                 "shelfLife": shelf_life,
                 "recommendation": inspection.recommendation,
-                "image": inspection.image_urls[0] if inspection.image_urls else None,
+                "image": variant_url_for(inspection.image_urls[0], "thumb") if inspection.image_urls else None,
+                "image_full": inspection.image_urls[0] if inspection.image_urls else None,
                 "created_at": inspection.created_at.isoformat() if inspection.created_at else None
             })
 
@@ -968,6 +1166,49 @@ def get_pest_detection_data(db: Session = Depends(get_db)):
         return {"success": False, "pest_detections": []}
 
 
+@storage_guard_router.post("/shelf-life/sweep")
+def run_shelf_life_sweep(db: Session = Depends(get_db)):
+    """Recompute remaining shelf life for all stored lots from sensor history"""
+    from app.services.shelf_life_service import ShelfLifeService
+
+    try:
+        summary = ShelfLifeService(db).run_sweep()
+        return {"success": True, **summary}
+    except Exception as e:
+        db.rollback()
+        print(f"Shelf-life sweep error: {e}")
+        raise HTTPException(status_code=500, detail=f"Shelf-life sweep failed: {str(e)}")
+
+
+@storage_guard_router.get("/shelf-life/sell-first")
+def get_sell_first_lots(
+    location_id: Optional[UUID] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Lots that should be sold first, ordered by remaining shelf life"""
+    from app.services.shelf_life_service import ShelfLifeService
+
+    lots = ShelfLifeService(db).get_sell_first(location_id=location_id, limit=limit)
+    return {
+        "success": True,
+        "total": len(lots),
+        "lots": [
+            {
+                "booking_id": str(lot.booking_id),
+                "location_id": str(lot.location_id) if lot.location_id else None,
+                "crop_type": lot.crop_type,
+                "initial_shelf_life_days": lot.initial_shelf_life_days,
+                "remaining_shelf_life_days": lot.remaining_shelf_life_days,
+                "current_decay_rate": lot.current_decay_rate,
+                "predicted_expiry_at": lot.predicted_expiry_at.isoformat() if lot.predicted_expiry_at else None,
+                "updated_at": lot.updated_at.isoformat() if lot.updated_at else None
+            }
+            for lot in lots
+        ]
+    }
+
+
 # =============================================================================
 # SECTION 7: TRANSPORT & LOGISTICS
 # =============================================================================
@@ -1243,18 +1484,9 @@ async def upload_proof_image(
         if str(booking.farmer_id) != farmer_id:
             raise HTTPException(status_code=403, detail="Not authorized for this booking")
         
-        # Save uploaded file
-        upload_dir = Path("uploads/proof_images")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        unique_filename = f"proof_{proof_type}_{booking_id}_{int(time.time())}.{file_extension}"
-        file_path = upload_dir / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Stream to content-addressed storage (identical re-uploads reuse the stored file)
+        stored = await get_upload_service().save_upload(file, "proof_images")
+        unique_filename = stored.path.name
         
         # Create proof record in database (you may want to create a DeliveryProof table)
         # For now, we'll store in booking notes or create a simple JSON record
@@ -1271,7 +1503,12 @@ async def upload_proof_image(
             "success": True,
             "message": f"{proof_type.capitalize()} proof uploaded successfully",
             "file_name": unique_filename,
-            "file_path": str(file_path),
+            "file_path": str(stored.path),
+            "file_url": stored.url,
+            "thumbnail_url": stored.variant_url("thumb"),
+            "web_url": stored.variant_url("web"),
+            "sha256": stored.sha256,
+            "deduplicated": stored.deduplicated,
             "proof_type": proof_type,
             "booking_id": booking_id,
             "timestamp": timestamp
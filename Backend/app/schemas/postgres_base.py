@@ -1559,6 +1559,51 @@ class QualityMetric(Base):
     job = relationship("StorageJob")
 
 
+class LotShelfLife(Base):
+    """Remaining shelf life of a stored lot, refreshed by the shelf-life sweep"""
+    __tablename__ = "lot_shelf_life"
+
+    booking_id = Column(PGUUID(as_uuid=True), ForeignKey("storage_bookings.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(PGUUID(as_uuid=True), ForeignKey("storage_locations.id", ondelete="SET NULL"))
+    crop_type = Column(String(120))
+    initial_shelf_life_days = Column(Float, nullable=False)  # intake estimate at reference conditions
+    consumed_days = Column(Float, nullable=False, default=0.0)  # equivalent days used up at reference conditions
+    remaining_shelf_life_days = Column(Float, nullable=False)
+    current_decay_rate = Column(Float)  # multiple of the reference rate at the latest reading
+    predicted_expiry_at = Column(DateTime(timezone=True))
+    sell_first = Column(Boolean, default=False)
+    model_version = Column(String(32))
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    booking = relationship("StorageBooking")
+    location = relationship("StorageLocation")
+    __table_args__ = (Index("ix_lot_shelf_life_location_remaining", "location_id", "remaining_shelf_life_days"),)
+
+
+class DemandForecast(Base):
+    """Precomputed weekly storage demand forecast per facility or region and crop"""
+    __tablename__ = "storage_demand_forecasts"
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    level = Column(String(16), nullable=False)  # facility, region
+    location_id = Column(PGUUID(as_uuid=True), ForeignKey("storage_locations.id", ondelete="CASCADE"))
+    region = Column(String(120), nullable=False)
+    crop = Column(String(120), nullable=False)
+    week_start = Column(Date, nullable=False)
+    horizon_weeks = Column(Integer, nullable=False)
+    forecast_kg = Column(Float, nullable=False)
+    lower_kg = Column(Float)
+    upper_kg = Column(Float)
+    model_version = Column(String(32))
+    generated_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    location = relationship("StorageLocation")
+    __table_args__ = (
+        Index("ix_demand_forecast_location_week", "location_id", "week_start"),
+        Index("ix_demand_forecast_region_crop_week", "region", "crop", "week_start"),
+    )
+
+
 # =========================================================
 # TRANSPORT & LOGISTICS TABLES
 # =========================================================
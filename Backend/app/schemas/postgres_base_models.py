@@ -252,6 +252,24 @@ class IPMRecommendations(BaseModel):
     approval_reason: Optional[str] = None
 
 
+class SkippedStage(BaseModel):
+    """Workflow stage skipped or degraded to stay within the request's time budget"""
+    stage: str = Field(..., description="Node or sub-step name")
+    reason: str = Field(..., description="insufficient_budget or deadline_exceeded")
+    remaining_seconds: float = Field(..., description="Budget left when the stage was skipped")
+
+
+def merge_skipped_stages(left: List[SkippedStage], right: List[SkippedStage]) -> List[SkippedStage]:
+    """Reducer for skipped_stages: append new entries (nodes may return the full state)"""
+    def key(entry) -> tuple:
+        data = entry if isinstance(entry, dict) else entry.dict()
+        return data.get("stage"), data.get("reason")
+
+    left, right = list(left or []), list(right or [])
+    seen = {key(entry) for entry in left}
+    return left + [entry for entry in right if key(entry) not in seen]
+
+
 class ProcessingTimings(BaseModel):
     """Processing time breakdown"""
     total_ms: float
@@ -278,6 +296,7 @@ class AnalysisResponse(BaseModel):
     uncertain: bool = Field(False, description="Whether analysis has high uncertainty")
     uncertainty_guidance: Optional[List[str]] = Field(None, description="Guidance for uncertain results")
     timings: Optional[ProcessingTimings] = None
+    skipped_stages: List[SkippedStage] = Field(default_factory=list, description="Stages skipped to meet the time budget")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -403,6 +422,7 @@ class MultiLLMResults(BaseModel):
     slm_analysis: Optional[LLMAnalysisResult] = Field(None, description="SLM-focused analysis")
     llm_analysis: Dict[str, LLMAnalysisResult] = Field(default_factory=dict, description="LLM analyses by provider")
     cross_validation: Optional[LLMAnalysisResult] = Field(None, description="Cross-validation analysis")
+    validator_results: Dict[str, LLMAnalysisResult] = Field(default_factory=dict, description="Individual cross-validation validator results")
     consensus_result: Optional[Dict[str, Any]] = Field(None, description="Final consensus result")
     confidence_scores: Dict[str, float] = Field(default_factory=dict, description="Confidence scores by provider")
     agreement_score: Optional[float] = Field(None, ge=0, le=1, description="Agreement between analyses")
@@ -410,6 +430,18 @@ class MultiLLMResults(BaseModel):
     total_token_usage: Dict[str, int] = Field(default_factory=dict, description="Total token usage across providers")
 
 
+class PreparedImage(BaseModel):
+    """Image decoded, resized and encoded once by the preprocess node for all downstream nodes"""
+    index: int = Field(..., description="Position of the image in the request")
+    source_path: str = Field(..., description="Validated input image path")
+    processed_path: str = Field(..., description="Path of the encoded preprocessed image")
+    width: int = Field(..., description="Preprocessed width in pixels")
+    height: int = Field(..., description="Preprocessed height in pixels")
+    mime_type: str = Field("image/jpeg", description="MIME type of the encoded payload")
+    data_url: str = Field(..., description="Base64 data URL sent to vision providers")
+    tile_paths: List[str] = Field(default_factory=list, description="Tiles written for very large drone images")
+
+
 # Internal workflow state models (for LangGraph)
 from typing import Annotated
 from operator import or_ as dict_union
@@ -420,6 +452,7 @@ class WorkflowState(BaseModel):
     images: List[ImageMetadata] = Field(default_factory=list)
     payload: Optional[AnalysisPayload] = None
     processed_images: List[str] = Field(default_factory=list)  # Base64 or file paths
+    prepared_images: List[PreparedImage] = Field(default_factory=list, description="Encoded payloads aligned with processed_images")
     
     # Traditional CV pipeline results
     vision_results: Optional[Dict[str, Any]] = None
@@ -445,6 +478,11 @@ class WorkflowState(BaseModel):
     processing_times: Annotated[Dict[str, float], dict_union] = Field(default_factory=dict)
     node_execution_order: List[str] = Field(default_factory=list, description="Order of node execution")
     
+    # Request-level time budget (wall clock, so it survives checkpoint resume)
+    budget_seconds: Optional[float] = Field(None, description="Time budget requested for this analysis")
+    deadline: Optional[float] = Field(None, description="Epoch seconds after which optional stages are cancelled")
+    skipped_stages: Annotated[List[SkippedStage], merge_skipped_stages] = Field(default_factory=list)
+    
     # LLM-specific configurations
     active_llm_providers: List[str] = Field(default_factory=list, description="Active LLM providers for this analysis")
     preferred_llm_providers: List[str] = Field(default_factory=list, description="Preferred LLM providers for this analysis")
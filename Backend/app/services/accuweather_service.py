@@ -1,8 +1,9 @@
-import httpx
 import logging
 from typing import Dict, Any, Optional, List
 import ssl
 
+from app.connections.http_connection import get_http_pool
+
 logger = logging.getLogger(__name__)
 
 class AccuWeatherService:
@@ -51,41 +52,37 @@ class AccuWeatherService:
     async def _get_location_key(self, latitude: float, longitude: float) -> Optional[str]:
         """Get AccuWeather location key for coordinates."""
         try:
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=False,
-                follow_redirects=True,
-            ) as client:
-                url = f"{self.postgres_base_url}/locations/v1/cities/geoposition/search"
-                params = {
-                    "apikey": self.api_key,
-                    "q": f"{latitude},{longitude}",
-                    "details": "false",
-                }
-
-                logger.info(f"🌍 Requesting location: {url}")
-                logger.info(f"📍 Coordinates: {latitude}, {longitude}")
-
-                response = await client.get(url, params=params)
-                logger.info(f"📡 Location response status: {response.status_code}")
-
-                if response.status_code == 200:
-                    data = response.json()
-                    location_key = data.get("Key")
-                    location_name = data.get("LocalizedName", "Unknown")
-                    country = data.get("Country", {}).get("LocalizedName", "Unknown")
-                    logger.info(f"🌍 Location found: {location_name}, {country}")
-                    return location_key
-                elif response.status_code == 401:
-                    logger.error("❌ AccuWeather API key is invalid!")
-                    logger.error(f"🔑 API key used: {self.api_key[:10]}...")
-                elif response.status_code == 403:
-                    logger.error("❌ AccuWeather API access forbidden - check subscription")
-                elif response.status_code == 503:
-                    logger.error("❌ AccuWeather API limit exceeded")
-                else:
-                    logger.error(f"AccuWeather location API error: {response.status_code}")
-                    logger.error(f"Response: {response.text[:200]}...")
+            client = get_http_pool().httpx_client("accuweather", timeout=self.timeout, verify=False, follow_redirects=True)
+            url = f"{self.postgres_base_url}/locations/v1/cities/geoposition/search"
+            params = {
+                "apikey": self.api_key,
+                "q": f"{latitude},{longitude}",
+                "details": "false",
+            }
+
+            logger.info(f"🌍 Requesting location: {url}")
+            logger.info(f"📍 Coordinates: {latitude}, {longitude}")
+
+            response = await client.get(url, params=params)
+            logger.info(f"📡 Location response status: {response.status_code}")
+
+            if response.status_code == 200:
+                data = response.json()
+                location_key = data.get("Key")
+                location_name = data.get("LocalizedName", "Unknown")
+                country = data.get("Country", {}).get("LocalizedName", "Unknown")
+                logger.info(f"🌍 Location found: {location_name}, {country}")
+                return location_key
+            elif response.status_code == 401:
+                logger.error("❌ AccuWeather API key is invalid!")
+                logger.error(f"🔑 API key used: {self.api_key[:10]}...")
+            elif response.status_code == 403:
+                logger.error("❌ AccuWeather API access forbidden - check subscription")
+            elif response.status_code == 503:
+                logger.error("❌ AccuWeather API limit exceeded")
+            else:
+                logger.error(f"AccuWeather location API error: {response.status_code}")
+                logger.error(f"Response: {response.text[:200]}...")
 
         except Exception as e:
             logger.error(f"Location lookup failed: {e}")
@@ -95,27 +92,23 @@ class AccuWeatherService:
     async def _get_current_conditions(self, location_key: str) -> Optional[Dict[str, Any]]:
         """Get detailed current weather conditions."""
         try:
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=False,
-                follow_redirects=True,
-            ) as client:
-                url = f"{self.postgres_base_url}/currentconditions/v1/{location_key}"
-                params = {"apikey": self.api_key, "details": "true"}
-
-                logger.info(f"🌡️ Getting current conditions for location: {location_key}")
-                response = await client.get(url, params=params)
-                logger.info(f"📡 Current conditions response: {response.status_code}")
-
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        current_data = data[0]
-                        logger.info("✅ Current conditions retrieved")
-                        return current_data
-                else:
-                    logger.error(f"Current conditions API error: {response.status_code}")
-                    logger.error(f"Response: {response.text[:200]}...")
+            client = get_http_pool().httpx_client("accuweather", timeout=self.timeout, verify=False, follow_redirects=True)
+            url = f"{self.postgres_base_url}/currentconditions/v1/{location_key}"
+            params = {"apikey": self.api_key, "details": "true"}
+
+            logger.info(f"🌡️ Getting current conditions for location: {location_key}")
+            response = await client.get(url, params=params)
+            logger.info(f"📡 Current conditions response: {response.status_code}")
+
+            if response.status_code == 200:
+                data = response.json()
+                if data and len(data) > 0:
+                    current_data = data[0]
+                    logger.info("✅ Current conditions retrieved")
+                    return current_data
+            else:
+                logger.error(f"Current conditions API error: {response.status_code}")
+                logger.error(f"Response: {response.text[:200]}...")
 
         except Exception as e:
             logger.error(f"Current conditions failed: {e}")
@@ -125,25 +118,21 @@ class AccuWeatherService:
     async def _get_daily_forecast(self, location_key: str, days: int = 5) -> Optional[List[Dict[str, Any]]]:
         """Get daily forecast for agricultural planning."""
         try:
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=False,
-                follow_redirects=True,
-            ) as client:
-                url = f"{self.postgres_base_url}/forecasts/v1/daily/{days}day/{location_key}"
-                params = {"apikey": self.api_key, "details": "false", "metric": "true"}
-
-                logger.info(f"📅 Getting {days}-day forecast for location: {location_key}")
-                response = await client.get(url, params=params)
-                logger.info(f"📡 Forecast response: {response.status_code}")
-
-                if response.status_code == 200:
-                    data = response.json()
-                    daily_forecasts = data.get("DailyForecasts", [])
-                    logger.info(f"✅ Forecast retrieved: {len(daily_forecasts)} days")
-                    return daily_forecasts
-                else:
-                    logger.warning(f"Forecast API error: {response.status_code} (continuing without forecast)")
+            client = get_http_pool().httpx_client("accuweather", timeout=self.timeout, verify=False, follow_redirects=True)
+            url = f"{self.postgres_base_url}/forecasts/v1/daily/{days}day/{location_key}"
+            params = {"apikey": self.api_key, "details": "false", "metric": "true"}
+
+            logger.info(f"📅 Getting {days}-day forecast for location: {location_key}")
+            response = await client.get(url, params=params)
+            logger.info(f"📡 Forecast response: {response.status_code}")
+
+            if response.status_code == 200:
+                data = response.json()
+                daily_forecasts = data.get("DailyForecasts", [])
+                logger.info(f"✅ Forecast retrieved: {len(daily_forecasts)} days")
+                return daily_forecasts
+            else:
+                logger.warning(f"Forecast API error: {response.status_code} (continuing without forecast)")
 
         except Exception as e:
             logger.warning(f"Forecast retrieval failed: {e} (continuing without forecast)")
@@ -4,17 +4,41 @@ Handles storage booking creation, suggestions, and management
 """
 
 import math
-from typing import List, Optional
+from typing import List, Optional, Set
 from uuid import UUID
 from datetime import datetime, timezone, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, event, case, or_, and_
 from fastapi import HTTPException, status
 
+from app.core.config import settings
+from app.core.cache import get_cache_manager
+from app.connections.postgres_connection import SessionLocal
 from app.schemas import postgres_base as models
 from app.schemas import postgres_base_models as schemas
 
 
+ACTIVE_BOOKING_STATUSES = ("PENDING", "CONFIRMED", "ACTIVE")
+DASHBOARD_ACTIVE_LIMIT = 10
+DASHBOARD_RECENT_LIMIT = 5
+
+# Only the columns StorageBookingOut serializes; avoids hydrating full ORM rows
+_DASHBOARD_BOOKING_COLUMNS = (
+    "id", "farmer_id", "location_id", "vendor_id", "crop_type", "quantity_kg", "grade",
+    "duration_days", "start_date", "end_date", "price_per_day", "total_price",
+    "booking_status", "payment_status", "vendor_confirmed", "vendor_confirmed_at",
+    "transport_required", "transport_booking_id", "created_at", "updated_at",
+)
+
+# Per-farmer dashboard views keyed by farmer_id. Memory only: invalidation runs
+# in the committing process, so a shared tier could serve another worker's stale view
+_dashboard_cache = get_cache_manager().namespace(
+    "farmer_dashboard",
+    max_entries=settings.FARMER_DASHBOARD_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.FARMER_DASHBOARD_CACHE_TTL_SECONDS,
+)
+
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate distance between two coordinates using Haversine formula
@@ -308,57 +332,106 @@ def cancel_booking(
     return booking
 
 
-def get_farmer_dashboard_data(
+def _query_farmer_dashboard(
     db: Session,
     farmer_id: UUID
 ) -> schemas.FarmerDashboardResponse:
     """
-    Get comprehensive dashboard data for farmer
+    Build the farmer dashboard from a single windowed query.
+    Summary counts are window aggregates over all of the farmer's bookings;
+    only rows ranked into the active/recent lists are returned.
     """
-    # Get booking statistics
-    total_bookings = db.query(func.count(models.StorageBooking.id)).filter(
-        models.StorageBooking.farmer_id == farmer_id
-    ).scalar() or 0
-    
-    active_bookings_count = db.query(func.count(models.StorageBooking.id)).filter(
-        models.StorageBooking.farmer_id == farmer_id,
-        models.StorageBooking.booking_status.in_(["PENDING", "CONFIRMED", "ACTIVE"])
-    ).scalar() or 0
-    
-    completed_bookings = db.query(func.count(models.StorageBooking.id)).filter(
-        models.StorageBooking.farmer_id == farmer_id,
-        models.StorageBooking.booking_status == "COMPLETED"
-    ).scalar() or 0
-    
-    # Get total spent
-    total_spent = db.query(func.sum(models.StorageBooking.total_price)).filter(
-        models.StorageBooking.farmer_id == farmer_id,
-        models.StorageBooking.booking_status == "COMPLETED"
-    ).scalar() or 0.0
-    
-    # Get active bookings
-    active_bookings = db.query(models.StorageBooking).filter(
-        models.StorageBooking.farmer_id == farmer_id,
-        models.StorageBooking.booking_status.in_(["PENDING", "CONFIRMED", "ACTIVE"])
-    ).order_by(models.StorageBooking.created_at.desc()).limit(10).all()
-    
-    # Get recent bookings
-    recent_bookings = db.query(models.StorageBooking).filter(
-        models.StorageBooking.farmer_id == farmer_id
-    ).order_by(models.StorageBooking.created_at.desc()).limit(5).all()
-    
-    # Build summary
+    booking = models.StorageBooking
+    is_active = booking.booking_status.in_(ACTIVE_BOOKING_STATUSES)
+    is_completed = booking.booking_status == "COMPLETED"
+
+    ranked = db.query(
+        *[getattr(booking, column) for column in _DASHBOARD_BOOKING_COLUMNS],
+        is_active.label("is_active"),
+        func.count(booking.id).over().label("total_bookings"),
+        func.sum(case((is_active, 1), else_=0)).over().label("active_count"),
+        func.sum(case((is_completed, 1), else_=0)).over().label("completed_count"),
+        func.sum(case((is_completed, booking.total_price), else_=0)).over().label("total_spent"),
+        func.row_number().over(order_by=booking.created_at.desc()).label("recent_rank"),
+        func.row_number().over(partition_by=is_active, order_by=booking.created_at.desc()).label("status_rank"),
+    ).filter(
+        booking.farmer_id == farmer_id
+    ).subquery()
+
+    rows = db.query(ranked).filter(
+        or_(
+            ranked.c.recent_rank <= DASHBOARD_RECENT_LIMIT,
+            and_(ranked.c.is_active, ranked.c.status_rank <= DASHBOARD_ACTIVE_LIMIT)
+        )
+    ).order_by(ranked.c.created_at.desc()).all()
+
+    first = rows[0] if rows else None
     summary = schemas.FarmerBookingSummary(
-        total_bookings=total_bookings,
-        active_bookings=active_bookings_count,
-        completed_bookings=completed_bookings,
+        total_bookings=int(first.total_bookings) if first else 0,
+        active_bookings=int(first.active_count or 0) if first else 0,
+        completed_bookings=int(first.completed_count or 0) if first else 0,
         pending_payments=0,  # TODO: Calculate from payments table
-        total_spent=float(total_spent)
+        total_spent=float(first.total_spent or 0.0) if first else 0.0
     )
-    
+
     return schemas.FarmerDashboardResponse(
         summary=summary,
-        active_bookings=[schemas.StorageBookingOut.model_validate(b) for b in active_bookings],
-        recent_bookings=[schemas.StorageBookingOut.model_validate(b) for b in recent_bookings],
+        active_bookings=[
+            schemas.StorageBookingOut.model_validate(row)
+            for row in rows if row.is_active and row.status_rank <= DASHBOARD_ACTIVE_LIMIT
+        ],
+        recent_bookings=[
+            schemas.StorageBookingOut.model_validate(row)
+            for row in rows if row.recent_rank <= DASHBOARD_RECENT_LIMIT
+        ],
         pending_payments=[]  # TODO: Add payments
     )
+
+
+def get_farmer_dashboard_data(
+    db: Session,
+    farmer_id: UUID
+) -> schemas.FarmerDashboardResponse:
+    """
+    Get comprehensive dashboard data for farmer.
+    Served from a per-farmer cached view that is dropped whenever a booking,
+    transport booking or certificate for that farmer is committed.
+    """
+    return _dashboard_cache.get_or_load_sync(
+        str(farmer_id), lambda: _query_farmer_dashboard(db, farmer_id)
+    )
+
+
+def invalidate_farmer_dashboard(farmer_id: Optional[UUID]) -> None:
+    """Drop the cached dashboard view for a farmer"""
+    if farmer_id is None:
+        return
+    _dashboard_cache.delete(str(farmer_id))
+
+
+# Models whose writes change what the farmer dashboard shows. Proof uploads
+# are recorded on StorageBooking.vendor_notes, so they are covered too.
+_DASHBOARD_SOURCE_MODELS = (
+    models.StorageBooking,
+    models.TransportBooking,
+    models.StorageCertificate,
+)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_dashboard_invalidations(session, flush_context):
+    farmer_ids: Set[str] = session.info.setdefault("dashboard_farmer_ids", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _DASHBOARD_SOURCE_MODELS) and getattr(obj, "farmer_id", None):
+            farmer_ids.add(str(obj.farmer_id))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_dashboard_invalidations(session):
+    for farmer_id in session.info.pop("dashboard_farmer_ids", ()):
+        invalidate_farmer_dashboard(farmer_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_dashboard_invalidations(session):
+    session.info.pop("dashboard_farmer_ids", None)
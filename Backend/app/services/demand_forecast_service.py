@@ -0,0 +1,604 @@
+"""
+Demand Forecast Service - Weekly storage demand forecasts per facility and region
+
+Demand signals are booked quantities (StorageBooking), awarded jobs (StorageJob via
+their RFQ) and open requests (StorageRFQ, attributed to the region of the nearest
+facility). They are aggregated into weekly kg per (facility | region, crop) series.
+
+Each series gets a seasonal baseline (same week last year blended with the recent
+8-week mean). A HistGradientBoostingRegressor per (region, crop) then corrects the
+baseline from calendar, lag and weather features, directly for every horizon;
+regions with too little history use a model pooled over all regions of the crop.
+Training is incremental on the data side: only bookings, jobs and weather rows newer
+than their stored watermarks are read from Postgres and folded into the persisted
+weekly history. A cancelled booking is counted when it is created and subtracted
+again (in the week it was created) when its cancellation is read, so each side is
+folded exactly once. Open RFQs are re-read every run and never persisted, so an RFQ
+stops counting once it is awarded and is then counted once, as a job. Forecasts are
+published to the storage_demand_forecasts table and served from there.
+
+Runs are serialised (a process lock plus a Postgres advisory lock) so two runs
+never fold the same events past the watermark twice. The API queues runs on a
+background worker (start_training) instead of training inside the request.
+"""
+
+import contextlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.schemas import postgres_base as models
+
+logger = logging.getLogger(__name__)
+
+
+MODEL_VERSION = "seasonal-hgb-v2"
+# Bumped when the persisted history changes meaning; older state is rebuilt from Postgres
+STATE_VERSION = 2
+SERIES_KEYS = ["level", "key", "region", "crop"]
+FEATURES = [
+    "horizon", "woy_sin", "woy_cos", "month", "is_region",
+    "lag1", "lag2", "lag4", "roll8", "roll26", "lag52_target", "baseline", "temperature",
+]
+UNKNOWN_REGION = "unknown"
+# Booking statuses that are not demand; counted only while cancelled_at can net them out
+CANCELLED_BOOKING_STATUSES = ("CANCELLED", "REJECTED")
+# pg_try_advisory_lock key shared by every worker that trains demand forecasts
+ADVISORY_LOCK_KEY = 0x44454D44  # "DEMD"
+
+# One run at a time in this process; the advisory lock covers other processes
+_train_lock = threading.Lock()
+_status_lock = threading.Lock()
+_train_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="demand-forecast")
+_last_run: Dict[str, Any] = {"running": False, "started_at": None, "finished_at": None, "summary": None, "error": None}
+
+
+class TrainingInProgress(RuntimeError):
+    """Another demand forecast training run holds the lock"""
+
+
+def _week_start(timestamps: pd.Series) -> pd.Series:
+    """Monday of the (UTC) week each timestamp falls in, as naive datetimes"""
+    ts = pd.to_datetime(timestamps, utc=True).dt.tz_localize(None)
+    return ts.dt.to_period("W-SUN").dt.start_time
+
+
+def _nearest_index(lat: np.ndarray, lon: np.ndarray, ref_lat: np.ndarray, ref_lon: np.ndarray) -> np.ndarray:
+    """Index of the nearest reference point for each (lat, lon), equirectangular distance"""
+    result = np.empty(len(lat), dtype=np.int64)
+    cos_ref = np.cos(np.radians(ref_lat))
+    for start in range(0, len(lat), 10000):
+        dlat = lat[start:start + 10000, None] - ref_lat[None, :]
+        dlon = (lon[start:start + 10000, None] - ref_lon[None, :]) * cos_ref[None, :]
+        result[start:start + 10000] = np.argmin(dlat * dlat + dlon * dlon, axis=1)
+    return result
+
+
+class DemandForecastService:
+    """Trains demand models on local history and publishes forecasts"""
+
+    def __init__(self, db: Session, state_path: Optional[Path] = None):
+        self.db = db
+        self.state_path = state_path or (settings.MODEL_DIR / "demand_forecast" / "state.joblib")
+        self.horizons = list(range(
+            settings.DEMAND_FORECAST_MIN_HORIZON_WEEKS,
+            settings.DEMAND_FORECAST_MAX_HORIZON_WEEKS + 1,
+        ))
+        self.history_weeks = settings.DEMAND_FORECAST_HISTORY_WEEKS
+        self.min_training_rows = settings.DEMAND_FORECAST_MIN_TRAINING_ROWS
+
+    # -------------------------
+    # State
+    # -------------------------
+    def _load_state(self) -> Dict[str, Any]:
+        if self.state_path.exists():
+            try:
+                state = joblib.load(self.state_path)
+                if state.get("version") == STATE_VERSION:
+                    return state
+                logger.info("Rebuilding demand forecast history for the new state format")
+            except Exception as e:
+                logger.warning(f"Discarding unreadable demand forecast state: {e}")
+        return {
+            "version": STATE_VERSION,
+            "weekly": pd.DataFrame(columns=SERIES_KEYS + ["week_start", "demand_kg"]),
+            "temperature": pd.DataFrame(columns=["region", "week_start", "temperature_sum", "temperature_n"]),
+            "watermark": None,
+            "cancellation_watermark": None,
+            "temperature_watermark": None,
+            "models": {},
+        }
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        joblib.dump(state, tmp_path)
+        tmp_path.replace(self.state_path)
+
+    # -------------------------
+    # Data extraction
+    # -------------------------
+    def _load_locations(self) -> pd.DataFrame:
+        rows = self.db.query(
+            models.StorageLocation.id,
+            models.StorageLocation.lat,
+            models.StorageLocation.lon,
+            func.coalesce(func.nullif(func.trim(models.Vendor.state), ""), UNKNOWN_REGION),
+        ).outerjoin(
+            models.Vendor, models.Vendor.id == models.StorageLocation.vendor_id
+        ).all()
+        locations = pd.DataFrame(rows, columns=["location_id", "lat", "lon", "region"])
+        locations["region"] = locations["region"].str.strip().str.title()
+        return locations
+
+    @staticmethod
+    def _normalize_events(events: pd.DataFrame) -> pd.DataFrame:
+        events["crop"] = events["crop"].fillna("unknown").astype(str).str.strip().str.lower()
+        events["quantity_kg"] = pd.to_numeric(events["quantity_kg"], errors="coerce").fillna(0.0)
+        return events
+
+    @staticmethod
+    def _with_region(events: pd.DataFrame, locations: pd.DataFrame) -> pd.DataFrame:
+        region_of = dict(zip(locations["location_id"], locations["region"]))
+        events["region"] = events["location_id"].map(region_of).fillna(UNKNOWN_REGION)
+        return events
+
+    def _fetch_events(self, since: Optional[datetime], locations: pd.DataFrame) -> pd.DataFrame:
+        """
+        Bookings and jobs newer than the watermark: location_id, region, crop, kg, created_at
+
+        Cancelled/rejected bookings without a cancellation time are never demand.
+        Those with one are counted here and netted out by _fetch_cancellations.
+        """
+        booking = models.StorageBooking
+        job = models.StorageJob
+        rfq = models.StorageRFQ
+
+        bookings = self.db.query(booking.location_id, booking.crop_type, booking.quantity_kg, booking.created_at).filter(
+            or_(
+                func.upper(func.coalesce(booking.booking_status, "")).notin_(CANCELLED_BOOKING_STATUSES),
+                booking.cancelled_at.isnot(None),
+            )
+        )
+        jobs = self.db.query(job.location_id, rfq.crop, rfq.quantity_kg, job.created_at).join(rfq, rfq.id == job.rfq_id)
+        if since is not None:
+            bookings = bookings.filter(booking.created_at > since)
+            jobs = jobs.filter(job.created_at > since)
+
+        columns = ["location_id", "crop", "quantity_kg", "created_at"]
+        events = pd.concat(
+            [pd.DataFrame(bookings.all(), columns=columns), pd.DataFrame(jobs.all(), columns=columns)],
+            ignore_index=True,
+        )
+        return self._normalize_events(self._with_region(events, locations))
+
+    def _fetch_cancellations(
+        self, since: Optional[datetime], locations: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, Optional[datetime]]:
+        """
+        Bookings cancelled after the cancellation watermark, as negative events in
+        the week the booking was created
+
+        Returns:
+            (events, newest cancelled_at read or None when nothing was read)
+        """
+        booking = models.StorageBooking
+        query = self.db.query(
+            booking.location_id, booking.crop_type, booking.quantity_kg, booking.created_at, booking.cancelled_at
+        ).filter(
+            func.upper(booking.booking_status).in_(CANCELLED_BOOKING_STATUSES),
+            booking.cancelled_at.isnot(None),
+        )
+        if since is not None:
+            query = query.filter(booking.cancelled_at > since)
+        cancelled = pd.DataFrame(
+            query.all(), columns=["location_id", "crop", "quantity_kg", "created_at", "cancelled_at"]
+        )
+        events = self._normalize_events(self._with_region(cancelled.drop(columns="cancelled_at"), locations))
+        if events.empty:
+            return events, None
+        events["quantity_kg"] = -events["quantity_kg"]
+        return events, pd.to_datetime(cancelled["cancelled_at"], utc=True).max().to_pydatetime()
+
+    def _fetch_open_rfqs(self, locations: pd.DataFrame) -> pd.DataFrame:
+        """
+        All currently open RFQs, attributed to the region of the nearest facility.
+        Read in full every run (not incrementally) because an RFQ stops being open
+        when it is awarded; the resulting job is counted by _fetch_events instead.
+        """
+        rfq = models.StorageRFQ
+        rows = self.db.query(rfq.origin_lat, rfq.origin_lon, rfq.crop, rfq.quantity_kg, rfq.created_at).filter(
+            rfq.status == "OPEN"
+        ).all()
+        open_rfqs = pd.DataFrame(rows, columns=["lat", "lon", "crop", "quantity_kg", "created_at"])
+        if not open_rfqs.empty and not locations.empty:
+            nearest = _nearest_index(
+                open_rfqs["lat"].to_numpy(float), open_rfqs["lon"].to_numpy(float),
+                locations["lat"].to_numpy(float), locations["lon"].to_numpy(float),
+            )
+            open_rfqs["region"] = locations["region"].to_numpy()[nearest]
+        else:
+            open_rfqs["region"] = UNKNOWN_REGION
+        # RFQs have no facility yet: they only count toward regional demand
+        open_rfqs["location_id"] = None
+        return self._normalize_events(open_rfqs[["location_id", "crop", "quantity_kg", "created_at", "region"]])
+
+    def _fetch_temperature(
+        self, since: Optional[datetime], locations: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, Optional[datetime]]:
+        """
+        Weekly temperature sums per region from weather observations newer than the
+        temperature watermark
+
+        Returns:
+            (weekly sums, newest fetched_at read or None when nothing was read)
+        """
+        query = self.db.query(
+            models.WeatherData.latitude, models.WeatherData.longitude,
+            models.WeatherData.temperature, models.WeatherData.fetched_at,
+        ).filter(models.WeatherData.temperature.isnot(None))
+        if since is not None:
+            query = query.filter(models.WeatherData.fetched_at > since)
+        weather = pd.DataFrame(query.all(), columns=["lat", "lon", "temperature", "fetched_at"])
+        empty = pd.DataFrame(columns=["region", "week_start", "temperature_sum", "temperature_n"])
+        if weather.empty:
+            return empty, None
+        newest = pd.to_datetime(weather["fetched_at"], utc=True).max().to_pydatetime()
+        if locations.empty:
+            # Nothing to attribute the rows to: leave the watermark so they are read once facilities exist
+            return empty, None
+
+        nearest = _nearest_index(
+            weather["lat"].to_numpy(float), weather["lon"].to_numpy(float),
+            locations["lat"].to_numpy(float), locations["lon"].to_numpy(float),
+        )
+        weather["region"] = locations["region"].to_numpy()[nearest]
+        weather["week_start"] = _week_start(weather["fetched_at"])
+        weather["temperature"] = weather["temperature"].astype(float)
+        weekly = weather.groupby(["region", "week_start"], as_index=False).agg(
+            temperature_sum=("temperature", "sum"), temperature_n=("temperature", "size")
+        )
+        return weekly, newest
+
+    # -------------------------
+    # Incremental aggregation
+    # -------------------------
+    @staticmethod
+    def _weekly_from_events(events: pd.DataFrame) -> pd.DataFrame:
+        if events.empty:
+            return pd.DataFrame(columns=SERIES_KEYS + ["week_start", "demand_kg"])
+        events = events.assign(week_start=_week_start(events["created_at"]))
+
+        facility = events[events["location_id"].notna()].assign(
+            level="facility", key=lambda df: df["location_id"].astype(str)
+        )
+        region = events.assign(level="region", key=events["region"])
+        weekly = pd.concat([facility, region], ignore_index=True)
+        return weekly.groupby(SERIES_KEYS + ["week_start"], as_index=False)["quantity_kg"].sum().rename(
+            columns={"quantity_kg": "demand_kg"}
+        )
+
+    @staticmethod
+    def _combine(existing: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        if new.empty:
+            return existing
+        if existing.empty:
+            return new
+        return pd.concat([existing, new], ignore_index=True).groupby(keys, as_index=False).sum()
+
+    def _dense_history(self, weekly: pd.DataFrame, last_week: pd.Timestamp) -> pd.DataFrame:
+        """Complete weekly grid per series (missing weeks are zero demand)"""
+        weekly = weekly[weekly["week_start"] <= last_week]
+        if weekly.empty:
+            return weekly.assign(demand_kg=pd.Series(dtype=float))
+        first = weekly.groupby(SERIES_KEYS)["week_start"].min()
+        n_weeks = ((last_week - first).dt.days // 7 + 1).to_numpy()
+        index = first.index.repeat(n_weeks)
+        offsets = np.concatenate([np.arange(n) for n in n_weeks])
+        grid = index.to_frame(index=False)
+        grid["week_start"] = np.repeat(first.to_numpy(), n_weeks) + pd.to_timedelta(offsets * 7, unit="D")
+        dense = grid.merge(weekly, on=SERIES_KEYS + ["week_start"], how="left")
+        dense["demand_kg"] = dense["demand_kg"].fillna(0.0).astype(float)
+        return dense.sort_values(SERIES_KEYS + ["week_start"], ignore_index=True)
+
+    # -------------------------
+    # Features
+    # -------------------------
+    def _build_frames(self, dense: pd.DataFrame, temperature: pd.DataFrame) -> pd.DataFrame:
+        """One row per (series, origin week, horizon) with features and the realised target"""
+        grouped = dense.groupby(SERIES_KEYS, sort=False)["demand_kg"]
+        base = dense.copy()
+        base["lag1"] = base["demand_kg"]
+        base["lag2"] = grouped.shift(1)
+        base["lag4"] = grouped.shift(3)
+        base["roll8"] = grouped.rolling(8, min_periods=1).mean().reset_index(level=list(range(len(SERIES_KEYS))), drop=True)
+        base["roll26"] = grouped.rolling(26, min_periods=1).mean().reset_index(level=list(range(len(SERIES_KEYS))), drop=True)
+        base["is_region"] = (base["level"] == "region").astype(float)
+
+        if not temperature.empty:
+            weekly_temp = temperature.assign(
+                temperature=temperature["temperature_sum"] / temperature["temperature_n"]
+            )[["region", "week_start", "temperature"]]
+            base = base.merge(weekly_temp, on=["region", "week_start"], how="left")
+        else:
+            base["temperature"] = np.nan
+
+        frames = []
+        for horizon in self.horizons:
+            frame = base.copy()
+            frame["horizon"] = float(horizon)
+            frame["target"] = grouped.shift(-horizon).to_numpy()
+            frame["lag52_target"] = grouped.shift(52 - horizon).to_numpy()
+            target_week = frame["week_start"] + pd.Timedelta(weeks=horizon)
+            woy = target_week.dt.isocalendar().week.astype(float).to_numpy()
+            frame["target_week"] = target_week
+            frame["woy_sin"] = np.sin(2 * np.pi * woy / 52.0)
+            frame["woy_cos"] = np.cos(2 * np.pi * woy / 52.0)
+            frame["month"] = target_week.dt.month.astype(float)
+            frames.append(frame)
+
+        frames = pd.concat(frames, ignore_index=True)
+        frames["baseline"] = np.where(
+            frames["lag52_target"].notna(),
+            0.5 * frames["lag52_target"] + 0.5 * frames["roll8"],
+            frames["roll8"],
+        )
+        return frames
+
+    # -------------------------
+    # Training & publishing
+    # -------------------------
+    def _fit(self, rows: pd.DataFrame) -> Dict[str, Any]:
+        """Fit one residual model and estimate its error quantiles on a time holdout"""
+        residual = rows["target"] - rows["baseline"]
+        if len(rows) < self.min_training_rows:
+            errors = residual.to_numpy()
+            return {
+                "model": None,
+                "error_q": (np.quantile(errors, [0.1, 0.9]) if len(errors) else np.array([0.0, 0.0])),
+            }
+
+        cutoff = rows["week_start"].quantile(0.8)
+        train, holdout = rows[rows["week_start"] <= cutoff], rows[rows["week_start"] > cutoff]
+        model = HistGradientBoostingRegressor(
+            max_iter=200, learning_rate=0.05, max_leaf_nodes=31, l2_regularization=1.0, random_state=42
+        )
+        if len(holdout) and len(train) >= self.min_training_rows // 2:
+            model.fit(train[FEATURES], residual.loc[train.index])
+            errors = (holdout["target"] - np.maximum(holdout["baseline"] + model.predict(holdout[FEATURES]), 0.0)).to_numpy()
+        else:
+            errors = residual.to_numpy()
+        model.fit(rows[FEATURES], residual)
+        return {"model": model, "error_q": np.quantile(errors, [0.1, 0.9])}
+
+    @contextlib.contextmanager
+    def _training_lock(self) -> Iterator[None]:
+        """
+        Hold the process lock and, on Postgres, the advisory lock for one run
+
+        Raises:
+            TrainingInProgress: If another run holds either lock
+        """
+        if not _train_lock.acquire(blocking=False):
+            raise TrainingInProgress("Demand forecast training is already running")
+        conn = None
+        locked = False
+        try:
+            bind = self.db.get_bind() if self.db is not None else None
+            if bind is not None and bind.dialect.name == "postgresql":
+                # Own connection: the session commits mid-run and may hand its connection back
+                conn = bind.connect()
+                locked = bool(conn.execute(select(func.pg_try_advisory_lock(ADVISORY_LOCK_KEY))).scalar())
+                if not locked:
+                    raise TrainingInProgress("Demand forecast training is running in another worker")
+            yield
+        finally:
+            if conn is not None:
+                try:
+                    if locked:
+                        conn.execute(select(func.pg_advisory_unlock(ADVISORY_LOCK_KEY)))
+                finally:
+                    conn.close()
+            _train_lock.release()
+
+    def train_and_publish(self) -> Dict[str, Any]:
+        """
+        Fold new demand events into the weekly history, retrain the per-region/crop
+        models and replace the published forecasts
+
+        Returns:
+            Dict with series/crop/model/forecast counts and elapsed seconds
+
+        Raises:
+            TrainingInProgress: If another run is in progress
+        """
+        with self._training_lock():
+            return self._train_and_publish()
+
+    def _train_and_publish(self) -> Dict[str, Any]:
+        started = datetime.now(timezone.utc)
+        state = self._load_state()
+        locations = self._load_locations()
+
+        events = self._fetch_events(state["watermark"], locations)
+        cancellations, newest_cancellation = self._fetch_cancellations(state.get("cancellation_watermark"), locations)
+        state["weekly"] = self._combine(
+            state["weekly"],
+            self._weekly_from_events(pd.concat([events, cancellations], ignore_index=True)),
+            SERIES_KEYS + ["week_start"],
+        )
+        if not events.empty:
+            newest = pd.to_datetime(events["created_at"], utc=True).max().to_pydatetime()
+            state["watermark"] = max(state["watermark"], newest) if state["watermark"] else newest
+        if newest_cancellation is not None:
+            state["cancellation_watermark"] = newest_cancellation
+
+        temperature, newest_weather = self._fetch_temperature(state["temperature_watermark"], locations)
+        state["temperature"] = self._combine(state["temperature"], temperature, ["region", "week_start"])
+        if newest_weather is not None:
+            state["temperature_watermark"] = newest_weather
+
+        current_week = _week_start(pd.Series([started]))[0]
+        last_complete_week = current_week - pd.Timedelta(weeks=1)
+        history_start = current_week - pd.Timedelta(weeks=self.history_weeks)
+        state["weekly"] = state["weekly"][state["weekly"]["week_start"] >= history_start]
+        state["temperature"] = state["temperature"][state["temperature"]["week_start"] >= history_start]
+
+        # Open RFQs join this run's history only; persisting them would keep counting
+        # them after they turn into jobs
+        weekly = self._combine(
+            state["weekly"], self._weekly_from_events(self._fetch_open_rfqs(locations)), SERIES_KEYS + ["week_start"]
+        )
+        weekly = weekly[weekly["week_start"] >= history_start]
+
+        dense = self._dense_history(weekly, last_complete_week)
+        if dense.empty:
+            self._save_state(state)
+            return {"series": 0, "crops": 0, "forecasts": 0, "elapsed_seconds": 0.0}
+
+        frames = self._build_frames(dense, state["temperature"])
+        training = frames[frames["target"].notna()]
+        origin = frames[frames["week_start"] == last_complete_week].copy()
+
+        # Per crop: a model pooled over all regions, plus one per region with enough rows
+        state["models"] = {}
+        for crop, crop_rows in training.groupby("crop"):
+            state["models"][crop] = {
+                "pooled": self._fit(crop_rows),
+                "regions": {
+                    region: self._fit(region_rows)
+                    for region, region_rows in crop_rows.groupby("region")
+                    if len(region_rows) >= self.min_training_rows
+                },
+            }
+
+        origin["forecast_kg"] = origin["baseline"]
+        origin["lower_kg"] = origin["baseline"]
+        origin["upper_kg"] = origin["baseline"]
+        for (region, crop), index in origin.groupby(["region", "crop"]).groups.items():
+            crop_models = state["models"].get(crop)
+            if crop_models is None:
+                continue
+            fitted = crop_models["regions"].get(region, crop_models["pooled"])
+            forecast = origin.loc[index, "baseline"].to_numpy()
+            if fitted["model"] is not None:
+                forecast = forecast + fitted["model"].predict(origin.loc[index, FEATURES])
+            forecast = np.maximum(forecast, 0.0)
+            origin.loc[index, "forecast_kg"] = forecast
+            origin.loc[index, "lower_kg"] = np.maximum(forecast + fitted["error_q"][0], 0.0)
+            origin.loc[index, "upper_kg"] = np.maximum(forecast + fitted["error_q"][1], 0.0)
+
+        published = self._publish(origin, started)
+        self._save_state(state)
+
+        elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+        summary = {
+            "series": int(dense.groupby(SERIES_KEYS).ngroups),
+            "crops": len(state["models"]),
+            "region_models": sum(len(crop_models["regions"]) for crop_models in state["models"].values()),
+            "training_rows": int(len(training)),
+            "forecasts": published,
+            "elapsed_seconds": round(elapsed, 3),
+        }
+        logger.info(f"📈 Demand forecasts published: {summary}")
+        return summary
+
+    def _publish(self, origin: pd.DataFrame, generated_at: datetime) -> int:
+        records = [
+            {
+                "level": row.level,
+                "location_id": row.key if row.level == "facility" else None,
+                "region": row.region,
+                "crop": row.crop,
+                "week_start": row.target_week.date(),
+                "horizon_weeks": int(row.horizon),
+                "forecast_kg": round(float(row.forecast_kg), 2),
+                "lower_kg": round(float(row.lower_kg), 2),
+                "upper_kg": round(float(row.upper_kg), 2),
+                "model_version": MODEL_VERSION,
+                "generated_at": generated_at,
+            }
+            for row in origin.itertuples(index=False)
+        ]
+        table = models.DemandForecast.__table__
+        self.db.query(models.DemandForecast).delete(synchronize_session=False)
+        for start in range(0, len(records), 5000):
+            self.db.execute(insert(table).values(records[start:start + 5000]))
+        self.db.commit()
+        return len(records)
+
+    # -------------------------
+    # Serving
+    # -------------------------
+    def get_forecasts(
+        self,
+        location_id: Optional[Any] = None,
+        region: Optional[str] = None,
+        crop: Optional[str] = None,
+    ) -> List[models.DemandForecast]:
+        """Published forecasts for a facility or a region, optionally for one crop"""
+        query = self.db.query(models.DemandForecast)
+        if location_id:
+            query = query.filter(models.DemandForecast.location_id == location_id)
+        elif region:
+            query = query.filter(
+                models.DemandForecast.level == "region",
+                func.lower(models.DemandForecast.region) == region.strip().lower(),
+            )
+        if crop:
+            query = query.filter(models.DemandForecast.crop == crop.strip().lower())
+        return query.order_by(models.DemandForecast.crop, models.DemandForecast.week_start).all()
+
+
+def _run_training() -> None:
+    from app.connections.postgres_connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        summary = DemandForecastService(db).train_and_publish()
+        _last_run.update(summary=summary, error=None)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Demand forecast training failed: {e}")
+        _last_run.update(error=str(e))
+    finally:
+        db.close()
+        with _status_lock:
+            _last_run.update(running=False, finished_at=datetime.now(timezone.utc).isoformat())
+
+
+def start_training() -> bool:
+    """
+    Queue a training run on the background worker
+
+    Returns:
+        False when a run is already queued or running in this process
+    """
+    with _status_lock:
+        if _last_run["running"]:
+            return False
+        _last_run.update(running=True, started_at=datetime.now(timezone.utc).isoformat())
+    _train_executor.submit(_run_training)
+    return True
+
+
+def training_status() -> Dict[str, Any]:
+    """State of the latest background training run"""
+    with _status_lock:
+        return dict(_last_run)
+
+
+def shutdown_training_worker() -> None:
+    _train_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,197 @@
+"""
+Image Dedup Service - Perceptual near-duplicate lookup for analyzed uploads
+
+Keeps the dHash of recent analyses per scope (farmer, plot and request options) so a
+re-photographed or re-compressed image can reuse the earlier diagnosis instead
+of running the full multi-provider analysis again. Hashes live in per-scope
+numpy arrays and are searched with a vectorized XOR + popcount, which keeps a
+lookup well under a millisecond for hundreds of thousands of hashes. The
+diagnoses themselves are stored in the shared cache manager (disk tier when
+enabled); the hash index is per process and fills as that worker sees uploads.
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import get_cache_manager
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _ScopeHashes:
+    """Ring buffer of (hash, timestamp, key) for one scope"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        capacity = min(max_entries, 64)
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.size = 0
+        self._next = 0  # slot overwritten next once the buffer is full
+
+    def add(self, phash: int, key: str, timestamp: float) -> None:
+        if self.size < len(self.hashes):
+            slot = self.size
+            self.size += 1
+        elif len(self.hashes) < self.max_entries:
+            # Grow geometrically up to the per-scope cap
+            capacity = min(self.max_entries, len(self.hashes) * 2)
+            self.hashes = np.resize(self.hashes, capacity)
+            self.timestamps = np.resize(self.timestamps, capacity)
+            self.keys.extend([None] * (capacity - len(self.keys)))
+            slot = self.size
+            self.size += 1
+        else:
+            slot = self._next
+            self._next = (self._next + 1) % self.max_entries
+
+        self.hashes[slot] = phash
+        self.timestamps[slot] = timestamp
+        self.keys[slot] = key
+
+    def nearest(self, phash: int, max_distance: int, min_timestamp: float) -> Optional[Tuple[str, int, float]]:
+        """Closest recent entry within max_distance as (key, distance, timestamp)"""
+        if self.size == 0:
+            return None
+        distances = np.bitwise_count(self.hashes[:self.size] ^ np.uint64(phash))
+        distances[self.timestamps[:self.size] < min_timestamp] = 255
+        index = int(np.argmin(distances))
+        distance = int(distances[index])
+        if distance > max_distance:
+            return None
+        return self.keys[index], distance, float(self.timestamps[index])
+
+
+class ImageDedupService:
+    """
+    Perceptual-hash index of analyzed images, scoped per farmer and plot
+
+    Args:
+        max_distance: Largest Hamming distance treated as the same image
+        max_age_seconds: Older analyses are not reused
+        max_entries_per_scope: Hashes kept per scope before the oldest are replaced
+    """
+
+    def __init__(
+        self,
+        max_distance: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+        max_entries_per_scope: Optional[int] = None,
+    ):
+        self.max_distance = settings.IMAGE_DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        self.max_age_seconds = max_age_seconds or settings.IMAGE_DEDUP_MAX_AGE_SECONDS
+        self.max_entries_per_scope = max_entries_per_scope or settings.IMAGE_DEDUP_MAX_ENTRIES_PER_SCOPE
+        self._scopes: Dict[str, _ScopeHashes] = {}
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "reused": 0, "stored": 0}
+        self._results = get_cache_manager().namespace(
+            "plant_diagnoses",
+            max_entries=1024,
+            ttl_seconds=self.max_age_seconds,
+            disk=True,
+        )
+
+    @staticmethod
+    def scope_for(
+        farmer_id: Optional[str],
+        plot_id: Optional[str] = None,
+        options: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Scope key for a farmer/plot, or None when the upload is anonymous
+
+        Args:
+            farmer_id: Uploading farmer
+            plot_id: Plot within the farm
+            options: Digest of the request options; analyses run with different
+                options (providers, label, chain mode, ...) are never reused for each other
+        """
+        if not farmer_id:
+            return None
+        return f"{farmer_id}:{plot_id or '-'}:{options or '-'}"
+
+    def find(self, scope: str, phash: int) -> Optional[Tuple[str, int, float]]:
+        """
+        Find the closest recent analysis of a near-duplicate image
+
+        Returns:
+            (result key, Hamming distance, analyzed-at timestamp) or None
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            hashes = self._scopes.get(scope)
+            if hashes is None:
+                return None
+            return hashes.nearest(phash, self.max_distance, time.time() - self.max_age_seconds)
+
+    def add(self, scope: str, phash: int, key: str) -> None:
+        """Index an analyzed image under its result key"""
+        with self._lock:
+            hashes = self._scopes.get(scope)
+            if hashes is None:
+                hashes = self._scopes[scope] = _ScopeHashes(self.max_entries_per_scope)
+            hashes.add(phash, key, time.time())
+            self.stats["stored"] += 1
+
+    async def find_diagnosis(self, scope: str, phash: int) -> Optional[Dict[str, Any]]:
+        """
+        Prior analysis response for a near-duplicate upload, flagged as reused
+
+        Returns:
+            Copy of the stored response with a "near_duplicate" section, or None
+        """
+        match = self.find(scope, phash)
+        if match is None:
+            return None
+        key, distance, analyzed_at = match
+        stored = await asyncio.to_thread(self._results.get, key)
+        if stored is None:
+            return None
+
+        with self._lock:
+            self.stats["reused"] += 1
+        response = copy.deepcopy(stored)
+        response["near_duplicate"] = {
+            "reused": True,
+            "distance": distance,
+            "max_distance": self.max_distance,
+            "analyzed_at": analyzed_at,
+        }
+        return response
+
+    async def remember(self, scope: str, phash: int, key: str, response: Dict[str, Any]) -> None:
+        """Store an analysis response and index its image hash"""
+        await asyncio.to_thread(self._results.set, key, response)
+        self.add(scope, phash, key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Index size and reuse counters"""
+        with self._lock:
+            return {
+                **self.stats,
+                "scopes": len(self._scopes),
+                "hashes": sum(h.size for h in self._scopes.values()),
+                "max_distance": self.max_distance,
+            }
+
+
+# Singleton instance
+_image_dedup_instance: Optional[ImageDedupService] = None
+
+
+def get_image_dedup_service() -> ImageDedupService:
+    """Get singleton ImageDedupService instance"""
+    global _image_dedup_instance
+
+    if _image_dedup_instance is None:
+        _image_dedup_instance = ImageDedupService()
+
+    return _image_dedup_instance
@@ -8,7 +8,9 @@ import asyncio
 import json
 import logging
 import os
+import time
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import Dict, Any, List, Optional, Union, Tuple
 from dataclasses import dataclass
 from datetime import datetime
@@ -17,10 +19,15 @@ import base64
 from app.services.prompt_engineering import AgriculturalPromptEngine
 import aiohttp
 
+from app.connections.http_connection import get_http_pool
+from app.services.provider_guard import get_provider_guard
+from app.services.provider_router import get_provider_router, route_kind
+from app.core.metrics import record_llm_call
 from app.core.config import (
     OPENAI_API_KEY, ANTHROPIC_API_KEY, GEMINI_API_KEY,
     AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT,
-    LLM_MODELS, LLM_VISION_MODELS, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_TIMEOUT
+    LLM_MODELS, LLM_VISION_MODELS, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_TIMEOUT,
+    settings
 )
 logger = logging.getLogger(__name__)
 
@@ -142,13 +149,12 @@ class LLMResponse:
         
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
+        self.session = get_http_pool().aiohttp_session("llm", timeout=LLM_TIMEOUT)
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        self.session = None
     
     def _setup_gemini(self):
         """Setup Gemini provider"""
@@ -774,14 +780,12 @@ class BaseLLMClient(ABC):
         self.session: Optional[aiohttp.ClientSession] = None
     
     async def __aenter__(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT))
+        # Pooled per provider; concurrent callers share its keep-alive connections
+        self.session = get_http_pool().aiohttp_session(f"llm:{self.provider.value}", timeout=LLM_TIMEOUT)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-            self.session = None
+        pass
     
     @abstractmethod
     async def analyze_image(self, image_data: str, prompt: str, response_type: LLMResponseType) -> LLMResponse:
@@ -1218,6 +1222,59 @@ class GoogleClient(BaseLLMClient):
             return self._create_error_response(response_type, str(e))
 
 
+def _response_tokens(response: LLMResponse) -> Optional[int]:
+    """Total tokens of a response from tokens_used or the provider usage block"""
+    if response.tokens_used:
+        return response.tokens_used
+    usage = (response.metadata or {}).get("usage") or {}
+    if not isinstance(usage, dict):
+        return None
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    if usage.get("totalTokenCount"):
+        return usage["totalTokenCount"]
+    tokens = (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    return tokens or None
+
+
+class LatencyHistogram:
+    """Rolling window of call latencies for one provider"""
+    
+    # Upper bounds (seconds) of the buckets reported by snapshot()
+    BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, float("inf"))
+    
+    def __init__(self, window: int):
+        self._samples: deque = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q (0-1), or None without samples"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        counts = [0] * len(self.BUCKETS)
+        for sample in self._samples:
+            for i, bound in enumerate(self.BUCKETS):
+                if sample <= bound:
+                    counts[i] += 1
+                    break
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": {("+Inf" if b == float("inf") else f"{b:g}"): c for b, c in zip(self.BUCKETS, counts)},
+        }
+
+
 class MultiLLMService:
     """
     Production-ready multi-LLM service with provider switching and fallbacks
@@ -1226,7 +1283,14 @@ class MultiLLMService:
     def __init__(self):
         """Initialize multi-LLM service"""
         self.clients = self._initialize_clients()
-        self.provider_health = {provider: True for provider in LLMProvider}
+        self.latency = {
+            provider: LatencyHistogram(settings.LLM_LATENCY_WINDOW) for provider in LLMProvider
+        }
+        # Whether each recent hedgeable request fired a hedge; caps the hedge rate
+        self._hedge_window: deque = deque(maxlen=settings.LLM_LATENCY_WINDOW)
+        self.hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+        self.router = get_provider_router()
+        self.guard = get_provider_guard()
         
     def _initialize_clients(self) -> Dict[LLMProvider, BaseLLMClient]:
         """Initialize all available LLM clients"""
@@ -1242,6 +1306,60 @@ class MultiLLMService:
         logger.info(f"Initialized LLM clients: {list(clients.keys())}")
         return clients
     
+    def _route_name(self, provider: LLMProvider) -> str:
+        client = self.clients.get(provider)
+        return f"{provider.value}:{client.model}" if client else provider.value
+    
+    def _record_outcome(self, provider: LLMProvider, response: LLMResponse, elapsed: float, vision: bool) -> None:
+        """Feed latency, success and token cost of a call to the router and the metrics registry"""
+        tokens = _response_tokens(response)
+        price = settings.LLM_COST_PER_1K_TOKENS.get(provider.value)
+        cost = tokens / 1000 * price if tokens and price is not None else None
+        self.router.record(self._route_name(provider), route_kind(vision), elapsed, response.success, cost)
+        record_llm_call(provider.value, self._model_name(provider), elapsed, response.success, tokens, cost)
+    
+    def _record_failure(self, provider: LLMProvider, elapsed: float, vision: bool) -> None:
+        """Account a call that raised before producing a response"""
+        self.router.record(self._route_name(provider), route_kind(vision), elapsed, False)
+        record_llm_call(provider.value, self._model_name(provider), elapsed, False)
+    
+    def _model_name(self, provider: LLMProvider) -> Optional[str]:
+        client = self.clients.get(provider)
+        return client.model if client else None
+    
+    async def _admit(self, provider: LLMProvider, response_type: LLMResponseType) -> Optional[LLMResponse]:
+        """Fast failure response when the provider's circuit is open or its quota is exhausted"""
+        rejection = await self.guard.acquire(provider.value)
+        if rejection is None:
+            return None
+        return LLMResponse(
+            provider=provider,
+            response_type=response_type,
+            content="",
+            metadata={"rejected": rejection},
+            success=False,
+            error=f"Provider {provider.value} {rejection}"
+        )
+    
+    def _record_guard(self, provider: LLMProvider, response: LLMResponse) -> None:
+        self.guard.record(provider.value, response.success, response.error)
+    
+    def rank_providers(
+        self,
+        providers: List[LLMProvider],
+        vision: bool = True,
+        interactive: bool = True
+    ) -> List[LLMProvider]:
+        """
+        Order providers best-first by observed latency, error rate and cost
+        
+        Ties keep the given order, so pass providers in static preference order.
+        """
+        available = [p for p in providers if p in self.clients]
+        names = {self._route_name(p): p for p in available}
+        ranked = self.router.rank(list(names), route_kind(vision, interactive))
+        return [names[n] for n in ranked]
+    
     async def analyze_image_with_provider(
         self,
         provider: LLMProvider,
@@ -1261,17 +1379,31 @@ class MultiLLMService:
                 error=f"Provider {provider.value} not available"
             )
         
+        rejected = await self._admit(provider, response_type)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
         try:
             async with client:
                 response = await client.analyze_image(image_data, prompt, response_type)
                 
-            # Update provider health
-            self.provider_health[provider] = response.success
+            elapsed = time.monotonic() - started
+            self._record_guard(provider, response)
+            self._record_outcome(provider, response, elapsed, vision=True)
+            if response.success:
+                self.latency[provider].record(elapsed)
             return response
             
+        except asyncio.CancelledError:
+            # A cancelled hedge loser was at least this slow; keep the tail honest
+            self.latency[provider].record(time.monotonic() - started)
+            self.guard.release(provider.value)
+            raise
         except Exception as e:
             logger.error(f"Provider {provider.value} analysis failed: {e}")
-            self.provider_health[provider] = False
+            self.guard.record(provider.value, False, str(e))
+            self._record_failure(provider, time.monotonic() - started, vision=True)
             return client._create_error_response(response_type, str(e))
     
     async def analyze_text_with_provider(
@@ -1292,17 +1424,26 @@ class MultiLLMService:
                 error=f"Provider {provider.value} not available"
             )
         
+        rejected = await self._admit(provider, response_type)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
         try:
             async with client:
                 response = await client.analyze_text(prompt, response_type)
                 
-            # Update provider health
-            self.provider_health[provider] = response.success
+            self._record_guard(provider, response)
+            self._record_outcome(provider, response, time.monotonic() - started, vision=False)
             return response
             
+        except asyncio.CancelledError:
+            self.guard.release(provider.value)
+            raise
         except Exception as e:
             logger.error(f"Provider {provider.value} text analysis failed: {e}")
-            self.provider_health[provider] = False
+            self.guard.record(provider.value, False, str(e))
+            self._record_failure(provider, time.monotonic() - started, vision=False)
             return client._create_error_response(response_type, str(e))
     
     async def parallel_image_analysis(
@@ -1349,12 +1490,146 @@ class MultiLLMService:
         
         return results
     
-    def get_healthy_providers(self) -> List[LLMProvider]:
-        """Get list of currently healthy providers"""
-        return [
-            provider for provider, healthy in self.provider_health.items()
-            if healthy and provider in self.clients
-        ]
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        """Seconds to wait on a provider before hedging (its rolling p90 latency)"""
+        histogram = self.latency[provider]
+        if len(histogram) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(
+            settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            histogram.percentile(settings.LLM_HEDGE_PERCENTILE),
+        )
+    
+    def _hedge_allowed(self) -> bool:
+        if not self._hedge_window:
+            return True
+        return sum(self._hedge_window) / len(self._hedge_window) < settings.LLM_HEDGE_MAX_RATE
+    
+    async def analyze_image_hedged(
+        self,
+        providers: List[LLMProvider],
+        image_data: str,
+        prompt: str,
+        response_type: LLMResponseType
+    ) -> LLMResponse:
+        """
+        Analyze an image with the first provider, hedging to the next on a slow answer
+        
+        If the primary has not answered within hedge_delay(), the same request is
+        sent to the next provider (subject to LLM_HEDGE_MAX_RATE) and the first
+        successful response wins; the other call is cancelled. A provider that
+        fails outright is replaced immediately.
+        
+        Args:
+            providers: Providers in order of preference
+            image_data: Base64 image or data URL
+            prompt: Analysis prompt
+            response_type: Expected response type
+            
+        Returns:
+            LLMResponse: Winning response, or the last failure if every provider failed
+        """
+        candidates = [p for p in providers if p in self.clients]
+        if not candidates:
+            return LLMResponse(
+                provider=providers[0] if providers else LLMProvider.GOOGLE,
+                response_type=response_type,
+                content="",
+                metadata={},
+                success=False,
+                error="No providers available"
+            )
+        
+        self.hedge_stats["requests"] += 1
+        queue = list(candidates)
+        running: Dict[asyncio.Task, LLMProvider] = {}
+        current = candidates[0]
+        hedge_decided = False
+        hedged = False
+        last_failure: Optional[LLMResponse] = None
+        
+        def launch() -> LLMProvider:
+            provider = queue.pop(0)
+            task = asyncio.create_task(
+                self.analyze_image_with_provider(provider, image_data, prompt, response_type)
+            )
+            running[task] = provider
+            return provider
+        
+        launch()
+        try:
+            while running:
+                # At most one hedge per request, timed on the provider currently in flight
+                timeout = None
+                if not hedge_decided and queue and settings.LLM_HEDGE_ENABLED:
+                    timeout = self.hedge_delay(current)
+                done, _ = await asyncio.wait(
+                    running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    hedge_decided = True
+                    hedged = self._hedge_allowed()
+                    self._hedge_window.append(hedged)
+                    if hedged:
+                        self.hedge_stats["hedged"] += 1
+                        logger.info(
+                            f"⏱️ {current.value} slower than {timeout:.1f}s, hedging to {queue[0].value}"
+                        )
+                        launch()
+                    continue
+                
+                for task in done:
+                    provider = running.pop(task)
+                    response = task.result()
+                    if response.success and response.content:
+                        if hedged and provider is not current:
+                            self.hedge_stats["hedge_wins"] += 1
+                        response.metadata["hedged"] = hedged
+                        return response
+                    last_failure = response
+                
+                if not running and queue:
+                    # Every in-flight call failed: fail over right away
+                    self.hedge_stats["failovers"] += 1
+                    current = launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if not hedge_decided:
+                self._hedge_window.append(False)
+        
+        return last_failure or LLMResponse(
+            provider=current,
+            response_type=response_type,
+            content="",
+            metadata={},
+            success=False,
+            error="All providers failed"
+        )
+    
+    def is_provider_healthy(self, provider: LLMProvider, vision: Optional[bool] = None) -> bool:
+        """
+        Whether a provider should currently receive traffic
+        
+        Health comes from the router's rolling error rate, so one failed call no
+        longer excludes a provider, and failing providers are retried after a cooldown.
+        Providers whose circuit is open are unhealthy so callers reroute up front.
+        
+        Args:
+            provider: Provider to check
+            vision: Check vision (True) or text (False) calls; None accepts either
+        """
+        kind = route_kind(vision) if vision is not None else None
+        return (
+            provider in self.clients
+            and self.router.is_healthy(self._route_name(provider), kind)
+            and self.guard.is_available(provider.value)
+        )
+    
+    def get_healthy_providers(self, vision: Optional[bool] = None) -> List[LLMProvider]:
+        """Get list of currently healthy providers (see is_provider_healthy)"""
+        return [provider for provider in self.clients if self.is_provider_healthy(provider, vision)]
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Get comprehensive provider status"""
@@ -1362,10 +1637,17 @@ class MultiLLMService:
             "available_providers": list(self.clients.keys()),
             "healthy_providers": self.get_healthy_providers(),
             "provider_health": {
-                provider.value: status 
-                for provider, status in self.provider_health.items()
+                provider.value: self.is_provider_healthy(provider)
+                for provider in self.clients
             },
-            "total_providers": len(self.clients)
+            "total_providers": len(self.clients),
+            "latency": {
+                provider.value: self.latency[provider].snapshot()
+                for provider in self.clients
+            },
+            "hedging": dict(self.hedge_stats),
+            "routing": self.router.report(),
+            "circuits": self.guard.snapshot()
         }
 
 
@@ -1398,19 +1680,22 @@ async def cleanup_llm_service():
 async def analyze_leaf_image_llm(
     image_bytes: bytes,
     providers: Optional[str] = "auto",
-    prompt: Optional[str] = None
+    prompt: Optional[str] = None,
+    hedge: bool = False
 ) -> Dict[str, Any]:
     """High-level helper to analyze a leaf image across multiple LLM vision providers.
 
     - Encodes the image to base64 (JPEG assumed for MIME in downstream clients).
     - Selects providers: "auto" uses healthy providers, "all" uses all initialized, or a comma list.
     - Uses provided prompt or a sensible default.
+    - With hedge=True, asks the selected providers in order and keeps only the first
+      valid answer (see MultiLLMService.analyze_image_hedged) instead of waiting for all.
     - Returns a normalized payload with per-provider results.
     """
     service = get_llm_service()
     b64 = base64.b64encode(image_bytes).decode("utf-8")
 
-    available = service.get_healthy_providers() or list(service.clients.keys())
+    available = service.get_healthy_providers(vision=True) or list(service.clients.keys())
     if providers and providers not in ("auto", "all"):
         req = [p.strip().lower() for p in providers.split(",") if p.strip()]
         selected: List[LLMProvider] = []
@@ -1439,6 +1724,32 @@ async def analyze_leaf_image_llm(
     prompts = {p: effective_prompt for p in selected}
     rtypes = {p: LLMResponseType.LLM_VISION_ANALYSIS for p in selected}
 
+    if hedge:
+        # Best healthy provider first (explicit lists keep the caller's order);
+        # unhealthy ones are only last-resort failovers
+        healthy = set(service.get_healthy_providers(vision=True))
+        ordered = [p for p in selected if p in healthy]
+        if providers in (None, "auto", "all"):
+            ordered = service.rank_providers(ordered, vision=True)
+        selected = ordered + [p for p in selected if p not in healthy]
+        response = await service.analyze_image_hedged(
+            selected, b64, effective_prompt, LLMResponseType.LLM_VISION_ANALYSIS
+        )
+        provider = response.provider.value if isinstance(response.provider, LLMProvider) else str(response.provider)
+        if not (response.success and response.content):
+            # Every provider failed; the last failure is reported for diagnostics
+            return {
+                "status": "error",
+                "error": response.error or "all_providers_failed",
+                "providers": [p.value for p in selected],
+                "responses": {provider: response.to_dict()}
+            }
+        return {
+            "status": "success",
+            "providers": [p.value for p in selected],
+            "responses": {provider: response.to_dict()}
+        }
+
     results = await service.parallel_image_analysis(selected, b64, prompts, rtypes)
     return {
         "status": "success",
@@ -1,4 +1,3 @@
-import httpx
 import logging
 from typing import Dict, Any, Optional, List
 import asyncio
@@ -6,6 +5,7 @@ from datetime import datetime, timedelta
 import json
 import os
 from app.core.config import settings
+from app.connections.http_connection import get_http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -78,98 +78,94 @@ class MandiMarketService:
         try:
             logger.info(f"🔑 Using eNAM API key: {self.enam_api_key[:10]}...")
             
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=False,  # Skip SSL verification for testing
-                follow_redirects=True
-            ) as client:
-                
-                # Step 1: Get mandi list
-                mandi_url = f"{self.enam_base_url}/mandi-list"
-                mandi_params = {
-                    "apikey": self.enam_api_key,
-                    "state": state or "all",
-                    "district": district or "all"
-                }
-                
-                logger.info(f"🌍 Requesting mandi list: {mandi_url}")
-                mandi_response = await client.get(mandi_url, params=mandi_params)
+            client = get_http_pool().httpx_client("mandi:enam", timeout=self.timeout, verify=False, follow_redirects=True)
+            
+            # Step 1: Get mandi list
+            mandi_url = f"{self.enam_base_url}/mandi-list"
+            mandi_params = {
+                "apikey": self.enam_api_key,
+                "state": state or "all",
+                "district": district or "all"
+            }
+            
+            logger.info(f"🌍 Requesting mandi list: {mandi_url}")
+            mandi_response = await client.get(mandi_url, params=mandi_params)
+            
+            logger.info(f"📡 Mandi list response: {mandi_response.status_code}")
+            
+            if mandi_response.status_code == 200:
+                mandis = mandi_response.json()
+                if not mandis:
+                    logger.warning("No mandis found for the specified location")
+                    return None
                 
-                logger.info(f"📡 Mandi list response: {mandi_response.status_code}")
+                logger.info(f"✅ Found {len(mandis)} mandis")
                 
-                if mandi_response.status_code == 200:
-                    mandis = mandi_response.json()
-                    if not mandis:
-                        logger.warning("No mandis found for the specified location")
-                        return None
-                    
-                    logger.info(f"✅ Found {len(mandis)} mandis")
-                    
-                    # Step 2: Get price data for each mandi
-                    price_data = []
-                    for mandi in mandis[:5]:  # Limit to 5 mandis for performance
-                        try:
-                            price_url = f"{self.enam_base_url}/mandi-price"
-                            price_params = {
-                                "apikey": self.enam_api_key,
-                                "crop": crop_name,
-                                "mandi_id": mandi.get("id"),
-                                "date": datetime.now().strftime("%Y-%m-%d")
-                            }
-                            
-                            logger.info(f"💰 Getting price for {crop_name} at {mandi.get('name', 'Unknown')}")
-                            price_response = await client.get(price_url, params=price_params)
-                            
-                            if price_response.status_code == 200:
-                                price_info = price_response.json()
-                                if price_info and price_info.get("price", 0) > 0:
-                                    price_data.append({
-                                        "mandi_id": mandi.get("id"),
-                                        "mandi_name": mandi.get("name", "Unknown"),
-                                        "state": mandi.get("state", "Unknown"),
-                                        "district": mandi.get("district", "Unknown"),
-                                        "price": price_info.get("price", 0),
-                                        "arrival": price_info.get("arrival", 0),
-                                        "quality": price_info.get("quality", "Standard"),
-                                        "date": price_info.get("date", datetime.now().strftime("%Y-%m-%d"))
-                                    })
-                                    logger.info(f"✅ Price data: ₹{price_info.get('price', 0)}/quintal")
-                                else:
-                                    logger.warning(f"No price data available for {crop_name} at {mandi.get('name')}")
-                            else:
-                                logger.warning(f"Price API error for {mandi.get('name')}: {price_response.status_code}")
-                                
-                        except Exception as e:
-                            logger.warning(f"Error fetching price for {mandi.get('name')}: {e}")
-                            continue
-                    
-                    if price_data:
-                        logger.info(f"✅ Successfully fetched price data from {len(price_data)} mandis")
-                        return {
-                            "mandis": mandis,
-                            "price_data": price_data,
-                            "source": "eNAM",
-                            "api_key_status": "valid"
+                # Step 2: Get price data for each mandi
+                price_data = []
+                for mandi in mandis[:5]:  # Limit to 5 mandis for performance
+                    try:
+                        price_url = f"{self.enam_base_url}/mandi-price"
+                        price_params = {
+                            "apikey": self.enam_api_key,
+                            "crop": crop_name,
+                            "mandi_id": mandi.get("id"),
+                            "date": datetime.now().strftime("%Y-%m-%d")
                         }
-                    else:
-                        logger.warning("No valid price data found from any mandi")
-                        return None
                         
-                elif mandi_response.status_code == 401:
-                    logger.error("❌ eNAM API key is invalid!")
-                    logger.error(f"🔑 API key used: {self.enam_api_key[:10]}...")
-                    return None
-                elif mandi_response.status_code == 403:
-                    logger.error("❌ eNAM API access forbidden - check subscription")
-                    return None
-                elif mandi_response.status_code == 429:
-                    logger.error("❌ eNAM API rate limit exceeded")
-                    return None
+                        logger.info(f"💰 Getting price for {crop_name} at {mandi.get('name', 'Unknown')}")
+                        price_response = await client.get(price_url, params=price_params)
+                        
+                        if price_response.status_code == 200:
+                            price_info = price_response.json()
+                            if price_info and price_info.get("price", 0) > 0:
+                                price_data.append({
+                                    "mandi_id": mandi.get("id"),
+                                    "mandi_name": mandi.get("name", "Unknown"),
+                                    "state": mandi.get("state", "Unknown"),
+                                    "district": mandi.get("district", "Unknown"),
+                                    "price": price_info.get("price", 0),
+                                    "arrival": price_info.get("arrival", 0),
+                                    "quality": price_info.get("quality", "Standard"),
+                                    "date": price_info.get("date", datetime.now().strftime("%Y-%m-%d"))
+                                })
+                                logger.info(f"✅ Price data: ₹{price_info.get('price', 0)}/quintal")
+                            else:
+                                logger.warning(f"No price data available for {crop_name} at {mandi.get('name')}")
+                        else:
+                            logger.warning(f"Price API error for {mandi.get('name')}: {price_response.status_code}")
+                            
+                    except Exception as e:
+                        logger.warning(f"Error fetching price for {mandi.get('name')}: {e}")
+                        continue
+                
+                if price_data:
+                    logger.info(f"✅ Successfully fetched price data from {len(price_data)} mandis")
+                    return {
+                        "mandis": mandis,
+                        "price_data": price_data,
+                        "source": "eNAM",
+                        "api_key_status": "valid"
+                    }
                 else:
-                    logger.error(f"eNAM mandi list API error: {mandi_response.status_code}")
-                    logger.error(f"Response: {mandi_response.text[:200]}...")
+                    logger.warning("No valid price data found from any mandi")
                     return None
-                
+                    
+            elif mandi_response.status_code == 401:
+                logger.error("❌ eNAM API key is invalid!")
+                logger.error(f"🔑 API key used: {self.enam_api_key[:10]}...")
+                return None
+            elif mandi_response.status_code == 403:
+                logger.error("❌ eNAM API access forbidden - check subscription")
+                return None
+            elif mandi_response.status_code == 429:
+                logger.error("❌ eNAM API rate limit exceeded")
+                return None
+            else:
+                logger.error(f"eNAM mandi list API error: {mandi_response.status_code}")
+                logger.error(f"Response: {mandi_response.text[:200]}...")
+                return None
+            
         except Exception as e:
             logger.error(f"eNAM API error: {e}")
             return None
@@ -183,82 +179,78 @@ class MandiMarketService:
         try:
             logger.info(f"🔑 Using Agmarknet API key: {self.agmarknet_api_key[:10]}...")
             
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=False,  # Skip SSL verification for testing
-                follow_redirects=True
-            ) as client:
+            client = get_http_pool().httpx_client("mandi:agmarknet", timeout=self.timeout, verify=False, follow_redirects=True)
+            
+            # Step 1: Get commodity list to validate crop name
+            commodity_url = f"{self.agmarknet_base_url}/commodities"
+            commodity_params = {
+                "apikey": self.agmarknet_api_key
+            }
+            
+            logger.info(f"🌾 Getting commodity list from Agmarknet")
+            commodity_response = await client.get(commodity_url, params=commodity_params)
+            
+            if commodity_response.status_code == 200:
+                commodities = commodity_response.json()
+                # Find matching commodity
+                matching_commodity = None
+                for commodity in commodities:
+                    if crop_name.lower() in commodity.get("name", "").lower():
+                        matching_commodity = commodity
+                        break
+                
+                if not matching_commodity:
+                    logger.warning(f"Commodity '{crop_name}' not found in Agmarknet")
+                    return None
                 
-                # Step 1: Get commodity list to validate crop name
-                commodity_url = f"{self.agmarknet_base_url}/commodities"
-                commodity_params = {
-                    "apikey": self.agmarknet_api_key
+                commodity_id = matching_commodity.get("id")
+                logger.info(f"✅ Found commodity: {matching_commodity.get('name')} (ID: {commodity_id})")
+                
+                # Step 2: Get price data
+                price_url = f"{self.agmarknet_base_url}/price-data"
+                price_params = {
+                    "apikey": self.agmarknet_api_key,
+                    "commodity_id": commodity_id,
+                    "state": state or "all",
+                    "district": district or "all",
+                    "date": datetime.now().strftime("%Y-%m-%d"),
+                    "limit": 10
                 }
                 
-                logger.info(f"🌾 Getting commodity list from Agmarknet")
-                commodity_response = await client.get(commodity_url, params=commodity_params)
+                logger.info(f"💰 Getting price data for {crop_name}")
+                price_response = await client.get(price_url, params=price_params)
                 
-                if commodity_response.status_code == 200:
-                    commodities = commodity_response.json()
-                    # Find matching commodity
-                    matching_commodity = None
-                    for commodity in commodities:
-                        if crop_name.lower() in commodity.get("name", "").lower():
-                            matching_commodity = commodity
-                            break
-                    
-                    if not matching_commodity:
-                        logger.warning(f"Commodity '{crop_name}' not found in Agmarknet")
-                        return None
-                    
-                    commodity_id = matching_commodity.get("id")
-                    logger.info(f"✅ Found commodity: {matching_commodity.get('name')} (ID: {commodity_id})")
-                    
-                    # Step 2: Get price data
-                    price_url = f"{self.agmarknet_base_url}/price-data"
-                    price_params = {
-                        "apikey": self.agmarknet_api_key,
-                        "commodity_id": commodity_id,
-                        "state": state or "all",
-                        "district": district or "all",
-                        "date": datetime.now().strftime("%Y-%m-%d"),
-                        "limit": 10
-                    }
-                    
-                    logger.info(f"💰 Getting price data for {crop_name}")
-                    price_response = await client.get(price_url, params=price_params)
-                    
-                    logger.info(f"📡 Price data response: {price_response.status_code}")
-                    
-                    if price_response.status_code == 200:
-                        price_data = price_response.json()
-                        if price_data and len(price_data) > 0:
-                            logger.info(f"✅ Successfully fetched {len(price_data)} price records from Agmarknet")
-                            return {
-                                "data": price_data,
-                                "commodity_info": matching_commodity,
-                                "source": "Agmarknet",
-                                "api_key_status": "valid"
-                            }
-                        else:
-                            logger.warning("No price data available for the specified criteria")
-                            return None
+                logger.info(f"📡 Price data response: {price_response.status_code}")
+                
+                if price_response.status_code == 200:
+                    price_data = price_response.json()
+                    if price_data and len(price_data) > 0:
+                        logger.info(f"✅ Successfully fetched {len(price_data)} price records from Agmarknet")
+                        return {
+                            "data": price_data,
+                            "commodity_info": matching_commodity,
+                            "source": "Agmarknet",
+                            "api_key_status": "valid"
+                        }
                     else:
-                        logger.error(f"Agmarknet price API error: {price_response.status_code}")
-                        logger.error(f"Response: {price_response.text[:200]}...")
+                        logger.warning("No price data available for the specified criteria")
                         return None
-                        
-                elif commodity_response.status_code == 401:
-                    logger.error("❌ Agmarknet API key is invalid!")
-                    logger.error(f"🔑 API key used: {self.agmarknet_api_key[:10]}...")
-                    return None
-                elif commodity_response.status_code == 403:
-                    logger.error("❌ Agmarknet API access forbidden - check subscription")
-                    return None
                 else:
-                    logger.error(f"Agmarknet commodity API error: {commodity_response.status_code}")
+                    logger.error(f"Agmarknet price API error: {price_response.status_code}")
+                    logger.error(f"Response: {price_response.text[:200]}...")
                     return None
-                
+                    
+            elif commodity_response.status_code == 401:
+                logger.error("❌ Agmarknet API key is invalid!")
+                logger.error(f"🔑 API key used: {self.agmarknet_api_key[:10]}...")
+                return None
+            elif commodity_response.status_code == 403:
+                logger.error("❌ Agmarknet API access forbidden - check subscription")
+                return None
+            else:
+                logger.error(f"Agmarknet commodity API error: {commodity_response.status_code}")
+                return None
+            
         except Exception as e:
             logger.error(f"Agmarknet API error: {e}")
             return None
@@ -268,77 +260,73 @@ class MandiMarketService:
         try:
             logger.info(f"🔑 Using data.gov.in API key: {self.data_gov_api_key[:10]}...")
             
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
-                verify=True,
-                follow_redirects=True
-            ) as client:
-                
-                # Build query parameters
-                params = {
-                    "api-key": self.data_gov_api_key,
-                    "format": "json",
-                    "limit": 50,
-                    "offset": 0
-                }
-                
-                # Add filters if provided
-                if state and state != "All":
-                    params["filters[State]"] = state
-                if district and district != "All":
-                    params["filters[District]"] = district
-                
-                # Map crop names to commodity names used in the API
-                commodity_mapping = {
-                    "rice": "Rice",
-                    "wheat": "Wheat", 
-                    "maize": "Maize",
-                    "cotton": "Cotton",
-                    "sugarcane": "Sugarcane",
-                    "chickpea": "Gram",
-                    "lentil": "Lentil",
-                    "soybean": "Soybean",
-                    "onion": "Onion",
-                    "potato": "Potato",
-                    "tomato": "Tomato",
-                    "banana": "Banana",
-                    "mango": "Mango",
-                    "orange": "Orange",
-                    "grapes": "Grapes"
-                }
-                
-                commodity_name = commodity_mapping.get(crop_name.lower(), crop_name.title())
-                params["filters[Commodity]"] = commodity_name
-                
-                logger.info(f"🌾 Getting market data for {commodity_name} from data.gov.in")
-                logger.info(f"🔗 URL: {self.data_gov_base_url}")
-                logger.info(f"📋 Params: {params}")
-                
-                response = await client.get(self.data_gov_base_url, params=params)
-                
-                logger.info(f"📡 Response status: {response.status_code}")
+            client = get_http_pool().httpx_client("mandi:data_gov", timeout=self.timeout, verify=True, follow_redirects=True)
+            
+            # Build query parameters
+            params = {
+                "api-key": self.data_gov_api_key,
+                "format": "json",
+                "limit": 50,
+                "offset": 0
+            }
+            
+            # Add filters if provided
+            if state and state != "All":
+                params["filters[State]"] = state
+            if district and district != "All":
+                params["filters[District]"] = district
+            
+            # Map crop names to commodity names used in the API
+            commodity_mapping = {
+                "rice": "Rice",
+                "wheat": "Wheat", 
+                "maize": "Maize",
+                "cotton": "Cotton",
+                "sugarcane": "Sugarcane",
+                "chickpea": "Gram",
+                "lentil": "Lentil",
+                "soybean": "Soybean",
+                "onion": "Onion",
+                "potato": "Potato",
+                "tomato": "Tomato",
+                "banana": "Banana",
+                "mango": "Mango",
+                "orange": "Orange",
+                "grapes": "Grapes"
+            }
+            
+            commodity_name = commodity_mapping.get(crop_name.lower(), crop_name.title())
+            params["filters[Commodity]"] = commodity_name
+            
+            logger.info(f"🌾 Getting market data for {commodity_name} from data.gov.in")
+            logger.info(f"🔗 URL: {self.data_gov_base_url}")
+            logger.info(f"📋 Params: {params}")
+            
+            response = await client.get(self.data_gov_base_url, params=params)
+            
+            logger.info(f"📡 Response status: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                records = data.get("records", [])
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    records = data.get("records", [])
-                    
-                    if records and len(records) > 0:
-                        logger.info(f"✅ Successfully fetched {len(records)} records from data.gov.in")
-                        return {
-                            "data": records,
-                            "total": data.get("total", len(records)),
-                            "source": "data.gov.in",
-                            "api_key_status": "valid",
-                            "commodity": commodity_name
-                        }
-                    else:
-                        logger.warning(f"No market data found for {commodity_name}")
-                        return None
+                if records and len(records) > 0:
+                    logger.info(f"✅ Successfully fetched {len(records)} records from data.gov.in")
+                    return {
+                        "data": records,
+                        "total": data.get("total", len(records)),
+                        "source": "data.gov.in",
+                        "api_key_status": "valid",
+                        "commodity": commodity_name
+                    }
                 else:
-                    logger.error(f"data.gov.in API error: {response.status_code}")
-                    logger.error(f"Response: {response.text[:200]}...")
+                    logger.warning(f"No market data found for {commodity_name}")
                     return None
-                    
+            else:
+                logger.error(f"data.gov.in API error: {response.status_code}")
+                logger.error(f"Response: {response.text[:200]}...")
+                return None
+                
         except Exception as e:
             logger.error(f"data.gov.in API error: {e}")
             return None
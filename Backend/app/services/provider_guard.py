@@ -0,0 +1,277 @@
+"""
+Provider Guard - Circuit breakers and rate limiting for LLM providers
+
+Each provider gets a circuit breaker (closed / open / half-open with probe
+requests) and a token bucket sized to the account's requests-per-minute quota.
+While a provider is failing or out of quota, calls are rejected in
+milliseconds so callers can reroute, instead of every request waiting out
+LLM_TIMEOUT. State is shared by every service that talks to the same provider.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Error text that means the provider is throttling us (HTTP 429 / quota)
+_RATE_LIMIT_PATTERN = re.compile(r"\b429\b|rate.?limit|quota|resource.?exhausted", re.IGNORECASE)
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Opens after failure_threshold consecutive failures (or immediately when the
+    provider throttles us). After reset_seconds up to half_open_probes requests
+    are let through; a successful probe closes the circuit, a failed one reopens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None,
+    ):
+        self.failure_threshold = failure_threshold or settings.LLM_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = settings.LLM_CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.half_open_probes = half_open_probes or settings.LLM_CIRCUIT_HALF_OPEN_PROBES
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probes_in_flight = 0
+
+    def _reset_elapsed(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.reset_seconds
+
+    def is_available(self) -> bool:
+        """Whether a request would currently be let through (does not reserve a probe)"""
+        if self.state is CircuitState.OPEN:
+            return self._reset_elapsed()
+        if self.state is CircuitState.HALF_OPEN:
+            return self._probes_in_flight < self.half_open_probes
+        return True
+
+    def allow(self) -> bool:
+        """Admit a request; in half-open state this reserves a probe slot"""
+        if self.state is CircuitState.OPEN and self._reset_elapsed():
+            self.state = CircuitState.HALF_OPEN
+            self._probes_in_flight = 0
+
+        if self.state is CircuitState.OPEN:
+            self.rejected += 1
+            return False
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a probe slot for a request that ended without an outcome"""
+        if self.state is CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state is not CircuitState.CLOSED:
+            self.state = CircuitState.CLOSED
+            self._probes_in_flight = 0
+
+    def record_failure(self, trip: bool = False) -> bool:
+        """
+        Record a failed request
+
+        Args:
+            trip: Open the circuit regardless of the failure count (throttling)
+
+        Returns:
+            bool: True if this failure opened the circuit
+        """
+        self.consecutive_failures += 1
+        if self.state is CircuitState.OPEN:
+            return False
+        if trip or self.state is CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._probes_in_flight = 0
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+
+    Reservations may drive the balance negative; later callers then wait their
+    turn behind earlier ones, which keeps queued requests roughly FIFO.
+
+    Args:
+        requests_per_minute: Sustained rate
+        burst_seconds: Capacity expressed in seconds of quota
+    """
+
+    def __init__(self, requests_per_minute: float, burst_seconds: Optional[float] = None):
+        burst_seconds = settings.LLM_RATE_LIMIT_BURST_SECONDS if burst_seconds is None else burst_seconds
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.throttled = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token, possibly from the future
+
+        Returns:
+            Optional[float]: Seconds to wait before sending, or None if that exceeds max_wait
+        """
+        self._refill()
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            self.throttled += 1
+            return None
+        self.tokens -= 1
+        return wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "requests_per_minute": round(self.rate * 60, 2),
+            "available": round(self.tokens, 2),
+            "throttled": self.throttled,
+        }
+
+
+class ProviderGuard:
+    """
+    Circuit breaker and rate limiter per provider
+
+    Usage:
+        rejection = await guard.acquire("openai")
+        if rejection: reroute / fail fast
+        ... call provider ...
+        guard.record("openai", success, error)   # or guard.release() on cancellation
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker()
+        return breaker
+
+    def bucket(self, name: str) -> Optional[TokenBucket]:
+        if name not in self._buckets:
+            rpm = settings.LLM_RATE_LIMITS.get(name, 0)
+            self._buckets[name] = TokenBucket(rpm) if rpm > 0 else None
+        return self._buckets[name]
+
+    def is_available(self, name: str) -> bool:
+        """Whether the provider's circuit would admit a request right now"""
+        return self.breaker(name).is_available()
+
+    async def acquire(self, name: str, max_wait: Optional[float] = None) -> Optional[str]:
+        """
+        Admit a request to a provider, queueing briefly for quota
+
+        Args:
+            name: Provider name
+            max_wait: Longest acceptable wait for quota (LLM_RATE_LIMIT_MAX_WAIT_SECONDS)
+
+        Returns:
+            Optional[str]: None when admitted, otherwise the rejection reason
+        """
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            return "circuit open"
+
+        bucket = self.bucket(name)
+        if bucket is None:
+            return None
+
+        wait = bucket.reserve(settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait)
+        if wait is None:
+            breaker.release()
+            return "rate limited"
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+        return None
+
+    def release(self, name: str) -> None:
+        """End an admitted request without an outcome (e.g. cancelled hedge)"""
+        self.breaker(name).release()
+
+    def record(self, name: str, success: bool, error: Optional[str] = None) -> None:
+        """Record the outcome of an admitted request"""
+        breaker = self.breaker(name)
+        if success:
+            breaker.record_success()
+            return
+
+        throttled = bool(error and _RATE_LIMIT_PATTERN.search(error))
+        if breaker.record_failure(trip=throttled):
+            reason = "throttled" if throttled else f"{breaker.consecutive_failures} consecutive failures"
+            logger.warning(f"🔌 Circuit opened for {name} ({reason}); retrying in {breaker.reset_seconds:.0f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Breaker and bucket state per provider"""
+        names = set(self._breakers) | {n for n, b in self._buckets.items() if b is not None}
+        result = {}
+        for name in sorted(names):
+            bucket = self.bucket(name)
+            result[name] = {
+                "circuit": self.breaker(name).snapshot(),
+                "rate_limit": bucket.snapshot() if bucket else None,
+            }
+        return result
+
+
+# Singleton instance
+_provider_guard_instance: Optional[ProviderGuard] = None
+
+
+def get_provider_guard() -> ProviderGuard:
+    """Get singleton ProviderGuard instance"""
+    global _provider_guard_instance
+
+    if _provider_guard_instance is None:
+        _provider_guard_instance = ProviderGuard()
+
+    return _provider_guard_instance
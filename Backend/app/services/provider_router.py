@@ -0,0 +1,271 @@
+"""
+Provider Router - Latency/cost-aware selection between LLM providers
+
+Keeps exponentially weighted latency, error rate and cost per provider/model,
+separately for vision and text calls, and ranks candidates for a request kind
+(vision vs text, interactive vs batch). Latency and cost are scored against fixed
+references (the prior latency / reference cost, or the caller's budget), so a
+candidate's score does not depend on which other candidates are in the list.
+A small exploration rate keeps estimates fresh for providers that are not
+currently winning. Recent decisions are kept for reporting.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Request kinds and how much each metric matters (lower score wins)
+ROUTE_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "vision_interactive": {"latency": 0.5, "errors": 0.4, "cost": 0.1},
+    "vision_batch": {"latency": 0.15, "errors": 0.45, "cost": 0.4},
+    "text_interactive": {"latency": 0.45, "errors": 0.4, "cost": 0.15},
+    "text_batch": {"latency": 0.1, "errors": 0.4, "cost": 0.5},
+}
+
+
+def route_kind(vision: bool, interactive: bool = True) -> str:
+    """Name of the route profile for a request"""
+    return f"{'vision' if vision else 'text'}_{'interactive' if interactive else 'batch'}"
+
+
+def _modality(kind: str) -> str:
+    """Stats partition for a route kind: vision and text calls differ in latency and cost"""
+    return kind.split("_", 1)[0]
+
+
+@dataclass
+class CandidateStats:
+    """Rolling estimates for one provider/model"""
+    ewma_latency: Optional[float] = None  # seconds, successful calls
+    ewma_error_rate: float = 0.0
+    ewma_cost: Optional[float] = None  # per request
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_failure_at: float = 0.0
+
+
+@dataclass
+class RouteDecision:
+    """One routing decision, kept for reporting"""
+    timestamp: float
+    kind: str
+    chosen: str
+    explored: bool
+    scores: Dict[str, float]
+
+
+class AdaptiveRouter:
+    """
+    Ranks provider/model candidates by EWMA latency, error rate and cost
+
+    Estimates are kept per (candidate, modality), where the modality is the
+    vision/text part of the route kind.
+
+    Args:
+        alpha: EWMA smoothing factor (weight of the newest observation)
+        explore_rate: Probability of routing to a non-best candidate
+        rng: Random source (inject a seeded one for reproducible tests)
+    """
+
+    def __init__(
+        self,
+        alpha: Optional[float] = None,
+        explore_rate: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.alpha = settings.LLM_ROUTER_EWMA_ALPHA if alpha is None else alpha
+        self.explore_rate = settings.LLM_ROUTER_EXPLORE_RATE if explore_rate is None else explore_rate
+        self.rng = rng or random.Random()
+        self._stats: Dict[Tuple[str, str], CandidateStats] = {}
+        self._decisions: deque = deque(maxlen=settings.LLM_ROUTER_DECISION_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, modality: str) -> CandidateStats:
+        stats = self._stats.get((name, modality))
+        if stats is None:
+            stats = self._stats[(name, modality)] = CandidateStats()
+        return stats
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return (1 - self.alpha) * current + self.alpha * value
+
+    def record(
+        self,
+        name: str,
+        kind: str,
+        latency_seconds: float,
+        success: bool,
+        cost: Optional[float] = None,
+    ) -> None:
+        """Record the outcome of one call of a route kind"""
+        with self._lock:
+            stats = self._get(name, _modality(kind))
+            stats.requests += 1
+            stats.ewma_error_rate = self._ewma(stats.ewma_error_rate, 0.0 if success else 1.0)
+            if success:
+                stats.consecutive_failures = 0
+                stats.ewma_latency = self._ewma(stats.ewma_latency, latency_seconds)
+                if cost is not None:
+                    stats.ewma_cost = self._ewma(stats.ewma_cost, cost)
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                stats.last_failure_at = time.time()
+
+    @staticmethod
+    def _stats_healthy(stats: CandidateStats) -> bool:
+        failing = (
+            stats.ewma_error_rate >= settings.LLM_ROUTER_UNHEALTHY_ERROR_RATE
+            or stats.consecutive_failures >= 3
+        )
+        if not failing:
+            return True
+        return time.time() - stats.last_failure_at >= settings.LLM_ROUTER_RETRY_UNHEALTHY_SECONDS
+
+    def is_healthy(self, name: str, kind: Optional[str] = None) -> bool:
+        """
+        Unhealthy while the error rate is high or failures are consecutive,
+        until LLM_ROUTER_RETRY_UNHEALTHY_SECONDS pass so the provider gets retried
+
+        Args:
+            name: Provider/model name
+            kind: Route kind to check; None means healthy for at least one modality
+        """
+        with self._lock:
+            if kind is not None:
+                stats = self._stats.get((name, _modality(kind)))
+                return stats is None or self._stats_healthy(stats)
+            partitions = [s for (n, _), s in self._stats.items() if n == name]
+            return not partitions or any(self._stats_healthy(s) for s in partitions)
+
+    def _scores(
+        self,
+        candidates: Sequence[str],
+        kind: str,
+        max_latency_seconds: Optional[float],
+        max_cost: Optional[float],
+    ) -> Dict[str, float]:
+        weights = ROUTE_WEIGHTS.get(kind, ROUTE_WEIGHTS["text_interactive"])
+        prior_latency = settings.LLM_ROUTER_PRIOR_LATENCY_SECONDS
+        modality = _modality(kind)
+        with self._lock:
+            snapshot = {name: self._stats.get((name, modality)) or CandidateStats() for name in candidates}
+
+        # Candidates without samples assume the prior latency and no errors. Failed
+        # calls are retried elsewhere, so expected latency grows with the error rate
+        latencies = {
+            n: (s.ewma_latency if s.ewma_latency is not None else prior_latency) / (1 - min(s.ewma_error_rate, 0.9))
+            for n, s in snapshot.items()
+        }
+        costs = {n: s.ewma_cost or 0.0 for n, s in snapshot.items()}
+        # Fixed references: the caller's budget when given, else the configured defaults
+        latency_ref = max_latency_seconds or prior_latency or 1.0
+        cost_ref = max_cost or settings.LLM_ROUTER_REFERENCE_COST_USD or 1.0
+
+        scores = {}
+        for name, stats in snapshot.items():
+            score = (
+                weights["latency"] * latencies[name] / latency_ref
+                + weights["errors"] * stats.ewma_error_rate
+                + weights["cost"] * costs[name] / cost_ref
+            )
+            # Budget violations sort after every compliant candidate
+            if max_latency_seconds is not None and latencies[name] > max_latency_seconds:
+                score += 1.0
+            if max_cost is not None and costs[name] > max_cost:
+                score += 1.0
+            scores[name] = round(score, 4)
+        return scores
+
+    def rank(
+        self,
+        candidates: Sequence[str],
+        kind: str,
+        max_latency_seconds: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        explore: bool = True,
+    ) -> List[str]:
+        """
+        Order candidates best-first for a request kind
+
+        Ties keep the caller's order, so pass candidates in static preference order.
+        With probability explore_rate a non-best candidate is moved to the front.
+
+        Args:
+            candidates: Provider/model names
+            kind: Route profile (see ROUTE_WEIGHTS / route_kind)
+            max_latency_seconds: Soft latency budget
+            max_cost: Soft per-request cost budget
+            explore: Allow exploration for this decision
+
+        Returns:
+            List[str]: Candidates, best first
+        """
+        candidates = list(dict.fromkeys(candidates))
+        if len(candidates) <= 1:
+            return candidates
+
+        scores = self._scores(candidates, kind, max_latency_seconds, max_cost)
+        ranked = sorted(candidates, key=lambda n: scores[n])
+
+        explored = False
+        if explore and self.rng.random() < self.explore_rate:
+            pick = self.rng.choice(ranked[1:])
+            ranked.remove(pick)
+            ranked.insert(0, pick)
+            explored = True
+
+        self._decisions.append(RouteDecision(
+            timestamp=time.time(), kind=kind, chosen=ranked[0], explored=explored, scores=scores
+        ))
+        if explored:
+            logger.debug(f"🎲 Router exploring {ranked[0]} for {kind}")
+        return ranked
+
+    def choose(self, candidates: Sequence[str], kind: str, **kwargs) -> str:
+        """Best candidate for a request kind (see rank)"""
+        ranked = self.rank(candidates, kind, **kwargs)
+        if not ranked:
+            raise ValueError("No candidates to route between")
+        return ranked[0]
+
+    def report(self, recent: int = 20) -> Dict[str, Any]:
+        """Per-candidate estimates (by modality) and the most recent decisions"""
+        with self._lock:
+            stats: Dict[str, Dict[str, Any]] = {}
+            for (name, modality), s in self._stats.items():
+                stats.setdefault(name, {})[modality] = asdict(s)
+            decisions = [asdict(d) for d in list(self._decisions)[-recent:]]
+        explored = sum(1 for d in self._decisions if d.explored)
+        return {
+            "candidates": stats,
+            "decisions": decisions,
+            "decision_count": len(self._decisions),
+            "explored": explored,
+        }
+
+
+# Singleton instance
+_router_instance: Optional[AdaptiveRouter] = None
+
+
+def get_provider_router() -> AdaptiveRouter:
+    """Get singleton AdaptiveRouter instance"""
+    global _router_instance
+
+    if _router_instance is None:
+        _router_instance = AdaptiveRouter()
+
+    return _router_instance
@@ -0,0 +1,353 @@
+"""
+Shelf Life Service - Sensor-driven remaining shelf life for stored lots
+
+The intake grade from StorageGuardAgent gives each lot a shelf life at reference
+storage conditions. This service re-estimates how much of it has been used up from
+the temperature/humidity history of the lot's storage location using Q10
+(respiration rate) kinetics:
+
+    rate(t) = Q10 ** ((T(t) - T_ref) / 10) * humidity_factor(RH(t))
+
+Each hour in storage consumes rate(t) hours of reference shelf life. The sweep is
+vectorized: per crop group it builds an hourly rate matrix for all locations, takes
+a cumulative sum, and reads every lot's consumption as the difference of two entries.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.schemas import postgres_base as models
+
+logger = logging.getLogger(__name__)
+
+
+MODEL_VERSION = "q10-v1"
+
+# Reference storage temperature (°C), Q10, optimal RH band (%) and default shelf
+# life (days) at reference conditions. Approximate postharvest handbook values.
+CROP_KINETICS: Dict[str, Tuple[float, float, float, float, float]] = {
+    "tomato": (12.0, 2.5, 85.0, 95.0, 14.0),
+    "potato": (8.0, 2.0, 90.0, 95.0, 90.0),
+    "onion": (1.0, 2.0, 65.0, 70.0, 120.0),
+    "banana": (14.0, 2.5, 90.0, 95.0, 10.0),
+    "mango": (13.0, 2.5, 85.0, 90.0, 14.0),
+    "apple": (1.0, 3.0, 90.0, 95.0, 90.0),
+    "grape": (0.0, 3.0, 90.0, 95.0, 30.0),
+    "cabbage": (1.0, 2.5, 95.0, 100.0, 60.0),
+    "cauliflower": (1.0, 2.5, 95.0, 98.0, 21.0),
+    "carrot": (1.0, 2.5, 95.0, 100.0, 90.0),
+    "chilli": (8.0, 2.5, 90.0, 95.0, 14.0),
+    "okra": (8.0, 2.5, 90.0, 95.0, 7.0),
+    "rice": (15.0, 2.0, 60.0, 70.0, 180.0),
+    "wheat": (15.0, 2.0, 60.0, 70.0, 180.0),
+    "maize": (15.0, 2.0, 60.0, 70.0, 150.0),
+}
+DEFAULT_KINETICS = (10.0, 2.5, 80.0, 95.0, 15.0)
+
+# Shelf life StorageGuardAgent assigns per intake grade
+GRADE_SHELF_LIFE_DAYS = {"grade a": 15.0, "grade b": 7.0, "grade c": 2.0}
+
+# Extra decay per RH percentage point outside the optimal band
+DRY_PENALTY_PER_POINT = 0.05  # water loss / shrivelling
+WET_PENALTY_PER_POINT = 0.08  # condensation / mould
+MIN_RATE = 0.1  # very cold storage never stops ageing entirely
+
+ACTIVE_LOT_STATUSES = ("CONFIRMED", "ACTIVE")
+
+
+def crop_kinetics(crop_type: Optional[str]) -> Tuple[float, float, float, float, float]:
+    """Look up kinetics for a crop name, matching on substrings (e.g. 'Cherry Tomato')"""
+    name = (crop_type or "").strip().lower()
+    if name in CROP_KINETICS:
+        return CROP_KINETICS[name]
+    for crop, params in CROP_KINETICS.items():
+        if crop in name:
+            return params
+    return DEFAULT_KINETICS
+
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along axis 1; leading NaNs stay NaN"""
+    valid = ~np.isnan(matrix)
+    idx = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return matrix[np.arange(matrix.shape[0])[:, None], idx]
+
+
+def decay_rates(
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    t_ref: float,
+    q10: float,
+    rh_min: float,
+    rh_max: float,
+) -> np.ndarray:
+    """
+    Hourly decay rate relative to reference conditions.
+    Hours without readings (NaN) are treated as reference conditions (rate 1.0).
+    """
+    temp_factor = np.power(q10, (temperature - t_ref) / 10.0)
+    dry = np.clip(rh_min - humidity, 0.0, None) * DRY_PENALTY_PER_POINT
+    wet = np.clip(humidity - rh_max, 0.0, None) * WET_PENALTY_PER_POINT
+    humidity_factor = 1.0 + np.nan_to_num(dry + wet, nan=0.0)
+    rates = np.nan_to_num(temp_factor, nan=1.0) * humidity_factor
+    return np.maximum(rates, MIN_RATE)
+
+
+def compute_consumed_hours(
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    lot_location_idx: np.ndarray,
+    lot_start_idx: np.ndarray,
+    lot_crop_idx: np.ndarray,
+    crop_params: List[Tuple[float, float, float, float]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized shelf-life consumption for all lots
+
+    Args:
+        temperature: (locations, hours) hourly mean temperature, NaN where unknown
+        humidity: (locations, hours) hourly mean relative humidity, NaN where unknown
+        lot_location_idx: (lots,) row of each lot's location
+        lot_start_idx: (lots,) first hour column the lot was in storage (clipped to 0)
+        lot_crop_idx: (lots,) index into crop_params for each lot
+        crop_params: (t_ref, q10, rh_min, rh_max) per crop group
+
+    Returns:
+        (consumed_hours, current_rate): reference-hours used since start and the
+        decay rate at the latest hour, both shaped (lots,)
+    """
+    hours = temperature.shape[1]
+    consumed = np.zeros(len(lot_location_idx), dtype=np.float64)
+    current = np.ones(len(lot_location_idx), dtype=np.float64)
+    if hours == 0:
+        return consumed, current
+
+    for group, (t_ref, q10, rh_min, rh_max) in enumerate(crop_params):
+        lots = np.nonzero(lot_crop_idx == group)[0]
+        if lots.size == 0:
+            continue
+        locations = np.unique(lot_location_idx[lots])
+        rates = decay_rates(temperature[locations], humidity[locations], t_ref, q10, rh_min, rh_max)
+        cumulative = np.zeros((locations.size, hours + 1), dtype=np.float64)
+        np.cumsum(rates, axis=1, out=cumulative[:, 1:])
+
+        rows = np.searchsorted(locations, lot_location_idx[lots])
+        consumed[lots] = cumulative[rows, hours] - cumulative[rows, lot_start_idx[lots]]
+        current[lots] = rates[rows, hours - 1]
+
+    return consumed, current
+
+
+class ShelfLifeService:
+    """Periodic sweep that refreshes LotShelfLife for every lot in storage"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.max_history_days = settings.SHELF_LIFE_MAX_HISTORY_DAYS
+        self.sell_first_days = settings.SHELF_LIFE_SELL_FIRST_DAYS
+        self.sell_first_fraction = settings.SHELF_LIFE_SELL_FIRST_FRACTION
+
+    def _load_active_lots(self, now: datetime) -> List[Any]:
+        booking = models.StorageBooking
+        return self.db.query(
+            booking.id,
+            booking.location_id,
+            booking.crop_type,
+            booking.grade,
+            booking.start_date,
+            models.CropInspection.shelf_life_days,
+        ).outerjoin(
+            models.CropInspection, models.CropInspection.id == booking.ai_inspection_id
+        ).filter(
+            func.upper(booking.booking_status).in_(ACTIVE_LOT_STATUSES),
+            booking.start_date <= now,
+        ).all()
+
+    def _prune_inactive_lots(self) -> int:
+        """Drop LotShelfLife rows of lots that have left storage (completed, cancelled, ...)"""
+        booking = models.StorageBooking
+        active = select(booking.id).where(func.upper(booking.booking_status).in_(ACTIVE_LOT_STATUSES))
+        return self.db.query(models.LotShelfLife).filter(
+            models.LotShelfLife.booking_id.notin_(active)
+        ).delete(synchronize_session=False)
+
+    def _load_hourly_conditions(
+        self, location_ids: List[Any], window_start: datetime, hours: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Hourly mean temperature/humidity per location, forward-filled"""
+        temperature = np.full((len(location_ids), hours), np.nan)
+        humidity = np.full((len(location_ids), hours), np.nan)
+        if not location_ids or hours == 0:
+            return temperature, humidity
+
+        row_of = {loc: i for i, loc in enumerate(location_ids)}
+        hour = func.date_trunc("hour", models.SensorReading.reading_time)
+        sensor_type = func.lower(models.IoTSensor.sensor_type)
+        rows = self.db.query(
+            models.IoTSensor.location_id,
+            sensor_type,
+            hour,
+            func.avg(models.SensorReading.reading_value),
+        ).join(
+            models.IoTSensor, models.IoTSensor.id == models.SensorReading.sensor_id
+        ).filter(
+            models.IoTSensor.location_id.in_(location_ids),
+            sensor_type.in_(("temperature", "humidity")),
+            models.SensorReading.reading_time >= window_start,
+        ).group_by(
+            models.IoTSensor.location_id, sensor_type, hour
+        ).all()
+
+        for location_id, kind, bucket, value in rows:
+            col = int((bucket - window_start).total_seconds() // 3600)
+            if 0 <= col < hours and value is not None:
+                target = temperature if kind == "temperature" else humidity
+                target[row_of[location_id], col] = float(value)
+
+        return _forward_fill(temperature), _forward_fill(humidity)
+
+    def _initial_shelf_life(self, lot: Any, default_days: float) -> float:
+        if lot.shelf_life_days:
+            return float(lot.shelf_life_days)
+        grade_days = GRADE_SHELF_LIFE_DAYS.get((lot.grade or "").strip().lower())
+        return grade_days if grade_days is not None else default_days
+
+    def run_sweep(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Recompute remaining shelf life for all active lots and upsert LotShelfLife.
+        Rows of lots that are no longer in storage are deleted.
+
+        Returns:
+            Dict with lot/location/pruned counts, sell-first count and elapsed seconds
+        """
+        started = datetime.now(timezone.utc)
+        now = now or started
+        pruned = self._prune_inactive_lots()
+        lots = self._load_active_lots(now)
+        if not lots:
+            self.db.commit()
+            return {"lots": 0, "locations": 0, "pruned": pruned, "sell_first": 0, "elapsed_seconds": 0.0}
+
+        earliest_start = min(lot.start_date for lot in lots)
+        window_start = max(earliest_start, now - timedelta(days=self.max_history_days))
+        window_start = window_start.replace(minute=0, second=0, microsecond=0)
+        hours = max(int((now - window_start).total_seconds() // 3600), 0)
+
+        location_ids = sorted({lot.location_id for lot in lots}, key=str)
+        temperature, humidity = self._load_hourly_conditions(location_ids, window_start, hours)
+
+        row_of = {loc: i for i, loc in enumerate(location_ids)}
+        crop_keys: Dict[Tuple[float, float, float, float, float], int] = {}
+        n = len(lots)
+        lot_location_idx = np.empty(n, dtype=np.int64)
+        lot_start_idx = np.empty(n, dtype=np.int64)
+        lot_crop_idx = np.empty(n, dtype=np.int64)
+        pre_window_hours = np.zeros(n, dtype=np.float64)
+        initial_days = np.empty(n, dtype=np.float64)
+
+        for i, lot in enumerate(lots):
+            params = crop_kinetics(lot.crop_type)
+            lot_crop_idx[i] = crop_keys.setdefault(params, len(crop_keys))
+            lot_location_idx[i] = row_of[lot.location_id]
+            offset_hours = (lot.start_date - window_start).total_seconds() / 3600.0
+            lot_start_idx[i] = min(max(int(offset_hours), 0), hours)
+            # Time before the history window is assumed to be at reference conditions
+            pre_window_hours[i] = max(-offset_hours, 0.0)
+            initial_days[i] = self._initial_shelf_life(lot, params[4])
+
+        crop_params = [params[:4] for params in sorted(crop_keys, key=crop_keys.get)]
+        consumed_hours, current_rate = compute_consumed_hours(
+            temperature, humidity, lot_location_idx, lot_start_idx, lot_crop_idx, crop_params
+        )
+
+        consumed_days = (consumed_hours + pre_window_hours) / 24.0
+        remaining_days = np.maximum(initial_days - consumed_days, 0.0)
+        calendar_days_left = remaining_days / current_rate
+        sell_first = (remaining_days <= self.sell_first_days) | (
+            remaining_days <= initial_days * self.sell_first_fraction
+        )
+
+        records = [
+            {
+                "booking_id": lot.id,
+                "location_id": lot.location_id,
+                "crop_type": lot.crop_type,
+                "initial_shelf_life_days": round(float(initial_days[i]), 3),
+                "consumed_days": round(float(consumed_days[i]), 3),
+                "remaining_shelf_life_days": round(float(remaining_days[i]), 3),
+                "current_decay_rate": round(float(current_rate[i]), 4),
+                "predicted_expiry_at": now + timedelta(days=float(calendar_days_left[i])),
+                "sell_first": bool(sell_first[i]),
+                "model_version": MODEL_VERSION,
+                "updated_at": now,
+            }
+            for i, lot in enumerate(lots)
+        ]
+
+        table = models.LotShelfLife.__table__
+        for start in range(0, len(records), 5000):
+            stmt = insert(table).values(records[start:start + 5000])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.booking_id],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in records[0] if column != "booking_id"
+                },
+            )
+            self.db.execute(stmt)
+        self.db.commit()
+
+        elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+        summary = {
+            "lots": n,
+            "locations": len(location_ids),
+            "pruned": pruned,
+            "sell_first": int(sell_first.sum()),
+            "elapsed_seconds": round(elapsed, 3),
+        }
+        logger.info(f"🧊 Shelf-life sweep updated {n} lots across {len(location_ids)} locations in {elapsed:.2f}s")
+        return summary
+
+    def get_sell_first(self, location_id: Optional[Any] = None, limit: int = 50) -> List[models.LotShelfLife]:
+        """Lots closest to expiry that are still in storage, optionally for one storage location"""
+        booking = models.StorageBooking
+        # Join on the booking so lots that left storage since the last sweep drop out immediately
+        query = self.db.query(models.LotShelfLife).join(
+            booking, booking.id == models.LotShelfLife.booking_id
+        ).filter(
+            models.LotShelfLife.sell_first.is_(True),
+            func.upper(booking.booking_status).in_(ACTIVE_LOT_STATUSES),
+        )
+        if location_id:
+            query = query.filter(models.LotShelfLife.location_id == location_id)
+        return query.order_by(models.LotShelfLife.remaining_shelf_life_days.asc()).limit(limit).all()
+
+
+async def run_shelf_life_sweep_loop(interval_seconds: Optional[int] = None) -> None:
+    """Run the shelf-life sweep forever on a fixed interval (off the event loop)"""
+    from app.connections.postgres_connection import SessionLocal
+
+    interval = interval_seconds or settings.SHELF_LIFE_SWEEP_INTERVAL_SECONDS
+
+    def _sweep_once() -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return ShelfLifeService(db).run_sweep()
+        finally:
+            db.close()
+
+    while True:
+        try:
+            await asyncio.to_thread(_sweep_once)
+        except Exception as e:
+            logger.error(f"Shelf-life sweep failed: {e}")
+        await asyncio.sleep(interval)
@@ -1,10 +1,12 @@
-from sqlalchemy.orm import Session
+import math
+from sqlalchemy.orm import Session, joinedload
 from uuid import UUID
 from typing import List, Optional
 from fastapi import HTTPException, status
 
 from app.schemas import postgres_base as models
 from app.schemas import postgres_base_models as schemas
+from app.services.booking_service import calculate_distance
 
 # =========================================================
 # Storage Locations
@@ -31,16 +33,28 @@ def create_location(db: Session, location: schemas.StorageLocationCreate, vendor
 
 def get_locations_near(db: Session, lat: float, lon: float, radius_km: float = 50.0) -> List[models.StorageLocation]:
     """
-    Very basic 'distance' calculation (Haversine could be added for accuracy).
+    Postgres fallback for proximity search (the primary path is the Mongo
+    vendor_locations 2dsphere index, see vendor_geo_service).
+    Pre-filters on the indexed lat/lon bounding box, then applies Haversine.
     """
-    locations = db.query(models.StorageLocation).all()
+    lat_delta = radius_km / 111.0
+    lon_delta = radius_km / max(111.0 * math.cos(math.radians(lat)), 1e-6)
+    locations = (
+        db.query(models.StorageLocation)
+        .options(joinedload(models.StorageLocation.vendor))
+        .filter(
+            models.StorageLocation.lat.between(lat - lat_delta, lat + lat_delta),
+            models.StorageLocation.lon.between(lon - lon_delta, lon + lon_delta),
+        )
+        .all()
+    )
     nearby = []
     for loc in locations:
-        # simple Euclidean approximation
-        dist = ((lat - loc.lat) ** 2 + (lon - loc.lon) ** 2) ** 0.5 * 111  # deg to km
+        dist = calculate_distance(lat, lon, loc.lat, loc.lon)
         if dist <= radius_km:
             loc.distance_km = round(dist, 2)
             nearby.append(loc)
+    nearby.sort(key=lambda loc: loc.distance_km)
     return nearby
 
 # =========================================================
@@ -0,0 +1,267 @@
+"""
+Upload Service - Content-addressed storage for uploaded images
+Streams uploads to disk in chunks with a size cap, verifies image magic bytes,
+deduplicates by SHA-256 and builds thumbnail/web variants in the background.
+Uploads needed only for one request go to private temporary files instead.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Served by the /uploads StaticFiles mount in app/__init__.py
+UPLOAD_ROOT = Path("uploads")
+UPLOAD_URL_PREFIX = "/uploads"
+# Request-scoped uploads; outside UPLOAD_ROOT so they are never served
+TEMP_UPLOAD_DIR = Path(tempfile.gettempdir()) / "agri_uploads"
+
+VARIANT_SUFFIXES = ("thumb", "web")
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Return the file extension for a supported image header, or None"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[4:8] == b"ftyp" and header[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "heic"
+    return None
+
+
+@dataclass
+class StoredUpload:
+    """A stored upload and the URLs it is served under"""
+    sha256: str
+    path: Path
+    url: str
+    size_bytes: int
+    extension: str
+    deduplicated: bool
+
+    def variant_url(self, variant: str) -> str:
+        """URL of a derived variant (falls back to the original until it exists)"""
+        return variant_url_for(self.url, variant)
+
+
+def _variant_path(original: Path, variant: str) -> Path:
+    return original.with_name(f"{original.stem}_{variant}.jpg")
+
+
+def variant_url_for(url: Optional[str], variant: str) -> Optional[str]:
+    """
+    Map a stored upload URL to its thumbnail/web variant URL.
+    Legacy values (bare filenames, external URLs) and variants that have not been
+    generated yet are returned unchanged so callers can always use the result.
+    """
+    if not url or variant not in VARIANT_SUFFIXES or not url.startswith(UPLOAD_URL_PREFIX + "/"):
+        return url
+    original = UPLOAD_ROOT / url[len(UPLOAD_URL_PREFIX) + 1:]
+    candidate = _variant_path(original, variant)
+    if candidate.exists():
+        return f"{UPLOAD_URL_PREFIX}/{candidate.relative_to(UPLOAD_ROOT).as_posix()}"
+    return url
+
+
+class UploadService:
+    """Streams uploads into a content-addressed store under uploads/<category>/"""
+
+    def __init__(self):
+        self.root = UPLOAD_ROOT
+        self.max_bytes = settings.UPLOAD_MAX_BYTES
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.variant_sizes: Dict[str, int] = {
+            "thumb": settings.UPLOAD_THUMBNAIL_SIZE,
+            "web": settings.UPLOAD_WEB_SIZE,
+        }
+        # Single worker keeps variant generation off the request path without
+        # competing with inference for CPU
+        self._variant_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-variants")
+        self._pending_variants: Set[str] = set()
+
+    async def _stream_to(self, upload_file: UploadFile, path: Path) -> Tuple[str, int, str]:
+        """
+        Copy an upload to path in chunks, enforcing the size cap and image type
+
+        File I/O runs in worker threads so a large upload never blocks the event loop.
+
+        Returns:
+            (sha256 hex digest, size in bytes, file extension)
+
+        Raises:
+            HTTPException: 413 too large, 415 not a supported image, 400 empty
+        """
+        digest = hashlib.sha256()
+        size = 0
+        extension = None
+        buffer = await asyncio.to_thread(open, path, "wb")
+        try:
+            while True:
+                chunk = await upload_file.read(self.chunk_size)
+                if not chunk:
+                    break
+                if extension is None:
+                    extension = sniff_image_type(chunk[:32])
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Unsupported or invalid image file")
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {self.max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+        finally:
+            await asyncio.to_thread(buffer.close)
+
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+        return digest.hexdigest(), size, extension
+
+    async def save_upload(self, upload_file: UploadFile, category: str) -> StoredUpload:
+        """
+        Stream an upload to disk and store it by content hash
+
+        Args:
+            upload_file: FastAPI uploaded file
+            category: Sub-directory under uploads/ (e.g. "proof_images")
+
+        Returns:
+            StoredUpload: Stored file details; re-uploads of identical bytes reuse the existing file
+
+        Raises:
+            HTTPException: 413 when the upload exceeds UPLOAD_MAX_BYTES, 415 when it is not a supported image
+        """
+        category_dir = self.root / category
+        tmp_dir = category_dir / ".incoming"
+        await asyncio.to_thread(tmp_dir.mkdir, parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{uuid4().hex}.part"
+
+        try:
+            sha256, size, extension = await self._stream_to(upload_file, tmp_path)
+            final_path = category_dir / sha256[:2] / f"{sha256}.{extension}"
+            deduplicated = await asyncio.to_thread(self._move_into_store, tmp_path, final_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        stored = StoredUpload(
+            sha256=sha256,
+            path=final_path,
+            url=f"{UPLOAD_URL_PREFIX}/{final_path.relative_to(self.root).as_posix()}",
+            size_bytes=size,
+            extension=extension,
+            deduplicated=deduplicated,
+        )
+        self.schedule_variants(stored)
+
+        logger.info(
+            f"📁 Stored upload {category}/{final_path.name} ({size} bytes, deduplicated={deduplicated})"
+        )
+        return stored
+
+    @staticmethod
+    def _move_into_store(tmp_path: Path, final_path: Path) -> bool:
+        """Move a finished upload to its content-addressed path; True when it already existed"""
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        if final_path.exists():
+            tmp_path.unlink(missing_ok=True)
+            return True
+        os.replace(tmp_path, final_path)
+        return False
+
+    async def save_temporary(self, upload_file: UploadFile) -> Path:
+        """
+        Stream an upload to a private temporary file (same size cap and type check)
+
+        For images only needed while one request runs: nothing is deduplicated or
+        served, and the caller removes the file with discard() when done.
+
+        Returns:
+            Path: Temporary file named <uuid>.<ext>
+        """
+        await asyncio.to_thread(TEMP_UPLOAD_DIR.mkdir, parents=True, exist_ok=True)
+        tmp_path = TEMP_UPLOAD_DIR / f"{uuid4().hex}.part"
+        try:
+            _, _, extension = await self._stream_to(upload_file, tmp_path)
+            path = tmp_path.with_suffix(f".{extension}")
+            await asyncio.to_thread(os.replace, tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return path
+
+    @staticmethod
+    def discard(paths: Iterable[Path]) -> None:
+        """Delete temporary uploads (missing files are ignored)"""
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not delete temporary upload {path}: {e}")
+
+    def schedule_variants(self, stored: StoredUpload) -> None:
+        """Queue thumbnail/web variant generation unless they already exist"""
+        key = str(stored.path)
+        if key in self._pending_variants:
+            return
+        if all(_variant_path(stored.path, v).exists() for v in self.variant_sizes):
+            return
+        self._pending_variants.add(key)
+        future = self._variant_executor.submit(self._build_variants, stored.path)
+        future.add_done_callback(lambda _: self._pending_variants.discard(key))
+
+    def _build_variants(self, original: Path) -> None:
+        try:
+            with Image.open(original) as img:
+                img = img.convert("RGB")
+                for variant, max_side in self.variant_sizes.items():
+                    target = _variant_path(original, variant)
+                    if target.exists():
+                        continue
+                    resized = img.copy()
+                    resized.thumbnail((max_side, max_side), Image.LANCZOS)
+                    tmp_target = target.with_suffix(".part")
+                    resized.save(tmp_target, format="JPEG", quality=85, optimize=True)
+                    os.replace(tmp_target, target)
+        except Exception as e:
+            logger.warning(f"Failed to build variants for {original}: {e}")
+
+    async def read_bytes(self, stored: StoredUpload) -> bytes:
+        """Read a stored upload back (bounded by UPLOAD_MAX_BYTES) without blocking the loop"""
+        return await asyncio.to_thread(stored.path.read_bytes)
+
+    def shutdown(self) -> None:
+        self._variant_executor.shutdown(wait=False)
+
+
+# Singleton instance
+_upload_service_instance: Optional[UploadService] = None
+
+
+def get_upload_service() -> UploadService:
+    """Get singleton UploadService instance"""
+    global _upload_service_instance
+
+    if _upload_service_instance is None:
+        _upload_service_instance = UploadService()
+
+    return _upload_service_instance
@@ -0,0 +1,500 @@
+"""
+Vendor Geo Service - Proximity search over storage locations and vendors
+Mirrors Postgres StorageLocation/Vendor rows into the Mongo `vendor_locations`
+collection (2dsphere index on `location`) and answers distance-sorted, paginated
+queries against it. Writes through SessionLocal are pushed to Mongo after commit.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import ReplaceOne
+from sqlalchemy import event, or_
+from sqlalchemy.orm import joinedload
+
+from app.core.config import settings
+from app.connections.mongo_connection import get_collection
+from app.connections.postgres_connection import SessionLocal
+from app.schemas import postgres_base as models
+
+logger = logging.getLogger(__name__)
+
+
+VENDOR_LOCATIONS_COLLECTION = "vendor_locations"
+
+
+class GeoIndexUnavailable(RuntimeError):
+    """vendor_locations cannot answer queries yet (never synced and empty)"""
+
+# Search categories -> StorageLocation.type / Vendor.business_type values that fall under them
+SERVICE_TYPE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "cold_storage": ("cold_storage",),
+    "dry_storage": ("dry_storage", "warehouse", "storage"),
+    "transport": ("transport", "logistics"),
+    "inputs": ("input_supply", "seed_supply"),
+    "processing": ("processing",),
+}
+
+_SERVICE_TYPE_LOOKUP = {raw: group for group, raws in SERVICE_TYPE_GROUPS.items() for raw in raws}
+
+
+def _enum_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return str(getattr(value, "value", value)).strip().lower() or None
+
+
+def service_types_for(*raw_types: Any) -> List[str]:
+    """Map raw location/vendor type values onto search categories"""
+    groups = set()
+    for raw in raw_types:
+        value = _enum_value(raw)
+        if value and value in _SERVICE_TYPE_LOOKUP:
+            groups.add(_SERVICE_TYPE_LOOKUP[value])
+    return sorted(groups)
+
+
+def normalize_service_type(service_type: Optional[str]) -> Optional[str]:
+    """
+    Resolve a requested service type (category or raw type) to a search category
+
+    Raises:
+        ValueError: If the service type is not recognised
+    """
+    value = _enum_value(service_type)
+    if value is None:
+        return None
+    if value in SERVICE_TYPE_GROUPS:
+        return value
+    if value in _SERVICE_TYPE_LOOKUP:
+        return _SERVICE_TYPE_LOOKUP[value]
+    raise ValueError(
+        f"Unknown service_type '{service_type}'. Expected one of: {', '.join(SERVICE_TYPE_GROUPS)}"
+    )
+
+
+def _vendor_fragment(vendor: Optional[models.Vendor]) -> Optional[Dict[str, Any]]:
+    if vendor is None:
+        return None
+    return {
+        "id": str(vendor.id),
+        "business_name": vendor.business_name,
+        "full_name": vendor.full_name,
+        "phone": vendor.phone,
+        "state": vendor.state,
+        "mandal": vendor.mandal,
+        "business_type": _enum_value(vendor.business_type),
+        "rating_avg": float(vendor.rating_avg) if vendor.rating_avg is not None else 0.0,
+        "verified": bool(vendor.verified),
+    }
+
+
+def location_document(location: models.StorageLocation, synced_at: datetime) -> Dict[str, Any]:
+    """Build the vendor_locations document for a StorageLocation (vendor loaded)"""
+    vendor = location.vendor
+    return {
+        "_id": str(location.id),
+        "vendor_id": str(location.vendor_id) if location.vendor_id else None,
+        "name": location.name,
+        "type": location.type,
+        "address": location.address,
+        "lat": location.lat,
+        "lon": location.lon,
+        "capacity_text": location.capacity_text,
+        "price_text": location.price_text,
+        "rating": location.rating,
+        "phone": location.phone,
+        "hours": location.hours,
+        "facilities": location.facilities or [],
+        "vendor": _vendor_fragment(vendor),
+        "service_types": service_types_for(location.type, vendor.business_type if vendor else None),
+        # GeoJSON order is [longitude, latitude]
+        "location": {"type": "Point", "coordinates": [location.lon, location.lat]},
+        "synced_at": synced_at,
+    }
+
+
+def location_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a vendor_locations document like the Storage Guard /locations listing"""
+    payload = {
+        "id": doc["_id"],
+        "name": doc.get("name"),
+        "type": doc.get("type"),
+        "address": doc.get("address"),
+        "lat": doc.get("lat"),
+        "lon": doc.get("lon"),
+        "capacity_text": doc.get("capacity_text"),
+        "price_text": doc.get("price_text"),
+        "rating": doc.get("rating"),
+        "facilities": doc.get("facilities") or [],
+        "vendor_id": doc.get("vendor_id"),
+        "service_types": doc.get("service_types") or [],
+        "distance_km": round(doc["distance_m"] / 1000.0, 2) if "distance_m" in doc else None,
+    }
+    vendor = doc.get("vendor")
+    if vendor:
+        payload["vendor"] = {
+            "id": vendor["id"],
+            "business_name": vendor.get("business_name"),
+            "full_name": vendor.get("full_name"),
+            "phone": vendor.get("phone"),
+        }
+    return payload
+
+
+def vendor_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shape a per-vendor group (vendor fragment, distance_m to its nearest location,
+    nearest_location, lists of service_types, location_count) for the /vendors listings
+    """
+    vendor = doc.get("vendor") or {"id": doc["_id"]}
+    return {
+        **vendor,
+        "service_types": sorted({t for types in doc["service_types"] for t in types}),
+        "distance_km": round(doc["distance_m"] / 1000.0, 2),
+        "location_count": doc["location_count"],
+        "nearest_location": doc["nearest_location"],
+    }
+
+
+def group_by_vendor(docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group distance-sorted location documents by vendor, nearest location first
+    (the Postgres counterpart of the $group stage in search_vendors)
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        vendor_id = doc.get("vendor_id")
+        if not vendor_id:
+            continue
+        group = groups.get(vendor_id)
+        if group is None:
+            group = groups[vendor_id] = {
+                "_id": vendor_id,
+                "vendor": doc.get("vendor"),
+                "distance_m": doc["distance_m"],
+                "nearest_location": {
+                    "id": doc["_id"], "name": doc.get("name"), "type": doc.get("type"),
+                    "address": doc.get("address"), "lat": doc.get("lat"), "lon": doc.get("lon"),
+                },
+                "service_types": [],
+                "location_count": 0,
+            }
+        group["service_types"].append(doc.get("service_types") or [])
+        group["location_count"] += 1
+    return sorted(groups.values(), key=lambda group: (group["distance_m"], group["_id"]))
+
+
+class VendorGeoService:
+    """Keeps vendor_locations in sync with Postgres and runs proximity queries on it"""
+
+    def __init__(self):
+        self.default_radius_km = settings.VENDOR_GEO_DEFAULT_RADIUS_KM
+        self.max_radius_km = settings.VENDOR_GEO_MAX_RADIUS_KM
+        self.page_size = settings.VENDOR_GEO_PAGE_SIZE
+        self.max_page_size = settings.VENDOR_GEO_MAX_PAGE_SIZE
+        self.batch_size = settings.VENDOR_GEO_SYNC_BATCH_SIZE
+        # Post-commit syncs run here so request threads never wait on Mongo
+        self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vendor-geo-sync")
+        # Set once a full sync finished or the collection was seen populated
+        self._ready = False
+
+    @property
+    def collection(self):
+        return get_collection(VENDOR_LOCATIONS_COLLECTION)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync_all(self) -> Dict[str, int]:
+        """
+        Rebuild vendor_locations from Postgres
+
+        Returns:
+            Dict: Number of upserted and removed documents
+        """
+        synced_at = datetime.now(timezone.utc)
+        upserted = self._sync_query(self._location_query, synced_at)
+        # Anything not touched by this run no longer exists in Postgres
+        removed = self.collection.delete_many({"synced_at": {"$lt": synced_at}}).deleted_count
+        self._ready = True
+        logger.info(f"📍 Vendor locations resynced: {upserted} upserted, {removed} removed")
+        return {"upserted": upserted, "removed": removed}
+
+    def ensure_ready(self) -> None:
+        """
+        Raises:
+            GeoIndexUnavailable: If no full sync has run and the collection is empty,
+                so an empty result would not mean "nothing nearby"
+        """
+        if self._ready:
+            return
+        if self.collection.estimated_document_count() == 0:
+            raise GeoIndexUnavailable("vendor_locations has not been synced yet")
+        self._ready = True
+
+    def sync_changes(
+        self,
+        location_ids: Iterable[str] = (),
+        vendor_ids: Iterable[str] = (),
+        deleted_location_ids: Iterable[str] = (),
+    ) -> None:
+        """Push changed locations/vendors to Mongo and drop deleted locations"""
+        location_ids = set(location_ids)
+        vendor_ids = set(vendor_ids)
+        deleted_location_ids = set(deleted_location_ids)
+
+        if deleted_location_ids:
+            self.collection.delete_many({"_id": {"$in": list(deleted_location_ids)}})
+
+        if vendor_ids:
+            # Include documents still pointing at a vendor that was deleted or re-assigned
+            for doc in self.collection.find({"vendor_id": {"$in": list(vendor_ids)}}, {"_id": 1}):
+                location_ids.add(doc["_id"])
+
+        location_ids -= deleted_location_ids
+        if not location_ids and not vendor_ids:
+            return
+
+        def query(db):
+            filters = []
+            if location_ids:
+                filters.append(models.StorageLocation.id.in_(location_ids))
+            if vendor_ids:
+                filters.append(models.StorageLocation.vendor_id.in_(vendor_ids))
+            return self._location_query(db).filter(or_(*filters))
+
+        seen = set()
+        synced_at = datetime.now(timezone.utc)
+        self._sync_query(query, synced_at, seen=seen)
+
+        # Ids we were told about but that are no longer in Postgres
+        missing = location_ids - seen
+        if missing:
+            self.collection.delete_many({"_id": {"$in": list(missing)}})
+
+    def schedule_sync(
+        self,
+        location_ids: Set[str],
+        vendor_ids: Set[str],
+        deleted_location_ids: Set[str],
+    ) -> None:
+        """Queue an incremental sync on the background worker"""
+        future = self._sync_executor.submit(self.sync_changes, location_ids, vendor_ids, deleted_location_ids)
+        future.add_done_callback(self._log_sync_failure)
+
+    @staticmethod
+    def _log_sync_failure(future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Vendor location sync failed (run a full resync to repair): {error}")
+
+    @staticmethod
+    def _location_query(db):
+        return db.query(models.StorageLocation).options(joinedload(models.StorageLocation.vendor))
+
+    def _sync_query(self, query_factory, synced_at: datetime, seen: Optional[Set[str]] = None) -> int:
+        db = SessionLocal()
+        try:
+            upserted = 0
+            batch: List[ReplaceOne] = []
+            for location in query_factory(db).yield_per(self.batch_size):
+                if location.lat is None or location.lon is None:
+                    continue
+                doc = location_document(location, synced_at)
+                if seen is not None:
+                    seen.add(doc["_id"])
+                batch.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+                if len(batch) >= self.batch_size:
+                    self.collection.bulk_write(batch, ordered=False)
+                    upserted += len(batch)
+                    batch = []
+            if batch:
+                self.collection.bulk_write(batch, ordered=False)
+                upserted += len(batch)
+            return upserted
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _geo_near(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: Optional[float],
+        service_type: Optional[str],
+        extra_query: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+            raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+        radius_km = min(radius_km or self.default_radius_km, self.max_radius_km)
+
+        query: Dict[str, Any] = dict(extra_query or {})
+        category = normalize_service_type(service_type)
+        if category:
+            query["service_types"] = category
+
+        return {
+            "$geoNear": {
+                "near": {"type": "Point", "coordinates": [lon, lat]},
+                "key": "location",
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000.0,
+                "spherical": True,
+                "query": query,
+            }
+        }
+
+    def page_bounds(self, page: int, page_size: Optional[int]) -> Tuple[int, int]:
+        """Clamp page/page_size to the configured bounds"""
+        page = max(1, page)
+        page_size = max(1, min(page_size or self.page_size, self.max_page_size))
+        return page, page_size
+
+    @staticmethod
+    def _paginate(pipeline: List[Dict[str, Any]], page: int, page_size: int) -> List[Dict[str, Any]]:
+        return pipeline + [{
+            "$facet": {
+                "total": [{"$count": "count"}],
+                "items": [{"$skip": (page - 1) * page_size}, {"$limit": page_size}],
+            }
+        }]
+
+    @staticmethod
+    def _unpack(result: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        if not result:
+            return 0, []
+        facet = result[0]
+        total = facet["total"][0]["count"] if facet.get("total") else 0
+        return total, facet.get("items", [])
+
+    def search_locations(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: Optional[float] = None,
+        service_type: Optional[str] = None,
+        page: int = 1,
+        page_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Storage locations within radius_km of a point, nearest first
+
+        Returns:
+            Dict: total, page, page_size and the page of location payloads
+
+        Raises:
+            GeoIndexUnavailable: If the index has not been built yet
+        """
+        self.ensure_ready()
+        page, page_size = self.page_bounds(page, page_size)
+        pipeline = self._paginate([self._geo_near(lat, lon, radius_km, service_type)], page, page_size)
+        total, docs = self._unpack(list(self.collection.aggregate(pipeline)))
+        return {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "locations": [location_payload(doc) for doc in docs],
+        }
+
+    def search_vendors(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: Optional[float] = None,
+        service_type: Optional[str] = None,
+        page: int = 1,
+        page_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Vendors with at least one location within radius_km, ordered by their nearest location
+
+        Returns:
+            Dict: total, page, page_size and the page of vendor payloads
+
+        Raises:
+            GeoIndexUnavailable: If the index has not been built yet
+        """
+        self.ensure_ready()
+        page, page_size = self.page_bounds(page, page_size)
+        pipeline = self._paginate([
+            self._geo_near(lat, lon, radius_km, service_type, {"vendor_id": {"$ne": None}}),
+            # $geoNear emits nearest first, so $first is each vendor's closest location
+            {"$group": {
+                "_id": "$vendor_id",
+                "vendor": {"$first": "$vendor"},
+                "distance_m": {"$first": "$distance_m"},
+                "nearest_location": {"$first": {
+                    "id": "$_id", "name": "$name", "type": "$type",
+                    "address": "$address", "lat": "$lat", "lon": "$lon",
+                }},
+                "service_types": {"$addToSet": "$service_types"},
+                "location_count": {"$sum": 1},
+            }},
+            {"$sort": {"distance_m": 1, "_id": 1}},
+        ], page, page_size)
+        total, docs = self._unpack(list(self.collection.aggregate(pipeline)))
+        return {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "vendors": [vendor_payload(doc) for doc in docs],
+        }
+
+    def shutdown(self) -> None:
+        self._sync_executor.shutdown(wait=False)
+
+
+# Singleton instance
+_vendor_geo_service_instance: Optional[VendorGeoService] = None
+
+
+def get_vendor_geo_service() -> VendorGeoService:
+    """Get singleton VendorGeoService instance"""
+    global _vendor_geo_service_instance
+
+    if _vendor_geo_service_instance is None:
+        _vendor_geo_service_instance = VendorGeoService()
+
+    return _vendor_geo_service_instance
+
+
+# ----------------------------------------------------------------------
+# Keep vendor_locations in step with Postgres writes
+# ----------------------------------------------------------------------
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_vendor_location_changes(session, flush_context):
+    changes = session.info.setdefault("vendor_geo_changes", {"locations": set(), "vendors": set(), "deleted": set()})
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, models.StorageLocation):
+            changes["locations"].add(str(obj.id))
+        elif isinstance(obj, models.Vendor):
+            changes["vendors"].add(str(obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, models.StorageLocation):
+            changes["deleted"].add(str(obj.id))
+        elif isinstance(obj, models.Vendor):
+            changes["vendors"].add(str(obj.id))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_vendor_location_changes(session):
+    changes = session.info.pop("vendor_geo_changes", None)
+    if not changes or not any(changes.values()):
+        return
+    try:
+        get_vendor_geo_service().schedule_sync(changes["locations"], changes["vendors"], changes["deleted"])
+    except Exception as e:
+        logger.warning(f"Could not schedule vendor location sync: {e}")
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_vendor_location_changes(session):
+    session.info.pop("vendor_geo_changes", None)
@@ -12,6 +12,8 @@ from dataclasses import dataclass
 
 from app.schemas.postgres_base_models import WeatherRisk, WeatherRiskIndices, WeatherRiskBand
 from app.core.config import STRICT_NO_FALLBACKS
+from app.core.cache import get_cache_manager
+from app.connections.http_connection import get_http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -62,8 +64,8 @@ class WeatherService:
         
         self.postgres_base_url = "https://api.openweathermap.org/data/2.5"
         self.session: Optional[aiohttp.ClientSession] = None
-        self._cache: Dict[str, Any] = {}  # Simple in-memory cache
-        self._cache_ttl: Dict[str, datetime] = {}  # Cache TTL tracking
+        # Shared across instances and workers; weather changes slowly
+        self._cache = get_cache_manager().namespace("weather", max_entries=1024, ttl_seconds=1800, disk=True)
         
         if self.has_valid_api_key:
             logger.info("Weather service initialized with API key")
@@ -71,56 +73,39 @@ class WeatherService:
             logger.info("Weather service initialized in fallback mode (no API key)")
 
     async def close(self):
-        """Close underlying HTTP session if open"""
-        try:
-            if self.session and not self.session.closed:
-                await self.session.close()
-        finally:
-            self.session = None
+        """Release the HTTP session (the shared pool owns and closes it)"""
+        self.session = None
     
     async def initialize_cache(self):
         """Initialize weather service cache"""
         try:
-            # Create cache directory if it doesn't exist
-            from pathlib import Path
-            cache_dir = Path("data/weather_cache")
-            cache_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Test cache functionality
-            test_key = "weather_cache_test"
-            self._cache[test_key] = {"initialized": True, "timestamp": datetime.utcnow()}
-            self._cache_ttl[test_key] = datetime.utcnow() + timedelta(minutes=5)
-            
+            await get_cache_manager().ping()
             logger.info("✅ Weather service cache initialized")
             
         except Exception as e:
             logger.warning(f"Weather cache initialization failed: {e}")
     
-    def _get_from_cache(self, key: str) -> Optional[Any]:
-        """Get item from cache if not expired"""
-        if key in self._cache and key in self._cache_ttl:
-            if datetime.utcnow() < self._cache_ttl[key]:
-                return self._cache[key]
-            else:
-                # Remove expired item
-                del self._cache[key]
-                del self._cache_ttl[key]
-        return None
+    async def _get_from_cache(self, key: str) -> Optional[Any]:
+        """Get item from cache if not expired (disk-tier reads run off the event loop)"""
+        if self._cache.disk is None:
+            return self._cache.get(key)
+        return await asyncio.to_thread(self._cache.get, key)
     
-    def _set_cache(self, key: str, value: Any, ttl_minutes: int = 30):
-        """Set item in cache with TTL"""
-        self._cache[key] = value
-        self._cache_ttl[key] = datetime.utcnow() + timedelta(minutes=ttl_minutes)
+    async def _set_cache(self, key: str, value: Any, ttl_minutes: int = 30):
+        """Set item in cache with TTL (disk-tier writes run off the event loop)"""
+        if self._cache.disk is None:
+            self._cache.set(key, value, ttl=ttl_minutes * 60)
+        else:
+            await asyncio.to_thread(self._cache.set, key, value, ttl_minutes * 60)
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
+        self.session = get_http_pool().aiohttp_session("weather")
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        self.session = None
     
     async def get_current_weather(self, lat: float, lon: float) -> WeatherData:
         """
@@ -140,14 +125,13 @@ class WeatherService:
         
         # Check cache first
         cache_key = f"current_weather_{lat}_{lon}"
-        cached_data = self._get_from_cache(cache_key)
+        cached_data = await self._get_from_cache(cache_key)
         if cached_data:
             logger.debug(f"Using cached weather data for {lat}, {lon}")
             return cached_data
         
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            self.session = get_http_pool().aiohttp_session("weather")
             
             url = f"{self.postgres_base_url}/weather"
             params = {
@@ -162,7 +146,7 @@ class WeatherService:
                     data = await response.json()
                     weather_data = self._parse_current_weather(data)
                     # Cache for 15 minutes
-                    self._set_cache(cache_key, weather_data, 15)
+                    await self._set_cache(cache_key, weather_data, 15)
                     return weather_data
                 else:
                     logger.warning(f"Weather API returned status {response.status}")
@@ -214,8 +198,7 @@ class WeatherService:
             List of forecast data
         """
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            self.session = get_http_pool().aiohttp_session("weather")
             
             url = f"{self.postgres_base_url}/forecast"
             params = {
@@ -671,16 +654,7 @@ class WeatherService:
         """
         try:
             # Clear existing cache for this location
-            cache_keys_to_remove = []
-            for key in self._cache.keys():
-                if f"_{lat}_{lon}" in key:
-                    cache_keys_to_remove.append(key)
-            
-            for key in cache_keys_to_remove:
-                if key in self._cache:
-                    del self._cache[key]
-                if key in self._cache_ttl:
-                    del self._cache_ttl[key]
+            await asyncio.to_thread(self._cache.delete, f"current_weather_{lat}_{lon}")
             
             # Force fresh data fetch
             await self.get_current_weather(lat, lon)
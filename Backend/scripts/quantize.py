@@ -0,0 +1,181 @@
+"""
+INT8 quantization for agricultural vision models
+Builds dynamic/static INT8 variants and reports accuracy and latency against FP32
+
+Examples:
+    # ONNX classifier served by app/models/infer.py
+    python quantize.py onnx --model ../data/models/weights/pest_classifier.onnx \
+        --labels ../data/models/pest_labels.json --images ../data/datasets/agricultural_images/val
+
+    # Storage Guard YOLO (exports ONNX first; mAP from the Ultralytics validator)
+    python quantize.py yolo --model ../crop_detection_model.pt --data ../configs/crops.yaml \
+        --images ../data/datasets/crops/images/train
+
+    # PlantClassifier (PyTorch; INT8 is served as dynamic quantization)
+    python quantize.py plant-classifier --images "../app/models(ml)/vision/training"
+
+Serve a variant by setting VISION_MODEL_VARIANTS[<model>] to int8_dynamic or int8_static.
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+from training_utils import (
+    IMAGE_EXTENSIONS,
+    compare_onnx_classifiers,
+    compare_yolo_detectors,
+    quantize_onnx_model,
+    sample_images,
+    latency_stats
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _flat_images(root_dir: str, max_images: int) -> List[str]:
+    """Any images under root_dir (detection datasets are not class-per-directory)"""
+    images = sorted(str(p) for p in Path(root_dir).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    step = max(1, len(images) // max_images) if images else 1
+    return images[::step][:max_images]
+
+
+def _log_report(report: Dict[str, Any], columns: List[str]):
+    """Side-by-side table of variant metrics"""
+    logger.info("variant        " + "".join(f"{c:>22}" for c in columns))
+    for variant, metrics in report["variants"].items():
+        logger.info(f"{variant:<15}" + "".join(f"{str(metrics.get(c, '-')):>22}" for c in columns))
+
+
+def quantize_onnx_classifier(args) -> Dict[str, Any]:
+    samples = sample_images(args.images, args.samples)
+    calibration = [path for path, _ in samples[:args.calibration_samples]]
+    variants = {"fp32": args.model}
+    for mode in args.modes:
+        variants[f"int8_{mode}"] = quantize_onnx_model(
+            args.model, mode, calibration_images=calibration, input_shape=args.input_shape
+        )
+
+    with open(args.labels, 'r') as f:
+        label_map = json.load(f)
+    report = compare_onnx_classifiers(variants, samples, label_map, args.input_shape)
+    _log_report(report, ["top1", "top1_delta", "agreement_with_fp32", "p50_ms", "p95_ms", "speedup", "size_mb"])
+    return report
+
+
+def quantize_yolo(args) -> Dict[str, Any]:
+    from ultralytics import YOLO
+
+    onnx_path = YOLO(args.model).export(format='onnx', imgsz=args.image_size, dynamic=False)
+    calibration = _flat_images(args.images, args.calibration_samples)
+    shape = [3, args.image_size, args.image_size]
+    variants = {"fp32": args.model, "fp32_onnx": onnx_path}
+    for mode in args.modes:
+        variants[f"int8_{mode}"] = quantize_onnx_model(
+            onnx_path, mode, calibration_images=calibration, input_shape=shape, normalization='unit'
+        )
+
+    report = compare_yolo_detectors(variants, args.data, args.image_size)
+    _log_report(report, ["map50", "map50_delta", "map50_95", "map50_95_delta", "inference_ms", "speedup", "size_mb"])
+    return report
+
+
+def quantize_plant_classifier(args) -> Dict[str, Any]:
+    """Compare the PlantClassifier in FP32 and with dynamically quantized Linear layers"""
+    import copy
+    import torch
+    import torch.nn as nn
+    from PIL import Image
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from app.models.vision_classifier import PlantClassifier
+
+    classifier = PlantClassifier(model_dir=args.model_dir) if args.model_dir else PlantClassifier()
+    classifier.device = torch.device('cpu')
+    fp32 = classifier.model.to('cpu').eval()
+    int8 = torch.ao.quantization.quantize_dynamic(copy.deepcopy(fp32), {nn.Linear}, dtype=torch.qint8)
+
+    samples = sample_images(args.images, args.samples)
+    tensors = [(classifier.transform(Image.open(p).convert('RGB')).unsqueeze(0), label) for p, label in samples]
+
+    report = {"samples": len(tensors), "variants": {}}
+    predictions = {}
+    with torch.inference_mode():
+        for variant, model in (("fp32", fp32), ("int8_dynamic", int8)):
+            for tensor, _ in tensors[:5]:
+                model(tensor)
+            latencies, predicted = [], []
+            for tensor, _ in tensors:
+                start = time.perf_counter()
+                idx = int(model(tensor).argmax(dim=1))
+                latencies.append(time.perf_counter() - start)
+                predicted.append(classifier.class_names[idx] if idx < len(classifier.class_names) else f"class_{idx}")
+            predictions[variant] = predicted
+            correct = sum(1 for p, (_, label) in zip(predicted, tensors) if p == label)
+            report["variants"][variant] = {
+                "top1": round(correct / len(tensors), 4) if tensors else None,
+                **latency_stats(latencies)
+            }
+
+    base, quant = report["variants"]["fp32"], report["variants"]["int8_dynamic"]
+    agreement = sum(1 for a, b in zip(predictions["fp32"], predictions["int8_dynamic"]) if a == b)
+    quant["agreement_with_fp32"] = round(agreement / len(tensors), 4) if tensors else None
+    if base["top1"] is not None:
+        quant["top1_delta"] = round(quant["top1"] - base["top1"], 4)
+    quant["speedup"] = round(base["p50_ms"] / quant["p50_ms"], 2) if quant["p50_ms"] else None
+    _log_report(report, ["top1", "top1_delta", "agreement_with_fp32", "p50_ms", "p95_ms", "speedup"])
+    return report
+
+
+def main():
+    """Main quantization function"""
+    parser = argparse.ArgumentParser(description='Build and evaluate INT8 variants of vision models')
+    subparsers = parser.add_subparsers(dest='target', required=True)
+
+    onnx_parser = subparsers.add_parser('onnx', help='ONNX classifier (app/models/infer.py)')
+    onnx_parser.add_argument('--model', required=True, help='FP32 ONNX model')
+    onnx_parser.add_argument('--labels', required=True, help='Label map JSON (index -> class)')
+    onnx_parser.add_argument('--input-shape', type=int, nargs=3, default=[3, 224, 224], help='C H W')
+
+    yolo_parser = subparsers.add_parser('yolo', help='Storage Guard YOLO detector')
+    yolo_parser.add_argument('--model', required=True, help='FP32 YOLO weights (.pt)')
+    yolo_parser.add_argument('--data', required=True, help='Ultralytics dataset YAML for mAP')
+    yolo_parser.add_argument('--image-size', type=int, default=640)
+
+    plant_parser = subparsers.add_parser('plant-classifier', help='PyTorch PlantClassifier')
+    plant_parser.add_argument('--model-dir', default=None, help='PlantClassifier model directory')
+
+    for sub in (onnx_parser, yolo_parser, plant_parser):
+        sub.add_argument('--images', required=True,
+                         help='Stored images (class subdirectories for classifiers)')
+        sub.add_argument('--samples', type=int, default=500, help='Images used for evaluation')
+        sub.add_argument('--calibration-samples', type=int, default=200, help='Images used for static calibration')
+        sub.add_argument('--report', default=None, help='Report JSON path')
+    for sub in (onnx_parser, yolo_parser):
+        sub.add_argument('--modes', nargs='+', choices=['dynamic', 'static'], default=['dynamic', 'static'])
+
+    args = parser.parse_args()
+
+    if args.target == 'onnx':
+        report = quantize_onnx_classifier(args)
+    elif args.target == 'yolo':
+        report = quantize_yolo(args)
+    else:
+        report = quantize_plant_classifier(args)
+
+    model_path = Path(getattr(args, 'model', None) or 'plant_classifier')
+    report_path = args.report or str(model_path.with_name(f"{model_path.stem}.quantization_report.json"))
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, default=lambda o: o.item() if isinstance(o, np.generic) else str(o))
+    logger.info(f"Quantization report written: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,13 @@
 """
 Training utilities for agricultural AI models
-Dataset handling, transforms, export functions, and calibration
+Dataset handling, transforms, export functions, calibration, and INT8 quantization
 """
 
 import os
 import json
 import logging
+import random
+import time
 from pathlib import Path
 from typing import Dict, Any, Tuple, List, Optional
 import warnings
@@ -19,6 +21,9 @@ from PIL import Image
 import numpy as np
 import onnx
 import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+)
 from sklearn.calibration import calibration_curve
 from scipy.optimize import minimize_scalar
 import albumentations as A
@@ -291,6 +296,237 @@ def calibrate_model(model_path: str, val_loader, calibration_path: str):
     logger.info(f"Calibration file created: {calibration_path}")
 
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def quantized_variant_path(onnx_path: str, variant: str) -> str:
+    """Where a quantized variant is written (matches app/models/model_variants.py)"""
+    path = Path(onnx_path)
+    return str(path.with_name(f"{path.stem}.{variant}.onnx"))
+
+
+def sample_images(root_dir: str, max_images: int = 200, seed: int = 42) -> List[Tuple[str, str]]:
+    """
+    Stratified sample of stored images from a class-per-directory tree
+    
+    Works for training datasets and the PlantClassifier sample store
+    (model_dir/training/<label>/).
+    
+    Returns:
+        List of (image_path, class_name), classes interleaved
+    """
+    rng = random.Random(seed)
+    per_class = {}
+    for class_dir in sorted(Path(root_dir).iterdir()):
+        if class_dir.is_dir():
+            images = [str(p) for p in class_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+            rng.shuffle(images)
+            if images:
+                per_class[class_dir.name] = images
+    
+    # Round-robin across classes so small classes are represented
+    samples = []
+    while per_class and len(samples) < max_images:
+        for class_name in list(per_class):
+            samples.append((per_class[class_name].pop(), class_name))
+            if not per_class[class_name]:
+                del per_class[class_name]
+            if len(samples) >= max_images:
+                break
+    return samples
+
+
+def load_onnx_input(image_path: str, input_shape: List[int], normalization: str = 'imagenet') -> np.ndarray:
+    """
+    Load an image as a (1, C, H, W) float32 array
+    
+    Args:
+        image_path: Image file
+        input_shape: [C, H, W]
+        normalization: 'imagenet' (classifiers, as in app/models/infer.py) or 'unit' (YOLO, [0, 1])
+    """
+    _, height, width = input_shape
+    image = Image.open(image_path).convert('RGB').resize((width, height), Image.BILINEAR)
+    array = np.asarray(image, dtype=np.float32) / 255.0
+    if normalization == 'imagenet':
+        array = (array - IMAGENET_MEAN) / IMAGENET_STD
+    return np.ascontiguousarray(array.transpose(2, 0, 1)[np.newaxis])
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Feeds sample images to ONNX Runtime static quantization calibration"""
+    
+    def __init__(self, onnx_path: str, image_paths: List[str], input_shape: List[int], normalization: str = 'imagenet'):
+        session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+        self.input_name = session.get_inputs()[0].name
+        self.image_paths = image_paths
+        self.input_shape = input_shape
+        self.normalization = normalization
+        self._iterator = iter(self.image_paths)
+    
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        path = next(self._iterator, None)
+        if path is None:
+            return None
+        return {self.input_name: load_onnx_input(path, self.input_shape, self.normalization)}
+    
+    def rewind(self):
+        self._iterator = iter(self.image_paths)
+
+
+def quantize_onnx_model(
+    onnx_path: str,
+    mode: str,
+    calibration_images: Optional[List[str]] = None,
+    input_shape: Optional[List[int]] = None,
+    normalization: str = 'imagenet',
+    output_path: Optional[str] = None
+) -> str:
+    """
+    Produce an INT8 variant of an ONNX model
+    
+    Args:
+        onnx_path: FP32 ONNX model
+        mode: 'dynamic' (weights only, no data needed) or 'static' (weights and
+            activations, calibrated on calibration_images; best for CNNs on CPU)
+        calibration_images: Sample images for static calibration
+        input_shape: [C, H, W] for calibration inputs
+        normalization: Input normalization for calibration ('imagenet' or 'unit')
+        output_path: Defaults to <model>.int8_<mode>.onnx next to the FP32 model
+        
+    Returns:
+        Path of the quantized model
+    """
+    output_path = output_path or quantized_variant_path(onnx_path, f"int8_{mode}")
+    logger.info(f"Quantizing {onnx_path} ({mode}) -> {output_path}")
+    
+    if mode == 'dynamic':
+        # ConvInteger only supports uint8 weights
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8)
+    elif mode == 'static':
+        if not calibration_images or not input_shape:
+            raise ValueError("Static quantization needs calibration_images and input_shape")
+        reader = ImageCalibrationReader(onnx_path, calibration_images, input_shape, normalization)
+        quantize_static(
+            onnx_path,
+            output_path,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    
+    onnx.checker.check_model(onnx.load(output_path))
+    logger.info(f"Quantized model written: {output_path}")
+    return output_path
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 3)
+    }
+
+
+def compare_onnx_classifiers(
+    variant_paths: Dict[str, str],
+    samples: List[Tuple[str, str]],
+    label_map: Dict[str, str],
+    input_shape: List[int],
+    warmup: int = 5
+) -> Dict[str, Any]:
+    """
+    Top-1 accuracy, agreement with FP32 and CPU latency per classifier variant
+    
+    Args:
+        variant_paths: Variant name -> ONNX path; must include 'fp32'
+        samples: (image_path, class_name) pairs
+        label_map: Class index (str) -> class name
+        input_shape: [C, H, W]
+        warmup: Untimed runs per variant
+        
+    Returns:
+        Per-variant metrics plus deltas against FP32
+    """
+    inputs = [(load_onnx_input(path, input_shape), label) for path, label in samples]
+    predictions = {}
+    report = {}
+    
+    for variant, path in variant_paths.items():
+        session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        input_name = session.get_inputs()[0].name
+        for array, _ in inputs[:warmup]:
+            session.run(None, {input_name: array})
+        
+        latencies = []
+        predicted = []
+        for array, _ in inputs:
+            start = time.perf_counter()
+            logits = session.run(None, {input_name: array})[0]
+            latencies.append(time.perf_counter() - start)
+            predicted.append(label_map.get(str(int(np.argmax(logits[0]))), 'unknown'))
+        
+        predictions[variant] = predicted
+        correct = sum(1 for p, (_, label) in zip(predicted, inputs) if p == label)
+        report[variant] = {
+            "path": path,
+            "size_mb": round(os.path.getsize(path) / 1e6, 2),
+            "top1": round(correct / len(inputs), 4) if inputs else None,
+            **latency_stats(latencies)
+        }
+    
+    baseline = report.get('fp32')
+    for variant, metrics in report.items():
+        if variant == 'fp32' or baseline is None:
+            continue
+        agreement = sum(1 for a, b in zip(predictions[variant], predictions['fp32']) if a == b)
+        metrics["agreement_with_fp32"] = round(agreement / len(inputs), 4) if inputs else None
+        metrics["top1_delta"] = round(metrics["top1"] - baseline["top1"], 4)
+        metrics["speedup"] = round(baseline["p50_ms"] / metrics["p50_ms"], 2) if metrics["p50_ms"] else None
+    
+    return {"samples": len(inputs), "variants": report}
+
+
+def compare_yolo_detectors(variant_paths: Dict[str, str], data_yaml: str, image_size: int = 640) -> Dict[str, Any]:
+    """
+    mAP and per-image latency per YOLO variant using the Ultralytics validator
+    
+    Args:
+        variant_paths: Variant name -> weights (.pt or .onnx); must include 'fp32'
+        data_yaml: Ultralytics dataset YAML with a val split
+        image_size: Inference size
+    """
+    from ultralytics import YOLO
+    
+    report = {}
+    for variant, path in variant_paths.items():
+        results = YOLO(path, task='detect').val(data=data_yaml, imgsz=image_size, batch=1, device='cpu', plots=False)
+        report[variant] = {
+            "path": path,
+            "size_mb": round(os.path.getsize(path) / 1e6, 2),
+            "map50": round(float(results.box.map50), 4),
+            "map50_95": round(float(results.box.map), 4),
+            "inference_ms": round(float(results.speed.get('inference', 0.0)), 3)
+        }
+    
+    baseline = report.get('fp32')
+    for variant, metrics in report.items():
+        if variant == 'fp32' or baseline is None:
+            continue
+        metrics["map50_delta"] = round(metrics["map50"] - baseline["map50"], 4)
+        metrics["map50_95_delta"] = round(metrics["map50_95"] - baseline["map50_95"], 4)
+        if metrics["inference_ms"]:
+            metrics["speedup"] = round(baseline["inference_ms"] / metrics["inference_ms"], 2)
+    
+    return {"data": data_yaml, "variants": report}
+
+
 def create_label_mapping(dataset: AgriculturalDataset, label_map_path: str):
     """
     Create label mapping file from dataset
@@ -0,0 +1,21 @@
+"""
+Offline tests for pure service/graph logic.
+
+app/__init__.py imports every router (and through them every database driver),
+so the ``app`` package is registered without running it; individual modules are
+then imported normally.
+"""
+
+import os
+import sys
+import types
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+if "app" not in sys.modules:
+    package = types.ModuleType("app")
+    package.__path__ = [os.path.join(BACKEND_DIR, "app")]
+    sys.modules["app"] = package
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.graph import budget
+from app.graph.nodes import vision_predict
+from app.models.vision_cascade import VisionCascade
+from app.schemas.postgres_base_models import Alternative, SkippedStage, WorkflowState, merge_skipped_stages
+
+
+@pytest.fixture(autouse=True)
+def _estimates(monkeypatch):
+    # Configured estimates only; no observed latencies from other tests
+    monkeypatch.setattr(budget, "expected_seconds", lambda stage: settings.WORKFLOW_STAGE_ESTIMATES_SECONDS.get(stage, 0.0))
+
+
+def _state(seconds_left):
+    deadline = None if seconds_left is None else time.time() + seconds_left
+    return WorkflowState(trace_id="budget-test", deadline=deadline)
+
+
+def test_merge_skipped_stages_deduplicates_dicts_and_models():
+    left = [SkippedStage(stage="slm_analysis", reason="insufficient_budget", remaining_seconds=1.0)]
+    right = [
+        {"stage": "slm_analysis", "reason": "insufficient_budget", "remaining_seconds": 0.5},
+        {"stage": "llm_analysis", "reason": "deadline_exceeded", "remaining_seconds": 0.0},
+    ]
+    merged = merge_skipped_stages(left, right)
+    assert [entry["stage"] if isinstance(entry, dict) else entry.stage for entry in merged] == [
+        "slm_analysis",
+        "llm_analysis",
+    ]
+    assert merge_skipped_stages(None, None) == []
+
+
+def test_deadline_for_uses_default_and_caps_budget(monkeypatch):
+    monkeypatch.setattr(settings, "WORKFLOW_DEFAULT_BUDGET_SECONDS", 0)
+    monkeypatch.setattr(settings, "WORKFLOW_MAX_BUDGET_SECONDS", 30)
+    assert budget.deadline_for(None) is None
+    assert budget.deadline_for(-1) is None
+
+    now = time.time()
+    assert budget.deadline_for(5) == pytest.approx(now + 5, abs=1)
+    assert budget.deadline_for(600) == pytest.approx(now + 30, abs=1)
+
+
+def test_remaining_and_has_budget_for():
+    assert budget.remaining_seconds(_state(None)) is None
+    assert budget.has_budget_for(_state(None), "llm_analysis")
+
+    assert budget.remaining_seconds({"deadline": time.time() - 1}) < 0
+    assert budget.has_budget_for(_state(60), "llm_analysis")
+    assert not budget.has_budget_for(_state(0.1), "llm_analysis")
+
+
+def test_within_budget_skips_optional_stage_without_budget():
+    calls = []
+
+    async def node(state):
+        calls.append(state)
+        return {"ok": True}
+
+    wrapped = budget.within_budget("llm_analysis", node)
+    result = asyncio.run(wrapped(_state(0.1)))
+
+    assert calls == []
+    assert [(entry.stage, entry.reason) for entry in result["skipped_stages"]] == [("llm_analysis", "insufficient_budget")]
+    # Required nodes are never wrapped
+    assert budget.within_budget("vision_predict", node) is node
+
+
+def test_within_budget_cancels_at_deadline(monkeypatch):
+    monkeypatch.setattr(budget, "expected_seconds", lambda stage: 0.0)
+    cancelled = []
+
+    async def node(state):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {"ok": True}
+
+    wrapped = budget.within_budget("slm_analysis", node)
+    result = asyncio.run(wrapped(_state(0.05)))
+
+    assert cancelled == [True]
+    assert [(entry.stage, entry.reason) for entry in result["skipped_stages"]] == [("slm_analysis", "deadline_exceeded")]
+
+
+def _predict(monkeypatch, tmp_path, state, local):
+    async def fake_local(image_path):
+        return local
+
+    llm_calls = []
+
+    async def fake_llm(llm_service, providers, state, index, image_path, timeout):
+        llm_calls.append(timeout)
+        return "rust", 0.9, []
+
+    monkeypatch.setattr(vision_predict, "predict_local", fake_local)
+    monkeypatch.setattr(vision_predict, "_llm_predict", fake_llm)
+    cascade = VisionCascade(thresholds_path=tmp_path / "thresholds.json")
+    monkeypatch.setattr(vision_predict, "get_vision_cascade", lambda: cascade)
+
+    async def run():
+        return await vision_predict._predict_image(None, [], asyncio.Semaphore(1), state, 0, "leaf.jpg")
+
+    return asyncio.run(run()), llm_calls
+
+
+def test_predict_image_degrades_without_budget(monkeypatch, tmp_path):
+    prediction, llm_calls = _predict(monkeypatch, tmp_path, _state(-1), local=None)
+    assert llm_calls == []
+    assert prediction["source"] == "none"
+    assert prediction["cascade"]["decision"] == "budget_exhausted"
+
+    local = ("blight", 0.5, [Alternative(label="rust", confidence=0.3)])
+    prediction, llm_calls = _predict(monkeypatch, tmp_path, _state(0.1), local=local)
+    assert llm_calls == []
+    assert (prediction["source"], prediction["label"]) == ("local", "blight")
+    assert prediction["cascade"]["decision"] == "budget_exhausted"
+
+
+def test_predict_image_clamps_llm_timeout_to_remaining_budget(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "VISION_IMAGE_TIMEOUT_SECONDS", 60)
+    prediction, llm_calls = _predict(monkeypatch, tmp_path, _state(5), local=None)
+    assert prediction["source"] == "llm"
+    assert 0 < llm_calls[0] <= 5
+
+
+def test_vision_node_cancels_tiled_pass_when_cancelled(monkeypatch):
+    tiled_cancelled = []
+
+    async def slow_tiled(state):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            tiled_cancelled.append(True)
+            raise
+        return [], []
+
+    async def slow_predict(*args):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(vision_predict, "get_llm_service", lambda: None)
+    monkeypatch.setattr(vision_predict, "_vision_provider_order", lambda llm_service: [])
+    monkeypatch.setattr(vision_predict, "_tiled_analyses", slow_tiled)
+    monkeypatch.setattr(vision_predict, "_predict_image", slow_predict)
+    state = WorkflowState(trace_id="budget-test", processed_images=["leaf.jpg"])
+
+    async def run():
+        task = asyncio.create_task(vision_predict.vision_predict_node(state))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels leftover tasks itself
+        assert tiled_cancelled == [True]
+
+    asyncio.run(run())
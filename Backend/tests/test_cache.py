@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+from app.core.cache import CacheNamespace, DiskCache
+
+
+def _disk(tmp_path):
+    return DiskCache(tmp_path / "cache.sqlite3", max_bytes=1 << 20)
+
+
+def test_claim_is_exclusive_until_released(tmp_path):
+    disk = _disk(tmp_path)
+    other_worker = DiskCache(disk.path, max_bytes=1 << 20)
+
+    assert disk.claim("weather", "k", lease_seconds=30)
+    assert not other_worker.claim("weather", "k", lease_seconds=30)
+    assert other_worker.is_claimed("weather", "k")
+    assert other_worker.claim("weather", "other-key", lease_seconds=30)
+
+    disk.release("weather", "k")
+    assert not other_worker.is_claimed("weather", "k")
+    assert other_worker.claim("weather", "k", lease_seconds=30)
+
+
+def test_expired_lease_can_be_reclaimed(tmp_path):
+    disk = _disk(tmp_path)
+    assert disk.claim("weather", "k", lease_seconds=0.01)
+    time.sleep(0.02)
+    assert not disk.is_claimed("weather", "k")
+    assert disk.claim("weather", "k", lease_seconds=30)
+
+
+def test_disk_tier_is_shared_and_expires(tmp_path):
+    disk = _disk(tmp_path)
+    writer = CacheNamespace("weather", max_entries=8, ttl_seconds=60, disk=disk)
+    reader = CacheNamespace("weather", max_entries=8, ttl_seconds=60, disk=DiskCache(disk.path, 1 << 20))
+
+    writer.set("k", {"temperature": 21.5})
+    assert reader.get("k") == {"temperature": 21.5}
+    assert reader.stats.disk_hits == 1
+
+    writer.set("short", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert CacheNamespace("weather", 8, 60, disk=disk).get("short") is None
+
+
+def test_lru_evicts_least_recently_used():
+    cache = CacheNamespace("lru", max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+def test_get_or_load_runs_loader_once_for_concurrent_callers(tmp_path):
+    cache = CacheNamespace("weather", max_entries=8, ttl_seconds=60, disk=_disk(tmp_path))
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader, lease_seconds=5) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats.coalesced == 4
+    # The lease is released once the value is stored
+    assert not cache.disk.is_claimed("weather", "k")
+
+
+def test_get_or_load_releases_lease_when_loader_fails(tmp_path):
+    cache = CacheNamespace("weather", max_entries=8, ttl_seconds=60, disk=_disk(tmp_path))
+
+    async def failing():
+        raise RuntimeError("provider down")
+
+    async def run():
+        try:
+            await cache.get_or_load("k", failing, lease_seconds=5)
+        except RuntimeError:
+            pass
+        return await cache.get_or_load("k", _value, lease_seconds=5)
+
+    async def _value():
+        return 42
+
+    assert asyncio.run(run()) == 42
+    assert not cache.disk.is_claimed("weather", "k")
+
+
+def test_get_or_load_reads_and_writes_disk_tier_off_the_loop(tmp_path):
+    disk = _disk(tmp_path)
+    cache = CacheNamespace("analyze_plant", max_entries=8, ttl_seconds=60, disk=disk)
+    disk_threads = []
+    disk_get, disk_set = disk.get, disk.set
+
+    def recording_get(*args):
+        disk_threads.append(threading.get_ident())
+        return disk_get(*args)
+
+    def recording_set(*args):
+        disk_threads.append(threading.get_ident())
+        return disk_set(*args)
+
+    disk.get, disk.set = recording_get, recording_set
+
+    async def loader():
+        return "diagnosis"
+
+    async def run():
+        first = await cache.get_or_load("k", loader)
+        cache._entries.clear()  # Force the second call to the disk tier
+        second = await cache.get_or_load("k", loader)
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run())
+    assert (first, second) == ("diagnosis", "diagnosis")
+    assert cache.stats.disk_hits == 1
+    assert len(disk_threads) == 3  # miss read, write, hit read
+    assert loop_thread not in disk_threads
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.graph.nodes import cross_validation
+from app.schemas.postgres_base_models import WorkflowState
+from app.services.llm_service import LLMProvider
+
+
+class _PromptEngine:
+    """Prompt engine that fails while building the second validator's prompt"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_cross_validation_prompt(self, **kwargs):
+        self.calls += 1
+        if self.calls == 2:
+            raise ValueError("template missing")
+        return "compare A and B"
+
+
+class _LLMService:
+    def get_healthy_providers(self):
+        return [LLMProvider.ANTHROPIC, LLMProvider.GOOGLE, LLMProvider.OPENAI]
+
+
+def test_prompt_failure_starts_no_validators(monkeypatch):
+    started = []
+
+    async def fake_validator(llm_service, provider, prompt, image_data):
+        started.append(provider)
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(cross_validation, "get_llm_service", lambda: _LLMService())
+    monkeypatch.setattr(cross_validation, "get_prompt_engine", lambda: _PromptEngine())
+    monkeypatch.setattr(cross_validation, "_validate_sequential_prerequisites", lambda state: True)
+    monkeypatch.setattr(cross_validation, "_prepare_sequential_validation_context", lambda state: {})
+    monkeypatch.setattr(cross_validation, "_run_validator", fake_validator)
+    state = WorkflowState(trace_id="cv-test", cv_analysis_enabled=True)
+
+    async def run():
+        result = await cross_validation.cross_validation_node(state)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels leftover tasks itself
+        assert started == []
+        assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+        return result
+
+    result = asyncio.run(run())
+    assert any("template missing" in error for error in result.errors)
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services import demand_forecast_service as forecast
+from app.services.demand_forecast_service import DemandForecastService, TrainingInProgress
+
+EVENT_COLUMNS = ["location_id", "crop", "quantity_kg", "created_at"]
+LOCATIONS = pd.DataFrame(
+    [("loc-a", 17.4, 78.5, "Telangana"), ("loc-b", 16.5, 80.6, "Andhra Pradesh")],
+    columns=["location_id", "lat", "lon", "region"],
+)
+
+
+class OfflineForecastService(DemandForecastService):
+    """Service with the Postgres reads and the publish step replaced by in-memory data"""
+
+    def __init__(self, state_path, bookings=(), cancellations=()):
+        super().__init__(db=None, state_path=state_path)
+        self.bookings = list(bookings)
+        self.cancellations = list(cancellations)
+        self.published = None
+
+    def _load_locations(self):
+        return LOCATIONS.copy()
+
+    def _fetch_events(self, since, locations):
+        rows = [row for row in self.bookings if since is None or row[3] > since]
+        events = pd.DataFrame(rows, columns=EVENT_COLUMNS)
+        return self._normalize_events(self._with_region(events, locations))
+
+    def _fetch_cancellations(self, since, locations):
+        rows = [row for row in self.cancellations if since is None or row[4] > since]
+        cancelled = pd.DataFrame(rows, columns=EVENT_COLUMNS + ["cancelled_at"])
+        events = self._normalize_events(self._with_region(cancelled.drop(columns="cancelled_at"), locations))
+        if events.empty:
+            return events, None
+        events["quantity_kg"] = -events["quantity_kg"]
+        return events, max(row[4] for row in rows)
+
+    def _fetch_open_rfqs(self, locations):
+        events = pd.DataFrame(columns=EVENT_COLUMNS + ["region"])
+        return self._normalize_events(events)
+
+    def _fetch_temperature(self, since, locations):
+        return pd.DataFrame(columns=["region", "week_start", "temperature_sum", "temperature_n"]), None
+
+    def _publish(self, origin, generated_at):
+        self.published = origin
+        return len(origin)
+
+
+def _weeks_ago(weeks, now=None):
+    now = now or datetime.now(timezone.utc)
+    return now - timedelta(weeks=weeks)
+
+
+def _weekly_bookings(location_id, crop, weeks, kg=100):
+    return [(location_id, crop, kg + (w % 4) * 10, _weeks_ago(w)) for w in range(2, weeks + 2)]
+
+
+def _history(state_path):
+    return forecast.joblib.load(state_path)["weekly"]
+
+
+def test_weekly_from_events_sums_facility_and_region_series():
+    monday = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+    events = pd.DataFrame(
+        [
+            ("loc-a", "wheat", 100.0, monday, "Telangana"),
+            ("loc-a", "wheat", 50.0, monday + timedelta(days=6), "Telangana"),
+            ("loc-a", "wheat", 20.0, monday + timedelta(days=7), "Telangana"),
+            (None, "wheat", 30.0, monday, "Telangana"),
+        ],
+        columns=EVENT_COLUMNS + ["region"],
+    )
+    weekly = DemandForecastService._weekly_from_events(events)
+    by_series = {
+        (row.level, row.key, row.week_start.date().isoformat()): row.demand_kg for row in weekly.itertuples()
+    }
+
+    assert by_series == {
+        ("facility", "loc-a", "2026-03-02"): 150.0,
+        ("facility", "loc-a", "2026-03-09"): 20.0,
+        # Events without a facility (open RFQs) only count toward their region
+        ("region", "Telangana", "2026-03-02"): 180.0,
+        ("region", "Telangana", "2026-03-09"): 20.0,
+    }
+
+
+def test_watermark_folds_each_event_once(tmp_path):
+    state_path = tmp_path / "state.joblib"
+    bookings = _weekly_bookings("loc-a", "wheat", weeks=10)
+    service = OfflineForecastService(state_path, bookings)
+    service.train_and_publish()
+    first = _history(state_path)["demand_kg"].sum()
+
+    state = forecast.joblib.load(state_path)
+    assert state["watermark"] == max(row[3] for row in bookings)
+
+    # Same data again: nothing new past the watermark
+    service.train_and_publish()
+    assert _history(state_path)["demand_kg"].sum() == first
+
+    service.bookings.append(("loc-a", "wheat", 40, datetime.now(timezone.utc)))
+    service.train_and_publish()
+    # Facility and region series both grow by the new booking
+    assert _history(state_path)["demand_kg"].sum() == first + 80
+
+
+def test_cancelled_booking_is_netted_out_once(tmp_path):
+    state_path = tmp_path / "state.joblib"
+    booked_at = _weeks_ago(3)
+    bookings = _weekly_bookings("loc-a", "wheat", weeks=6) + [("loc-a", "wheat", 500, booked_at)]
+    service = OfflineForecastService(state_path, bookings)
+    service.train_and_publish()
+    with_booking = _history(state_path)["demand_kg"].sum()
+
+    service.cancellations.append(("loc-a", "wheat", 500, booked_at, datetime.now(timezone.utc)))
+    service.train_and_publish()
+    assert _history(state_path)["demand_kg"].sum() == with_booking - 1000
+
+    service.train_and_publish()
+    assert _history(state_path)["demand_kg"].sum() == with_booking - 1000
+
+
+def test_sparse_region_uses_pooled_crop_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DEMAND_FORECAST_MIN_TRAINING_ROWS", 100)
+    bookings = _weekly_bookings("loc-a", "wheat", weeks=30) + _weekly_bookings("loc-b", "wheat", weeks=4)
+    service = OfflineForecastService(tmp_path / "state.joblib", bookings)
+    summary = service.train_and_publish()
+
+    models = forecast.joblib.load(tmp_path / "state.joblib")["models"]["wheat"]
+    assert models["pooled"]["model"] is not None
+    assert set(models["regions"]) == {"Telangana"}
+    assert summary["region_models"] == 1
+    published = service.published
+    assert set(published["region"]) == {"Telangana", "Andhra Pradesh"}
+
+
+def test_forecasts_cover_configured_horizons_and_are_non_negative(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DEMAND_FORECAST_MIN_HORIZON_WEEKS", 3)
+    monkeypatch.setattr(settings, "DEMAND_FORECAST_MAX_HORIZON_WEEKS", 5)
+    bookings = _weekly_bookings("loc-a", "rice", weeks=12)
+    # A large cancellation pushes recent history down; forecasts must not go below zero
+    cancellations = [("loc-a", "rice", 5000, _weeks_ago(2), datetime.now(timezone.utc))]
+    service = OfflineForecastService(tmp_path / "state.joblib", bookings, cancellations)
+    service.train_and_publish()
+
+    published = service.published
+    assert set(published["horizon"].astype(int)) == {3, 4, 5}
+    assert (published[["forecast_kg", "lower_kg", "upper_kg"]] >= 0).all().all()
+
+
+def test_concurrent_run_is_rejected(tmp_path):
+    service = OfflineForecastService(tmp_path / "state.joblib")
+    with forecast._train_lock:
+        with pytest.raises(TrainingInProgress):
+            service.train_and_publish()
@@ -0,0 +1,26 @@
+import asyncio
+
+from app.connections.http_connection import HTTPClientPool
+
+
+def test_client_from_another_loop_is_replaced_and_closed():
+    pool = HTTPClientPool()
+
+    async def get_clients():
+        return pool.httpx_client("weather"), pool.aiohttp_session("llm:test")
+
+    old_client, old_session = asyncio.run(get_clients())
+
+    async def replace():
+        client, session = await get_clients()
+        # Same loop: the pooled clients are reused
+        assert (client, session) == await get_clients()
+        await asyncio.gather(*pool._closing, return_exceptions=True)
+        await pool.close()
+        return client, session
+
+    new_client, new_session = asyncio.run(replace())
+    assert new_client is not old_client and new_session is not old_session
+    assert old_client.is_closed
+    assert old_session.closed
+    assert new_client.is_closed and new_session.closed
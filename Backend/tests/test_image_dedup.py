@@ -0,0 +1,77 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+from app.models.transforms import ImageTransforms
+from app.services.image_dedup_service import ImageDedupService, _ScopeHashes
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    # Memory-only cache so tests never touch the shared disk tier
+    monkeypatch.setattr(settings, "CACHE_DISK_ENABLED", False)
+    monkeypatch.setattr(cache, "_cache_manager_instance", cache.CacheManager())
+    return ImageDedupService(max_distance=6, max_age_seconds=3600, max_entries_per_scope=4)
+
+
+def _leaf_jpeg(quality: int, brightness: int = 0) -> bytes:
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    image[:, :, 1] = np.linspace(40, 200, 320, dtype=np.uint8)[None, :]
+    cv2.ellipse(image, (160, 120), (110, 60), 30, 0, 360, (30, 140, 40), -1)
+    cv2.circle(image, (120, 100), 18, (40, 60, 120), -1)
+    cv2.circle(image, (210, 150), 12, (40, 60, 120), -1)
+    image = cv2.convertScaleAbs(image, alpha=1.0, beta=brightness)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return encoded.tobytes()
+
+
+def test_dhash_survives_recompression():
+    original = ImageTransforms.calculate_dhash(_leaf_jpeg(95))
+    recompressed = ImageTransforms.calculate_dhash(_leaf_jpeg(40, brightness=10))
+    assert ImageTransforms.hamming_distance(original, recompressed) <= 6
+    assert ImageTransforms.calculate_dhash(b"not an image") is None
+
+
+def test_near_duplicate_reuses_diagnosis_within_scope(dedup):
+    scope = dedup.scope_for("farmer-1", "plot-a", "opts-1")
+    phash = ImageTransforms.calculate_dhash(_leaf_jpeg(95))
+    response = {"status": "success", "diagnosis": "early blight"}
+    asyncio.run(dedup.remember(scope, phash, "k1", response))
+
+    reused = asyncio.run(dedup.find_diagnosis(scope, ImageTransforms.calculate_dhash(_leaf_jpeg(40))))
+    assert reused["diagnosis"] == "early blight"
+    assert reused["near_duplicate"]["reused"]
+    assert "near_duplicate" not in response  # the stored copy is not modified
+
+
+def test_different_options_or_plot_do_not_match(dedup):
+    phash = ImageTransforms.calculate_dhash(_leaf_jpeg(95))
+    asyncio.run(dedup.remember(dedup.scope_for("farmer-1", "plot-a", "opts-1"), phash, "k1", {"status": "success"}))
+
+    assert dedup.scope_for(None) is None
+    assert asyncio.run(dedup.find_diagnosis(dedup.scope_for("farmer-1", "plot-a", "opts-2"), phash)) is None
+    assert asyncio.run(dedup.find_diagnosis(dedup.scope_for("farmer-1", "plot-b", "opts-1"), phash)) is None
+
+
+def test_distance_threshold_and_age():
+    hashes = _ScopeHashes(max_entries=4)
+    hashes.add(0b1111, "k", timestamp=100.0)
+
+    assert hashes.nearest(0b0111, max_distance=1, min_timestamp=0.0) == ("k", 1, 100.0)
+    assert hashes.nearest(0b0000, max_distance=3, min_timestamp=0.0) is None
+    assert hashes.nearest(0b1111, max_distance=1, min_timestamp=200.0) is None
+
+
+def test_ring_buffer_replaces_oldest_at_capacity():
+    hashes = _ScopeHashes(max_entries=3)
+    for i in range(4):
+        hashes.add(1 << (i * 8), f"k{i}", timestamp=float(i))
+
+    assert hashes.size == 3
+    assert hashes.nearest(1, max_distance=0, min_timestamp=0.0) is None  # k0 was overwritten
+    assert hashes.nearest(1 << 24, max_distance=0, min_timestamp=0.0)[0] == "k3"
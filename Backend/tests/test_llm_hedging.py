@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.services import llm_service
+from app.services.llm_service import LLMProvider, LLMResponse, LLMResponseType, MultiLLMService
+
+
+class ScriptedClient:
+    model = "scripted"
+
+
+class ScriptedLLMService(MultiLLMService):
+    """Providers answer from a script instead of calling remote APIs"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        super().__init__()
+
+    def _initialize_clients(self):
+        return {provider: ScriptedClient() for provider in self.answers}
+
+    async def analyze_image_with_provider(self, provider, image_data, prompt, response_type):
+        delay, success = self.answers[provider]
+        await asyncio.sleep(delay)
+        return LLMResponse(
+            provider=provider,
+            response_type=response_type,
+            content="leaf blight" if success else "",
+            success=success,
+            error=None if success else f"{provider.value} unavailable",
+        )
+
+
+@pytest.fixture
+def use_service(monkeypatch):
+    def install(answers):
+        service = ScriptedLLMService(answers)
+        monkeypatch.setattr(llm_service, "_llm_service_instance", service)
+        return service
+    return install
+
+
+def test_hedged_returns_first_success_after_failover(use_service):
+    service = use_service({LLMProvider.OPENAI: (0.0, False), LLMProvider.GOOGLE: (0.0, True)})
+    response = asyncio.run(service.analyze_image_hedged(
+        [LLMProvider.OPENAI, LLMProvider.GOOGLE], "b64", "prompt", LLMResponseType.LLM_VISION_ANALYSIS
+    ))
+    assert response.success
+    assert response.provider is LLMProvider.GOOGLE
+    assert service.hedge_stats["failovers"] == 1
+
+
+def test_hedged_helper_reports_error_when_every_provider_fails(use_service):
+    use_service({LLMProvider.OPENAI: (0.0, False), LLMProvider.GOOGLE: (0.0, False)})
+    result = asyncio.run(llm_service.analyze_leaf_image_llm(b"img", providers="openai,google", hedge=True))
+
+    assert result["status"] == "error"
+    assert result["error"] == "google unavailable"
+    assert result["providers"] == ["openai", "google"]
+
+
+def test_hedged_helper_reports_success(use_service):
+    use_service({LLMProvider.OPENAI: (0.0, True)})
+    result = asyncio.run(llm_service.analyze_leaf_image_llm(b"img", providers="openai", hedge=True))
+
+    assert result["status"] == "success"
+    assert result["responses"]["openai"]["content"] == "leaf blight"
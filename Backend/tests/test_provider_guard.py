@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from app.services.provider_guard import CircuitBreaker, CircuitState, ProviderGuard, TokenBucket
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60, half_open_probes=1)
+    assert not breaker.record_failure()
+    breaker.record_success()  # resets the streak
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.is_available()
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_throttling_trips_immediately():
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=60)
+    assert breaker.record_failure(trip=True)
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_half_open_probe_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0, half_open_probes=1)
+    breaker.record_failure()
+
+    assert breaker.allow()  # reset elapsed: the probe goes through
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05, half_open_probes=1)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow()
+
+
+def test_released_probe_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0, half_open_probes=1)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.is_available()
+    assert breaker.allow()
+
+
+def test_token_bucket_queues_then_rejects():
+    bucket = TokenBucket(requests_per_minute=60, burst_seconds=1)  # 1 token, refills 1/s
+    assert bucket.reserve(max_wait=0) == 0.0
+    wait = bucket.reserve(max_wait=2)
+    assert 0.9 < wait <= 1.0
+    assert bucket.reserve(max_wait=0.5) is None
+    assert bucket.throttled == 1
+
+
+def test_guard_fails_fast_while_open_and_on_rate_limit_errors():
+    guard = ProviderGuard()
+    guard.record("openai", False, "HTTP 429 Too Many Requests")
+
+    assert not guard.is_available("openai")
+    assert asyncio.run(guard.acquire("openai")) == "circuit open"
+    assert guard.snapshot()["openai"]["circuit"]["state"] == "open"
@@ -0,0 +1,87 @@
+import random
+
+from app.core.config import settings
+from app.services.provider_router import AdaptiveRouter, route_kind
+
+VISION = route_kind(vision=True)
+TEXT = route_kind(vision=False)
+
+
+def _router(**kwargs):
+    return AdaptiveRouter(alpha=0.5, explore_rate=0.0, rng=random.Random(0), **kwargs)
+
+
+def _warm(router, name, kind, latency, cost=None, calls=5):
+    for _ in range(calls):
+        router.record(name, kind, latency, True, cost)
+
+
+def test_ranks_by_latency_and_keeps_order_on_ties():
+    router = _router()
+    _warm(router, "slow", VISION, 4.0)
+    _warm(router, "fast", VISION, 1.0)
+
+    assert router.rank(["slow", "fast"], VISION) == ["fast", "slow"]
+    # No samples: both score the prior, caller order breaks the tie
+    assert router.rank(["a", "b"], VISION) == ["a", "b"]
+
+
+def test_failing_or_unsampled_candidates_do_not_reorder_healthy_ones():
+    router = _router()
+    _warm(router, "fast-expensive", VISION, 1.0, cost=0.02)
+    _warm(router, "slow-cheap", VISION, 2.0, cost=0.001)
+    for _ in range(5):
+        router.record("broken", VISION, 30.0, False)
+
+    healthy = ["fast-expensive", "slow-cheap"]
+    alone = router._scores(healthy, VISION, None, None)
+    with_others = router._scores(healthy + ["broken", "unsampled"], VISION, None, None)
+
+    assert {name: with_others[name] for name in healthy} == alone
+    assert router.rank(healthy + ["broken"], VISION)[-1] == "broken"
+
+
+def test_vision_and_text_are_tracked_separately():
+    router = _router()
+    _warm(router, "a", VISION, 8.0)
+    _warm(router, "b", VISION, 2.0)
+    _warm(router, "a", TEXT, 0.5)
+    _warm(router, "b", TEXT, 3.0)
+
+    assert router.rank(["a", "b"], VISION)[0] == "b"
+    assert router.rank(["a", "b"], TEXT)[0] == "a"
+    assert set(router.report()["candidates"]["a"]) == {"vision", "text"}
+
+
+def test_budget_violations_sort_last():
+    router = _router()
+    _warm(router, "fast-expensive", VISION, 1.0, cost=0.05)
+    _warm(router, "slow-cheap", VISION, 3.0, cost=0.001)
+
+    assert router.rank(["fast-expensive", "slow-cheap"], VISION, max_cost=0.01)[0] == "slow-cheap"
+    assert router.rank(["fast-expensive", "slow-cheap"], VISION, max_latency_seconds=2.0)[0] == "fast-expensive"
+
+
+def test_health_is_per_modality_and_recovers_after_cooldown(monkeypatch):
+    router = _router()
+    for _ in range(3):
+        router.record("a", VISION, 1.0, False)
+    _warm(router, "a", TEXT, 1.0)
+
+    assert not router.is_healthy("a", VISION)
+    assert router.is_healthy("a", TEXT)
+    assert router.is_healthy("a")  # healthy for at least one modality
+    assert router.is_healthy("unknown", VISION)
+
+    monkeypatch.setattr(settings, "LLM_ROUTER_RETRY_UNHEALTHY_SECONDS", 0.0)
+    assert router.is_healthy("a", VISION)
+
+
+def test_exploration_moves_a_non_best_candidate_first():
+    router = AdaptiveRouter(alpha=0.5, explore_rate=1.0, rng=random.Random(1))
+    _warm(router, "best", VISION, 1.0)
+    _warm(router, "other", VISION, 3.0)
+
+    assert router.rank(["best", "other"], VISION) == ["other", "best"]
+    assert router.rank(["best", "other"], VISION, explore=False) == ["best", "other"]
+    assert router.report()["explored"] == 1
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import random
+from collections import deque
+
+import pytest
+
+from app.core.config import settings
+from app.models.llm_manager import LLMResponse, LLMResponseType
+from app.models.response_agent import ResponseAgent
+
+ANSWER = (
+    "Leaf rust is a fungal disease. Symptoms include orange spots and yellowing leaves. "
+    "1. Apply a copper fungicide and monitor the field weekly. "
+    "2. Remove infected leaves and avoid overhead irrigation."
+)
+
+
+@pytest.fixture(autouse=True)
+def _settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_SKIP_LOG_PATH", tmp_path / "skipped.jsonl")
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_MIN_SCORE_SAMPLES", 5)
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_BOUND_FLOOR", 0.0)
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_EXPLORE_RATE", 0.0)
+
+
+def _response(provider, content=ANSWER, error=None):
+    return LLMResponse(
+        provider=provider,
+        response_type=LLMResponseType.LLM_ANALYSIS,
+        content=content,
+        success=error is None,
+        error=error,
+        confidence=0.9,
+    )
+
+
+async def _answer(response, delay=0.0):
+    await asyncio.sleep(delay)
+    return response
+
+
+class _Slow:
+    """Provider call that only returns after a long delay and notes whether it was cancelled"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.cancelled = False
+
+    async def __call__(self):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return _response(self.provider)
+
+
+def _seed(agent, provider, score, count=5):
+    for _ in range(count):
+        agent._score_history.setdefault(provider, deque()).append(score)
+
+
+def test_quality_bar_met_cancels_pending_calls():
+    agent = ResponseAgent(rng=random.Random(0))
+    slow = _Slow("anthropic")
+    decision, responses = asyncio.run(
+        agent.select_as_completed({"openai": _answer(_response("openai")), "anthropic": slow()}, "leaf rust", quality_bar=0.1)
+    )
+
+    assert decision.selected_provider == "openai"
+    assert decision.metadata["early_exit"] == "quality_bar_met"
+    assert list(responses) == ["openai"]
+    assert slow.cancelled
+    logged = [json.loads(line) for line in settings.RESPONSE_AGENT_SKIP_LOG_PATH.read_text().splitlines()]
+    assert [(entry["provider"], entry["reason"]) for entry in logged] == [("anthropic", "quality_bar_met")]
+
+
+def test_cannot_beat_best_uses_successful_history():
+    agent = ResponseAgent(rng=random.Random(0))
+    _seed(agent, "anthropic", 0.05)
+    slow = _Slow("anthropic")
+    decision, _ = asyncio.run(
+        agent.select_as_completed({"openai": _answer(_response("openai")), "anthropic": slow()}, "leaf rust", quality_bar=1.0)
+    )
+
+    assert decision.metadata["early_exit"] == "cannot_beat_best"
+    assert slow.cancelled
+
+
+def test_failures_do_not_pin_the_bound():
+    agent = ResponseAgent(rng=random.Random(0))
+    formula_max = agent.max_possible_score("anthropic", "leaf rust")
+    for _ in range(10):
+        agent.select_best_response({"anthropic": _response("anthropic", content="", error="timeout")}, "leaf rust")
+
+    assert "anthropic" not in agent._score_history
+    assert agent.max_possible_score("anthropic", "leaf rust") == formula_max
+
+
+def test_bound_is_a_floored_quantile(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_BOUND_FLOOR", 0.4)
+    agent = ResponseAgent(rng=random.Random(0))
+    _seed(agent, "anthropic", 0.1)
+    assert agent.max_possible_score("anthropic", "leaf rust") == 0.4
+
+    _seed(agent, "google", 0.6, count=19)
+    _seed(agent, "google", 0.0, count=1)
+    assert agent.max_possible_score("google", "leaf rust") == 0.6
+
+
+def test_failed_best_never_ends_selection():
+    agent = ResponseAgent(rng=random.Random(0))
+    _seed(agent, "anthropic", 0.05)
+    failed = _response("openai", content="", error="rate limited")
+    decision, responses = asyncio.run(
+        agent.select_as_completed(
+            {"openai": _answer(failed), "anthropic": _answer(_response("anthropic"), delay=0.05)},
+            "leaf rust",
+            quality_bar=0.0,
+        )
+    )
+
+    assert decision.metadata["early_exit"] is None
+    assert set(responses) == {"openai", "anthropic"}
+    assert decision.selected_provider == "anthropic"
+
+
+def test_exploration_lets_skipped_providers_finish(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_AGENT_EXPLORE_RATE", 1.0)
+    agent = ResponseAgent(rng=random.Random(0))
+    _seed(agent, "anthropic", 0.05)
+    decision, responses = asyncio.run(
+        agent.select_as_completed(
+            {"openai": _answer(_response("openai")), "anthropic": _answer(_response("anthropic"), delay=0.05)},
+            "leaf rust",
+            quality_bar=1.0,
+        )
+    )
+
+    assert decision.metadata["explored"]
+    assert decision.metadata["early_exit"] is None
+    assert set(responses) == {"openai", "anthropic"}
+    # The fresh successful score lifts the provider's ceiling again
+    assert agent.max_possible_score("anthropic", "leaf rust") > 0.05
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from app.services.shelf_life_service import (
+    CROP_KINETICS,
+    DEFAULT_KINETICS,
+    MIN_RATE,
+    _forward_fill,
+    compute_consumed_hours,
+    crop_kinetics,
+    decay_rates,
+)
+
+
+def test_crop_kinetics_matches_substrings_and_falls_back():
+    assert crop_kinetics("Tomato") == CROP_KINETICS["tomato"]
+    assert crop_kinetics("Cherry Tomato") == CROP_KINETICS["tomato"]
+    assert crop_kinetics(None) == DEFAULT_KINETICS
+    assert crop_kinetics("dragonfruit") == DEFAULT_KINETICS
+
+
+def test_forward_fill_keeps_leading_nans():
+    matrix = np.array([[np.nan, 1.0, np.nan, 3.0, np.nan]])
+    filled = _forward_fill(matrix)
+    assert np.isnan(filled[0, 0])
+    assert filled[0, 1:].tolist() == [1.0, 1.0, 3.0, 3.0]
+
+
+def test_decay_rates_follow_q10_and_humidity_band():
+    temperature = np.array([[12.0, 22.0, np.nan, -100.0]])
+    humidity = np.array([[90.0, 90.0, 80.0, 90.0]])
+    rates = decay_rates(temperature, humidity, t_ref=12.0, q10=2.5, rh_min=85.0, rh_max=95.0)
+
+    assert rates[0, 0] == pytest.approx(1.0)
+    assert rates[0, 1] == pytest.approx(2.5)  # +10 °C multiplies the rate by Q10
+    assert rates[0, 2] == pytest.approx(1.25)  # unknown temperature, 5 points too dry
+    assert rates[0, 3] == MIN_RATE
+
+
+def test_compute_consumed_hours_counts_from_each_lot_start():
+    hours = 4
+    temperature = np.array([[12.0] * hours, [22.0] * hours])
+    humidity = np.full((2, hours), 90.0)
+    consumed, current = compute_consumed_hours(
+        temperature,
+        humidity,
+        lot_location_idx=np.array([0, 1, 1]),
+        lot_start_idx=np.array([0, 0, 3]),
+        lot_crop_idx=np.array([0, 0, 0]),
+        crop_params=[(12.0, 2.5, 85.0, 95.0)],
+    )
+
+    assert consumed.tolist() == pytest.approx([4.0, 10.0, 2.5])
+    assert current.tolist() == pytest.approx([1.0, 2.5, 2.5])
+
+
+def test_compute_consumed_hours_without_history():
+    empty = np.empty((1, 0))
+    consumed, current = compute_consumed_hours(
+        empty, empty, np.array([0]), np.array([0]), np.array([0]), [(12.0, 2.5, 85.0, 95.0)]
+    )
+    assert consumed.tolist() == [0.0]
+    assert current.tolist() == [1.0]
@@ -0,0 +1,65 @@
+import asyncio
+import io
+import threading
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.services.upload_service import UploadService
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="leaf.png")
+
+
+def test_temporary_upload_is_typed_and_discarded():
+    service = UploadService()
+    path = asyncio.run(service.save_temporary(_upload(PNG)))
+
+    assert path.suffix == ".png"
+    assert path.read_bytes() == PNG
+    service.discard([path])
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("data,status", [(b"GIF89a" + b"\x00" * 32, 415), (b"", 400)])
+def test_temporary_upload_rejects_non_images(data, status):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(UploadService().save_temporary(_upload(data)))
+    assert error.value.status_code == status
+
+
+def test_temporary_upload_enforces_size_cap():
+    service = UploadService()
+    service.max_bytes = 32
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service.save_temporary(_upload(PNG)))
+    assert error.value.status_code == 413
+
+
+def test_upload_file_io_runs_off_the_event_loop(monkeypatch):
+    from app.services import upload_service
+
+    threads = []
+
+    class _RecordingFile(io.BytesIO):
+        def write(self, data):
+            threads.append(threading.get_ident())
+            return super().write(data)
+
+    def fake_open(path, mode):
+        threads.append(threading.get_ident())
+        return _RecordingFile()
+
+    monkeypatch.setattr(upload_service, "open", fake_open, raising=False)
+    monkeypatch.setattr(upload_service.os, "replace", lambda src, dst: None)
+
+    async def run():
+        await UploadService().save_temporary(_upload(PNG))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2
+    assert loop_thread not in threads
@@ -0,0 +1,59 @@
+import json
+import random
+
+from app.core.config import settings
+from app.models.vision_cascade import VisionCascade, labels_agree
+
+
+def _cascade(tmp_path, monkeypatch, audit_rate=0.0):
+    monkeypatch.setattr(settings, "VISION_CASCADE_AUDIT_RATE", audit_rate)
+    monkeypatch.setattr(settings, "VISION_CASCADE_MIN_SAMPLES", 10)
+    monkeypatch.setattr(settings, "VISION_CASCADE_TUNE_EVERY", 20)
+    monkeypatch.setattr(settings, "VISION_CASCADE_TARGET_AGREEMENT", 0.9)
+    return VisionCascade(thresholds_path=tmp_path / "thresholds.json", rng=random.Random(0))
+
+
+def test_labels_agree_on_same_condition_words():
+    assert labels_agree("Bacterial Blight", "bacterial_blight")
+    assert labels_agree("Tomato___Late_blight", "Late Blight")
+    assert labels_agree("blight, late", "Late blight")
+    assert not labels_agree("rust", "unknown")
+    assert not labels_agree("", "rust")
+
+
+def test_labels_agree_rejects_contained_or_negated_names():
+    assert not labels_agree("healthy", "Unhealthy")
+    assert not labels_agree("healthy", "not healthy - early blight")
+    assert not labels_agree("Tomato___Late_blight", "tomato")
+    assert not labels_agree("blight", "Early Blight")
+
+
+def test_decide_uses_per_class_threshold(tmp_path, monkeypatch):
+    cascade = _cascade(tmp_path, monkeypatch)
+    assert cascade.decide("rust", 0.9) == "local"
+    assert cascade.decide("rust", 0.5) == "escalate"
+
+    cascade.thresholds["rust"] = 0.4
+    assert cascade.decide("Rust", 0.5) == "local"
+
+
+def test_tune_runs_in_background_and_persists(tmp_path, monkeypatch):
+    cascade = _cascade(tmp_path, monkeypatch)
+    # Local answers agree with the LLM above 0.7 confidence and disagree below it
+    for i in range(20):
+        confidence = 0.5 + i * 0.02
+        cascade.record("rust", confidence, "rust" if confidence >= 0.7 else "blight")
+
+    cascade._tune_executor.shutdown(wait=True)
+    saved = json.loads((tmp_path / "thresholds.json").read_text())
+    assert 0.66 <= saved["rust"] <= 0.72
+    assert cascade.threshold_for("rust") == saved["rust"]
+
+
+def test_class_that_never_agrees_always_escalates(tmp_path, monkeypatch):
+    cascade = _cascade(tmp_path, monkeypatch)
+    for i in range(10):
+        cascade.record("mildew", 0.99, "rust")
+
+    assert cascade.tune()["mildew"] > 1.0
+    assert cascade.decide("mildew", 0.99) == "escalate"